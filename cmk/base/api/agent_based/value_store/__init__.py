@@ -2,8 +2,18 @@
 # Copyright (C) 2019 Checkmk GmbH - License: GNU General Public License v2
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
-from ._utils import ValueStoreManager
+from ._utils import (
+    remove_value_store,
+    rename_value_store,
+    value_store_database,
+    ValueStoreDatabase,
+    ValueStoreManager,
+)
 
 __all__ = [
+    "remove_value_store",
+    "rename_value_store",
+    "value_store_database",
+    "ValueStoreDatabase",
     "ValueStoreManager",
 ]
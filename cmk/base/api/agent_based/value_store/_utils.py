@@ -3,11 +3,16 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+import atexit
+import contextlib
+import functools
 import json
+import sqlite3
+import threading
+import time
 from ast import literal_eval
 from collections.abc import (
     Callable,
-    Container,
     Hashable,
     Iterable,
     Iterator,
@@ -15,8 +20,9 @@ from collections.abc import (
     MutableMapping,
 )
 from contextlib import contextmanager
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Final, TypeVar
+from typing import Any, Final, Generic, Protocol, TypeVar
 
 import cmk.utils.cleanup
 import cmk.utils.paths
@@ -67,29 +73,301 @@ class _DynamicDiskSyncedMapping(dict[_TKey, _TValue]):
         return super().pop(key, *args)
 
 
-class _StaticDiskSyncedMapping(Mapping[_TKey, _TValue]):
-    """Represents the values stored on disk
+_SQLITE_PRAGMAS: Final = (
+    "PRAGMA journal_mode=WAL;",
+    "PRAGMA synchronous=NORMAL;",
+    "PRAGMA busy_timeout=10000;",
+)
 
-    This class provides a Mapping-interface for the values stored
-    on disk.
+_SQLITE_SCHEMA: Final = (
+    """CREATE TABLE IF NOT EXISTS value_stores (
+        host TEXT PRIMARY KEY,
+        generation INTEGER NOT NULL,
+        data TEXT NOT NULL
+    ) WITHOUT ROWID;""",
+)
 
-    The only way to modify the values is the disksync method.
+
+@dataclass
+class _PendingChanges(Generic[_TKey, _TValue]):
+    """The changes of the values of a host not yet written to the database"""
+
+    base_generation: int | None
+    removed: set[_TKey] = field(default_factory=set)
+    updated: dict[_TKey, _TValue] = field(default_factory=dict)
+
+    def add(self, removed: Iterable[_TKey], updated: Iterable[tuple[_TKey, _TValue]]) -> None:
+        for key in removed:
+            self.updated.pop(key, None)
+            self.removed.add(key)
+        for key, value in updated:
+            self.removed.discard(key)
+            self.updated[key] = value
+
+    def apply(self, data: Mapping[_TKey, _TValue]) -> dict[_TKey, _TValue]:
+        applied = {k: v for k, v in data.items() if k not in self.removed}
+        applied.update(self.updated)
+        return applied
+
+
+class ValueStoreDatabase(Generic[_TKey, _TValue]):
+    """The values of all hosts in a single SQLite database
+
+    Every host has a record of its own, holding its serialized values and a generation that is
+    increased with every write. The values last loaded or written are kept in memory and are
+    only deserialized again if the generation in the database has changed.
+
+    Changes are written in batches: Pending changes are written when there are too many of them,
+    at the latest `max_delay` seconds after the oldest one has been made, and when the process
+    exits. The delay is watched by a timer thread, so the changes are also written while the
+    process is idle, e.g. a keepalive helper waiting for the next host to check. Pending changes are based on the
+    generation the host had when they were made. If another process wrote the values of the
+    host in the meantime, the pending changes are discarded, so values are never replaced by
+    older ones. Without batching, the changes are written right away.
+
+    Hosts without a record are read from the JSON file they were stored in before, and the file
+    is removed once their values are written to the database.
     """
 
+    _MAX_CACHED_HOSTS: Final = 10000
+
     def __init__(
         self,
-        *,
         path: Path,
+        *,
+        legacy_dir: Path,
         log_debug: Callable[[str], None],
         serializer: Callable[[Mapping[_TKey, _TValue]], str],
         deserializer: Callable[[str], Mapping[_TKey, _TValue]],
+        max_pending: int = 100,
+        max_delay: float = 1.0,
     ) -> None:
-        self._path: Final = path
-        self._last_sync: float | None = None
-        self._data: Mapping[_TKey, _TValue] = {}
-        self._log_debug = log_debug
+        self.path: Final = path
+        self._legacy_dir: Final = legacy_dir
+        self._log_debug: Final = log_debug
         self._serializer: Final = serializer
         self._deserializer: Final = deserializer
+        self._max_pending: Final = max_pending
+        self._max_delay: Final = max_delay
+        self._cache: dict[HostName, tuple[int, Mapping[_TKey, _TValue]]] = {}
+        self._pending: dict[HostName, _PendingChanges[_TKey, _TValue]] = {}
+        self._pending_since = 0.0
+        self._flush_timer: threading.Timer | None = None
+        # Held while accessing the pending changes and the cache, see _flush_delayed
+        self._lock: Final = threading.RLock()
+
+    @contextlib.contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """Leaving the context commits the changes, unless there is an error"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with contextlib.closing(sqlite3.connect(self.path)) as connection:
+            for pragma in _SQLITE_PRAGMAS:
+                connection.execute(pragma)
+            with connection:
+                for statement in _SQLITE_SCHEMA:
+                    connection.execute(statement)
+            with connection:
+                yield connection
+
+    def _load_legacy(self, host_name: HostName) -> Mapping[_TKey, _TValue]:
+        return (
+            self._deserializer(content)
+            if (
+                content := store.load_text_from_file(
+                    self._legacy_dir / host_name, lock=False
+                ).strip()
+            )
+            else {}
+        )
+
+    def _remember(
+        self, host_name: HostName, generation: int, data: Mapping[_TKey, _TValue]
+    ) -> Mapping[_TKey, _TValue]:
+        self._cache.pop(host_name, None)
+        if len(self._cache) >= self._MAX_CACHED_HOSTS:
+            del self._cache[next(iter(self._cache))]
+        self._cache[host_name] = (generation, data)
+        return data
+
+    def _load_committed(self, host_name: HostName) -> tuple[int | None, Mapping[_TKey, _TValue]]:
+        cached_generation, cached_data = self._cache.get(host_name, (None, {}))
+        with self._connection() as connection:
+            row = connection.execute(
+                "SELECT generation, CASE WHEN generation = ? THEN NULL ELSE data END"
+                " FROM value_stores WHERE host = ?",
+                (cached_generation, str(host_name)),
+            ).fetchone()
+
+        if row is None:
+            self._cache.pop(host_name, None)
+            return None, self._load_legacy(host_name)
+
+        generation, raw = row
+        if raw is None:
+            self._log_debug("already loaded")
+            return generation, cached_data
+        self._log_debug("loading from database")
+        return generation, self._remember(host_name, generation, self._deserializer(raw))
+
+    def load(self, host_name: HostName) -> Mapping[_TKey, _TValue]:
+        with self._lock:
+            generation, data = self._load_committed(host_name)
+            if (pending := self._pending.get(host_name)) is None:
+                return data
+            if pending.base_generation != generation:
+                self._log_debug("discarding pending changes, values have been written meanwhile")
+                del self._pending[host_name]
+                return data
+            return pending.apply(data)
+
+    def update(
+        self,
+        host_name: HostName,
+        *,
+        removed: Iterable[_TKey],
+        updated: Iterable[tuple[_TKey, _TValue]],
+        batched: bool,
+    ) -> None:
+        with self._lock:
+            if (pending := self._pending.get(host_name)) is None:
+                if not self._pending:
+                    self._pending_since = time.monotonic()
+                # The changes are based on what has been loaded last
+                base_generation = self._cache.get(host_name, (None, {}))[0]
+                pending = self._pending[host_name] = _PendingChanges(base_generation)
+            pending.add(removed, updated)
+
+            if (
+                not batched
+                or len(self._pending) >= self._max_pending
+                or time.monotonic() - self._pending_since >= self._max_delay
+            ):
+                self.flush()
+            elif self._flush_timer is None:
+                self._flush_timer = threading.Timer(
+                    self._max_delay - (time.monotonic() - self._pending_since),
+                    self._flush_delayed,
+                )
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def _flush_delayed(self) -> None:
+        try:
+            self.flush()
+        except Exception as e:
+            # The changes are kept, they are written with the next flush
+            logger.warning("value store: writing the pending changes failed: %s", e)
+
+    def flush(self) -> None:
+        """Write all pending changes in a single transaction"""
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self._pending:
+                return
+            self._log_debug(f"writing the values of {len(self._pending)} hosts to the database")
+
+            migrated = []
+            with self._connection() as connection:
+                # Don't let anybody write between reading and writing
+                connection.execute("BEGIN IMMEDIATE")
+                for host_name, changes in self._pending.items():
+                    row = connection.execute(
+                        "SELECT generation, data FROM value_stores WHERE host = ?",
+                        (str(host_name),),
+                    ).fetchone()
+                    if row is None:
+                        generation, data = None, self._load_legacy(host_name)
+                        migrated.append(host_name)
+                    else:
+                        generation, raw = row
+                        data = self._deserializer(raw)
+
+                    if generation != changes.base_generation:
+                        self._log_debug(f"discarding outdated changes of {host_name}")
+                        continue
+
+                    data = changes.apply(data)
+                    generation = 1 if generation is None else generation + 1
+                    connection.execute(
+                        "INSERT OR REPLACE INTO value_stores VALUES (?, ?, ?)",
+                        (str(host_name), generation, self._serializer(data)),
+                    )
+                    self._remember(host_name, generation, data)
+            self._pending.clear()
+
+            for host_name in migrated:
+                (self._legacy_dir / host_name).unlink(missing_ok=True)
+
+    def remove(self, host_name: HostName) -> bool:
+        """Remove the values of the host, return whether there were any"""
+        with self._lock:
+            self._pending.pop(host_name, None)
+            self._cache.pop(host_name, None)
+        with self._connection() as connection:
+            removed = bool(
+                connection.execute(
+                    "DELETE FROM value_stores WHERE host = ?", (str(host_name),)
+                ).rowcount
+            )
+        try:
+            (self._legacy_dir / host_name).unlink()
+        except FileNotFoundError:
+            return removed
+        return True
+
+    def rename(self, old_name: HostName, new_name: HostName) -> bool:
+        """Move the values of a host to its new name, return whether there were any"""
+        with self._lock:
+            self.flush()
+            self._cache.pop(old_name, None)
+            self._cache.pop(new_name, None)
+        with self._connection() as connection:
+            connection.execute("DELETE FROM value_stores WHERE host = ?", (str(new_name),))
+            renamed = bool(
+                connection.execute(
+                    "UPDATE value_stores SET host = ?, generation = generation + 1 WHERE host = ?",
+                    (str(new_name), str(old_name)),
+                ).rowcount
+            )
+        if renamed:
+            # Would be shadowed by the record anyway
+            (self._legacy_dir / new_name).unlink(missing_ok=True)
+        return renamed
+
+    def migrate(self) -> int:
+        """Move the values of all hosts from their JSON files to the database
+
+        Return the number of hosts migrated.
+        """
+        try:
+            legacy_files = [p for p in self._legacy_dir.iterdir() if p.is_file()]
+        except FileNotFoundError:
+            return 0
+        for legacy_file in legacy_files:
+            self.update(HostName(legacy_file.name), removed=(), updated=(), batched=True)
+        self.flush()
+        return len(legacy_files)
+
+
+class _StaticDatabaseSyncedMapping(Mapping[_TKey, _TValue]):
+    """Represents the values of a host stored in the value store database
+
+    The only way to modify the values is the disksync method.
+    """
+
+    def __init__(
+        self,
+        *,
+        database: ValueStoreDatabase[_TKey, _TValue],
+        host_name: HostName,
+        batched: bool,
+    ) -> None:
+        self._database: Final = database
+        self._host_name: Final = host_name
+        self._batched: Final = batched
+        self._data: Mapping[_TKey, _TValue] = {}
         self.disksync()
 
     def __getitem__(self, key: _TKey) -> _TValue:
@@ -104,72 +382,46 @@ class _StaticDiskSyncedMapping(Mapping[_TKey, _TValue]):
     def disksync(
         self,
         *,
-        removed: Container[_TKey] = (),
+        removed: Iterable[_TKey] = (),
         updated: Iterable[tuple[_TKey, _TValue]] = (),
     ) -> None:
         """Re-load and write the changes of the stored values
 
-        This method will reload the values from disk, apply the changes (remove keys
-        and update values) as specified by the arguments, and then write the result to disk.
-
-        When this method returns, the data provided via the Mapping-interface and
-        the data stored on disk must be in sync.
+        This method will reload the values from the database and apply the changes (remove keys
+        and update values) as specified by the arguments. Without batching, the changes are
+        written right away, with batching they may be written later on.
         """
-        self._log_debug("synchronizing")
-
-        self._path.parent.mkdir(parents=True, exist_ok=True)
-
-        with store.locked(self._path):
-            try:
-                if self._path.stat().st_mtime == self._last_sync:
-                    self._log_debug("already loaded")
-                else:
-                    self._log_debug("loading from disk")
-                    self._data = (
-                        self._deserializer(content)
-                        if (content := store.load_text_from_file(self._path, lock=False).strip())
-                        else {}
-                    )
+        removed, updated = list(removed), list(updated)
+        try:
+            if removed or updated:
+                self._database.update(
+                    self._host_name, removed=removed, updated=updated, batched=self._batched
+                )
+            self._data = self._database.load(self._host_name)
+        except Exception as exc:
+            raise MKGeneralException from exc
+
+
+class _StaticMapping(Protocol[_TKey, _TValue]):
+    def __getitem__(self, key: _TKey) -> _TValue: ...
+
+    def __iter__(self) -> Iterator[_TKey]: ...
 
-                if removed or updated:
-                    data = {k: v for k, v in self._data.items() if k not in removed}
-                    data.update(updated)
-                    self._log_debug("writing to disk")
-                    store.save_text_to_file(self._path, self._serializer(data))
-                    self._data = data
+    def __contains__(self, key: object) -> bool: ...
 
-                self._last_sync = self._path.stat().st_mtime
-            except Exception as exc:
-                raise MKGeneralException from exc
+    def disksync(
+        self, *, removed: set[_TKey], updated: Iterable[tuple[_TKey, _TValue]]
+    ) -> None: ...
 
 
 class _DiskSyncedMapping(MutableMapping[_TKey, _TValue]):  # pylint: disable=too-many-ancestors
     """Implements the overlay logic between dynamic and static value store"""
 
-    @classmethod
-    def make(
-        cls,
-        *,
-        path: Path,
-        log_debug: Callable[[str], None],
-        serializer: Callable[[Mapping[_TKey, _TValue]], str],
-        deserializer: Callable[[str], Mapping[_TKey, _TValue]],
-    ) -> "_DiskSyncedMapping":
-        return cls(
-            dynamic=_DynamicDiskSyncedMapping(),
-            static=_StaticDiskSyncedMapping(
-                path=path,
-                log_debug=log_debug,
-                serializer=serializer,
-                deserializer=deserializer,
-            ),
-        )
-
     def __init__(
         self,
         *,
         dynamic: _DynamicDiskSyncedMapping[_TKey, _TValue],
-        static: _StaticDiskSyncedMapping[_TKey, _TValue],
+        static: _StaticMapping[_TKey, _TValue],
     ) -> None:
         self._dynamic = dynamic
         self.static = static
@@ -276,6 +528,34 @@ class _ValueStore(MutableMapping[_UserKey, Any]):  # pylint: disable=too-many-an
         return sum(1 for _ in self)
 
 
+@functools.cache
+def value_store_database(path: Path, legacy_dir: Path) -> ValueStoreDatabase[_ValueStoreKey, str]:
+    """The value store database of this process, pending changes are written on exit"""
+    database = ValueStoreDatabase[_ValueStoreKey, str](
+        path,
+        legacy_dir=legacy_dir,
+        log_debug=lambda x: logger.debug("value store: %s", x),
+        serializer=lambda d: json.dumps(list(d.items())),
+        deserializer=lambda raw: {tuple(k): v for k, v in json.loads(raw)},
+    )
+    atexit.register(database.flush)
+    return database
+
+
+def remove_value_store(host_name: HostName) -> bool:
+    """Remove the stored values of the host, return whether there were any"""
+    return value_store_database(
+        ValueStoreManager.DATABASE_PATH, ValueStoreManager.STORAGE_PATH
+    ).remove(host_name)
+
+
+def rename_value_store(old_name: HostName, new_name: HostName) -> bool:
+    """Move the stored values of a host to its new name, return whether there were any"""
+    return value_store_database(
+        ValueStoreManager.DATABASE_PATH, ValueStoreManager.STORAGE_PATH
+    ).rename(old_name, new_name)
+
+
 class ValueStoreManager:
     """Provide the ValueStores for one host
 
@@ -290,13 +570,21 @@ class ValueStoreManager:
     """
 
     STORAGE_PATH = Path(cmk.utils.paths.counters_dir)
+    DATABASE_PATH = cmk.utils.paths.counters_database_file
 
-    def __init__(self, host_name: HostName) -> None:
-        self._value_store: _DiskSyncedMapping[_ValueStoreKey, str] = _DiskSyncedMapping.make(
-            path=self.STORAGE_PATH / host_name,
-            log_debug=lambda x: logger.debug("value store: %s", x),
-            serializer=lambda d: json.dumps(list(d.items())),
-            deserializer=lambda raw: {tuple(k): v for k, v in json.loads(raw)},
+    def __init__(self, host_name: HostName, *, batched: bool = False) -> None:
+        """Load the value store of the host
+
+        With batching, the changes of several hosts are written together. This only makes sense
+        for processes checking many hosts.
+        """
+        self._value_store: _DiskSyncedMapping[_ValueStoreKey, str] = _DiskSyncedMapping(
+            dynamic=_DynamicDiskSyncedMapping(),
+            static=_StaticDatabaseSyncedMapping(
+                database=value_store_database(self.DATABASE_PATH, self.STORAGE_PATH),
+                host_name=host_name,
+                batched=batched,
+            ),
         )
         self.active_service_interface: MutableMapping[str, Any] | None = None
         self._host_name = host_name
@@ -49,7 +49,6 @@ from cmk.utils.paths import (
     base_autochecks_dir,
     base_discovered_host_labels_dir,
     checks_dir,
-    counters_dir,
     data_source_cache_dir,
     discovered_host_labels_dir,
     local_agent_based_plugins_dir,
@@ -150,7 +149,11 @@ import cmk.base.core
 import cmk.base.nagios_utils
 import cmk.base.parent_scan
 from cmk.base import check_api, config, core_config, notify, server_side_calls, sources
-from cmk.base.api.agent_based.value_store import ValueStoreManager
+from cmk.base.api.agent_based.value_store import (
+    remove_value_store,
+    rename_value_store,
+    ValueStoreManager,
+)
 from cmk.base.automations import Automation, automations, MKAutomationError
 from cmk.base.checkers import (
     CheckPluginMapper,
@@ -1172,6 +1175,9 @@ class AutomationRenameHosts(Automation):
             if self._rename_host_file(str(tmp_dir / d), oldname, newname):
                 actions.append(d)
 
+        if rename_value_store(HostName(oldname), HostName(newname)) and "counters" not in actions:
+            actions.append("counters")
+
         actions.extend(cmk.piggyback.move_for_host_rename(oldname, newname))
 
         # Logwatch
@@ -1185,6 +1191,7 @@ class AutomationRenameHosts(Automation):
         # HW/SW Inventory
         if self._rename_host_file(var_dir + "/inventory", oldname, newname):
             self._rename_host_file(var_dir + "/inventory", oldname + ".gz", newname + ".gz")
+            self._rename_host_file(var_dir + "/inventory", oldname + ".sdt", newname + ".sdt")
             actions.append("inv")
 
         if self._rename_host_dir(var_dir + "/inventory_archive", oldname, newname):
@@ -1624,7 +1631,8 @@ class ABCDeleteHosts:
 
     def _execute(self, args: list[str]) -> None:
         for hostname_str in args:
-            self._delete_host_files(HostName(hostname_str))
+            self._delete_host_files(hostname := HostName(hostname_str))
+            remove_value_store(hostname)
 
     @abc.abstractmethod
     def _single_file_paths(self, hostname: HostName) -> Iterable[str]:
@@ -1678,12 +1686,12 @@ class AutomationDeleteHosts(ABCDeleteHosts, Automation):
             f"{precompiled_hostchecks_dir}/{hostname}",
             f"{precompiled_hostchecks_dir}/{hostname}.py",
             f"{autochecks_dir}/{hostname}.mk",
-            f"{counters_dir}/{hostname}",
             f"{discovered_host_labels_dir}/{hostname}.mk",
             f"{tcp_cache_dir}/{hostname}",
             f"{var_dir}/persisted/{hostname}",
             f"{var_dir}/inventory/{hostname}",
             f"{var_dir}/inventory/{hostname}.gz",
+            f"{var_dir}/inventory/{hostname}.sdt",
             f"{var_dir}/agent_deployment/{hostname}",
         ]
 
@@ -1720,11 +1728,11 @@ class AutomationDeleteHostsKnownRemote(ABCDeleteHosts, Automation):
             f"{precompiled_hostchecks_dir}/{hostname}",
             f"{precompiled_hostchecks_dir}/{hostname}.py",
             f"{autochecks_dir}/{hostname}.mk",
-            f"{counters_dir}/{hostname}",
             f"{tcp_cache_dir}/{hostname}",
             f"{var_dir}/persisted/{hostname}",
             f"{var_dir}/inventory/{hostname}",
             f"{var_dir}/inventory/{hostname}.gz",
+            f"{var_dir}/inventory/{hostname}.sdt",
         ]
 
     def _delete_host_files(self, hostname: HostName) -> None:
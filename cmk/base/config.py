@@ -10,6 +10,7 @@ import copy
 import dataclasses
 import enum
 import functools
+import hashlib
 import ipaddress
 import itertools
 import logging
@@ -36,6 +37,7 @@ from typing import (
     NamedTuple,
     overload,
     TypeAlias,
+    TypeGuard,
     TypeVar,
 )
 
@@ -62,6 +64,7 @@ from cmk.utils.log import console
 from cmk.utils.macros import replace_macros_in_str
 from cmk.utils.regex import regex
 from cmk.utils.rulesets import ruleset_matcher, RuleSetName, tuple_rulesets
+from cmk.utils.rulesets.match_cache import PrecomputedHostRuleMatchesStore
 from cmk.utils.rulesets.ruleset_matcher import LabelManager, RulesetMatcher, RulesetName, RuleSpec
 from cmk.utils.sectionname import SectionName
 from cmk.utils.servicename import Item, ServiceName
@@ -402,6 +405,22 @@ class ConfiguredIPLookup(Generic[_TErrHandler]):
 
         return ip_lookup.fallback_ip_for(family)
 
+    def prefetch(self, host_names: Iterable[HostName]) -> None:
+        """Resolve the addresses of the hosts at once instead of one by one when called"""
+        clusters = self._config_cache.hosts_config.clusters
+        ip_lookup.prefetch_dns_lookups(
+            ip_lookup_configs=(
+                self._config_cache.ip_lookup_config(host_name)
+                for host_name in host_names
+                if host_name not in clusters
+            ),
+            configured_ipv4_addresses=ipaddresses,
+            configured_ipv6_addresses=ipv6addresses,
+            simulation_mode=simulation_mode,
+            override_dns=HostAddress(fake_dns) if fake_dns is not None else None,
+            force_file_cache_renewal=not use_dns_cache,
+        )
+
 
 def handle_ip_lookup_failure(host_name: HostName, exc: Exception) -> None:
     """Writes error messages to the console (stdout)."""
@@ -500,9 +519,14 @@ def load_packed_config(config_path: ConfigPath) -> None:
 
     """
     _initialize_config()
-    globals().update(PackedConfigStore.from_serial(config_path).read())
+    packed_config_store = PackedConfigStore.from_serial(config_path)
+    globals().update(packed_config_store.read())
     _perform_post_config_loading_actions()
 
+    get_config_cache().ruleset_matcher.ruleset_optimizer.set_precomputed_host_matches(
+        PrecomputedHostRuleMatchesStore.from_serial(config_path).load(packed_config_store.digest())
+    )
+
 
 def _initialize_config() -> None:
     load_default_config()
@@ -712,7 +736,49 @@ def get_derived_config_variable_names() -> set[str]:
 
 def save_packed_config(config_path: ConfigPath, config_cache: ConfigCache) -> None:
     """Create and store a precompiled configuration for Checkmk helper processes"""
-    PackedConfigStore.from_serial(config_path).write(PackedConfigGenerator(config_cache).generate())
+    packed_config_store = PackedConfigStore.from_serial(config_path)
+    helper_config = PackedConfigGenerator(config_cache).generate()
+    packed_config_store.write(helper_config)
+
+    # The helpers should not have to match the host rulesets again
+    optimizer = config_cache.ruleset_matcher.ruleset_optimizer
+    PrecomputedHostRuleMatchesStore.from_serial(config_path).write(
+        packed_config_store.digest(),
+        optimizer.all_processed_hosts(),
+        {
+            ruleset_matcher.ruleset_fingerprint(ruleset): optimizer.host_rule_indices(ruleset)
+            for ruleset in _iter_host_rulesets(helper_config)
+        },
+    )
+
+
+def _iter_host_rulesets(
+    helper_config: Mapping[str, object]
+) -> Iterator[Sequence[RuleSpec[object]]]:
+    """Yields all rulesets of the helper config that look like host rulesets
+
+    Rulesets are either configuration variables on their own or values of dictionaries like
+    extra_host_conf.
+    """
+    for value in helper_config.values():
+        for candidate in value.values() if isinstance(value, dict) else (value,):
+            if _is_host_ruleset(candidate):
+                yield candidate
+
+
+def _is_host_ruleset(value: object) -> TypeGuard[Sequence[RuleSpec[object]]]:
+    return (
+        isinstance(value, list)
+        and bool(value)
+        and all(
+            isinstance(rule, dict)
+            and "value" in rule
+            and isinstance(condition := rule.get("condition"), dict)
+            and "service_description" not in condition
+            and "service_label_groups" not in condition
+            for rule in value
+        )
+    )
 
 
 class PackedConfigGenerator:
@@ -856,17 +922,39 @@ class PackedConfigStore:
     def make_packed_config_store_path(cls, config_path: ConfigPath) -> Path:
         return Path(config_path) / "precompiled_check_config.mk"
 
+    @property
+    def _digest_path(self) -> Path:
+        return self.path.with_suffix(f"{self.path.suffix}.sha256")
+
     def write(self, helper_config: Mapping[str, Any]) -> None:
         self.path.parent.mkdir(parents=True, exist_ok=True)
+        raw = pickle.dumps(helper_config)
+
+        tmp_digest_path = self._digest_path.with_suffix(f"{self._digest_path.suffix}.new")
+        tmp_digest_path.write_bytes(hashlib.sha256(raw).digest())
+        tmp_digest_path.rename(self._digest_path)
+
         tmp_path = self.path.with_suffix(f"{self.path.suffix}.compiled")
-        with tmp_path.open("wb") as compiled_file:
-            pickle.dump(helper_config, compiled_file)
+        tmp_path.write_bytes(raw)
         tmp_path.rename(self.path)
 
     def read(self) -> Mapping[str, Any]:
         with self.path.open("rb") as f:
             return pickle.load(f)  # nosec B301 # BNS:c3c5e9
 
+    def digest(self) -> bytes:
+        """Identifies the stored configuration, e.g. for data derived from it
+
+        The digest is computed once when writing the configuration, so the helpers do not
+        have to read the whole configuration again to get it.
+        """
+        try:
+            return self._digest_path.read_bytes()
+        except FileNotFoundError:
+            # Written by a version not storing the digest
+            with self.path.open("rb") as f:
+                return hashlib.file_digest(f, "sha256").digest()
+
 
 @contextlib.contextmanager
 def set_use_core_config(
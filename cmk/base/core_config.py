@@ -381,6 +381,11 @@ def _create_core_config(
     passwords = config_cache.collect_passwords()
     cmk.utils.password_store.save(passwords, cmk.utils.password_store.pending_password_store_path())
 
+    hosts_config = config_cache.hosts_config
+    ip_address_of.prefetch(
+        hn for hn in hosts_config.hosts if config_cache.is_active(hn) and config_cache.is_online(hn)
+    )
+
     config_path = next(VersionedConfigPath.current())
     with config_path.create(is_cmc=core.is_cmc()), _backup_objects_file(core):
         core.create_config(
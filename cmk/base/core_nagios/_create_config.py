@@ -6,13 +6,14 @@
 
 import base64
 import itertools
+import re
 import socket
 import sys
 from collections import Counter
 from collections.abc import Mapping, Sequence
 from contextlib import suppress
 from io import StringIO
-from typing import Any, cast, IO, Literal
+from typing import Any, cast, IO, Literal, NamedTuple
 
 import cmk.utils.config_path
 import cmk.utils.paths
@@ -43,6 +44,7 @@ from cmk.base.core_config import (
 from cmk.ccc import store
 from cmk.ccc.exceptions import MKGeneralException
 
+from ._parallel import map_in_forked_workers
 from ._precompile_host_checks import precompile_hostchecks
 
 _ContactgroupName = str
@@ -103,6 +105,7 @@ class NagiosCore(core_config.MonitoringCore):
             licensing_handler=licensing_handler,
             passwords=passwords,
             ip_address_of=ip_address_of,
+            workers=config.nagios_config_workers,
         )
 
         store.save_text_to_file(cmk.utils.paths.nagios_objects_file, config_buffer.getvalue())
@@ -110,7 +113,7 @@ class NagiosCore(core_config.MonitoringCore):
     def _precompile_hostchecks(self, config_path: VersionedConfigPath) -> None:
         with suppress(IOError):
             print("Precompiling host checks...", end="", flush=True, file=sys.stdout)
-        precompile_hostchecks(config_path, self._config_cache)
+        precompile_hostchecks(config_path, self._config_cache, workers=config.nagios_config_workers)
         with suppress(IOError):
             print(tty.ok + "\n", end="", flush=True, file=sys.stdout)
 
@@ -145,6 +148,45 @@ class NagiosConfig:
         # TODO: Something seems to be mixed up in our call sites...
         self._outfile.write(x)
 
+    def hostcheck_command_name(self, number: int) -> CoreCommandName:
+        return "check-mk-host-custom-%d" % number
+
+
+class _HostConfigFragment(NamedTuple):
+    """The objects of a single host, created by a worker process"""
+
+    objects: str
+    notify_host_config: NotificationHostConfig
+    services: int
+    hostgroups_to_define: set[HostgroupName]
+    servicegroups_to_define: set[ServicegroupName]
+    contactgroups_to_define: set[_ContactgroupName]
+    checknames_to_define: set[CheckPluginName]
+    active_checks_to_define: dict[str, str]
+    custom_commands_to_define: set[CoreCommandName]
+    hostcheck_commands_to_define: list[tuple[CoreCommand, str]]
+    warnings: Sequence[str]
+    failed_ip_lookups: Mapping[HostName, Exception]
+
+
+# The numbers of the custom host check commands depend on the commands of all hosts created
+# before. A worker does not know them, so it marks its numbers to be shifted when merging.
+_HOSTCHECK_COMMAND_NUMBER = re.compile("\0([0-9]+)\0")
+
+
+class _HostFragmentConfig(NagiosConfig):
+    def __init__(self, outfile: IO[str]) -> None:
+        super().__init__(outfile, None)
+
+    def hostcheck_command_name(self, number: int) -> CoreCommandName:
+        return "check-mk-host-custom-\0%d\0" % number
+
+
+def _shift_hostcheck_command_numbers(text: str, offset: int) -> str:
+    if "\0" not in text:
+        return text
+    return _HOSTCHECK_COMMAND_NUMBER.sub(lambda m: str(int(m.group(1)) + offset), text)
+
 
 def _validate_licensing(
     hosts: Hosts, licensing_handler: LicensingHandler, licensing_counter: Counter
@@ -163,17 +205,39 @@ def create_config(
     licensing_handler: LicensingHandler,
     passwords: Mapping[str, str],
     ip_address_of: config.IPLookup,
+    *,
+    workers: int = 1,
 ) -> None:
+    """Write the object configuration of the Nagios core
+
+    With more than one worker, the objects of the hosts are created in forked worker processes
+    and merged in the order of the host names. The result is the same as with a single worker.
+    """
     cfg = NagiosConfig(outfile, hostnames)
 
     _output_conf_header(cfg)
 
     licensing_counter = Counter("services")
     all_notify_host_configs: dict[HostName, NotificationHostConfig] = {}
-    for hostname in hostnames:
-        all_notify_host_configs[hostname] = _create_nagios_config_host(
-            cfg, config_cache, hostname, passwords, licensing_counter, ip_address_of
-        )
+    if workers > 1:
+        for hostname, fragment in zip(
+            hostnames,
+            map_in_forked_workers(
+                lambda hostname: _create_nagios_config_host_fragment(
+                    config_cache, hostname, passwords, ip_address_of
+                ),
+                hostnames,
+                workers,
+            ),
+        ):
+            all_notify_host_configs[hostname] = _add_host_config_fragment(
+                cfg, fragment, licensing_counter, ip_address_of
+            )
+    else:
+        for hostname in hostnames:
+            all_notify_host_configs[hostname] = _create_nagios_config_host(
+                cfg, config_cache, hostname, passwords, licensing_counter, ip_address_of
+            )
 
     _validate_licensing(config_cache.hosts_config, licensing_handler, licensing_counter)
 
@@ -191,6 +255,79 @@ def create_config(
         cfg.write(config.extra_nagios_conf)
 
 
+def _failed_ip_lookups(ip_address_of: config.IPLookup) -> Mapping[HostName, Exception]:
+    if isinstance(ip_address_of, config.ConfiguredIPLookup) and isinstance(
+        ip_address_of.error_handler, ip_lookup.CollectFailedHosts
+    ):
+        return ip_address_of.error_handler.failed_ip_lookups
+    return {}
+
+
+def _create_nagios_config_host_fragment(
+    config_cache: ConfigCache,
+    hostname: HostName,
+    stored_passwords: Mapping[str, str],
+    ip_address_of: config.IPLookup,
+) -> _HostConfigFragment:
+    """Create the objects of the host in a worker process, see _add_host_config_fragment()"""
+    outfile = StringIO()
+    cfg = _HostFragmentConfig(outfile)
+    licensing_counter = Counter("services")
+    num_warnings = len(config_warnings.g_configuration_warnings)
+    num_failed_ip_lookups = len(_failed_ip_lookups(ip_address_of))
+
+    notify_host_config = _create_nagios_config_host(
+        cfg, config_cache, hostname, stored_passwords, licensing_counter, ip_address_of
+    )
+
+    return _HostConfigFragment(
+        objects=outfile.getvalue(),
+        notify_host_config=notify_host_config,
+        services=licensing_counter["services"],
+        hostgroups_to_define=cfg.hostgroups_to_define,
+        servicegroups_to_define=cfg.servicegroups_to_define,
+        contactgroups_to_define=cfg.contactgroups_to_define,
+        checknames_to_define=cfg.checknames_to_define,
+        active_checks_to_define=cfg.active_checks_to_define,
+        custom_commands_to_define=cfg.custom_commands_to_define,
+        hostcheck_commands_to_define=cfg.hostcheck_commands_to_define,
+        warnings=config_warnings.g_configuration_warnings[num_warnings:],
+        failed_ip_lookups=dict(
+            itertools.islice(_failed_ip_lookups(ip_address_of).items(), num_failed_ip_lookups, None)
+        ),
+    )
+
+
+def _add_host_config_fragment(
+    cfg: NagiosConfig,
+    fragment: _HostConfigFragment,
+    license_counter: Counter,
+    ip_address_of: config.IPLookup,
+) -> NotificationHostConfig:
+    """Merge the objects of a host just as if they had been created in this process"""
+    offset = len(cfg.hostcheck_commands_to_define)
+    cfg.write(_shift_hostcheck_command_numbers(fragment.objects, offset))
+    cfg.hostcheck_commands_to_define.extend(
+        (_shift_hostcheck_command_numbers(command_name, offset), command_line)
+        for command_name, command_line in fragment.hostcheck_commands_to_define
+    )
+    cfg.hostgroups_to_define.update(fragment.hostgroups_to_define)
+    cfg.servicegroups_to_define.update(fragment.servicegroups_to_define)
+    cfg.contactgroups_to_define.update(fragment.contactgroups_to_define)
+    cfg.checknames_to_define.update(fragment.checknames_to_define)
+    cfg.active_checks_to_define.update(fragment.active_checks_to_define)
+    cfg.custom_commands_to_define.update(fragment.custom_commands_to_define)
+    license_counter["services"] += fragment.services
+
+    # The workers already reported the warnings on the console
+    config_warnings.g_configuration_warnings.extend(fragment.warnings)
+    if isinstance(ip_address_of, config.ConfiguredIPLookup):
+        for host_name, exc in fragment.failed_ip_lookups.items():
+            ip_address_of.error_handler(host_name, exc)
+
+    return fragment.notify_host_config
+
+
 def _output_conf_header(cfg: NagiosConfig) -> None:
     cfg.write(
         """#
@@ -271,7 +408,7 @@ def create_nagios_host_spec(  # pylint: disable=too-many-branches
             host_spec[key] = value
 
     def host_check_via_service_status(service: ServiceName) -> CoreCommand:
-        command = "check-mk-host-custom-%d" % (len(cfg.hostcheck_commands_to_define) + 1)
+        command = cfg.hostcheck_command_name(len(cfg.hostcheck_commands_to_define) + 1)
         service_with_hostname = replace_macros_in_str(
             service,
             {"$HOSTNAME$": hostname},
@@ -848,7 +985,7 @@ def create_nagios_config_commands(cfg: NagiosConfig) -> None:
         cfg.write("\n# ------------------------------------------------------------\n")
         cfg.write("# Dummy check commands and active check commands\n")
         cfg.write("# ------------------------------------------------------------\n\n")
-        for checkname in cfg.checknames_to_define:
+        for checkname in sorted(cfg.checknames_to_define):
             cfg.write(
                 format_nagios_object(
                     "command",
@@ -877,7 +1014,7 @@ def create_nagios_config_commands(cfg: NagiosConfig) -> None:
         )
 
     # custom_checks
-    for command_name in cfg.custom_commands_to_define:
+    for command_name in sorted(cfg.custom_commands_to_define):
         cfg.write(
             format_nagios_object(
                 "command",
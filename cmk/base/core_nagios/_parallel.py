@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Process pool for the per host steps of the core config generation
+
+The workers are forked after the configuration has been loaded and the config cache has been
+initialized, so they do not need to load anything again. Only the host names and the results
+are transferred between the processes. The tasks therefore can be closures, which is why they
+are handed to the workers via a module global instead of being pickled.
+"""
+
+import multiprocessing
+from collections.abc import Callable, Sequence
+from typing import TypeVar
+
+_TItem = TypeVar("_TItem")
+_TResult = TypeVar("_TResult")
+
+# The number of shards per worker. More shards balance the load better, fewer shards
+# reduce the overhead of the transfers.
+_SHARDS_PER_WORKER = 4
+
+_task: Callable | None = None
+
+
+def _run_shard(shard: Sequence[_TItem]) -> list[_TResult]:
+    assert _task is not None
+    return [_task(item) for item in shard]
+
+
+def _shards(items: Sequence[_TItem], num_shards: int) -> list[Sequence[_TItem]]:
+    """Split the items into contiguous shards of (almost) equal size"""
+    size, rest = divmod(len(items), num_shards)
+    bounds = [nr * size + min(nr, rest) for nr in range(num_shards + 1)]
+    return [items[start:end] for start, end in zip(bounds, bounds[1:])]
+
+
+def map_in_forked_workers(
+    task: Callable[[_TItem], _TResult], items: Sequence[_TItem], workers: int
+) -> list[_TResult]:
+    """Apply the task to the items in a pool of forked processes
+
+    The results are in the order of the items, just as if the task had been applied in this
+    process. With less than two workers or items, it is applied in this process.
+
+    An exception raised by the task is raised here, after all shards have been processed.
+    """
+    global _task
+
+    if workers < 2 or len(items) < 2:
+        return [task(item) for item in items]
+
+    workers = min(workers, len(items))
+    _task = task
+    try:
+        with multiprocessing.get_context("fork").Pool(processes=workers) as pool:
+            results_per_shard: list[list[_TResult]] = pool.map(
+                _run_shard,
+                _shards(items, min(len(items), workers * _SHARDS_PER_WORKER)),
+                chunksize=1,
+            )
+    finally:
+        _task = None
+
+    return [result for results in results_per_shard for result in results]
@@ -11,6 +11,7 @@ all saves substantial CPU resources as opposed to running Checkmk
 in adhoc mode (about 75%).
 """
 
+import functools
 import itertools
 import os
 import py_compile
@@ -41,6 +42,7 @@ from cmk.ccc import store
 from cmk.discover_plugins import PluginLocation
 
 from ._host_check_config import HostCheckConfig
+from ._parallel import map_in_forked_workers
 
 _TEMPLATE_FILE = Path(__file__).parent / "_host_check_template.py"
 
@@ -86,7 +88,9 @@ class HostCheckStore:
         console.verbose(f" ==> {compiled_filename}.", file=sys.stderr)
 
 
-def precompile_hostchecks(config_path: VersionedConfigPath, config_cache: ConfigCache) -> None:
+def precompile_hostchecks(
+    config_path: VersionedConfigPath, config_cache: ConfigCache, *, workers: int = 1
+) -> None:
     console.verbose("Creating precompiled host check config...")
     hosts_config = config_cache.hosts_config
 
@@ -94,34 +98,58 @@ def precompile_hostchecks(config_path: VersionedConfigPath, config_cache: Config
 
     console.verbose("Precompiling host checks...")
 
-    host_check_store = HostCheckStore()
-    for hostname in {
-        # Inconsistent with `create_config` above.
-        hn
-        for hn in itertools.chain(hosts_config.hosts, hosts_config.clusters)
-        if config_cache.is_active(hn) and config_cache.is_online(hn)
-    }:
-        try:
-            console.verbose_no_lf(
-                f"{tty.bold}{tty.blue}{hostname:<16}{tty.normal}:", file=sys.stderr
-            )
-            host_check = dump_precompiled_hostcheck(
-                config_cache,
-                config_path,
-                hostname,
+    hostnames = sorted(
+        {
+            # Inconsistent with `create_config` above.
+            hn
+            for hn in itertools.chain(hosts_config.hosts, hosts_config.clusters)
+            if config_cache.is_active(hn) and config_cache.is_online(hn)
+        }
+    )
+    precompile = functools.partial(
+        _precompile_hostcheck, config_cache, config_path, HostCheckStore()
+    )
+    for hostname, error in zip(
+        hostnames,
+        (
+            map_in_forked_workers(precompile, hostnames, workers)
+            if workers > 1
+            else map(precompile, hostnames)
+        ),
+    ):
+        if error is not None:
+            console.error(
+                f"Error precompiling checks for host {hostname}: {error}", file=sys.stderr
             )
-            if host_check is None:
-                console.verbose("(no Checkmk checks)")
-                continue
-
-            host_check_store.write(config_path, hostname, host_check)
-        except Exception as e:
-            if cmk.ccc.debug.enabled():
-                raise
-            console.error(f"Error precompiling checks for host {hostname}: {e}", file=sys.stderr)
             sys.exit(5)
 
 
+def _precompile_hostcheck(
+    config_cache: ConfigCache,
+    config_path: VersionedConfigPath,
+    host_check_store: HostCheckStore,
+    hostname: HostName,
+) -> str | None:
+    """Write the host check of the host, return the error message in case it fails"""
+    try:
+        console.verbose_no_lf(f"{tty.bold}{tty.blue}{hostname:<16}{tty.normal}:", file=sys.stderr)
+        host_check = dump_precompiled_hostcheck(
+            config_cache,
+            config_path,
+            hostname,
+        )
+        if host_check is None:
+            console.verbose("(no Checkmk checks)")
+            return None
+
+        host_check_store.write(config_path, hostname, host_check)
+    except Exception as e:
+        if cmk.ccc.debug.enabled():
+            raise
+        return str(e)
+    return None
+
+
 def dump_precompiled_hostcheck(  # pylint: disable=too-many-branches
     config_cache: ConfigCache,
     config_path: VersionedConfigPath,
@@ -52,6 +52,7 @@ tcp_connect_timeout = 5.0
 tcp_connect_timeouts: list[RuleSpec[float]] = []
 use_dns_cache = True  # prevent DNS by using own cache file
 delay_precompile = False  # delay Python compilation to Nagios execution
+nagios_config_workers = 1  # processes creating the Nagios config and host checks
 restart_locking: Literal["abort", "wait"] | None = "abort"
 check_submission: Literal["file", "pipe"] = "file"
 default_host_group = "check_mk"
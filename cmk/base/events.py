@@ -51,7 +51,14 @@ def event_keepalive(
     call_every_loop: Callable[[], object] | None = None,
     loop_interval: int | None = None,
     shutdown_function: Callable[[], object] | None = None,
+    loop_timeout: Callable[[], float] | None = None,
 ) -> None:
+    """Process the events sent by the core
+
+    call_every_loop is called after each event and when no event has arrived within
+    loop_interval seconds. If loop_timeout is given, it determines this time instead of
+    loop_interval on every turn.
+    """
     # pylint: disable=too-many-branches
     last_config_timestamp = config_timestamp()
 
@@ -76,7 +83,7 @@ def event_keepalive(
             # has been sent. We do this by setting the environment variable
             # CMK_EVENT_RESTART=1
 
-            if event_data_available(loop_interval):
+            if event_data_available(loop_timeout() if loop_timeout else loop_interval):
                 if last_config_timestamp != config_timestamp():
                     logger.info("Configuration has changed. Restarting myself.")
                     if shutdown_function:
@@ -158,7 +165,7 @@ def config_timestamp() -> float:
     return mtime
 
 
-def event_data_available(loop_interval: int | None) -> bool:
+def event_data_available(loop_interval: float | None) -> bool:
     return bool(select.select([0], [], [], loop_interval)[0])
 
 
@@ -46,10 +46,10 @@ from cmk.utils.rulesets.tuple_rulesets import hosttags_match_taglist
 from cmk.utils.sectionname import SectionMap, SectionName
 from cmk.utils.structured_data import (
     ImmutableTree,
-    load_tree,
     MutableTree,
     RawIntervalFromConfig,
     TreeOrArchiveStore,
+    TreeStore,
     UpdateResult,
 )
 from cmk.utils.tags import TagID
@@ -101,7 +101,7 @@ import cmk.base.dump_host
 import cmk.base.parent_scan
 from cmk.base import config, profiling, sources
 from cmk.base.api.agent_based.plugin_classes import SNMPSectionPlugin
-from cmk.base.api.agent_based.value_store import ValueStoreManager
+from cmk.base.api.agent_based.value_store import remove_value_store, ValueStoreManager
 from cmk.base.checkers import (
     CheckPluginMapper,
     CMKFetcher,
@@ -1182,12 +1182,9 @@ def mode_flush(hosts: list[HostName]) -> None:  # pylint: disable=too-many-branc
         flushed = False
 
         # counters
-        try:
-            os.remove(cmk.utils.paths.counters_dir + "/" + host)
+        if remove_value_store(host):
             print_(tty.bold + tty.blue + " counters")
             flushed = True
-        except OSError:
-            pass
 
         # cache files
         d = 0
@@ -2318,7 +2315,7 @@ def mode_check(
     with (
         error_handler,
         set_value_store_manager(
-            ValueStoreManager(hostname), store_changes=not dry_run
+            ValueStoreManager(hostname, batched=keepalive), store_changes=not dry_run
         ) as value_store_manager,
     ):
         console.debug(f"Checkmk version {cmk_version.__version__}")
@@ -2562,7 +2559,7 @@ def mode_inventory(options: _InventoryOptions, args: list[str]) -> None:
         section.section_begin(hostname)
         section.section_step("Inventorizing")
         try:
-            previous_tree = load_tree(Path(cmk.utils.paths.inventory_output_dir, hostname))
+            previous_tree = TreeStore(cmk.utils.paths.inventory_output_dir).load(host_name=hostname)
             if hostname in hosts_config.clusters:
                 check_result = inventory.inventorize_cluster(
                     config_cache.nodes(hostname),
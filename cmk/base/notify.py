@@ -26,11 +26,12 @@ import sys
 import time
 import traceback
 import uuid
-from collections.abc import Iterable, Mapping, Sequence
+from collections.abc import Iterable, Iterator, Mapping, Sequence
 from contextlib import suppress
+from dataclasses import dataclass
 from functools import partial
 from pathlib import Path
-from typing import Any, Callable, cast, Literal, overload
+from typing import Any, Callable, cast, Final, Literal, overload
 
 import cmk.utils.paths
 from cmk.utils import log
@@ -86,6 +87,8 @@ logger = logging.getLogger("cmk.base.notify")
 
 _log_to_stdout = False
 notify_mode = "notify"
+# The bulks known to the keepalive mode, see notify_keepalive
+_bulk_index: "BulkIndex | None" = None
 
 _ContactgroupName = str
 
@@ -661,6 +664,11 @@ def notify_keepalive(
     logging_level: int,
     all_timeperiods: TimeperiodSpecs,
 ) -> None:
+    global _bulk_index
+    _bulk_index = BulkIndex(notification_bulkdir)
+    _bulk_index.rebuild()
+    bulk_scheduler = BulkScheduler(_bulk_index, bulk_interval=bulk_interval)
+
     events.event_keepalive(
         event_function=partial(
             notify_notify,
@@ -679,12 +687,12 @@ def notify_keepalive(
             all_timeperiods=all_timeperiods,
         ),
         call_every_loop=partial(
-            send_ripe_bulks,
+            bulk_scheduler.send_ripe_bulks,
             get_http_proxy,
-            bulk_interval=bulk_interval,
             plugin_timeout=plugin_timeout,
         ),
         loop_interval=bulk_interval,
+        loop_timeout=bulk_scheduler.timeout,
     )
 
 
@@ -2090,6 +2098,8 @@ def do_bulk_notify(  # pylint: disable=too-many-branches
     filename_new.write_text(f"{(params, plugin_context)!r}\n")
     filename_new.rename(filename_final)  # We need an atomic creation!
     logger.info("        - stored in %s", filename_final)
+    if _bulk_index is not None:
+        _bulk_index.add(str(bulk_dir), filename_final.stat().st_mtime)
 
 
 def _create_bulk_dir(bulk_path: Sequence[str]) -> Path:
@@ -2159,21 +2169,22 @@ def remove_if_orphaned(bulk_dir: str, max_age: float, ref_time: float | None = N
             logger.info("    -> Error removing it: %s", e)
 
 
+def _listdir_visible(path: str) -> list[str]:
+    return [x for x in os.listdir(path) if not x.startswith(".")]
+
+
 def find_bulks(only_ripe: bool, *, bulk_interval: int) -> NotifyBulks:
     # pylint: disable=too-many-branches
     if not os.path.exists(notification_bulkdir):
         return []
 
-    def listdir_visible(path: str) -> list[str]:
-        return [x for x in os.listdir(path) if not x.startswith(".")]
-
     bulks: NotifyBulks = []
     now = time.time()
-    for contact in listdir_visible(notification_bulkdir):
+    for contact in _listdir_visible(notification_bulkdir):
         contact_dir = os.path.join(notification_bulkdir, contact)
-        for method in listdir_visible(contact_dir):
+        for method in _listdir_visible(contact_dir):
             method_dir = os.path.join(contact_dir, method)
-            for bulk in listdir_visible(method_dir):
+            for bulk in _listdir_visible(method_dir):
                 bulk_dir = os.path.join(method_dir, bulk)
 
                 uuids, oldest = bulk_uuids(bulk_dir)
@@ -2189,11 +2200,7 @@ def find_bulks(only_ripe: bool, *, bulk_interval: int) -> NotifyBulks:
                 interval, timeperiod, count = parts
 
                 if interval is not None:
-                    if age >= interval:
-                        logger.info("Bulk %s is ripe: age %d >= %d", bulk_dir, age, interval)
-                    elif len(uuids) >= count:
-                        logger.info("Bulk %s is ripe: count %d >= %d", bulk_dir, len(uuids), count)
-                    else:
+                    if not _interval_bulk_is_ripe(bulk_dir, age, len(uuids), interval, count):
                         logger.info(
                             "Bulk %s is not ripe yet (age: %d, count: %d)!",
                             bulk_dir,
@@ -2205,20 +2212,10 @@ def find_bulks(only_ripe: bool, *, bulk_interval: int) -> NotifyBulks:
 
                     bulks.append((bulk_dir, age, interval, "n.a.", count, uuids))
                 else:
-                    try:
-                        active = timeperiod_active(str(timeperiod))
-                    except Exception:
-                        # This prevents sending bulk notifications if a
-                        # livestatus connection error appears. It also implies
-                        # that an ongoing connection error will hold back bulk
-                        # notifications.
-                        logger.info(
-                            "Error while checking activity of time period %s: assuming active",
-                            timeperiod,
-                        )
-                        active = True
-
-                    if active is True and len(uuids) < count:
+                    active = _timeperiod_active(str(timeperiod))
+                    if not _timeperiod_bulk_is_ripe(
+                        bulk_dir, active, len(uuids), str(timeperiod), count
+                    ):
                         # Only add a log entry every 10 minutes since timeperiods
                         # can be very long (The default would be 10s).
                         if now % 600 <= bulk_interval:
@@ -2231,39 +2228,299 @@ def find_bulks(only_ripe: bool, *, bulk_interval: int) -> NotifyBulks:
 
                         if only_ripe:
                             continue
-                    elif active is False:
-                        logger.info(
-                            "Bulk %s is ripe: time period %s has ended", bulk_dir, timeperiod
-                        )
-                    elif len(uuids) >= count:
-                        logger.info("Bulk %s is ripe: count %d >= %d", bulk_dir, len(uuids), count)
-                    else:
-                        logger.info(
-                            "Bulk %s is ripe: time period %s is not known anymore",
-                            bulk_dir,
-                            timeperiod,
-                        )
 
                     bulks.append((bulk_dir, age, "n.a.", timeperiod, count, uuids))
     return bulks
 
 
+def _timeperiod_active(timeperiod: str) -> bool | None:
+    try:
+        return timeperiod_active(timeperiod)
+    except Exception:
+        # This prevents sending bulk notifications if a
+        # livestatus connection error appears. It also implies
+        # that an ongoing connection error will hold back bulk
+        # notifications.
+        logger.info(
+            "Error while checking activity of time period %s: assuming active",
+            timeperiod,
+        )
+        return True
+
+
+def _interval_bulk_is_ripe(bulk_dir: str, age: float, num: int, interval: int, count: int) -> bool:
+    if age >= interval:
+        logger.info("Bulk %s is ripe: age %d >= %d", bulk_dir, age, interval)
+        return True
+    if num >= count:
+        logger.info("Bulk %s is ripe: count %d >= %d", bulk_dir, num, count)
+        return True
+    return False
+
+
+def _timeperiod_bulk_is_ripe(
+    bulk_dir: str, active: bool | None, num: int, timeperiod: str, count: int
+) -> bool:
+    if active is True and num < count:
+        return False
+    if active is False:
+        logger.info("Bulk %s is ripe: time period %s has ended", bulk_dir, timeperiod)
+    elif num >= count:
+        logger.info("Bulk %s is ripe: count %d >= %d", bulk_dir, num, count)
+    else:
+        logger.info(
+            "Bulk %s is ripe: time period %s is not known anymore",
+            bulk_dir,
+            timeperiod,
+        )
+    return True
+
+
+@dataclass
+class _IndexedBulk:
+    interval: int | None
+    timeperiod: str | None
+    count: int
+    oldest: float
+    num_notifications: int
+    # Of the bulk directory, to notice notifications stored by other processes
+    mtime_ns: int
+    # Not sent before, after sending has failed
+    postponed_until: float = 0.0
+
+    def ripe_at(self) -> float | None:
+        """When the bulk becomes ripe, None if that depends on a time period"""
+        if not self.num_notifications:
+            return None
+        if self.num_notifications >= self.count:
+            return self.postponed_until
+        if self.interval is None:
+            return None
+        return max(self.oldest + self.interval, self.postponed_until)
+
+
+class BulkIndex:
+    """In-memory index of the bulks below the bulk directory, used by the keepalive mode
+
+    The notifications stored by this process are added to the index right away. The changes
+    made by other processes, e.g. when handling spool files, are noticed by refresh() with
+    the modification times of the directories.
+    """
+
+    def __init__(self, bulkdir: str) -> None:
+        self._bulkdir: Final = str(Path(bulkdir))
+        self._bulks: Final[dict[str, _IndexedBulk]] = {}
+        self._method_dirs: Final[dict[str, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._bulks)
+
+    def rebuild(self) -> None:
+        self._bulks.clear()
+        self._method_dirs.clear()
+        self.refresh()
+
+    def refresh(self) -> None:
+        for bulk_dir, bulk in list(self._bulks.items()):
+            try:
+                mtime_ns = os.stat(bulk_dir).st_mtime_ns
+            except FileNotFoundError:
+                del self._bulks[bulk_dir]
+                continue
+            if mtime_ns != bulk.mtime_ns:
+                self.update(bulk_dir)
+
+        for method_dir in self._method_dirs_on_disk():
+            try:
+                mtime_ns = os.stat(method_dir).st_mtime_ns
+            except FileNotFoundError:
+                continue
+            if self._method_dirs.get(method_dir) == mtime_ns:
+                continue
+            self._method_dirs[method_dir] = mtime_ns
+            for name in _listdir_visible(method_dir):
+                if (bulk_dir := os.path.join(method_dir, name)) not in self._bulks:
+                    self.update(bulk_dir)
+
+    def _method_dirs_on_disk(self) -> Iterator[str]:
+        if not os.path.exists(self._bulkdir):
+            return
+        for contact in _listdir_visible(self._bulkdir):
+            contact_dir = os.path.join(self._bulkdir, contact)
+            for method in _listdir_visible(contact_dir):
+                yield os.path.join(contact_dir, method)
+
+    def update(self, bulk_dir: str) -> None:
+        """Index the bulk as it is on disk"""
+        method_dir, bulk = os.path.split(bulk_dir)
+        if (parts := bulk_parts(method_dir, bulk)) is None:
+            self._bulks.pop(bulk_dir, None)
+            return
+        try:
+            mtime_ns = os.stat(bulk_dir).st_mtime_ns
+            uuids, oldest = bulk_uuids(bulk_dir)
+        except FileNotFoundError:
+            self._bulks.pop(bulk_dir, None)
+            return
+        interval, timeperiod, count = parts
+        self._bulks[bulk_dir] = _IndexedBulk(
+            interval, timeperiod, count, oldest, len(uuids), mtime_ns
+        )
+
+    def add(self, bulk_dir: str, mtime: float) -> None:
+        """Take over a notification stored in the bulk by this process"""
+        if (bulk := self._bulks.get(bulk_dir)) is None:
+            self.update(bulk_dir)
+            return
+        bulk.oldest = min(bulk.oldest, mtime) if bulk.num_notifications else mtime
+        bulk.num_notifications += 1
+        bulk.mtime_ns = os.stat(bulk_dir).st_mtime_ns
+
+    def postpone(self, bulk_dir: str, until: float) -> None:
+        if (bulk := self._bulks.get(bulk_dir)) is not None:
+            bulk.postponed_until = until
+
+    def next_ripe_time(self) -> float | None:
+        """When the next bulk becomes ripe, not considering the bulks waiting for time periods"""
+        return min(
+            (ripe_at for bulk in self._bulks.values() if (ripe_at := bulk.ripe_at()) is not None),
+            default=None,
+        )
+
+    def timeperiods(self) -> set[str]:
+        return {
+            bulk.timeperiod
+            for bulk in self._bulks.values()
+            if bulk.timeperiod is not None and bulk.num_notifications
+        }
+
+    def ripe_bulks(
+        self, now: float, timeperiod_states: Mapping[str, bool | None] | None
+    ) -> NotifyBulks:
+        """Return the ripe bulks
+
+        The bulks waiting for the end of a time period are only considered if the states of
+        the time periods are given. The notifications of the ripe bulks are read from disk.
+        """
+        bulks: NotifyBulks = []
+        for bulk_dir, bulk in list(self._bulks.items()):
+            if not bulk.num_notifications:
+                if timeperiod_states is not None:
+                    remove_if_orphaned(bulk_dir, max_age=60, ref_time=now)
+                    if not os.path.exists(bulk_dir):
+                        del self._bulks[bulk_dir]
+                continue
+            if now < bulk.postponed_until:
+                continue
+
+            age = now - bulk.oldest
+            if bulk.interval is not None:
+                if not _interval_bulk_is_ripe(
+                    bulk_dir, age, bulk.num_notifications, bulk.interval, bulk.count
+                ):
+                    continue
+            elif bulk.num_notifications < bulk.count and timeperiod_states is None:
+                continue
+            elif not _timeperiod_bulk_is_ripe(
+                bulk_dir,
+                None if timeperiod_states is None else timeperiod_states.get(str(bulk.timeperiod)),
+                bulk.num_notifications,
+                str(bulk.timeperiod),
+                bulk.count,
+            ):
+                continue
+
+            uuids, oldest = bulk_uuids(bulk_dir)
+            if not uuids:
+                self.update(bulk_dir)
+                continue
+            bulks.append(
+                (
+                    bulk_dir,
+                    now - oldest,
+                    "n.a." if bulk.interval is None else bulk.interval,
+                    "n.a." if bulk.timeperiod is None else bulk.timeperiod,
+                    bulk.count,
+                    uuids,
+                )
+            )
+        return bulks
+
+
+class BulkScheduler:
+    """Sends the bulks of the keepalive mode as soon as they become ripe
+
+    Every bulk_interval seconds, the index takes over the changes made by other processes
+    and the bulks waiting for the end of a time period are checked, querying each time
+    period once. In between, the ripeness is determined from the index only.
+    """
+
+    def __init__(self, index: BulkIndex, *, bulk_interval: int) -> None:
+        self._index: Final = index
+        self._bulk_interval: Final = bulk_interval
+        self._next_cycle = 0.0
+
+    def timeout(self) -> float:
+        """The seconds until the next bulk becomes ripe or the next cycle is due"""
+        wake_up = self._next_cycle
+        if (ripe_at := self._index.next_ripe_time()) is not None:
+            wake_up = min(wake_up, ripe_at)
+        return max(0.0, wake_up - time.time())
+
+    def ripe_bulks(self) -> NotifyBulks:
+        now = time.time()
+        timeperiod_states = None
+        if now >= self._next_cycle:
+            self._next_cycle = now + self._bulk_interval
+            self._index.refresh()
+            timeperiod_states = {tp: _timeperiod_active(tp) for tp in self._index.timeperiods()}
+        return self._index.ripe_bulks(now, timeperiod_states)
+
+    def send_ripe_bulks(
+        self,
+        get_http_proxy: Callable[[tuple[str, str]], HTTPProxyConfig],
+        *,
+        plugin_timeout: int,
+    ) -> None:
+        ripe = self.ripe_bulks()
+        failed = _send_bulks(ripe, get_http_proxy, plugin_timeout=plugin_timeout)
+        for bulk in ripe:
+            self._index.update(bulk[0])
+        # Do not try again and again in the meantime
+        for bulk_dir in failed:
+            self._index.postpone(bulk_dir, until=time.time() + self._bulk_interval)
+
+
+def _send_bulks(
+    bulks: NotifyBulks,
+    get_http_proxy: Callable[[tuple[str, str]], HTTPProxyConfig],
+    *,
+    plugin_timeout: int,
+) -> list[str]:
+    """Send the bulks, return the directories of the bulks that could not be sent"""
+    failed = []
+    if bulks:
+        logger.info("Sending out %d ripe bulk notifications", len(bulks))
+    for bulk in bulks:
+        try:
+            notify_bulk(bulk[0], bulk[-1], get_http_proxy, plugin_timeout=plugin_timeout)
+        except Exception:
+            if cmk.ccc.debug.enabled():
+                raise
+            logger.exception("Error sending bulk %s:", bulk[0])
+            failed.append(bulk[0])
+    return failed
+
+
 def send_ripe_bulks(
     get_http_proxy: Callable[[tuple[str, str]], HTTPProxyConfig],
     *,
     bulk_interval: int,
     plugin_timeout: int,
 ) -> None:
-    ripe = find_bulks(True, bulk_interval=bulk_interval)
-    if ripe:
-        logger.info("Sending out %d ripe bulk notifications", len(ripe))
-        for bulk in ripe:
-            try:
-                notify_bulk(bulk[0], bulk[-1], get_http_proxy, plugin_timeout=plugin_timeout)
-            except Exception:
-                if cmk.ccc.debug.enabled():
-                    raise
-                logger.exception("Error sending bulk %s:", bulk[0])
+    _send_bulks(
+        find_bulks(True, bulk_interval=bulk_interval), get_http_proxy, plugin_timeout=plugin_timeout
+    )
 
 
 def notify_bulk(
@@ -16,6 +16,7 @@ from typing import Any
 
 from cmk.ccc.exceptions import MKGeneralException, MKTerminate, MKTimeout
 from cmk.ccc.i18n import _
+from cmk.ccc.store._cache import object_cache, ObjectCache, ObjectCacheStats
 from cmk.ccc.store._file import (
     BytesSerializer,
     DimSerializer,
@@ -40,6 +41,8 @@ from cmk.ccc.store._locks import (
 __all__ = [
     "BytesSerializer",
     "DimSerializer",
+    "ObjectCache",
+    "ObjectCacheStats",
     "ObjectStore",
     "PickleSerializer",
     "Serializer",
@@ -51,6 +54,7 @@ __all__ = [
     "lock_checkmk_configuration",
     "lock_exclusive",
     "locked",
+    "object_cache",
     "release_all_locks",
     "release_lock",
     "try_acquire_lock",
@@ -186,9 +190,12 @@ def save_to_mk_file(path: Path | str, key: str, value: Any, pprint_value: bool =
 # Handle .mk files that are only holding a python data structure and often
 # directly read via file/open and then parsed using eval.
 # TODO: Consolidate with load_mk_file?
+# The loaded objects are kept in the object_cache, every call returns a new object.
 def load_object_from_file(path: Path | str, *, default: Any, lock: bool = False) -> Any:
     with _leave_locked_unless_exception(path) if lock else nullcontext():
-        return ObjectStore(Path(path), serializer=DimSerializer()).read_obj(default=default)
+        return ObjectStore(Path(path), serializer=DimSerializer(), cache=object_cache).read_obj(
+            default=default
+        )
 
 
 def load_object_from_pickle_file(path: Path | str, *, default: Any, lock: bool = False) -> Any:
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""In-process cache of the objects loaded from files
+
+Deserializing the python literals of our .mk files is expensive. Long running processes
+(GUI workers, keepalive helpers, automations) read the same files over and over again, so
+the loaded objects are kept in memory for as long as the file does not change.
+
+A cache entry is only valid for the file it has been loaded from: It is looked up by the
+path and validated with the modification time, the size and the inode of the file, which
+costs a single stat() per load. The objects are kept pickled, so every load returns a new
+object which the caller is free to modify. The cache is bounded by the size of the pickles,
+the least recently used entries are evicted first.
+"""
+
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Final, NamedTuple
+
+__all__ = ["ObjectCache", "ObjectCacheStats", "object_cache"]
+
+# Identifies the version of a file
+_Stamp = tuple[int, int, int]
+
+
+class _Entry(NamedTuple):
+    stamp: _Stamp
+    pickled: bytes
+
+
+class ObjectCacheStats(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+    bytes: int
+
+
+def _stamp(stat: os.stat_result) -> _Stamp:
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+class ObjectCache:
+    """Objects loaded from files, bounded by the size of the pickled objects
+
+    A file which is modified in place without changing its size within the resolution of the
+    file system timestamps would go unnoticed. This is why files which have been modified
+    less than `settle_time` seconds ago are not cached.
+    """
+
+    def __init__(self, *, max_bytes: int, settle_time: float = 2.0) -> None:
+        self.max_bytes: Final = max_bytes
+        self._settle_time_ns: Final = int(settle_time * 1e9)
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, path: Path, stat: os.stat_result) -> Any:
+        """Return a new copy of the object loaded from the file, raise KeyError if unknown"""
+        key = str(path)
+        with self._lock:
+            if (entry := self._entries.get(key)) is None or entry.stamp != _stamp(stat):
+                self._misses += 1
+                raise KeyError(key)
+            self._entries.move_to_end(key)
+            self._hits += 1
+        return pickle.loads(entry.pickled)  # nosec B301 # BNS:9a7128
+
+    def put(self, path: Path, stat: os.stat_result, obj: object) -> None:
+        """Remember the object loaded from the file, which had the given stat before loading"""
+        if time.time_ns() - stat.st_mtime_ns < self._settle_time_ns:
+            return
+        try:
+            pickled = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return  # Not everything is picklable, load it from the file every time
+        if len(pickled) > self.max_bytes:
+            return
+
+        key = str(path)
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = _Entry(_stamp(stat), pickled)
+            self._bytes += len(pickled)
+            while self._bytes > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+                self._evictions += 1
+
+    def invalidate(self, path: Path) -> None:
+        with self._lock:
+            self._discard(str(path))
+
+    def _discard(self, key: str) -> None:
+        if (entry := self._entries.pop(key, None)) is not None:
+            self._bytes -= len(entry.pickled)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> ObjectCacheStats:
+        with self._lock:
+            return ObjectCacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                entries=len(self._entries),
+                bytes=self._bytes,
+            )
+
+
+# The cache shared by all loads of the process which ask for caching
+object_cache = ObjectCache(max_bytes=64 * 1024 * 1024)
@@ -2,6 +2,7 @@
 # Copyright (C) 2019 Checkmk GmbH - License: GNU General Public License v2
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
+import os
 import pickle
 import pprint
 import tempfile
@@ -19,6 +20,7 @@ import cmk.ccc.debug
 from cmk.ccc.exceptions import MKGeneralException, MKTerminate, MKTimeout
 from cmk.ccc.i18n import _
 
+from ._cache import ObjectCache
 from ._locks import acquire_lock, release_lock
 
 __all__ = [
@@ -88,10 +90,11 @@ class PickleSerializer(Generic[TObject]):
         return obj
 
 
-def _raise_for_permissions(path: Path) -> None:
+def _raise_for_permissions(path: Path, stat: os.stat_result | None = None) -> None:
     """Ensure that the file is owned by the current user or root and not world writable.
     Raise an exception otherwise."""
-    stat = path.stat()
+    if stat is None:
+        stat = path.stat()
     # we trust root and ourselves
     owned_by_current_user_or_root = stat.st_uid in [0, getuid()] and stat.st_gid in [0, getgid()]
     world_writable = S_IMODE(stat.st_mode) & S_IWOTH != 0
@@ -174,14 +177,22 @@ class ObjectStore(Generic[TObject]):
     It can be used without touching IO: ObjectStore("hurz", TextSerializer, io=NoOpIo).
     where NoOpIo does nothing(see the testing)
     Typical use case for Fake/NoOp IO is a testing and, probably in the future validation(dry-run).
+
+    With a cache the deserialized object is kept in memory until the file changes.
     """
 
     def __init__(
-        self, path: Path, *, serializer: Serializer[TObject], io: type[FileIo] = RealIo
+        self,
+        path: Path,
+        *,
+        serializer: Serializer[TObject],
+        io: type[FileIo] = RealIo,
+        cache: ObjectCache | None = None,
     ) -> None:
         self.path: Final = path
         self._serializer = serializer
         self._io: Final = io(path)
+        self._cache: Final = cache
 
     def __fspath__(self) -> str:
         return str(self.path)
@@ -194,8 +205,29 @@ class ObjectStore(Generic[TObject]):
         return self._io.write(self._serializer.serialize(obj))
 
     def read_obj(self, *, default: TObject) -> TObject:
+        if self._cache is None:
+            raw = self._io.read()
+            return self._serializer.deserialize(raw) if raw else default
+
+        try:
+            stat = self.path.stat()
+        except OSError:
+            stat = None
+        if stat is not None and stat.st_size:
+            _raise_for_permissions(self.path, stat)
+            try:
+                cached: TObject = self._cache.get(self.path, stat)
+                return cached
+            except KeyError:
+                pass
+
         raw = self._io.read()
-        return self._serializer.deserialize(raw) if raw else default
+        if not raw:
+            return default
+        obj = self._serializer.deserialize(raw)
+        if stat is not None:
+            self._cache.put(self.path, stat, obj)
+        return obj
 
 
 Model_T = TypeVar("Model_T", bound=BaseModel)
@@ -19,7 +19,7 @@ from cmk.checkengine.discovery._utils import DiscoveredItem
 from cmk.checkengine.parameters import TimespecificParameters
 
 from cmk.ccc.exceptions import MKGeneralException
-from cmk.ccc.store import ObjectStore
+from cmk.ccc.store import object_cache, ObjectStore
 
 __all__ = [
     "AutocheckServiceWithNodes",
@@ -119,6 +119,7 @@ class AutochecksStore:
         self._store = ObjectStore(
             Path(cmk.utils.paths.autochecks_dir, f"{host_name}.mk"),
             serializer=_AutochecksSerializer(),
+            cache=object_cache,
         )
 
     def read(self) -> Sequence[AutocheckEntry]:
@@ -8,8 +8,8 @@ from __future__ import annotations
 import abc
 import logging
 import time
-from collections.abc import Iterator, Mapping, MutableMapping, Sequence
-from typing import final, Final, NamedTuple
+from collections.abc import Iterable, Iterator, Mapping, MutableMapping, Sequence
+from typing import Any, final, Final, NamedTuple, overload
 
 from cmk.utils.agentdatatype import AgentRawData
 from cmk.utils.hostaddress import HostName
@@ -32,7 +32,8 @@ from ._sectionstore import SectionStore
 
 class SectionWithHeader(NamedTuple):
     header: SectionMarker
-    section: list[AgentRawData]
+    # The raw data between the markers, the lines are split when they are needed
+    chunks: list[memoryview]
 
 
 MutableSection = list[SectionWithHeader]
@@ -104,6 +105,12 @@ class ParserState(abc.ABC):
     def do_action(self, line: bytes) -> ParserState:
         raise NotImplementedError()
 
+    def on_body(self, body: memoryview) -> None:
+        """Handle the lines between two markers, they never change the state
+
+        The data is ignored unless we are in a section.
+        """
+
     @abc.abstractmethod
     def on_section_header(self, section_header: SectionMarker) -> ParserState:
         raise NotImplementedError()
@@ -361,9 +368,12 @@ class PiggybackSectionParser(ParserState):
         self.current_section: Final = current_section
 
     def do_action(self, line: bytes) -> ParserState:
-        self.piggyback_sections[self.current_host][-1].section.append(AgentRawData(line))
+        self.on_body(memoryview(line))
         return self
 
+    def on_body(self, body: memoryview) -> None:
+        self.piggyback_sections[self.current_host][-1].chunks.append(body)
+
     def on_piggyback_header(self, piggyback_header: PiggybackMarker) -> ParserState:
         if piggyback_header.should_be_ignored():
             return self.to_piggyback_ignore_parser()
@@ -469,11 +479,12 @@ class HostSectionParser(ParserState):
         self.current_section: Final = current_section
 
     def do_action(self, line: bytes) -> ParserState:
-        self.sections[-1].section.append(
-            AgentRawData(line if self.current_section.nostrip else line.strip())
-        )
+        self.on_body(memoryview(line))
         return self
 
+    def on_body(self, body: memoryview) -> None:
+        self.sections[-1].chunks.append(body)
+
     def on_piggyback_header(self, piggyback_header: PiggybackMarker) -> ParserState:
         if piggyback_header.hostname == self.hostname:
             # Unpiggybacked "normal" host
@@ -534,11 +545,12 @@ class AgentParser(Parser[AgentRawData, AgentRawDataSection]):
 
         def decode_sections(
             sections: ImmutableSection,
-        ) -> MutableSectionMap[list[AgentRawDataSectionElem]]:
-            out: MutableSectionMap[list[AgentRawDataSectionElem]] = {}
-            for header, content in sections:
-                out.setdefault(header.name, []).extend(header.parse_line(line) for line in content)
-            return out
+        ) -> MutableSectionMap[Sequence[AgentRawDataSectionElem]]:
+            parts: dict[SectionName, list[SectionWithHeader]] = {}
+            for section in sections:
+                if selection is NO_SELECTION or section.header.name in selection:
+                    parts.setdefault(section.header.name, []).append(section)
+            return {name: _LazySection(section_parts) for name, section_parts in parts.items()}
 
         def flatten_piggyback_section(
             sections: ImmutableSection,
@@ -547,7 +559,7 @@ class AgentParser(Parser[AgentRawData, AgentRawDataSection]):
             cache_for: int,
             selection: SectionNameCollection,
         ) -> Iterator[bytes]:
-            for header, content in sections:
+            for header, chunks in sections:
                 if not (selection is NO_SELECTION or header.name in selection):
                     continue
 
@@ -565,13 +577,9 @@ class AgentParser(Parser[AgentRawData, AgentRawDataSection]):
                             header.separator,
                         )
                     ).encode(header.encoding)
-                yield from (bytes(line) for line in content)
+                yield from _iter_lines(chunks)
 
-        sections = {
-            name: content
-            for name, content in decode_sections(raw_sections).items()
-            if selection is NO_SELECTION or name in selection
-        }
+        sections = decode_sections(raw_sections)
         piggybacked_raw_data = {
             header.hostname: list(
                 flatten_piggyback_section(
@@ -603,6 +611,7 @@ class AgentParser(Parser[AgentRawData, AgentRawDataSection]):
             lambda valid_until, now: valid_until < now,
             now=now,
             keep_outdated=self.keep_outdated,
+            selection=selection,
         )
         return HostSections[AgentRawDataSection](
             new_sections,
@@ -614,7 +623,11 @@ class AgentParser(Parser[AgentRawData, AgentRawDataSection]):
         self,
         raw_data: AgentRawData,
     ) -> tuple[ImmutableSection, Mapping[PiggybackMarker, ImmutableSection]]:
-        """Split agent output in chunks, splits lines by whitespaces."""
+        """Split agent output in chunks
+
+        Only the marker lines are looked at here, the lines of the sections are split and
+        decoded when the sections are accessed.
+        """
         parser: ParserState = NOOPParser(
             self.hostname,
             [],
@@ -623,7 +636,99 @@ class AgentParser(Parser[AgentRawData, AgentRawDataSection]):
             encoding_fallback=self.encoding_fallback,
             logger=self._logger,
         )
-        for line in raw_data.split(b"\n"):
-            parser = parser(line.rstrip(b"\r"))
+        data = memoryview(raw_data)
+        pos = 0
+        for start, end, marker in _iter_markers(raw_data):
+            if start > pos:
+                parser.on_body(data[pos:start])
+            parser = parser(marker)
+            pos = end
+        if len(raw_data) > pos:
+            parser.on_body(data[pos:])
 
         return parser.sections, parser.piggyback_sections
+
+
+def _iter_markers(raw_data: bytes) -> Iterator[tuple[int, int, bytes]]:
+    """Find the lines starting with b"<<<" and ending with b">>>"
+
+    Yields the start and the end of the line (without the newline) and the line itself,
+    with trailing carriage returns removed.
+    """
+    for start in _iter_marker_candidates(raw_data):
+        if (end := raw_data.find(b"\n", start)) == -1:
+            end = len(raw_data)
+        if (line := raw_data[start:end].rstrip(b"\r")).endswith(b">>>"):
+            yield start, end, line
+
+
+def _iter_marker_candidates(raw_data: bytes) -> Iterator[int]:
+    if raw_data.startswith(b"<<<"):
+        yield 0
+    pos = raw_data.find(b"\n<<<")
+    while pos != -1:
+        yield pos + 1
+        pos = raw_data.find(b"\n<<<", pos + 1)
+
+
+def _iter_lines(chunks: Iterable[memoryview]) -> Iterator[AgentRawData]:
+    """The lines of the chunks, just as they have been seen by the line by line parsing
+
+    Blank lines are skipped, trailing carriage returns are removed.
+    """
+    for chunk in chunks:
+        for line in bytes(chunk).split(b"\n"):
+            if (line := line.rstrip(b"\r")) and not line.isspace():
+                yield AgentRawData(line)
+
+
+class _LazySection(Sequence[AgentRawDataSectionElem]):
+    """The lines of a section, split and decoded on first access
+
+    A section may be made up of several parts with different markers (encodings, separators).
+    """
+
+    def __init__(self, parts: Sequence[SectionWithHeader]) -> None:
+        self._parts: Sequence[SectionWithHeader] = parts
+        self._lines: list[AgentRawDataSectionElem] | None = None
+
+    def _decoded(self) -> list[AgentRawDataSectionElem]:
+        if self._lines is None:
+            self._lines = [
+                header.parse_line(line if header.nostrip else line.strip())
+                for header, chunks in self._parts
+                for line in _iter_lines(chunks)
+            ]
+            self._parts = ()  # The raw data is not needed anymore
+        return self._lines
+
+    def __repr__(self) -> str:
+        return repr(self._decoded())
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        # Persisted sections are pickled, they are read back as lists
+        return list, (self._decoded(),)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, _LazySection | list | tuple):
+            return self._decoded() == list(other)
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __len__(self) -> int:
+        return len(self._decoded())
+
+    def __iter__(self) -> Iterator[AgentRawDataSectionElem]:
+        return iter(self._decoded())
+
+    @overload
+    def __getitem__(self, index: int) -> AgentRawDataSectionElem: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> Sequence[AgentRawDataSectionElem]: ...
+
+    def __getitem__(
+        self, index: int | slice
+    ) -> AgentRawDataSectionElem | Sequence[AgentRawDataSectionElem]:
+        return self._decoded()[index]
@@ -2,20 +2,57 @@
 # Copyright (C) 2019 Checkmk GmbH - License: GNU General Public License v2
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
+"""Store of the persisted sections of a host
+
+Each section is stored in a file of its own in the directory of the host. The file starts with
+a small header holding the time of creation and the end of the validity of the section, followed
+by the pickled content. This way, the validity of the sections can be checked without loading
+their content, and only the content of the sections actually needed is loaded.
+
+The files are replaced atomically, so they can be read without locking. Writing and removing
+a section file is done while holding the lock on that file.
+
+Formerly, all sections of a host were pickled into a single file at the path of the directory.
+Such a file is still read and it is converted as soon as sections are written.
+"""
 
 import logging
-from collections.abc import Callable
+import os
+import pickle
+import shutil
+import struct
+from collections.abc import Callable, Iterable
 from pathlib import Path
 from typing import Final, Generic, TypeVar
 
 from cmk.utils.sectionname import MutableSectionMap, SectionMap, SectionName
 
 import cmk.ccc.store as _store
+from cmk.ccc.exceptions import MKGeneralException
+
+from ._parser import NO_SELECTION, SectionNameCollection
 
 __all__ = ["SectionStore"]
 
 _T = TypeVar("_T")
 
+_MAGIC: Final = b"CMKP"
+# magic, time of creation, end of validity
+_HEADER: Final = struct.Struct("<4sqq")
+
+
+def _serialize(entry: tuple[int, int, object]) -> bytes:
+    created_at, valid_until, content = entry
+    return _HEADER.pack(_MAGIC, created_at, valid_until) + pickle.dumps(content)
+
+
+def _parse_header(raw: bytes) -> tuple[int, int] | None:
+    """Return the time of creation and the end of validity, None for invalid (empty) files"""
+    if len(raw) < _HEADER.size:
+        return None
+    magic, created_at, valid_until = _HEADER.unpack_from(raw)
+    return (created_at, valid_until) if magic == _MAGIC else None
+
 
 class SectionStore(Generic[_T]):
     def __init__(
@@ -31,22 +68,151 @@ class SectionStore(Generic[_T]):
     def __repr__(self) -> str:
         return f"{type(self).__name__}({self.path!r}, logger={self._logger!r})"
 
+    def _section_file(self, section_name: SectionName) -> Path:
+        return self.path / str(section_name)
+
+    def _section_names(self) -> list[SectionName]:
+        try:
+            # Skip the temporary files of the atomic writes
+            return [SectionName(n) for n in os.listdir(self.path) if not n.startswith(".")]
+        except (FileNotFoundError, NotADirectoryError):
+            return []
+
+    def _load_legacy(self) -> MutableSectionMap[tuple[int, int, _T]]:
+        """Load the sections of a host pickled into a single file"""
+        if not self.path.is_file():
+            return {}
+        raw_sections_data = _store.load_object_from_pickle_file(self.path, default={})
+        return {
+            SectionName(k): v
+            for k, v in raw_sections_data.items()
+            if len(v) == 3  # Skip entries of "old" format
+        }
+
+    def _convert_legacy(self) -> None:
+        """Replace the single file of the sections by the directory of section files
+
+        The directory is prepared next to the file and moved into place afterwards. If another
+        process got ahead of us, its directory is kept.
+        """
+        if not (legacy_sections := self._load_legacy()):
+            self.path.unlink(missing_ok=True)
+            return
+
+        tmp_dir = self.path.with_name(f".{self.path.name}.converting.{os.getpid()}")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir(parents=True)
+        for section_name, entry in legacy_sections.items():
+            _store.save_bytes_to_file(tmp_dir / str(section_name), _serialize(entry))
+        try:
+            self.path.unlink(missing_ok=True)
+            tmp_dir.rename(self.path)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        else:
+            self._logger.debug(
+                "Converted persisted sections: %s", ", ".join(str(s) for s in legacy_sections)
+            )
+
     def store(self, sections: MutableSectionMap[tuple[int, int, _T]]) -> None:
+        """Replace all persisted sections"""
         if not sections:
             self._logger.debug("No persisted sections")
-            self.path.unlink(missing_ok=True)
+            if self.path.is_dir():
+                shutil.rmtree(self.path, ignore_errors=True)
+            else:
+                self.path.unlink(missing_ok=True)
             return
 
-        self.path.parent.mkdir(parents=True, exist_ok=True)
-        _store.save_object_to_pickle_file(
-            self.path,
-            {str(k): v for k, v in sections.items()},
-        )
+        self.add(sections)
+        self.discard(set(self._section_names()) - set(sections), lambda _created_at, _until: True)
+
+    def add(self, sections: SectionMap[tuple[int, int, _T]]) -> None:
+        """Store the given sections, the others are kept"""
+        if not sections:
+            return
+
+        if self.path.is_file():
+            self._convert_legacy()
+        self.path.mkdir(parents=True, exist_ok=True)
+        for section_name, entry in sections.items():
+            _store.save_bytes_to_file(self._section_file(section_name), _serialize(entry))
         self._logger.debug("Stored persisted sections: %s", ", ".join(str(s) for s in sections))
 
-    def load(self) -> MutableSectionMap[tuple[int, int, _T]]:
-        raw_sections_data = _store.load_object_from_pickle_file(self.path, default={})
-        return {SectionName(k): v for k, v in raw_sections_data.items()}
+    def discard(
+        self,
+        section_names: Iterable[SectionName],
+        predicate: Callable[[int, int], bool],
+    ) -> None:
+        """Remove the sections for which the predicate on creation and validity holds
+
+        The predicate is evaluated again while holding the lock on the section file, so a
+        section written in the meantime by another process is kept.
+        """
+        if self.path.is_file():
+            self._convert_legacy()
+        for section_name in section_names:
+            file_path = self._section_file(section_name)
+            if not file_path.exists():
+                continue
+            with _store.locked(file_path):
+                with file_path.open("rb") as f:
+                    header = _parse_header(f.read(_HEADER.size))
+                if header is None or predicate(*header):
+                    file_path.unlink(missing_ok=True)
+                    self._logger.debug("Removed persisted section %r", section_name)
+
+    def load_headers(self) -> MutableSectionMap[tuple[int, int]]:
+        """Return the time of creation and end of validity of the persisted sections
+
+        Only the headers of the section files are read.
+        """
+        if self.path.is_file():
+            return {
+                section_name: (created_at, valid_until)
+                for section_name, (created_at, valid_until, _content) in self._load_legacy().items()
+            }
+
+        headers: MutableSectionMap[tuple[int, int]] = {}
+        for section_name in self._section_names():
+            try:
+                with self._section_file(section_name).open("rb") as f:
+                    header = _parse_header(f.read(_HEADER.size))
+            except FileNotFoundError:
+                continue  # removed in the meantime
+            if header is not None:
+                headers[section_name] = header
+        return headers
+
+    def load(
+        self, section_names: Iterable[SectionName] | None = None
+    ) -> MutableSectionMap[tuple[int, int, _T]]:
+        """Load the given persisted sections, all of them by default
+
+        Sections which are not persisted are skipped.
+        """
+        if self.path.is_file():
+            legacy_sections = self._load_legacy()
+            if section_names is None:
+                return legacy_sections
+            return {n: legacy_sections[n] for n in section_names if n in legacy_sections}
+
+        sections: MutableSectionMap[tuple[int, int, _T]] = {}
+        for section_name in self._section_names() if section_names is None else section_names:
+            try:
+                raw = self._section_file(section_name).read_bytes()
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            if (header := _parse_header(raw)) is None:
+                continue
+            try:
+                content = pickle.loads(raw[_HEADER.size :])
+            except (pickle.UnpicklingError, EOFError, ValueError) as e:
+                raise MKGeneralException(
+                    f"Cannot load persisted section {section_name} from {self.path}: {e}"
+                ) from e
+            sections[section_name] = (*header, content)
+        return sections
 
     def update(
         self,
@@ -56,6 +222,7 @@ class SectionStore(Generic[_T]):
         section_outdated: Callable[[int, int], bool],
         now: int,
         keep_outdated: bool,
+        selection: SectionNameCollection = NO_SELECTION,
     ) -> SectionMap[_T]:
         persisted_sections = self._update(
             sections,
@@ -63,6 +230,7 @@ class SectionStore(Generic[_T]):
             section_outdated,
             now=now,
             keep_outdated=keep_outdated,
+            selection=selection,
         )
         return self._add_persisted_sections(
             sections,
@@ -78,30 +246,39 @@ class SectionStore(Generic[_T]):
         *,
         now: int,
         keep_outdated: bool,
+        selection: SectionNameCollection,
     ) -> MutableSectionMap[tuple[int, int, _T]]:
-        # TODO: This is not race condition free when modifying the data. Either remove
-        # the possible write here and simply ignore the outdated sections or lock when
-        # reading and unlock after writing
-        persisted_sections = self.load()
+        """Store the new persisted sections, remove the outdated ones and load the others
 
+        Only the sections which are not available from the source and are part of the
+        selection are loaded.
+        """
         new_sections = {
-            section_name: persist_info + (section_content,)
-            for section_name, section_content in sections.items()
+            section_name: persist_info + (sections[section_name],)
+            for section_name in sections
             if (persist_info := lookup_persist(section_name)) is not None
+            and (keep_outdated or not section_outdated(persist_info[1], now))
         }
-        store_sections = bool(new_sections)
-        persisted_sections.update(new_sections)
+        self.add(new_sections)
 
+        headers = self.load_headers()
         if not keep_outdated:
-            for section_name in tuple(persisted_sections):
-                (_created_at, valid_until, _section_content) = persisted_sections[section_name]
-                if section_outdated(valid_until, now):
-                    store_sections = True
-                    del persisted_sections[section_name]
+            outdated = {
+                section_name
+                for section_name, (_created_at, valid_until) in headers.items()
+                if section_name not in new_sections and section_outdated(valid_until, now)
+            }
+            self.discard(
+                outdated, lambda _created_at, valid_until: section_outdated(valid_until, now)
+            )
+            headers = {n: h for n, h in headers.items() if n not in outdated}
 
-        if store_sections:
-            self.store(persisted_sections)
-        return persisted_sections
+        return self.load(
+            section_name
+            for section_name in headers
+            if section_name not in sections
+            and (selection is NO_SELECTION or section_name in selection)
+        )
 
     def _add_persisted_sections(
         self,
@@ -116,7 +293,7 @@ class SectionStore(Generic[_T]):
                 if section_name not in sections
             }
         )
-        result: MutableSectionMap[_T] = dict(sections.items())
+        result: MutableSectionMap[_T] = {}
         for section_name, entry in persisted_sections.items():
             if len(entry) == 2:
                 continue  # Skip entries of "old" format
@@ -131,4 +308,8 @@ class SectionStore(Generic[_T]):
 
             self._logger.debug("Using persisted section %r", section_name)
             result[section_name] = entry[-1]
-        return result
+
+        if not result:
+            # Keep lazily decoded sections lazy
+            return sections
+        return {**sections, **result}
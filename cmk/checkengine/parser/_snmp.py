@@ -48,11 +48,10 @@ class SNMPParser(Parser[SNMPRawData, SNMPRawData]):
         self,
         raw_data: SNMPRawData,
         *,
-        # The selection argument is ignored: Selection is done
-        # in the fetcher for SNMP.
+        # Selection is done in the fetcher for SNMP, the selection argument
+        # only restricts the persisted sections loaded here.
         selection: SectionNameCollection,
     ) -> HostSections[SNMPRawData]:
-        sections = dict(raw_data)
         now = int(time.time())
 
         def lookup_persist(section_name: SectionName) -> tuple[int, int] | None:
@@ -61,8 +60,9 @@ class SNMPParser(Parser[SNMPRawData, SNMPRawData]):
             return None
 
         cache_info: MutableSectionMap[tuple[int, int]] = {}
+        # Don't copy the raw data: The sections may be decoded lazily on first access.
         new_sections = self.section_store.update(
-            sections,
+            raw_data,
             cache_info,
             lookup_persist,
             # persisted section is considered valid for one host check interval after fetch
@@ -71,5 +71,6 @@ class SNMPParser(Parser[SNMPRawData, SNMPRawData]):
             lambda valid_until, now: valid_until + self.host_check_interval < now,
             now=now,
             keep_outdated=self.keep_outdated,
+            selection=selection,
         )
         return HostSections[SNMPRawData](new_sections, cache_info=cache_info)
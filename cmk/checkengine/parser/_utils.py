@@ -6,7 +6,7 @@
 from __future__ import annotations
 
 from collections import defaultdict
-from collections.abc import Callable, Iterable, Mapping
+from collections.abc import Callable, Iterable, Mapping, Sequence
 
 from cmk.utils.hostaddress import HostName
 from cmk.utils.sectionname import MutableSectionMap
@@ -21,7 +21,7 @@ __all__ = ["group_by_host"]
 def group_by_host(
     host_sections: Iterable[tuple[HostKey, HostSections]], log: Callable[[str], None]
 ) -> Mapping[HostKey, HostSections]:
-    out_sections: dict[HostKey, MutableSectionMap[list]] = defaultdict(dict)
+    out_sections: dict[HostKey, MutableSectionMap[Sequence]] = defaultdict(dict)
     out_cache_info: dict[HostKey, MutableSectionMap[tuple[int, int]]] = defaultdict(dict)
     out_piggybacked_raw_data: dict[HostKey, dict[HostName, list[bytes]]] = defaultdict(dict)
     host_keys: list[HostKey] = []
@@ -31,7 +31,11 @@ def group_by_host(
         section_names = sorted(str(s) for s in host_section.sections.keys())
         log(f"  {host_key!s}  -> Add sections: {section_names}")
         for section_name, section_content in host_section.sections.items():
-            out_sections[host_key].setdefault(section_name, []).extend(section_content)
+            # Keep the content of a single source as it is, it may not have been decoded yet.
+            if (known := out_sections[host_key].get(section_name)) is None:
+                out_sections[host_key][section_name] = section_content
+            else:
+                out_sections[host_key][section_name] = [*known, *section_content]
         for hostname, raw_lines in host_section.piggybacked_raw_data.items():
             out_piggybacked_raw_data[host_key].setdefault(hostname, []).extend(raw_lines)
         # TODO: It should be supported that different sources produce equal sections.
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""The open events of the Event Console, indexed for the lookups of the event processing"""
+
+from __future__ import annotations
+
+import heapq
+from collections.abc import Iterable, Iterator
+from typing import TypeVar
+
+from .event import Event
+
+# The index buckets are dicts keyed by the event id. Since events are added in the order
+# of their ids, iterating a bucket yields the oldest event first.
+_Bucket = dict[int, Event]
+_K = TypeVar("_K")
+
+
+class EventTable:
+    """The open events, indexed by id, rule id, host and rule id + host
+
+    Lookups by host are case-insensitive (like the host filter of the status table), the
+    exact host name has to be checked by the caller if needed.
+
+    The index is only updated by add(), remove() and reindex(). Whoever changes the host of
+    an event which is in the table has to call reindex().
+    """
+
+    def __init__(self, events: Iterable[Event] = ()) -> None:
+        self._by_id: _Bucket = {}
+        self._by_rule: dict[str | None, _Bucket] = {}
+        self._by_host: dict[str, _Bucket] = {}
+        self._by_rule_and_host: dict[tuple[str | None, str], _Bucket] = {}
+        # The keys an event has been indexed with, needed to remove it from the index.
+        self._keys: dict[int, tuple[str | None, str]] = {}
+        for event in events:
+            self.add(event)
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __iter__(self) -> Iterator[Event]:
+        return iter(self._by_id.values())
+
+    def get(self, event_id: int) -> Event | None:
+        return self._by_id.get(event_id)
+
+    def oldest(self) -> Event | None:
+        return next(iter(self._by_id.values()), None)
+
+    def of_rule(self, rule_id: str | None) -> Iterable[Event]:
+        return self._by_rule.get(rule_id, {}).values()
+
+    def of_host(self, host_name: str) -> Iterable[Event]:
+        """The events of the host, compared case-insensitive"""
+        return self._by_host.get(host_name.lower(), {}).values()
+
+    def of_hosts(self, host_names: Iterable[str]) -> Iterable[Event]:
+        """The events of the hosts, compared case-insensitive, oldest first"""
+        buckets = [
+            bucket.values()
+            for host_key in {host_name.lower() for host_name in host_names}
+            if (bucket := self._by_host.get(host_key))
+        ]
+        if len(buckets) == 1:
+            return buckets[0]
+        return heapq.merge(*buckets, key=lambda event: event["id"])
+
+    def of_rule_and_host(self, rule_id: str | None, host_name: str) -> Iterable[Event]:
+        """The events of the rule and the host, compared case-insensitive"""
+        return self._by_rule_and_host.get((rule_id, host_name.lower()), {}).values()
+
+    def add(self, event: Event) -> None:
+        event_id = event["id"]
+        if event_id in self._by_id:
+            # Event ids are unique, this can only happen with a broken status file
+            self._unindex(event_id)
+        self._by_id[event_id] = event
+        self._index(event_id, event)
+
+    def remove(self, event: Event) -> bool:
+        """Remove the event from the table, returns False if it is not present"""
+        event_id = event.get("id", -1)
+        if self._by_id.get(event_id) is not event:
+            return False
+        del self._by_id[event_id]
+        self._unindex(event_id)
+        return True
+
+    def reindex(self, event: Event) -> None:
+        """Update the index after the host of the event has been changed"""
+        event_id = event["id"]
+        if (keys := self._keys.get(event_id)) is None or keys == _keys_of(event):
+            return
+        self._unindex(event_id)
+        self._index(event_id, event)
+
+    def _index(self, event_id: int, event: Event) -> None:
+        rule_id, host_key = keys = self._keys[event_id] = _keys_of(event)
+        _insert_ordered(self._by_rule.setdefault(rule_id, {}), event_id, event)
+        _insert_ordered(self._by_host.setdefault(host_key, {}), event_id, event)
+        _insert_ordered(self._by_rule_and_host.setdefault(keys, {}), event_id, event)
+
+    def _unindex(self, event_id: int) -> None:
+        rule_id, host_key = keys = self._keys.pop(event_id)
+        _remove_from_bucket(self._by_rule, rule_id, event_id)
+        _remove_from_bucket(self._by_host, host_key, event_id)
+        _remove_from_bucket(self._by_rule_and_host, keys, event_id)
+
+
+def _keys_of(event: Event) -> tuple[str | None, str]:
+    return event.get("rule_id"), event.get("host", "").lower()
+
+
+def _insert_ordered(bucket: _Bucket, event_id: int, event: Event) -> None:
+    # Events are added in the order of their ids, so this is the fast path. Only events
+    # which are reindexed or loaded from an unordered status may need sorting.
+    if not bucket or next(reversed(bucket)) < event_id:
+        bucket[event_id] = event
+        return
+    bucket[event_id] = event
+    ordered = sorted(bucket.items(), key=lambda item: item[0])
+    bucket.clear()
+    bucket.update(ordered)
+
+
+def _remove_from_bucket(index: dict[_K, _Bucket], key: _K, event_id: int) -> None:
+    bucket = index[key]
+    del bucket[event_id]
+    if not bucket:
+        del index[key]
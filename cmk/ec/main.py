@@ -28,11 +28,12 @@ import sys
 import threading
 import time
 import traceback
+from collections import defaultdict
 from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
 from logging import DEBUG, getLogger, Logger
 from pathlib import Path
 from types import FrameType
-from typing import Any, assert_never, IO, Literal, TypedDict
+from typing import Any, assert_never, IO, Literal, TypedDict, TypeVar
 
 from setproctitle import setthreadtitle
 
@@ -55,16 +56,17 @@ from .config import Config, ConfigFromWATO, Count, ECRulePack, MatchGroups, Rule
 from .core_queries import HostInfo, query_hosts_scheduled_downtime_depth
 from .crash_reporting import CrashReportStore, ECCrashReport
 from .event import create_events_from_syslog_messages, Event, scrub_string
+from .event_table import EventTable
 from .helpers import ECLock, parse_bytes_into_syslog_messages
 from .history import ActiveHistoryPeriod, get_logfile, History, HistoryWhat, quote_tab, TimedHistory
 from .history_file import FileHistory
 from .history_mongo import MongoDBHistory
 from .history_sqlite import SQLiteHistory, SQLiteSettings
 from .host_config import HostConfig
+from .match_workers import MatchedBatch, MatchedEvent, MatchWorkerPool, SyslogMessage, WorkerConfig
 from .perfcounters import Perfcounters
 from .query import (
     Columns,
-    filter_operator_in,
     MKClientError,
     Query,
     QueryCOMMAND,
@@ -72,13 +74,24 @@ from .query import (
     QueryREPLICATE,
     StatusTable,
 )
-from .rule_matcher import compile_rule, match, MatchFailure, MatchResult, MatchSuccess, RuleMatcher
+from .rule_matcher import (
+    compile_rule,
+    match,
+    matching_rules,
+    MatchResult,
+    MatchSuccess,
+    RuleMatcher,
+    RuleMatchStats,
+    RulePrefilter,
+)
 from .rule_packs import load_active_config
 from .settings import create_settings, FileDescriptor, PortNumber, Settings
 from .snmp import SNMPTrapParser
 from .syslog import SyslogFacility, SyslogPriority
 from .timeperiod import TimePeriods
 
+_T = TypeVar("_T")
+
 
 def open_log(log_file_path: Path) -> None:
     try:
@@ -379,8 +392,17 @@ class EventServer(ECServerThread):
         self._snmp_trap_socket: socket.socket | None = None
 
         self._rules: list[Rule] = []
+        self._rules_generation = 0
         self._rule_by_id: dict[str | None, Rule] = {}
         self._rule_hash: dict[int, dict[int, Any]] = {}
+        self._uses_time_periods = False
+        self._prefilter = RulePrefilter(())
+        self._rule_match_stats: defaultdict[str, RuleMatchStats] = defaultdict(RuleMatchStats)
+        self._match_pool = (
+            MatchWorkerPool(settings.options.match_workers, self._logger.getChild("match_workers"))
+            if settings.options.match_workers
+            else None
+        )
         self._hash_stats: list[list[int]] = []  # facility/priority
         for _unused_facility in range(32):
             self._hash_stats.append([0] * 8)
@@ -657,6 +679,7 @@ class EventServer(ECServerThread):
                 self._syslog_tcp,
                 self._eventsocket,
                 self._snmp_trap_socket,
+                self._match_pool,
             )
             if f is not None
         ]
@@ -665,7 +688,7 @@ class EventServer(ECServerThread):
         unprocessed_pipe_data = b""
         while not self._terminate_event.is_set():
             try:
-                readable: list[FileDescr | socket.socket] = select.select(
+                readable: list[FileDescr | socket.socket | MatchWorkerPool] = select.select(
                     listen_list + list(client_sockets.keys()), [], [], select_timeout
                 )[0]
             except OSError as e:
@@ -727,17 +750,26 @@ class EventServer(ECServerThread):
 
             # Read events from builtin syslog server
             if self._syslog_udp is not None and self._syslog_udp in readable:
-                message, address = self._syslog_udp.recvfrom(4096)
-                self.process_syslog_messages(
-                    [message], parse_address("syslog socket (UDP)", address)
-                )
+                if self._match_in_workers():
+                    # Hand everything that arrived to the workers at once, bursts would
+                    # otherwise overflow the receive buffer of the socket.
+                    self._submit_to_match_pool(messages=self._receive_syslog_udp())
+                else:
+                    message, address = self._syslog_udp.recvfrom(4096)
+                    self.process_syslog_messages(
+                        [message], parse_address("syslog socket (UDP)", address)
+                    )
 
             # Read events from builtin snmptrap server
             if self._snmp_trap_socket is not None and self._snmp_trap_socket in readable:
                 message, address = self._snmp_trap_socket.recvfrom(65535)
-                self.process_potential_event_instrumented(
-                    self.create_events_from_trap(message, parse_address("SNMP trap", address))
+                trap_events = self.create_events_from_trap(
+                    message, parse_address("SNMP trap", address)
                 )
+                if self._match_in_workers():
+                    self._submit_to_match_pool(events=list(trap_events))
+                else:
+                    self.process_potential_event_instrumented(trap_events)
 
             if spool_files := sorted(
                 self.settings.paths.spool_dir.value.glob("[!.]*"), key=lambda x: x.stat().st_mtime
@@ -748,6 +780,25 @@ class EventServer(ECServerThread):
             else:
                 select_timeout = 1  # restore default select timeout
 
+            if self._match_pool is not None:
+                # Do not let the workers get too far ahead
+                self.process_matched_batches(wait=self._match_pool.is_congested)
+
+        if self._match_pool is not None:
+            self.process_matched_batches(wait=True)
+            self._match_pool.close()
+
+    def _receive_syslog_udp(self, limit: int = 1000) -> list[SyslogMessage]:
+        assert self._syslog_udp is not None
+        messages: list[SyslogMessage] = []
+        while len(messages) < limit:
+            try:
+                message, address = self._syslog_udp.recvfrom(4096, socket.MSG_DONTWAIT)
+            except BlockingIOError:
+                break
+            messages.append((message, parse_address("syslog socket (UDP)", address)))
+        return messages
+
     def create_events_from_trap(self, data: bytes, address: tuple[str, int]) -> Iterator[Event]:
         try:
             if varbinds_and_ipaddress := self._snmp_trap_parser(data, address):
@@ -761,25 +812,91 @@ class EventServer(ECServerThread):
         handler function to record some statistics etc.
         """
         for event in events:
-            self._perfcounters.count("messages")
-            before = time.time()
-            # In replication slave mode (when not took over), ignore all events
-            if not is_replication_slave(self._config) or self._slave_status["mode"] != "sync":
-                self.process_potential_event(event)
-            elif self.settings.options.debug:
-                self._logger.info("Replication: we are in slave mode, ignoring event")
-            elapsed = time.time() - before
-            self._perfcounters.count_time("processing", elapsed)
+            self._process_instrumented(self.process_potential_event, event)
+
+    def _process_instrumented(self, process: Callable[[_T], None], event: _T) -> None:
+        self._perfcounters.count("messages")
+        before = time.time()
+        # In replication slave mode (when not took over), ignore all events
+        if not is_replication_slave(self._config) or self._slave_status["mode"] != "sync":
+            process(event)
+        elif self.settings.options.debug:
+            self._logger.info("Replication: we are in slave mode, ignoring event")
+        elapsed = time.time() - before
+        self._perfcounters.count_time("processing", elapsed)
 
     def process_syslog_messages(
         self, messages: Iterable[bytes], address: tuple[str, int] | None
     ) -> None:
+        if self._match_in_workers():
+            self._submit_to_match_pool(messages=[(message, address) for message in messages])
+            return
         self.process_potential_event_instrumented(
             create_events_from_syslog_messages(
                 messages, address, self._logger if self._config["debug_rules"] else None
             )
         )
 
+    def _match_in_workers(self) -> bool:
+        # The rule debugging output is only available when matching in process
+        return self._match_pool is not None and not self._config["debug_rules"]
+
+    def _submit_to_match_pool(
+        self,
+        *,
+        messages: Sequence[SyslogMessage] = (),
+        events: Sequence[Event] = (),
+    ) -> None:
+        assert self._match_pool is not None
+        if not messages and not events:
+            return
+        active_periods = self._active_time_periods()
+        with self._lock_configuration:
+            if messages:
+                self._match_pool.submit_syslog_messages(messages, active_periods)
+            if events:
+                self._match_pool.submit_events(events, active_periods)
+
+    def _active_time_periods(self) -> Mapping[str, bool] | None:
+        if not self._uses_time_periods:
+            return {}
+        try:
+            return self._time_period.active_periods()
+        except Exception:
+            return None  # The rules with a time period will fail to match, as in process
+
+    def process_matched_batches(self, *, wait: bool = False) -> None:
+        """Process the events matched by the worker processes in the order they were received"""
+        if self._match_pool is None:
+            return
+        for batch in self._match_pool.done_batches(wait=wait):
+            self._process_matched_batch(batch)
+
+    def _process_matched_batch(self, batch: MatchedBatch) -> None:
+        with self._lock_configuration:
+            rules = self._rules if batch.generation == self._rules_generation else None
+        if rules is not None:
+            for index, stats in batch.rule_stats.items():
+                self._rule_match_stats[rules[index]["id"]].add(stats)
+        for matched_event in batch.events:
+            self._process_instrumented(
+                lambda matched: self._process_matched_event(matched, rules), matched_event
+            )
+
+    def _process_matched_event(self, matched: MatchedEvent, rules: Sequence[Rule] | None) -> None:
+        if rules is None:
+            # Matched with the rules before the last configuration reload, match again
+            self._process_event(matched.event, self._matching_rules(matched.event))
+            return
+        for error in matched.errors:
+            self._logger.error(error)
+        if self._config["rule_optimizer"]:
+            self._hash_stats[matched.event["facility"]][matched.event["priority"]] += 1
+        self._perfcounters.count("rule_tries", matched.tries)
+        self._process_event(
+            matched.event, ((rules[index], result) for index, result in matched.hits)
+        )
+
     def do_housekeeping(self) -> None:
         with self._event_status.lock, self._lock_configuration:
             self.hk_handle_event_timeouts()
@@ -985,9 +1102,8 @@ class EventServer(ECServerThread):
                 # First look for case 1: rule that already have at least one hit
                 # and this events in the state "counting" exist.
                 events_to_delete: list[tuple[Event, HistoryWhat]] = []
-                events = self._event_status.events()
-                for event in events:
-                    if event["rule_id"] == rule["id"] and event["phase"] == "counting":
+                for event in self._event_status.events_of_rule(rule["id"]):
+                    if event["phase"] == "counting":
                         # time has elapsed. Now lets see if we have reached
                         # the necessary count:
                         if event["count"] < expected_count:  # no -> trigger alarm
@@ -1040,10 +1156,8 @@ class EventServer(ECServerThread):
             merge, reset_ack = merge  # type: ignore[unreachable]
 
         if merge != "never":
-            for event in self._event_status.events():
-                if event["rule_id"] == rule["id"] and (
-                    event["phase"] == "open" or (event["phase"] == "ack" and merge == "acked")
-                ):
+            for event in self._event_status.events_of_rule(rule["id"]):
+                if event["phase"] == "open" or (event["phase"] == "ack" and merge == "acked"):
                     merge_event = event
                     break
 
@@ -1169,6 +1283,12 @@ class EventServer(ECServerThread):
                         ):
                             count_unspecific += 1
 
+        self._rules_generation += 1
+        self._prefilter = RulePrefilter(self._rules)
+        self._uses_time_periods = any("match_timeperiod" in rule for rule in self._rules)
+        if self._match_pool is not None:
+            self._match_pool.configure(self._worker_config())
+
         self._logger.info(
             "Compiled %d active rules (ignoring %d disabled rules)", count_rules, count_disabled
         )
@@ -1187,6 +1307,26 @@ class EventServer(ECServerThread):
                     ]
                     self._logger.info(" %-12s: %s", SyslogFacility(facility), " ".join(stats))
 
+    def _worker_config(self) -> WorkerConfig:
+        rule_index = {id(rule): index for index, rule in enumerate(self._rules)}
+        return WorkerConfig(
+            generation=self._rules_generation,
+            rules=self._rules,
+            rule_hash=(
+                {
+                    facility: {
+                        priority: [rule_index[id(rule)] for rule in rules]
+                        for priority, rules in prio_hash.items()
+                    }
+                    for facility, prio_hash in self._rule_hash.items()
+                }
+                if self._config["rule_optimizer"]
+                else None
+            ),
+            hostname_translation=self._config["hostname_translation"],
+            omd_site_id=omd_site(),
+        )
+
     def hash_rule(self, rule: Rule) -> None:
         """Construct rule hash for faster execution."""
         facility = rule.get("match_facility")
@@ -1242,144 +1382,126 @@ class EventServer(ECServerThread):
                 (100.0 * count / float(total_count)),
             )
 
-    def process_potential_event(self, event: Event) -> None:  # pylint: disable=too-many-branches
-        self.do_translate_hostname(event)
+        self._logger.info("Top 20 of rule matching time:")
+        rule_entries = sorted(
+            self.rule_match_stats().items(), key=lambda item: item[1].seconds, reverse=True
+        )
+        for rule_id, stats in rule_entries[:20]:
+            self._logger.info(
+                "  %s - %.3fs, %d tries (%.1fus each), %d prefiltered",
+                rule_id,
+                stats.seconds,
+                stats.tries,
+                1e6 * stats.seconds / stats.tries if stats.tries else 0.0,
+                stats.prefiltered,
+            )
 
-        # Log all incoming messages into a syslog-like text file if that is enabled
-        if self._config["log_messages"]:
-            self.log_message(event)
+    def process_potential_event(self, event: Event) -> None:
+        self.do_translate_hostname(event)
+        self._process_event(event, self._matching_rules(event))
 
+    def _matching_rules(self, event: Event) -> Iterator[tuple[Rule, MatchSuccess]]:
         # Rule optimizer
         if self._config["rule_optimizer"]:
             self._hash_stats[event["facility"]][event["priority"]] += 1
             rule_candidates = self._rule_hash.get(event["facility"], {}).get(event["priority"], [])
         else:
             rule_candidates = self._rules
+        return matching_rules(
+            self._prefilter.filter(rule_candidates, event, self._count_prefiltered),
+            event,
+            self.event_rule_matches,
+            self._logger.exception,
+        )
 
-        skip_pack = None
-        for rule in rule_candidates:
-            # TODO: Rewrite this skipping logic, so it's blindingly obvious, even for mypy.
-            if skip_pack and rule["pack"] == skip_pack:  # type: ignore[unreachable]
-                continue  # type: ignore[unreachable] # still in the rule pack that we want to skip
-            skip_pack = None  # new pack, reset skipping
-
-            try:
-                result = self.event_rule_matches(rule, event)
-            except Exception as e:
-                result = MatchFailure(
-                    reason=f"Rule would match, but due to inverted matching does not. {e}"
-                )
-                self._logger.exception(result.reason)
-
-            if isinstance(result, MatchSuccess):
-                self._perfcounters.count("rule_hits")
-                if self._config["debug_rules"]:
-                    self._logger.info("  matching groups:\n%s", pprint.pformat(result.match_groups))
+    def _count_prefiltered(self, rule: Rule) -> None:
+        self._rule_match_stats[rule["id"]].prefiltered += 1
 
-                self._event_status.count_rule_match(rule["id"])
-                if self._config["log_rulehits"]:
-                    self._logger.info(
-                        "Rule '%s/%s' hit by message %s/%s - '%s'.",
-                        rule["pack"],
-                        rule["id"],
-                        SyslogFacility(event["facility"]),
-                        SyslogPriority(event["priority"]),
-                        event["text"],
-                    )
-
-                if rule.get("drop"):
-                    if rule["drop"] == "skip_pack":
-                        skip_pack = rule["pack"]
-                        if self._config["debug_rules"]:
-                            self._logger.info("  skipping this rule pack (%s)", skip_pack)
-                        continue
-                    self._perfcounters.count("drops")
-                    return
-
-                if result.cancelling:
-                    self._event_status.cancel_events(
-                        self, self._event_columns, event, result.match_groups, rule
-                    )
-                    return
+    def _process_event(  # pylint: disable=too-many-branches
+        self, event: Event, rule_hits: Iterable[tuple[Rule, MatchSuccess]]
+    ) -> None:
+        """Process a translated event, rule_hits are the rules it matches, see matching_rules()"""
+        # Log all incoming messages into a syslog-like text file if that is enabled
+        if self._config["log_messages"]:
+            self.log_message(event)
 
-                # Remember the rule id that this event originated from
-                event["rule_id"] = rule["id"]
+        for rule, result in rule_hits:
+            self._perfcounters.count("rule_hits")
+            if self._config["debug_rules"]:
+                self._logger.info("  matching groups:\n%s", pprint.pformat(result.match_groups))
 
-                # Attach optional contact group information for visibility
-                # and eventually for notifications
-                self._add_rule_contact_groups_to_event(rule, event)
+            self._event_status.count_rule_match(rule["id"])
+            if self._config["log_rulehits"]:
+                self._logger.info(
+                    "Rule '%s/%s' hit by message %s/%s - '%s'.",
+                    rule["pack"],
+                    rule["id"],
+                    SyslogFacility(event["facility"]),
+                    SyslogPriority(event["priority"]),
+                    event["text"],
+                )
 
-                # Store groups from matching this event. In order to make
-                # persistence easier, we do not save them as list but join
-                # them on ASCII-1.
-                match_groups_message = result.match_groups.get("match_groups_message", ())
-                assert match_groups_message is not False
-                event["match_groups"] = match_groups_message
+            if rule.get("drop"):
+                if rule["drop"] == "skip_pack":
+                    if self._config["debug_rules"]:
+                        self._logger.info("  skipping this rule pack (%s)", rule["pack"])
+                    continue
+                self._perfcounters.count("drops")
+                return
 
-                match_groups_syslog_application = result.match_groups.get(
-                    "match_groups_syslog_application", ()
+            if result.cancelling:
+                self._event_status.cancel_events(
+                    self, self._event_columns, event, result.match_groups, rule
                 )
-                assert match_groups_syslog_application is not False
-                event["match_groups_syslog_application"] = match_groups_syslog_application
+                return
 
-                self.rewrite_event(rule, event, result.match_groups)
+            # Remember the rule id that this event originated from
+            event["rule_id"] = rule["id"]
 
-                # Lookup the monitoring core hosts and add the core host
-                # name to the event when one can be matched.
-                #
-                # Needs to be done AFTER event rewriting, because the rewriting
-                # may change the "host" field.
-                #
-                # For the moment we have no rule/condition matching on this
-                # field. So we only add the core host info for matched events.
-                self._add_core_host_to_new_event(event)
-
-                if "count" in rule:
-                    count = rule["count"]
-                    # Check if a matching event already exists that we need to
-                    # count up. If the count reaches the limit, the event will
-                    # be opened and its rule actions performed.
-                    existing_event = self._event_status.count_event(self, event, count)
-                    if existing_event:
-                        if "delay" in rule:
-                            if self._config["debug_rules"]:
-                                self._logger.info(
-                                    "Event opening will be delayed for %d seconds", rule["delay"]
-                                )
-                            existing_event["delay_until"] = time.time() + rule["delay"]
-                            existing_event["phase"] = "delayed"
-                        else:
-                            event_has_opened(
-                                self._history,
-                                self.settings,
-                                self._config,
-                                self._logger,
-                                self.host_config,
-                                self._event_columns,
-                                rule,
-                                existing_event,
-                            )
+            # Attach optional contact group information for visibility
+            # and eventually for notifications
+            self._add_rule_contact_groups_to_event(rule, event)
 
-                        self._history.add(existing_event, "COUNTREACHED")
+            # Store groups from matching this event. In order to make
+            # persistence easier, we do not save them as list but join
+            # them on ASCII-1.
+            match_groups_message = result.match_groups.get("match_groups_message", ())
+            assert match_groups_message is not False
+            event["match_groups"] = match_groups_message
 
-                        if "delay" not in rule and rule.get("autodelete"):
-                            existing_event["phase"] = "closed"
-                            with self._event_status.lock:
-                                self._event_status.remove_event(existing_event, "AUTODELETE")
-                elif "expect" in rule:
-                    self._event_status.count_expected_event(self, event)
-                else:
+            match_groups_syslog_application = result.match_groups.get(
+                "match_groups_syslog_application", ()
+            )
+            assert match_groups_syslog_application is not False
+            event["match_groups_syslog_application"] = match_groups_syslog_application
+
+            self.rewrite_event(rule, event, result.match_groups)
+
+            # Lookup the monitoring core hosts and add the core host
+            # name to the event when one can be matched.
+            #
+            # Needs to be done AFTER event rewriting, because the rewriting
+            # may change the "host" field.
+            #
+            # For the moment we have no rule/condition matching on this
+            # field. So we only add the core host info for matched events.
+            self._add_core_host_to_new_event(event)
+
+            if "count" in rule:
+                count = rule["count"]
+                # Check if a matching event already exists that we need to
+                # count up. If the count reaches the limit, the event will
+                # be opened and its rule actions performed.
+                existing_event = self._event_status.count_event(self, event, count)
+                if existing_event:
                     if "delay" in rule:
                         if self._config["debug_rules"]:
                             self._logger.info(
                                 "Event opening will be delayed for %d seconds", rule["delay"]
                             )
-                        event["delay_until"] = time.time() + rule["delay"]
-                        event["phase"] = "delayed"
+                        existing_event["delay_until"] = time.time() + rule["delay"]
+                        existing_event["phase"] = "delayed"
                     else:
-                        event["phase"] = "open"
-
-                    if self.new_event_respecting_limits(event) and event["phase"] == "open":
                         event_has_opened(
                             self._history,
                             self.settings,
@@ -1388,13 +1510,44 @@ class EventServer(ECServerThread):
                             self.host_config,
                             self._event_columns,
                             rule,
-                            event,
+                            existing_event,
                         )
-                        if rule.get("autodelete"):
-                            event["phase"] = "closed"
-                            with self._event_status.lock:
-                                self._event_status.remove_event(event, "AUTODELETE")
-                return
+
+                    self._history.add(existing_event, "COUNTREACHED")
+
+                    if "delay" not in rule and rule.get("autodelete"):
+                        existing_event["phase"] = "closed"
+                        with self._event_status.lock:
+                            self._event_status.remove_event(existing_event, "AUTODELETE")
+            elif "expect" in rule:
+                self._event_status.count_expected_event(self, event)
+            else:
+                if "delay" in rule:
+                    if self._config["debug_rules"]:
+                        self._logger.info(
+                            "Event opening will be delayed for %d seconds", rule["delay"]
+                        )
+                    event["delay_until"] = time.time() + rule["delay"]
+                    event["phase"] = "delayed"
+                else:
+                    event["phase"] = "open"
+
+                if self.new_event_respecting_limits(event) and event["phase"] == "open":
+                    event_has_opened(
+                        self._history,
+                        self.settings,
+                        self._config,
+                        self._logger,
+                        self.host_config,
+                        self._event_columns,
+                        rule,
+                        event,
+                    )
+                    if rule.get("autodelete"):
+                        event["phase"] = "closed"
+                        with self._event_status.lock:
+                            self._event_status.remove_event(event, "AUTODELETE")
+            return
 
         # End of loop over rules.
         if self._config["archive_orphans"]:
@@ -1447,8 +1600,23 @@ class EventServer(ECServerThread):
         match.
         """
         self._perfcounters.count("rule_tries")
-        with self._lock_configuration:
-            return self._rule_matcher.event_rule_matches(rule, event)
+        stats = self._rule_match_stats[rule["id"]]
+        stats.tries += 1
+        before = time.perf_counter()
+        try:
+            with self._lock_configuration:
+                return self._rule_matcher.event_rule_matches(rule, event)
+        finally:
+            stats.seconds += time.perf_counter() - before
+
+    def rule_match_stats(self) -> Mapping[str, RuleMatchStats]:
+        return dict(self._rule_match_stats)
+
+    def reset_rule_match_stats(self, rule_id: str | None) -> None:
+        if rule_id:
+            self._rule_match_stats.pop(rule_id, None)
+        else:
+            self._rule_match_stats.clear()
 
     def rewrite_event(  # pylint: disable=too-many-branches
         self, rule: Rule, event: Event, match_groups: MatchGroups, set_first: bool = True
@@ -1864,14 +2032,13 @@ class StatusTableEvents(StatusTable):
         self._columns_dict = dict(self.columns)
 
     def _enumerate(self, query: QueryGET) -> Iterable[Sequence[object]]:
-        for event in self._event_status.get_events():
-            # Optimize filters that are set by the check_mkevents active check. Since users
-            # may have a lot of those checks running, it is a good idea to optimize this.
-            if not query.only_host or filter_operator_in(event["host"], query.only_host):
-                yield [
-                    event.get(column_name[6:], default)
-                    for column_name, default in self._columns_dict.items()
-                ]
+        # Optimize filters that are set by the check_mkevents active check. Since users
+        # may have a lot of those checks running, it is a good idea to optimize this.
+        for event in self._event_status.get_events(query.only_host or None):
+            yield [
+                event.get(column_name[6:], default)
+                for column_name, default in self._columns_dict.items()
+            ]
 
 
 class StatusTableHistory(StatusTable):
@@ -1904,14 +2071,24 @@ class StatusTableRules(StatusTable):
     columns: Columns = [
         ("rule_id", ""),
         ("rule_hits", 0),
+        ("rule_tries", 0),
+        ("rule_prefiltered", 0),
+        ("rule_match_time", 0.0),
     ]
 
-    def __init__(self, logger: Logger, event_status: EventStatus) -> None:
+    def __init__(
+        self, logger: Logger, event_status: EventStatus, event_server: EventServer
+    ) -> None:
         super().__init__(logger)
         self._event_status = event_status
+        self._event_server = event_server
 
     def _enumerate(self, query: QueryGET) -> Iterable[Sequence[object]]:
-        return self._event_status.get_rule_stats()
+        hits = dict(self._event_status.get_rule_stats())
+        match_stats = self._event_server.rule_match_stats()
+        for rule_id in sorted(hits.keys() | match_stats.keys()):
+            stats = match_stats.get(rule_id, RuleMatchStats())
+            yield [rule_id, hits.get(rule_id, 0), stats.tries, stats.prefiltered, stats.seconds]
 
 
 class StatusTableStatus(StatusTable):
@@ -1971,7 +2148,7 @@ class StatusServer(ECServerThread):
 
         self._table_events = StatusTableEvents(logger, event_status)
         self._table_history = StatusTableHistory(logger, history)
-        self._table_rules = StatusTableRules(logger, event_status)
+        self._table_rules = StatusTableRules(logger, event_status, event_server)
         self._table_status = StatusTableStatus(logger, event_server)
         self._perfcounters = perfcounters
         self._lock_configuration = lock_configuration
@@ -2245,14 +2422,20 @@ class StatusServer(ECServerThread):
         if len(arguments) != 2:
             raise MKClientError("Wrong number of arguments for DELETE")
         event_ids, user = arguments
-        ids = {int(event_id) for event_id in event_ids.split(",")}
-        self._event_status.delete_events_by(lambda event: event["id"] in ids, user)
+        self._event_status.delete_events(
+            [
+                event
+                for event_id in sorted({int(event_id) for event_id in event_ids.split(",")})
+                if (event := self._event_status.event(event_id)) is not None
+            ],
+            user,
+        )
 
     def handle_command_delete_events_of_host(self, arguments: list[str]) -> None:
         if len(arguments) != 2:
             raise MKClientError("Wrong number of arguments for DELETE_EVENTS_OF_HOST")
         hostname, user = arguments
-        self._event_status.delete_events_by(lambda event: event["host"] == hostname, user)
+        self._event_status.delete_events(self._event_status.events_of_host(hostname), user)
 
     def handle_command_update(self, arguments: list[str]) -> None:
         event_ids, user, acknowledged, comment, contact = arguments
@@ -2328,9 +2511,11 @@ class StatusServer(ECServerThread):
         if arguments:
             self._logger.info("Resetting counters of rule %s", arguments[0])
             self._event_status.reset_counters(arguments[0])
+            self._event_server.reset_rule_match_stats(arguments[0])
         else:
             self._logger.info("Resetting all rule counters")
             self._event_status.reset_counters(None)
+            self._event_server.reset_rule_match_stats(None)
 
     def handle_command_action(self, arguments: list[str]) -> None:
         event_ids, user, action_id = arguments
@@ -2549,7 +2734,7 @@ class EventStatus:
 
     def flush(self) -> None:
         # TODO: Improve types!
-        self._events: list[Event] = []
+        self._events = EventTable()
         self._next_event_id = 1
         self._rule_stats: dict[str, int] = {}
         # needed for expecting rules
@@ -2562,14 +2747,17 @@ class EventStatus:
         # - number of rule misses
 
     def events(self) -> list[Event]:
-        # TODO: Improve type!
-        return self._events
+        """A snapshot of the events, the caller may remove events while iterating"""
+        return list(self._events)
+
+    def events_of_rule(self, rule_id: str | None) -> list[Event]:
+        return list(self._events.of_rule(rule_id))
+
+    def events_of_host(self, host_name: str) -> list[Event]:
+        return [event for event in self._events.of_host(host_name) if event["host"] == host_name]
 
     def event(self, eid: int) -> Event | None:
-        for event in self._events:
-            if event["id"] == eid:
-                return event
-        return None
+        return self._events.get(eid)
 
     def interval_start(self, rule_id: str, interval: int) -> int:
         """
@@ -2618,14 +2806,14 @@ class EventStatus:
     def pack_status(self) -> PackedEventStatus:
         return PackedEventStatus(
             next_event_id=self._next_event_id,
-            events=self._events,
+            events=list(self._events),
             rule_stats=self._rule_stats,
             interval_starts=self._interval_starts,
         )
 
     def unpack_status(self, status: PackedEventStatus) -> None:
         self._next_event_id = status["next_event_id"]
-        self._events = status["events"]
+        self._events = EventTable(status["events"])
         self._rule_stats = status["rule_stats"]
         self._interval_starts = status["interval_starts"]
 
@@ -2657,7 +2845,7 @@ class EventStatus:
             try:
                 status = ast.literal_eval(path.read_text(encoding="utf-8"))
                 self._next_event_id = status["next_event_id"]
-                self._events = status["events"]
+                events: list[Event] = status["events"]
                 self._rule_stats = status["rule_stats"]
                 self._interval_starts = status.get("interval_starts", {})
                 self._logger.info("Loaded event state from %s.", path)
@@ -2665,8 +2853,11 @@ class EventStatus:
                 self._logger.exception("Error loading event state from %s", path)
                 raise
 
+        else:
+            events = list(self._events)
+
         # Add new columns and fix broken events
-        for event in self._events:
+        for event in events:
             event.setdefault("ipaddress", "")
             event.setdefault("host", HostName(""))
             event.setdefault("application", "")
@@ -2675,6 +2866,7 @@ class EventStatus:
             if "core_host" not in event:
                 event_server.add_core_host_to_event(event)
                 event["host_in_downtime"] = False
+        self._events = EventTable(events)
 
         # core_host is needed to initialize the status
         self._initialize_event_limit_status()
@@ -2715,7 +2907,7 @@ class EventStatus:
         self._perfcounters.count("events")
         event["id"] = self._next_event_id
         self._next_event_id += 1
-        self._events.append(event)
+        self._events.add(event)
         self.num_existing_events += 1
         self._count_event_add(event)
         self._history.add(event, "NEW")
@@ -2728,19 +2920,18 @@ class EventStatus:
         self._history.add(event, "ARCHIVED")
 
     def remove_event(self, event: Event, delete_reason: HistoryWhat, user: str = "") -> None:
-        try:
-            self._events.remove(event)
-            self._history.add(event, delete_reason, user)
-            self._count_event_remove(event)
-        except ValueError:
-            self._logger.exception("Cannot remove event %d: not present", event["id"])
+        if not self._events.remove(event):
+            self._logger.error("Cannot remove event %d: not present", event["id"])
+            return
+        self._history.add(event, delete_reason, user)
+        self._count_event_remove(event)
 
     # protected by self.lock
     def remove_oldest_event(self, ty: LimitKind, event: Event) -> None:
         if ty == "overall":
             self._logger.log(VERBOSE, "  Removing oldest event")
-            oldest_event = self._events[0]
-            self.remove_event(oldest_event, "AUTODELETE")
+            if (oldest_event := self._events.oldest()) is not None:
+                self.remove_event(oldest_event, "AUTODELETE")
         elif ty == "by_rule" and event["rule_id"] is not None:
             self._logger.log(VERBOSE, '  Removing oldest event of rule "%s"', event["rule_id"])
             self._remove_oldest_event_of_rule(event["rule_id"])
@@ -2750,14 +2941,12 @@ class EventStatus:
 
     # protected by self.lock
     def _remove_oldest_event_of_rule(self, rule_id: str) -> None:
-        for event in self._events:
-            if event["rule_id"] == rule_id:
-                self.remove_event(event, "AUTODELETE")
-                return
+        if (event := next(iter(self._events.of_rule(rule_id)), None)) is not None:
+            self.remove_event(event, "AUTODELETE")
 
     # protected by self.lock
     def _remove_oldest_event_of_host(self, hostname: str) -> None:
-        for event in self._events:
+        for event in self._events.of_host(hostname):
             if event["host"] == hostname:
                 self.remove_event(event, "AUTODELETE")
                 return
@@ -2786,12 +2975,12 @@ class EventStatus:
         Cancel all events the belong to a certain rule id and are
         of the same "breed" as a new event.
         """
+        # Only events of the same host can be cancelled, see cancelling_match()
+        host = self._cancelling_host(match_groups, new_event, rule)
         with self.lock:
             to_delete = []
-            for event in self._events:
-                if event["rule_id"] == rule["id"] and self.cancelling_match(
-                    match_groups, new_event, event, rule
-                ):
+            for event in list(self._events.of_rule_and_host(rule["id"], host)):
+                if self.cancelling_match(match_groups, new_event, event, rule):
                     # Fill a few fields of the cancelled event with data from
                     # the cancelling event so that action scripts have useful
                     # values and the logfile entry if more relevant.
@@ -2838,11 +3027,8 @@ class EventStatus:
             for e in to_delete:
                 self.remove_event(e, "CANCELLED")
 
-    def cancelling_match(  # pylint: disable=too-many-branches
-        self, match_groups: MatchGroups, new_event: Event, event: Event, rule: Rule
-    ) -> bool:
-        debug = self._config["debug_rules"]
-
+    @staticmethod
+    def _cancelling_host(match_groups: MatchGroups, new_event: Event, rule: Rule) -> HostName:
         # The match_groups of the canceling match only contain the *_ok match groups
         # Since the rewrite definitions are based on the positive match, we need to
         # create some missing keys. O.o
@@ -2854,10 +3040,16 @@ class EventStatus:
         # Note: before we compare host and application we need to
         # apply the rewrite rules to the event. Because if in the previous
         # the hostname was rewritten, it wouldn't match anymore here.
-        host = new_event["host"]
         if "set_host" in rule:
-            host = HostName(replace_groups(rule["set_host"], host, match_groups))
+            return HostName(replace_groups(rule["set_host"], new_event["host"], match_groups))
+        return new_event["host"]
 
+    def cancelling_match(  # pylint: disable=too-many-branches
+        self, match_groups: MatchGroups, new_event: Event, event: Event, rule: Rule
+    ) -> bool:
+        debug = self._config["debug_rules"]
+
+        host = self._cancelling_host(match_groups, new_event, rule)
         if event["host"] != host:
             if debug:
                 self._logger.info(
@@ -2964,10 +3156,12 @@ class EventStatus:
                 preserve["contact"] = found["contact"]
         found.update(event)
         found.update(preserve)
+        # The host of the found event may change, in case the hosts are not counted separately.
+        self._events.reindex(found)
 
     def count_expected_event(self, event_server: EventServer, event: Event) -> None:
-        for ev in self._events:
-            if ev["rule_id"] == event["rule_id"] and ev["phase"] == "counting":
+        for ev in self._events.of_rule(event["rule_id"]):
+            if ev["phase"] == "counting":
                 self.count_event_up(ev, event)
                 return
 
@@ -2984,31 +3178,35 @@ class EventStatus:
         since the event has been created because the count was too
         low in the specified period of time.
         """
-        for ev in self._events:
-            if ev["rule_id"] == event["rule_id"]:
-                if ev["phase"] == "ack" and not count["count_ack"]:
-                    continue  # skip acknowledged events
+        candidates = (
+            self._events.of_rule_and_host(event["rule_id"], event["host"])
+            if count["separate_host"]
+            else self._events.of_rule(event["rule_id"])
+        )
+        for ev in candidates:
+            if ev["phase"] == "ack" and not count["count_ack"]:
+                continue  # skip acknowledged events
 
-                if count["separate_host"] and ev["host"] != event["host"]:
-                    continue  # treat events with separated hosts separately
+            if count["separate_host"] and ev["host"] != event["host"]:
+                continue  # treat events with separated hosts separately
 
-                if count["separate_application"] and ev["application"] != event["application"]:
-                    continue  # same for application
+            if count["separate_application"] and ev["application"] != event["application"]:
+                continue  # same for application
 
-                if count["separate_match_groups"] and ev["match_groups"] != event["match_groups"]:
-                    continue
+            if count["separate_match_groups"] and ev["match_groups"] != event["match_groups"]:
+                continue
 
-                count_duration = count.get("count_duration")
-                if count_duration is not None and ev["first"] + count_duration < event["time"]:
-                    # Counting has been discontinued on this event after a certain time
-                    continue
+            count_duration = count.get("count_duration")
+            if count_duration is not None and ev["first"] + count_duration < event["time"]:
+                # Counting has been discontinued on this event after a certain time
+                continue
 
-                if ev["host_in_downtime"] != event["host_in_downtime"]:
-                    continue  # treat events with different downtime states separately
+            if ev["host_in_downtime"] != event["host_in_downtime"]:
+                continue  # treat events with different downtime states separately
 
-                found = ev
-                self.count_event_up(found, event)
-                break
+            found = ev
+            self.count_event_up(found, event)
+            break
         else:
             event["count"] = 1
             event["phase"] = "counting"
@@ -3021,16 +3219,16 @@ class EventStatus:
             return found  # do event action, return found copy of event
         return None  # do not do event action
 
-    def delete_events_by(self, predicate: Callable[[Event], bool], user: str) -> None:
-        for event in self._events[:]:
-            if predicate(event):
-                event["phase"] = "closed"
-                if user:
-                    event["owner"] = user
-                self.remove_event(event, "DELETE", user)
+    def delete_events(self, events: Iterable[Event], user: str) -> None:
+        for event in events:
+            event["phase"] = "closed"
+            if user:
+                event["owner"] = user
+            self.remove_event(event, "DELETE", user)
 
-    def get_events(self) -> Iterable[Event]:
-        return self._events
+    def get_events(self, hosts: Iterable[str] | None = None) -> Iterable[Event]:
+        """All events or only the ones of the given hosts (compared case-insensitive)"""
+        return self._events if hosts is None else self._events.of_hosts(hosts)
 
     def get_rule_stats(self) -> Iterable[tuple[str, int]]:
         return sorted(self._rule_stats.items(), key=lambda x: x[0])
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Rule matching in worker processes
+
+With --match-workers the parsing of the syslog messages, the host name translation and the
+rule matching run in a pool of worker processes. Only the processing of the matched events
+(counting, cancelling, opening, ...) is left to the event server thread. The batches are
+handed back in the order they have been submitted, so the events of a host are processed
+in the order they have been received.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import time
+import traceback
+from collections import defaultdict, deque
+from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from logging import Logger
+from typing import NamedTuple
+
+from livestatus import SiteId
+
+from cmk.utils.hostaddress import HostName
+from cmk.utils.timeperiod import TimeperiodName
+from cmk.utils.translations import translate_hostname, TranslationOptions
+
+from cmk.ccc.exceptions import MKGeneralException
+
+from .config import Rule
+from .event import create_event_from_syslog_message, Event
+from .rule_matcher import (
+    matching_rules,
+    MatchResult,
+    MatchSuccess,
+    RuleMatcher,
+    RuleMatchStats,
+    RulePrefilter,
+)
+
+__all__ = ["MatchedBatch", "MatchedEvent", "MatchWorkerPool", "SyslogMessage", "WorkerConfig"]
+
+
+@dataclass(frozen=True)
+class WorkerConfig:
+    """Everything the workers need to know, sent once per (re)configuration"""
+
+    generation: int
+    rules: Sequence[Rule]
+    # facility -> priority -> indices of the rule candidates, None if the optimizer is off
+    rule_hash: Mapping[int, Mapping[int, Sequence[int]]] | None
+    hostname_translation: TranslationOptions
+    omd_site_id: SiteId
+
+
+class MatchedEvent(NamedTuple):
+    event: Event
+    tries: int
+    # The rule hits as in matching_rules(), the rules are given by their index
+    hits: Sequence[tuple[int, MatchSuccess]]
+    errors: Sequence[str]
+
+
+class MatchedBatch(NamedTuple):
+    generation: int
+    events: Sequence[MatchedEvent]
+    # The costs of matching the batch by the index of the rule
+    rule_stats: Mapping[int, RuleMatchStats]
+
+
+# None: The state of the time periods is unknown
+_ActivePeriods = Mapping[TimeperiodName, bool] | None
+# A syslog message and the address it has been received from
+SyslogMessage = tuple[bytes, tuple[str, int] | None]
+
+
+class _Matcher:
+    def __init__(self, config: WorkerConfig) -> None:
+        self._config = config
+        self._rule_index = {id(rule): index for index, rule in enumerate(config.rules)}
+        self._prefilter = RulePrefilter(config.rules)
+        self._rule_stats: defaultdict[int, RuleMatchStats] = defaultdict(RuleMatchStats)
+        self._active_periods: _ActivePeriods = {}
+        self._rule_matcher = RuleMatcher(
+            logger=None,
+            omd_site_id=config.omd_site_id,
+            is_active_time_period=self._is_active_time_period,
+        )
+
+    def _is_active_time_period(self, name: TimeperiodName) -> bool:
+        if self._active_periods is None:
+            raise MKGeneralException("Cannot update time period information.")
+        # Unknown time periods are assumed to be active, see TimePeriods.active()
+        return self._active_periods.get(name, True)
+
+    def _candidates(self, event: Event) -> Iterable[Rule]:
+        if self._config.rule_hash is None:
+            return self._config.rules
+        indices = self._config.rule_hash.get(event["facility"], {}).get(event["priority"], ())
+        return (self._config.rules[index] for index in indices)
+
+    def match(self, events: Iterable[Event], active_periods: _ActivePeriods) -> MatchedBatch:
+        self._active_periods = active_periods
+        self._rule_stats = defaultdict(RuleMatchStats)
+        matched_events = [self._match_event(event) for event in events]
+        return MatchedBatch(self._config.generation, matched_events, self._rule_stats)
+
+    def _match_event(self, event: Event) -> MatchedEvent:
+        try:
+            event["host"] = translate_hostname(self._config.hostname_translation, event["host"])
+        except Exception:
+            event["host"] = HostName("")
+
+        tries = 0
+        errors: list[str] = []
+
+        def event_rule_matches(rule: Rule, event: Event) -> MatchResult:
+            nonlocal tries
+            tries += 1
+            stats = self._rule_stats[self._rule_index[id(rule)]]
+            stats.tries += 1
+            before = time.perf_counter()
+            try:
+                return self._rule_matcher.event_rule_matches(rule, event)
+            finally:
+                stats.seconds += time.perf_counter() - before
+
+        def prefiltered(rule: Rule) -> None:
+            self._rule_stats[self._rule_index[id(rule)]].prefiltered += 1
+
+        hits = [
+            (self._rule_index[id(rule)], result)
+            for rule, result in matching_rules(
+                self._prefilter.filter(self._candidates(event), event, prefiltered),
+                event,
+                event_rule_matches,
+                lambda reason: errors.append(f"{reason}\n{traceback.format_exc()}"),
+            )
+        ]
+        return MatchedEvent(event, tries, hits, errors)
+
+
+# The state of a worker process, set up by _initialize_worker()
+_matcher: _Matcher | None = None
+
+
+def _initialize_worker(config: WorkerConfig) -> None:
+    global _matcher
+    _matcher = _Matcher(config)
+
+
+def _match_syslog_messages(
+    messages: Sequence[SyslogMessage], active_periods: _ActivePeriods
+) -> MatchedBatch:
+    assert _matcher is not None
+    return _matcher.match(
+        (create_event_from_syslog_message(message, address, None) for message, address in messages),
+        active_periods,
+    )
+
+
+def _match_events(events: Sequence[Event], active_periods: _ActivePeriods) -> MatchedBatch:
+    assert _matcher is not None
+    return _matcher.match(events, active_periods)
+
+
+class _Task(NamedTuple):
+    future: Future[MatchedBatch]
+    function: Callable[..., MatchedBatch]
+    args: tuple[object, ...]
+
+
+class MatchWorkerPool:
+    """Matches batches of messages or events in worker processes
+
+    The pool is meant to be used by the event server thread only, apart from configure().
+    """
+
+    def __init__(self, num_workers: int, logger: Logger) -> None:
+        self._num_workers = num_workers
+        self._logger = logger
+        self._config: WorkerConfig | None = None
+        self._executor: ProcessPoolExecutor | None = None
+        self._pending: deque[_Task] = deque()
+        # Becomes readable when a batch is done, to be used with select()
+        self._wakeup_read, self._wakeup_write = os.pipe()
+        os.set_blocking(self._wakeup_read, False)
+        os.set_blocking(self._wakeup_write, False)
+
+    def fileno(self) -> int:
+        return self._wakeup_read
+
+    def __len__(self) -> int:
+        """The number of batches not yet handed back"""
+        return len(self._pending)
+
+    @property
+    def is_congested(self) -> bool:
+        return len(self._pending) >= 4 * self._num_workers
+
+    def configure(self, config: WorkerConfig) -> None:
+        """Use the new configuration for the batches submitted from now on"""
+        self._config = config
+        if (executor := self._executor) is not None:
+            self._executor = None
+            # Batches already submitted are still matched with the old configuration
+            executor.shutdown(wait=False)
+
+    def submit_syslog_messages(
+        self, messages: Sequence[SyslogMessage], active_periods: _ActivePeriods
+    ) -> None:
+        self._submit(_match_syslog_messages, (messages, active_periods))
+
+    def submit_events(self, events: Sequence[Event], active_periods: _ActivePeriods) -> None:
+        self._submit(_match_events, (events, active_periods))
+
+    def _submit(self, function: Callable[..., MatchedBatch], args: tuple[object, ...]) -> None:
+        if self._config is None:
+            raise MKGeneralException("Rule matching workers are not configured")
+        if self._executor is None:
+            # The workers must not inherit the sockets and locks of the threaded daemon
+            self._executor = ProcessPoolExecutor(
+                max_workers=self._num_workers,
+                mp_context=multiprocessing.get_context("forkserver"),
+                initializer=_initialize_worker,
+                initargs=(self._config,),
+            )
+        future = self._executor.submit(function, *args)
+        future.add_done_callback(self._wake_up)
+        self._pending.append(_Task(future, function, args))
+
+    def _wake_up(self, _future: Future[MatchedBatch]) -> None:
+        try:
+            os.write(self._wakeup_write, b"x")
+        except BlockingIOError:
+            pass  # There is already enough to read
+
+    def done_batches(self, *, wait: bool = False) -> Iterator[MatchedBatch]:
+        """Yields the done batches in the order they have been submitted
+
+        With wait=True all pending batches are handed back.
+        """
+        try:
+            while os.read(self._wakeup_read, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+        while self._pending and (wait or self._pending[0].future.done()):
+            task = self._pending.popleft()
+            try:
+                yield task.future.result()
+            except Exception:
+                self._logger.exception("Rule matching in worker failed, matching in process")
+                self._executor = None  # A broken pool cannot be used anymore
+                yield self._match_in_process(task)
+
+    def _match_in_process(self, task: _Task) -> MatchedBatch:
+        global _matcher
+        assert self._config is not None
+        _matcher = _Matcher(self._config)
+        try:
+            return task.function(*task.args)
+        finally:
+            _matcher = None
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        os.close(self._wakeup_read)
+        os.close(self._wakeup_write)
@@ -51,9 +51,9 @@ class Perfcounters:
 
         self._logger = logger.getChild("Perfcounters")
 
-    def count(self, counter: str) -> None:
+    def count(self, counter: str, increment: int = 1) -> None:
         with self._lock:
-            self._counters[counter] += 1
+            self._counters[counter] += increment
 
     def count_time(self, counter: str, ptime: float) -> None:
         with self._lock:
@@ -123,8 +123,8 @@ class Query:
 
 
 def filter_operator_in(a: str, b: Iterable[str]) -> bool:
-    """Implemented as a named function, as it is used in a second filter
-    cmk.ec.main: StatusTableEvents._enumerate
+    """Implemented as a named function, its semantics have to match the host index
+    used for the host filter of StatusTableEvents (cmk.ec.event_table.EventTable.of_hosts),
     not implemented as regex/IGNORECASE due to performance.
     """
     return a.lower() in {e.lower() for e in b}
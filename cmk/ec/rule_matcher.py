@@ -7,10 +7,12 @@ from __future__ import annotations
 
 import ipaddress
 import re
-from collections.abc import Callable
+from collections.abc import Callable, Iterable, Iterator, Sequence
 from dataclasses import dataclass
 from logging import Logger
-from typing import Literal, NamedTuple
+from re import _constants as sre_constants  # type: ignore[attr-defined]
+from re import _parser as sre_parser  # type: ignore[attr-defined]
+from typing import Any, Literal, NamedTuple
 
 from livestatus import SiteId
 
@@ -133,6 +135,152 @@ def match(pattern: TextPattern | None, text: str, complete: bool) -> TextMatchRe
     return m.groups("") if m else False
 
 
+@dataclass
+class RuleMatchStats:
+    """The costs of matching a rule"""
+
+    tries: int = 0
+    prefiltered: int = 0  # skipped because of the prefilter
+    seconds: float = 0.0
+
+    def add(self, other: RuleMatchStats) -> None:
+        self.tries += other.tries
+        self.prefiltered += other.prefiltered
+        self.seconds += other.seconds
+
+
+# The non-ASCII characters which re.IGNORECASE matches with an ASCII character, but which are
+# not lowered to it.
+_CASE_FOLDING = str.maketrans({"İ": "i", "ı": "i", "ſ": "s"})
+
+
+class _Needle(NamedTuple):
+    """A literal which has to be found in a field of the event"""
+
+    how: Literal["in_lower", "in_folded", "equals_lower"]
+    literal: str
+
+
+class _Requirement(NamedTuple):
+    """Any of the alternatives has to be found, all needles of an alternative"""
+
+    field: Literal["text", "host", "application"]
+    alternatives: Sequence[Sequence[_Needle]]
+
+
+def _haystack(value: str, how: str) -> str:
+    if how == "in_folded" and not value.isascii():
+        return value.translate(_CASE_FOLDING).lower()
+    return value.lower()
+
+
+def _regex_literals(pattern: re.Pattern[str]) -> Sequence[str]:
+    """The longest literal substrings every match of the pattern contains, lowered
+
+    Only plain ASCII literals on the top level of the pattern (or in plain groups) are
+    considered, everything else ends a literal.
+    """
+
+    def flattened(items: Iterable[tuple[Any, Any]]) -> Iterator[tuple[Any, Any]]:
+        for op, av in items:
+            # (group, add_flags, del_flags, pattern): A group without flags is just a sequence
+            if op is sre_constants.SUBPATTERN and not av[1] and not av[2]:
+                yield from flattened(av[3])
+            else:
+                yield op, av
+
+    literals = []
+    current: list[str] = []
+    try:
+        parsed = sre_parser.parse(pattern.pattern, pattern.flags)
+    except re.error:
+        return ()
+    for op, av in flattened(parsed):
+        if op is sre_constants.LITERAL and av < 128:
+            current.append(chr(av).lower())
+        elif current:
+            literals.append("".join(current))
+            current = []
+    if current:
+        literals.append("".join(current))
+    return sorted(literals, key=len, reverse=True)[:2]
+
+
+def _needles(pattern: TextPattern, complete: bool) -> Sequence[_Needle]:
+    """The needles a match of the pattern requires, empty if there are none"""
+    if isinstance(pattern, str):
+        return (_Needle("equals_lower" if complete else "in_lower", pattern),)
+    return tuple(_Needle("in_folded", literal) for literal in _regex_literals(pattern))
+
+
+def _requirements(rule: Rule) -> Sequence[_Requirement]:
+    if rule.get("invert_matching"):
+        return ()
+    requirements = []
+    if "match_host" in rule and (needles := _needles(rule["match_host"], complete=True)):
+        requirements.append(_Requirement("host", (needles,)))
+    # The rule also matches if only the cancelling condition matches
+    for field, keys in (
+        ("application", ("match_application", "cancel_application")),
+        ("text", ("match", "match_ok")),
+    ):
+        if field == "text" and "match" not in rule:
+            continue  # A rule without a text condition matches all texts
+        alternatives = [_needles(rule[key], complete=False) for key in keys if key in rule]  # type: ignore[literal-required]
+        if alternatives and all(alternatives):
+            requirements.append(_Requirement(field, alternatives))  # type: ignore[arg-type]
+    return requirements
+
+
+class RulePrefilter:
+    """Skips the rules which cannot match an event because a required literal is missing
+
+    The literals are taken from the host, application and text conditions of the rules. Every
+    literal is looked up at most once per event, however many rules require it.
+    """
+
+    def __init__(self, rules: Iterable[Rule]) -> None:
+        self._requirements = {id(rule): reqs for rule in rules if (reqs := _requirements(rule))}
+
+    def filter(
+        self, rules: Iterable[Rule], event: Event, skipped: Callable[[Rule], None]
+    ) -> Iterator[Rule]:
+        if not self._requirements:
+            yield from rules
+            return
+
+        haystacks: dict[tuple[str, str], str] = {}
+        found: dict[tuple[str, _Needle], bool] = {}
+
+        def is_found(field: str, needle: _Needle) -> bool:
+            try:
+                return found[(field, needle)]
+            except KeyError:
+                pass
+            try:
+                haystack = haystacks[(field, needle.how)]
+            except KeyError:
+                haystack = haystacks[(field, needle.how)] = _haystack(event[field], needle.how)  # type: ignore[literal-required]
+            result = found[(field, needle)] = (
+                needle.literal == haystack
+                if needle.how == "equals_lower"
+                else needle.literal in haystack
+            )
+            return result
+
+        for rule in rules:
+            if (requirements := self._requirements.get(id(rule))) is None or all(
+                any(
+                    all(is_found(requirement.field, needle) for needle in alternative)
+                    for alternative in requirement.alternatives
+                )
+                for requirement in requirements
+            ):
+                yield rule
+            else:
+                skipped(rule)
+
+
 def format_pattern(pattern: TextPattern | None) -> str:
     if pattern is None:
         return str(pattern)
@@ -163,6 +311,38 @@ def match_ip_network(pattern: str, ipaddress_text: str) -> bool:
     return ipaddress_ in network
 
 
+def matching_rules(
+    rules: Iterable[Rule],
+    event: Event,
+    event_rule_matches: Callable[[Rule, Event], MatchResult],
+    on_error: Callable[[str], None],
+) -> Iterator[tuple[Rule, MatchSuccess]]:
+    """Yields the rules hit by the event in the order they have to be processed.
+
+    The first hit ends the matching, unless the rule skips the rest of its rule pack.
+    on_error is called from within the exception handler when matching a rule fails.
+    """
+    skip_pack: str | None = None
+    for rule in rules:
+        if skip_pack is not None and rule["pack"] == skip_pack:
+            continue  # still in the rule pack that we want to skip
+        skip_pack = None  # new pack, reset skipping
+
+        try:
+            result = event_rule_matches(rule, event)
+        except Exception as e:
+            result = MatchFailure(
+                reason=f"Rule would match, but due to inverted matching does not. {e}"
+            )
+            on_error(result.reason)
+
+        if isinstance(result, MatchSuccess):
+            yield rule, result
+            if rule.get("drop") != "skip_pack":
+                return
+            skip_pack = rule["pack"]
+
+
 class RuleMatcher:
     def __init__(
         self,
@@ -179,6 +179,13 @@ class ECArgumentParser(ArgumentParser):
             action="store_true",
             help="create performance profile for event thread",
         )
+        self.add_argument(
+            "--match-workers",
+            metavar="N",
+            type=self._number_of_workers,
+            default=0,
+            help="match the rules in N worker processes (default: 0, match in the event thread)",
+        )
 
     @staticmethod
     def _file_descriptor(value: str) -> FileDescriptor:
@@ -191,6 +198,17 @@ class ECArgumentParser(ArgumentParser):
             raise ArgumentTypeError(f"invalid file descriptor value: {repr(value)}") from e
         return FileDescriptor(file_desc)
 
+    @staticmethod
+    def _number_of_workers(value: str) -> int:
+        """A custom argument type for the number of worker processes, i.e. non-negative integers."""
+        try:
+            number = int(value)
+            if number < 0:
+                raise ValueError
+        except ValueError as e:
+            raise ArgumentTypeError(f"invalid number of workers: {repr(value)}") from e
+        return number
+
 
 # a communication endpoint, e.g. for syslog or SNMP
 EndPoint = PortNumber | FileDescriptor
@@ -220,6 +238,7 @@ class Options(NamedTuple):
     debug: bool
     profile_status: bool
     profile_event: bool
+    match_workers: int
 
 
 class Settings(NamedTuple):
@@ -244,6 +263,7 @@ def create_settings(version: str, omd_root: Path, argv: list[str]) -> Settings:
         debug=args.debug,
         profile_status=args.profile_status,
         profile_event=args.profile_event,
+        match_workers=args.match_workers,
     )
     return Settings(paths=paths, options=options)
 
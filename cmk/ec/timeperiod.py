@@ -32,6 +32,11 @@ class TimePeriods:
             self._logger.exception("Cannot update time period information.")
             raise
 
+    def active_periods(self) -> Mapping[TimeperiodName, bool]:
+        """The state of all known time periods, e.g. for matching rules in other processes"""
+        self._update()
+        return self._active
+
     def active(self, name: TimeperiodName) -> bool:
         self._update()
         if (is_active := self._active.get(name)) is None:
@@ -306,7 +306,8 @@ class SNMPFetcher(Fetcher[SNMPRawData]):
             raise MKFetcherError("missing backend")
 
         now = int(time.time())
-        persisted_sections = self._section_store.load() if mode is Mode.CHECKING else {}
+        # Only the validity of the persisted sections is needed here, not their content
+        persisted_sections = self._section_store.load_headers() if mode is Mode.CHECKING else {}
         section_names = self._get_selection(mode)
         section_names |= self._detect(
             select_from=self._get_detected_sections(mode) - section_names, backend=self._backend
@@ -326,7 +327,7 @@ class SNMPFetcher(Fetcher[SNMPRawData]):
         fetched_data: dict[SectionName, SNMPRawDataElem] = {}
         for section_name in self._sort_section_names(section_names):
             try:
-                _from, until, _section = persisted_sections[section_name]
+                _from, until = persisted_sections[section_name]
                 if now > until:
                     raise LookupError(section_name)
             except LookupError:
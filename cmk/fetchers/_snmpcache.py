@@ -4,74 +4,136 @@
 # conditions defined in the file COPYING, which is part of this source code package.
 """SNMP caching"""
 
-import os
+import json
+import time
+from collections.abc import Iterator, MutableMapping
 from pathlib import Path
+from typing import Final
 
-import cmk.utils.cleanup
 from cmk.utils.hostaddress import HostAddress, HostName
 
 from cmk.snmplib import OID, SNMPDecodedString
 
 from cmk.ccc import store
 
-# TODO: Replace this by generic caching
-_g_single_oid_hostname: HostName | None = None
-_g_single_oid_ipaddress: HostAddress | None = None
-_g_single_oid_cache: dict[OID, SNMPDecodedString | None] | None = None
-
-
-def initialize_single_oid_cache(
-    host_name: HostName, ipaddress: HostAddress | None, from_disk: bool = False, *, cache_dir: Path
-) -> None:
-    global _g_single_oid_cache, _g_single_oid_ipaddress, _g_single_oid_hostname
-
-    if (
-        _g_single_oid_hostname != host_name
-        or _g_single_oid_ipaddress != ipaddress
-        or _g_single_oid_cache is None
-    ):
-        _g_single_oid_hostname = host_name
-        _g_single_oid_ipaddress = ipaddress
-        if from_disk:
-            _g_single_oid_cache = _load_single_oid_cache(host_name, ipaddress, cache_dir=cache_dir)
+__all__ = ["SingleOIDCache"]
+
+
+class SingleOIDCache(MutableMapping[OID, SNMPDecodedString | None]):
+    """Cache of the single OIDs of a host, used for the SNMP detection
+
+    The values are valid for `ttl` seconds after they have been fetched. The cache is shared
+    via the file system: The cache of a host is loaded from disk and the values fetched in
+    the meantime are merged back into the file by `save()`. This way the detection OIDs of a
+    device are only fetched once per TTL, even with concurrent fetcher processes.
+
+    Missing values (None) are only valid for the current run. They may just be the result of
+    a failed GET, e.g. a timeout, which must not hide the device from the detection for a
+    whole TTL.
+
+    The on disk format is a JSON object mapping the OIDs to the time they have been fetched
+    and their value.
+    """
+
+    def __init__(
+        self,
+        host_name: HostName,
+        ipaddress: HostAddress | None,
+        *,
+        cache_dir: Path,
+        ttl: float,
+    ) -> None:
+        self.path: Final = cache_dir / f"{host_name}.{ipaddress}"
+        self.ttl: Final = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: dict[OID, tuple[float, SNMPDecodedString | None]] = {}
+        self._fetched: set[OID] = set()
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.path!r}, ttl={self.ttl!r})"
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[OID]:
+        return iter(self._entries)
+
+    def __getitem__(self, oid: OID) -> SNMPDecodedString | None:
+        try:
+            fetched_at, value = self._entries[oid]
+        except KeyError:
+            self.misses += 1
+            raise
+        if fetched_at + self.ttl < time.time():
+            del self._entries[oid]
+            self.misses += 1
+            raise KeyError(oid)
+        self.hits += 1
+        return value
+
+    def __setitem__(self, oid: OID, value: SNMPDecodedString | None) -> None:
+        # Fetched values are valid at least for the current run, even with a TTL of 0.
+        self._entries[oid] = (float("inf") if self.ttl <= 0 else time.time(), value)
+        if value is None:
+            self._fetched.discard(oid)
         else:
-            _g_single_oid_cache = {}
-
-
-def write_single_oid_cache(
-    host_name: HostName, ipaddress: HostAddress | None, *, cache_dir: Path
-) -> None:
-    if not _g_single_oid_cache:
-        return
-
-    if not os.path.exists(cache_dir):
-        os.makedirs(cache_dir)
-    cache_path = f"{cache_dir}/{host_name}.{ipaddress}"
-    store.save_object_to_file(cache_path, _g_single_oid_cache, pretty=False)
-
-
-def _load_single_oid_cache(
-    host_name: HostName, ipaddress: HostAddress | None, cache_dir: Path
-) -> dict[OID, SNMPDecodedString | None]:
-    cache_path = cache_dir / f"{host_name}.{ipaddress}"
-    return store.load_object_from_file(cache_path, default={})
-
-
-def single_oid_cache() -> dict[OID, SNMPDecodedString | None]:
-    assert _g_single_oid_cache is not None
-    return _g_single_oid_cache
-
-
-def cleanup_host_caches() -> None:
-    _clear_other_hosts_oid_cache(None)
-
-
-cmk.utils.cleanup.register_cleanup(cleanup_host_caches)
-
-
-def _clear_other_hosts_oid_cache(hostname: HostName | None) -> None:
-    global _g_single_oid_cache, _g_single_oid_ipaddress, _g_single_oid_hostname
-    if _g_single_oid_hostname != hostname:
-        _g_single_oid_cache = None
-        _g_single_oid_hostname = hostname
-        _g_single_oid_ipaddress = None
+            self._fetched.add(oid)
+
+    def __delitem__(self, oid: OID) -> None:
+        del self._entries[oid]
+        self._fetched.discard(oid)
+
+    def set_volatile(self, oid: OID, value: SNMPDecodedString | None) -> None:
+        """Set a value for the current run only, it is not written to disk"""
+        self[oid] = value
+        self._fetched.discard(oid)
+
+    def load(self) -> None:
+        """Add the still valid values from disk"""
+        if self.ttl <= 0:
+            return
+        now = time.time()
+        self._entries.update(
+            (oid, entry)
+            for oid, entry in self._read().items()
+            if oid not in self._entries and entry[0] + self.ttl >= now
+        )
+
+    def save(self) -> None:
+        """Merge the values fetched by this process into the file on disk"""
+        if self.ttl <= 0 or not self._fetched:
+            return
+
+        now = time.time()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Loading with lock, the save function will release the lock
+        entries = {
+            oid: entry for oid, entry in self._read(lock=True).items() if entry[0] + self.ttl >= now
+        }
+        for oid in self._fetched:
+            if (entry := self._entries.get(oid)) is None:
+                continue
+            # Another process may have fetched the value in the meantime, keep the newest one.
+            if oid not in entries or entries[oid][0] <= entry[0]:
+                entries[oid] = entry
+        store.save_text_to_file(
+            self.path,
+            json.dumps(
+                {oid: [fetched_at, value] for oid, (fetched_at, value) in entries.items()},
+                separators=(",", ":"),
+            ),
+        )
+        self._fetched.clear()
+
+    def _read(self, *, lock: bool = False) -> dict[OID, tuple[float, SNMPDecodedString | None]]:
+        raw = store.load_text_from_file(self.path, default="", lock=lock)
+        try:
+            return {
+                oid: (float(fetched_at), value)
+                for oid, (fetched_at, value) in json.loads(raw or "{}").items()
+                if isinstance(value, str)
+            }
+        except (ValueError, TypeError, AttributeError):
+            # Unreadable or written by an older version: Simply fetch the values again
+            return {}
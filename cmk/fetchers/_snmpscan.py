@@ -17,10 +17,10 @@ from cmk.utils.tty import format_warning
 
 from cmk.snmplib import get_single_oid, SNMPBackend, SNMPDetectAtom, SNMPDetectBaseType
 
-import cmk.fetchers._snmpcache as snmp_cache
-
 from cmk.ccc.exceptions import MKGeneralException, MKSNMPError, MKTimeout, OnError
 
+from ._snmpcache import SingleOIDCache
+
 SNMPScanSection = tuple[SectionName, SNMPDetectBaseType]
 
 
@@ -29,6 +29,8 @@ class SNMPScanConfig:
     on_error: OnError
     missing_sys_description: bool
     oid_cache_dir: Path
+    # Values of the detection OIDs are shared between the runs for that many seconds.
+    oid_cache_ttl: float = 300.0
 
 
 # gather auto_discovered check_plugin_names for this host
@@ -64,29 +66,35 @@ def _snmp_scan(
     scan_config: SNMPScanConfig,
     backend: SNMPBackend,
 ) -> frozenset[SectionName]:
-    snmp_cache.initialize_single_oid_cache(
-        backend.config.hostname, backend.config.ipaddress, cache_dir=scan_config.oid_cache_dir
+    oid_cache = SingleOIDCache(
+        backend.config.hostname,
+        backend.config.ipaddress,
+        cache_dir=scan_config.oid_cache_dir,
+        ttl=scan_config.oid_cache_ttl,
     )
+    oid_cache.load()
     backend.logger.debug("  SNMP scan:")
 
     if scan_config.missing_sys_description:
-        _fake_description_object(backend.logger)
+        _fake_description_object(oid_cache, backend.logger)
     else:
-        _prefetch_description_object(backend=backend)
+        _prefetch_description_object(oid_cache, backend=backend)
 
     found_sections = _find_sections(
         sections,
+        oid_cache,
         on_error=scan_config.on_error,
         backend=backend,
     )
     _output_snmp_check_plugins("SNMP scan found", found_sections, backend.logger)
-    snmp_cache.write_single_oid_cache(
-        backend.config.hostname, backend.config.ipaddress, cache_dir=scan_config.oid_cache_dir
+    backend.logger.debug(
+        "  SNMP scan OID cache: %d hits, %d misses", oid_cache.hits, oid_cache.misses
     )
+    oid_cache.save()
     return found_sections
 
 
-def _prefetch_description_object(*, backend: SNMPBackend) -> None:
+def _prefetch_description_object(oid_cache: SingleOIDCache, *, backend: SNMPBackend) -> None:
     for oid, name in (
         (OID_SYS_DESCR, "system description"),
         (OID_SYS_OBJ, "system object"),
@@ -94,7 +102,7 @@ def _prefetch_description_object(*, backend: SNMPBackend) -> None:
         if (
             get_single_oid(
                 oid,
-                single_oid_cache=snmp_cache.single_oid_cache(),
+                single_oid_cache=oid_cache,
                 backend=backend,
                 log=backend.logger.debug,
             )
@@ -107,17 +115,18 @@ def _prefetch_description_object(*, backend: SNMPBackend) -> None:
             )
 
 
-def _fake_description_object(logger: Logger) -> None:
+def _fake_description_object(oid_cache: SingleOIDCache, logger: Logger) -> None:
     """Fake OID values to prevent issues with a lot of scan functions"""
     logger.debug(
         f'       Skipping system description OID (Set {OID_SYS_DESCR} and {OID_SYS_OBJ} to "")'
     )
-    snmp_cache.single_oid_cache()[OID_SYS_DESCR] = ""
-    snmp_cache.single_oid_cache()[OID_SYS_OBJ] = ""
+    oid_cache.set_volatile(OID_SYS_DESCR, "")
+    oid_cache.set_volatile(OID_SYS_OBJ, "")
 
 
 def _find_sections(
     sections: Iterable[SNMPScanSection],
+    oid_cache: SingleOIDCache,
     *,
     on_error: OnError,
     backend: SNMPBackend,
@@ -127,7 +136,7 @@ def _find_sections(
         oid_value_getter = functools.partial(
             get_single_oid,
             section_name=name,
-            single_oid_cache=snmp_cache.single_oid_cache(),
+            single_oid_cache=oid_cache,
             backend=backend,
             log=backend.logger.debug,
         )
@@ -2,25 +2,174 @@
 # Copyright (C) 2019 Checkmk GmbH - License: GNU General Public License v2
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
+"""File cache of the SNMP sections
+
+File layout (version 1):
+
+    magic | version | number of sections | index | section | section | ...
+
+The index contains the name, the offset and the length of every section. This way a
+section is only decoded when it is actually accessed. A section is a tree of tagged values:
+
+    b"l" count value...       list (tables, rows, ...)
+    b"s" length utf-8         decoded string
+    b"x" length bytes         decoded binary value (a list of ints in range 0..255)
+    b"B" length bytes         raw bytes
+    b"i" int64                integer
+    b"n"                      None
+
+Files written by older versions (a repr() of the whole data) are still readable.
+"""
 
 from __future__ import annotations
 
 import ast
+import struct
+from collections.abc import Iterator, Mapping
+from typing import Final
 
 from cmk.utils.sectionname import SectionName
 
-from cmk.snmplib import SNMPRawData
+from cmk.snmplib import SNMPRawData, SNMPRawDataElem
 
 from ._cache import FileCache
 
 __all__ = ["SNMPFileCache"]
 
+_MAGIC: Final = b"CMKSNMPC"
+_VERSION: Final = 1
+# magic, version, number of sections
+_HEADER: Final = struct.Struct("<8sHI")
+# length of the name, offset and length of the section
+_INDEX_ENTRY: Final = struct.Struct("<HII")
+_COUNT: Final = struct.Struct("<I")
+_INT: Final = struct.Struct("<q")
+
+
+def _encode(value: object, out: bytearray) -> None:
+    # Strings are by far the most common values, so check them first
+    if isinstance(value, str):
+        raw = value.encode("utf-8")
+        out += b"s" + _COUNT.pack(len(raw)) + raw
+    elif isinstance(value, list | tuple):
+        try:
+            raw = bytes(value) if value else b""
+        except (TypeError, ValueError):
+            raw = b""
+        if raw:
+            out += b"x" + _COUNT.pack(len(raw)) + raw
+            return
+        out += b"l" + _COUNT.pack(len(value))
+        for item in value:
+            _encode(item, out)
+    elif isinstance(value, bytes):
+        out += b"B" + _COUNT.pack(len(value)) + value
+    elif value is None:
+        out += b"n"
+    elif isinstance(value, int) and not isinstance(value, bool):
+        out += b"i" + _INT.pack(value)
+    else:
+        raise TypeError(f"Cannot store value of type {type(value).__name__} in SNMP cache")
+
+
+def _decode(data: bytes, pos: int) -> tuple[object, int]:
+    tag = data[pos]
+    pos += 1
+    if tag == 0x6C:  # b"l"
+        (count,) = _COUNT.unpack_from(data, pos)
+        pos += 4
+        items = []
+        for _ in range(count):
+            item, pos = _decode(data, pos)
+            items.append(item)
+        return items, pos
+    if tag == 0x73:  # b"s"
+        (length,) = _COUNT.unpack_from(data, pos)
+        pos += 4
+        return data[pos : pos + length].decode("utf-8"), pos + length
+    if tag == 0x78:  # b"x"
+        (length,) = _COUNT.unpack_from(data, pos)
+        pos += 4
+        return list(data[pos : pos + length]), pos + length
+    if tag == 0x42:  # b"B"
+        (length,) = _COUNT.unpack_from(data, pos)
+        pos += 4
+        return data[pos : pos + length], pos + length
+    if tag == 0x69:  # b"i"
+        return _INT.unpack_from(data, pos)[0], pos + _INT.size
+    if tag == 0x6E:  # b"n"
+        return None, pos
+    raise ValueError(f"Invalid tag {tag!r} at position {pos - 1}")
+
+
+class _LazySNMPSections(Mapping[SectionName, SNMPRawDataElem]):
+    """The sections of a cache file, decoded on first access"""
+
+    def __init__(self, data: bytes, index: Mapping[SectionName, tuple[int, int]]) -> None:
+        self._data: Final = data
+        self._index: Final = index
+        self._decoded: dict[SectionName, SNMPRawDataElem] = {}
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({list(self._index)!r})"
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __iter__(self) -> Iterator[SectionName]:
+        return iter(self._index)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._index
+
+    def __getitem__(self, key: SectionName) -> SNMPRawDataElem:
+        try:
+            return self._decoded[key]
+        except KeyError:
+            pass
+        offset, length = self._index[key]
+        section, end = _decode(self._data, offset)
+        if end != offset + length:
+            raise ValueError(f"Corrupted section {key}")
+        assert isinstance(section, list)
+        return self._decoded.setdefault(key, section)
+
 
 class SNMPFileCache(FileCache[SNMPRawData]):
     @staticmethod
     def _from_cache_file(raw_data: bytes) -> SNMPRawData:
+        if not raw_data.startswith(_MAGIC):
+            return SNMPFileCache._from_legacy_cache_file(raw_data)
+
+        _magic, version, count = _HEADER.unpack_from(raw_data)
+        if version != _VERSION:
+            raise ValueError(f"Unsupported SNMP cache file version: {version}")
+
+        pos = _HEADER.size
+        index: dict[SectionName, tuple[int, int]] = {}
+        for _ in range(count):
+            name_length, offset, length = _INDEX_ENTRY.unpack_from(raw_data, pos)
+            pos += _INDEX_ENTRY.size
+            index[SectionName(raw_data[pos : pos + name_length].decode("utf-8"))] = offset, length
+            pos += name_length
+        return _LazySNMPSections(raw_data, index)
+
+    @staticmethod
+    def _from_legacy_cache_file(raw_data: bytes) -> SNMPRawData:
         return {SectionName(k): v for k, v in ast.literal_eval(raw_data.decode("utf-8")).items()}
 
     @staticmethod
     def _to_cache_file(raw_data: SNMPRawData) -> bytes:
-        return (repr({str(k): v for k, v in raw_data.items()}) + "\n").encode("utf-8")
+        names = [str(k).encode("utf-8") for k in raw_data]
+        sections = bytearray()
+        locations = []
+        for section in raw_data.values():
+            offset = len(sections)
+            _encode(section, sections)
+            locations.append((offset, len(sections) - offset))
+
+        header = bytearray(_HEADER.pack(_MAGIC, _VERSION, len(names)))
+        data_offset = len(header) + sum(_INDEX_ENTRY.size + len(name) for name in names)
+        for name, (offset, length) in zip(names, locations):
+            header += _INDEX_ENTRY.pack(len(name), data_offset + offset, length) + name
+        return bytes(header + sections)
@@ -29,7 +29,7 @@ from cmk.ccc.version import parse_check_mk_version
 
 from ._graph_specification import GraphDataRange, GraphRecipe
 from ._loader import get_unit_info
-from ._timeseries import op_func_wrapper, time_series_operators
+from ._timeseries import time_series_math
 from ._type_defs import GraphConsoldiationFunction, RRDData, RRDDataKey
 from ._utils import (
     check_metrics,
@@ -105,13 +105,13 @@ def _align_and_resample_rrds(
         if start_time is None:
             start_time, end_time, step = time_series.twindow
         elif (start_time, end_time, step) != time_series.twindow:
-            time_series.values = (
-                time_series.downsample(
+            time_series.array = (
+                time_series.downsampled(
                     (start_time, end_time, step),
                     key.consolidation_func_name or consolidation_func_name,
                 )
                 if step >= time_series.twindow[2]
-                else time_series.forward_fill_resample((start_time, end_time, step))
+                else time_series.forward_filled((start_time, end_time, step))
             )
 
 
@@ -141,7 +141,7 @@ def _chop_last_empty_step(graph_data_range: GraphDataRange, rrd_data: RRDData) -
 
 def _chop_end_of_the_curve(rrd_data: RRDData, step: int) -> None:
     for data in rrd_data.values():
-        del data.values[-1]
+        data.array = data.array[:-1]
         data.end -= step
 
 
@@ -298,11 +298,11 @@ def translate_and_merge_rrd_columns(
     if not relevant_ts:
         return TimeSeries([0, 0, 0])
 
-    _op_title, op_func = time_series_operators()["MERGE"]
-    single_value_series = [op_func_wrapper(op_func, list(tsp)) for tsp in zip(*relevant_ts)]
+    merged = time_series_math("MERGE", relevant_ts)
+    assert merged is not None
 
     return TimeSeries(
-        single_value_series,
+        merged.array,
         time_window=relevant_ts[0].twindow,
         conversion=_retrieve_unit_conversion_function(target_metric),
     )
@@ -3,14 +3,14 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
-import functools
-import operator
 from collections.abc import Callable
 from dataclasses import dataclass
-from typing import Literal, TypeVar
+from typing import Literal
+
+import numpy as np
 
 from cmk.gui.i18n import _
-from cmk.gui.time_series import TimeSeries, TimeSeriesValues
+from cmk.gui.time_series import TimeSeries, TimeSeriesArray, TimeSeriesValues
 from cmk.gui.utils import escaping
 
 from cmk.ccc.exceptions import MKGeneralException
@@ -63,75 +63,67 @@ def time_series_math(
     _op_title, op_func = operators[operator_id]
     twindow = operands_evaluated[0].twindow
 
-    return TimeSeries(
-        [op_func_wrapper(op_func, list(tsp)) for tsp in zip(*operands_evaluated)], twindow
-    )
+    # One row per operand, the operator is applied to each column (time point). Just like
+    # zip(), the shortest operand determines the number of time points.
+    num_points = min(len(operand) for operand in operands_evaluated)
+    with np.errstate(all="ignore"):
+        return TimeSeries(
+            op_func(np.stack([operand.array[:num_points] for operand in operands_evaluated])),
+            twindow,
+        )
 
 
-_TOperatorReturn = TypeVar("_TOperatorReturn")
+def clean_time_series_point(tsp: TimeSeries | TimeSeriesValues) -> list[float]:
+    """removes "None" entries from input list"""
+    return [x for x in tsp if x is not None]
 
 
-def op_func_wrapper(
-    op_func: Callable[[TimeSeries | TimeSeriesValues], _TOperatorReturn],
-    tsp: TimeSeries | TimeSeriesValues,
-) -> _TOperatorReturn | None:
-    if tsp.count(None) < len(tsp):  # At least one non-None value
-        try:
-            return op_func(tsp)
-        except ZeroDivisionError:
-            pass
-    return None
+# The operators get the values of the operands as rows of an array, with NaN for missing values.
+# They return the values for each column. A point with no value for any operand has no value.
 
 
-def clean_time_series_point(tsp: TimeSeries | TimeSeriesValues) -> list[float]:
-    """removes "None" entries from input list"""
-    return [x for x in tsp if x is not None]
+def _time_series_operator_sum(operands: TimeSeriesArray) -> TimeSeriesArray:
+    present = ~np.isnan(operands)
+    return np.where(present.any(axis=0), np.where(present, operands, 0.0).sum(axis=0), np.nan)
 
 
-def _time_series_operator_sum(tsp: TimeSeries | TimeSeriesValues) -> float:
-    return sum(clean_time_series_point(tsp))
+def _time_series_operator_product(operands: TimeSeriesArray) -> TimeSeriesArray:
+    # Missing values propagate
+    return np.prod(operands, axis=0)
 
 
-def _time_series_operator_product(tsp: TimeSeries | TimeSeriesValues) -> float | None:
-    if None in tsp:
-        return None
-    return functools.reduce(operator.mul, tsp, 1)
+def _time_series_operator_difference(operands: TimeSeriesArray) -> TimeSeriesArray:
+    return operands[0] - operands[1]
 
 
-def _time_series_operator_difference(tsp: TimeSeries | TimeSeriesValues) -> float | None:
-    if None in tsp:
-        return None
-    assert tsp[0] is not None
-    assert tsp[1] is not None
-    return tsp[0] - tsp[1]
+def _time_series_operator_fraction(operands: TimeSeriesArray) -> TimeSeriesArray:
+    return np.where(operands[1] == 0, np.nan, operands[0] / operands[1])
 
 
-def _time_series_operator_fraction(tsp: TimeSeries | TimeSeriesValues) -> float | None:
-    if None in tsp or tsp[1] == 0:
-        return None
-    assert tsp[0] is not None
-    assert tsp[1] is not None
-    return tsp[0] / tsp[1]
+def _time_series_operator_maximum(operands: TimeSeriesArray) -> TimeSeriesArray:
+    return np.fmax.reduce(operands, axis=0)
 
 
-def _time_series_operator_maximum(tsp: TimeSeries | TimeSeriesValues) -> float:
-    return max(clean_time_series_point(tsp))
+def _time_series_operator_minimum(operands: TimeSeriesArray) -> TimeSeriesArray:
+    return np.fmin.reduce(operands, axis=0)
 
 
-def _time_series_operator_minimum(tsp: TimeSeries | TimeSeriesValues) -> float:
-    return min(clean_time_series_point(tsp))
+def _time_series_operator_average(operands: TimeSeriesArray) -> TimeSeriesArray:
+    present = ~np.isnan(operands)
+    return np.where(present, operands, 0.0).sum(axis=0) / present.sum(axis=0)
 
 
-def _time_series_operator_average(tsp: TimeSeries | TimeSeriesValues) -> float:
-    tsp_clean = clean_time_series_point(tsp)
-    return sum(tsp_clean) / len(tsp_clean)
+def _time_series_operator_merge(operands: TimeSeriesArray) -> TimeSeriesArray:
+    """The first present value"""
+    first_present = np.argmax(~np.isnan(operands), axis=0)
+    return operands[first_present, np.arange(operands.shape[1])]
 
 
 def time_series_operators() -> dict[
     Operators,
     tuple[
         str,
-        Callable[[TimeSeries | TimeSeriesValues], float | None],
+        Callable[[TimeSeriesArray], TimeSeriesArray],
     ],
 ]:
     return {
@@ -142,5 +134,5 @@ def time_series_operators() -> dict[
         "MAX": (_("Maximum"), _time_series_operator_maximum),
         "MIN": (_("Minimum"), _time_series_operator_minimum),
         "AVERAGE": (_("Average"), _time_series_operator_average),
-        "MERGE": ("First non None", lambda x: next(iter(clean_time_series_point(x)))),
+        "MERGE": ("First non None", _time_series_operator_merge),
     }
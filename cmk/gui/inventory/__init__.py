@@ -19,7 +19,7 @@ import livestatus
 
 import cmk.utils.paths
 from cmk.utils.hostaddress import HostAddress, HostName
-from cmk.utils.structured_data import SDRawTree
+from cmk.utils.structured_data import SDRawTree, TreeArchive
 
 from cmk.gui import sites
 from cmk.gui.config import active_config
@@ -183,13 +183,20 @@ def _inventory_of_host(host_name: HostName, api_request: dict[str, Any]) -> SDRa
     site = livestatus.SiteId(raw_site) if raw_site is not None else None
     verify_permission(host_name, site)
 
-    tree = load_filtered_and_merged_tree(get_status_data_via_livestatus(site, host_name))
     if "paths" in api_request:
-        return tree.filter(
-            make_filter_choices_from_api_request_paths(api_request["paths"])
-        ).serialize()
+        # Only the requested subtrees are loaded from the tree file
+        return (
+            load_filtered_and_merged_tree(
+                get_status_data_via_livestatus(site, host_name),
+                paths=[parse_inventory_path(raw_path).path for raw_path in api_request["paths"]],
+            )
+            .filter(make_filter_choices_from_api_request_paths(api_request["paths"]))
+            .serialize()
+        )
 
-    return tree.serialize()
+    return load_filtered_and_merged_tree(
+        get_status_data_via_livestatus(site, host_name)
+    ).serialize()
 
 
 def _write_json(resp):
@@ -297,10 +304,12 @@ class InventoryHousekeeping:
         except OSError:
             pass
 
-        for filename in [
-            x for x in (self._inventory_archive_path / hostname).iterdir() if not x.is_dir()
-        ]:
-            timestamps.add(filename.name)
+        try:
+            timestamps.update(
+                str(t) for t in TreeArchive(self._inventory_archive_path / hostname).timestamps()
+            )
+        except ValueError:
+            pass
         return timestamps
 
 
@@ -10,7 +10,13 @@ from typing import NamedTuple
 
 import cmk.utils.paths
 from cmk.utils.hostaddress import HostName
-from cmk.utils.structured_data import ImmutableDeltaTree, ImmutableTree, load_tree, SDFilterChoice
+from cmk.utils.structured_data import (
+    ImmutableDeltaTree,
+    ImmutableTree,
+    load_tree,
+    SDFilterChoice,
+    TreeArchive,
+)
 
 from cmk.gui.i18n import _
 
@@ -133,7 +139,9 @@ def _get_history(
     except FilterInventoryHistoryPathsError:
         return [], []
 
-    cached_tree_loader = _CachedTreeLoader()
+    cached_tree_loader = _CachedTreeLoader(
+        TreeArchive(Path(cmk.utils.paths.inventory_archive_dir, hostname))
+    )
     corrupted_history_files: set[Path] = set()
     history: list[HistoryEntry] = []
     filters = (
@@ -176,17 +184,20 @@ def _get_history(
 
 def _get_inventory_history_paths(hostname: HostName) -> Sequence[InventoryHistoryPath]:
     inventory_path = Path(cmk.utils.paths.inventory_output_dir, hostname)
-    inventory_archive_dir = Path(cmk.utils.paths.inventory_archive_dir, hostname)
+    tree_archive = TreeArchive(Path(cmk.utils.paths.inventory_archive_dir, hostname))
+
+    if not tree_archive.archive_dir.exists():
+        return []
 
     try:
         archived_tree_paths = [
             InventoryHistoryPath(
-                path=filepath,
-                timestamp=int(filepath.name),
+                path=tree_archive.archive_dir / str(timestamp),
+                timestamp=timestamp,
             )
-            for filepath in sorted(inventory_archive_dir.iterdir())
+            for timestamp in tree_archive.timestamps()
         ]
-    except FileNotFoundError:
+    except ValueError:
         return []
 
     try:
@@ -217,6 +228,7 @@ def _get_pairs(
 
 @dataclass(frozen=True)
 class _CachedTreeLoader:
+    tree_archive: TreeArchive
     _lookup: dict[Path, ImmutableTree] = field(default_factory=dict)
 
     def get_tree(self, filepath: Path) -> ImmutableTree:
@@ -226,7 +238,14 @@ class _CachedTreeLoader:
         if filepath in self._lookup:
             return self._lookup[filepath]
 
-        if not (tree := load_tree(filepath)):
+        # The archived trees are restored one after another, each from the previous one
+        if not (
+            tree := (
+                self.tree_archive.load(int(filepath.name))
+                if filepath.parent == self.tree_archive.archive_dir
+                else load_tree(filepath)
+            )
+        ):
             raise ValueError(tree)
 
         return self._lookup.setdefault(filepath, tree)
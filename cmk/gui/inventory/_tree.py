@@ -6,6 +6,7 @@
 from __future__ import annotations
 
 import ast
+import functools
 from collections.abc import Sequence
 from dataclasses import dataclass
 from enum import auto, Enum
@@ -16,12 +17,12 @@ import cmk.utils.paths
 from cmk.utils.hostaddress import HostName
 from cmk.utils.structured_data import (
     ImmutableTree,
-    load_tree,
     parse_visible_raw_path,
     SDFilterChoice,
     SDKey,
     SDNodeName,
     SDPath,
+    TreeStore,
 )
 
 from cmk.gui import userdb
@@ -134,21 +135,29 @@ def make_filter_choices_from_api_request_paths(
 
 @request_memoize(maxsize=None)
 def _load_tree_from_file(
-    *, tree_type: Literal["inventory", "status_data"], host_name: HostName | None
+    *,
+    tree_type: Literal["inventory", "status_data"],
+    host_name: HostName | None,
+    paths: tuple[SDPath, ...] = (),
 ) -> ImmutableTree:
-    """Load data of a host, cache it in the current HTTP request"""
+    """Load data of a host, cache it in the current HTTP request
+
+    With paths, only the subtrees at these paths are loaded."""
     if not host_name:
         return ImmutableTree()
     if "/" in host_name:
         # just for security reasons
         return ImmutableTree()
-    return load_tree(
-        Path(
-            cmk.utils.paths.inventory_output_dir
-            if tree_type == "inventory"
-            else cmk.utils.paths.status_data_dir
-        )
-        / host_name
+    tree_store = TreeStore(
+        cmk.utils.paths.inventory_output_dir
+        if tree_type == "inventory"
+        else cmk.utils.paths.status_data_dir
+    )
+    if not paths:
+        return tree_store.load(host_name=host_name)
+    return functools.reduce(
+        ImmutableTree.merge,
+        (tree_store.load(host_name=host_name, path=path) for path in paths),
     )
 
 
@@ -189,17 +198,23 @@ def _get_permitted_inventory_paths() -> Sequence[PermittedPath] | None:
     return permitted_paths
 
 
-def load_filtered_and_merged_tree(row: Row) -> ImmutableTree:
+def load_filtered_and_merged_tree(row: Row, paths: Sequence[SDPath] = ()) -> ImmutableTree:
     """Load inventory tree from file, status data tree from row,
-    merge these trees and returns the filtered tree"""
+    merge these trees and returns the filtered tree
+
+    With paths, only the subtrees at these paths are loaded from the inventory tree file."""
     host_name = row.get("host_name")
-    inventory_tree = _load_tree_from_file(tree_type="inventory", host_name=host_name)
+    inventory_tree = _load_tree_from_file(
+        tree_type="inventory", host_name=host_name, paths=tuple(paths)
+    )
     if raw_status_data_tree := row.get("host_structured_status"):
         status_data_tree = ImmutableTree.deserialize(
             ast.literal_eval(raw_status_data_tree.decode("utf-8"))
         )
     else:
-        status_data_tree = _load_tree_from_file(tree_type="status_data", host_name=host_name)
+        status_data_tree = _load_tree_from_file(
+            tree_type="status_data", host_name=host_name, paths=tuple(paths)
+        )
 
     merged_tree = inventory_tree.merge(status_data_tree)
     if isinstance(permitted_paths := _get_permitted_inventory_paths(), list):
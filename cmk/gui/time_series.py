@@ -3,14 +3,19 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+import math
 from collections.abc import Callable, Iterator, Sequence
 from statistics import fmean
 
+import numpy as np
+import numpy.typing as npt
+
 Timestamp = int
 
 TimeWindow = tuple[Timestamp, Timestamp, int]
 TimeSeriesValue = float | None
 TimeSeriesValues = Sequence[TimeSeriesValue]
+TimeSeriesArray = npt.NDArray[np.float64]
 
 
 def rrd_timestamps(time_window: TimeWindow) -> list[Timestamp]:
@@ -38,6 +43,43 @@ def aggregation_functions(series: TimeSeriesValues, aggr: str | None) -> TimeSer
             raise ValueError(f"Invalid Aggregation function {aggr}, only max, min, average allowed")
 
 
+def to_array(values: TimeSeriesValues | TimeSeriesArray) -> TimeSeriesArray:
+    """Missing values (None) are NaN in the arrays"""
+    return np.asarray(values, dtype=np.float64)
+
+
+def to_values(array: TimeSeriesArray) -> list[TimeSeriesValue]:
+    return [None if math.isnan(v) else v for v in array.tolist()]
+
+
+def _no_conversion(v: float) -> float:
+    return v
+
+
+def _convert(array: TimeSeriesArray, conversion: Callable[[float], float]) -> TimeSeriesArray:
+    """Apply the conversion to the present values
+
+    The conversions are simple arithmetics in most cases, which work on the whole array at
+    once. Others are applied value by value.
+    """
+    missing = np.isnan(array)
+    converted: object
+    try:
+        with np.errstate(all="ignore"):
+            converted = conversion(array)  # type: ignore[arg-type]
+    except Exception:  # pylint: disable=broad-except
+        converted = None
+    if isinstance(converted, np.ndarray) and converted.shape == array.shape:
+        result = converted.astype(np.float64)
+    else:
+        result = np.array(
+            [np.nan if m else conversion(v) for v, m in zip(array.tolist(), missing.tolist())],
+            dtype=np.float64,
+        )
+    result[missing] = np.nan
+    return result
+
+
 class TimeSeries:
     """Describes the returned time series returned by livestatus
 
@@ -47,6 +89,9 @@ class TimeSeries:
     - The Series describes the interval [start; end[
     - Start has no associated value to it.
 
+    The values are kept in a float64 array with NaN for the missing values. The graph
+    expressions and the resampling work on the arrays as a whole.
+
     args:
         data : list
             Includes [start, end, step, *values]
@@ -59,12 +104,12 @@ class TimeSeries:
 
     def __init__(
         self,
-        data: TimeSeriesValues,
+        data: TimeSeriesValues | TimeSeriesArray,
         time_window: TimeWindow | None = None,
-        conversion: Callable[[float], float] = lambda v: v,
+        conversion: Callable[[float], float] = _no_conversion,
     ) -> None:
         if time_window is None:
-            if not data or data[0] is None or data[1] is None or data[2] is None:
+            if not len(data) or data[0] is None or data[1] is None or data[2] is None:
                 raise ValueError(data)
 
             time_window = int(data[0]), int(data[1]), int(data[2])
@@ -74,27 +119,38 @@ class TimeSeries:
         self.start = int(time_window[0])
         self.end = int(time_window[1])
         self.step = int(time_window[2])
-        self.values = [v if v is None else conversion(v) for v in data]
+        self.array = to_array(data)
+        if conversion is not _no_conversion:
+            self.array = _convert(self.array, conversion)
 
     @property
     def twindow(self) -> TimeWindow:
         return self.start, self.end, self.step
 
+    @property
+    def values(self) -> TimeSeriesValues:
+        return to_values(self.array)
+
+    @values.setter
+    def values(self, values: TimeSeriesValues | TimeSeriesArray) -> None:
+        self.array = to_array(values)
+
     def forward_fill_resample(self, twindow: TimeWindow) -> TimeSeriesValues:
         """Upsample by forward filling values
 
         twindow : 3-tuple, (start, end, step)
              description of target time interval
         """
-        if twindow == self.twindow:
-            return self.values
+        return to_values(self.forward_filled(twindow))
 
-        idx_max = len(self.values) - 1
+    def forward_filled(self, twindow: TimeWindow) -> TimeSeriesArray:
+        """Like forward_fill_resample(), but as an array"""
+        if twindow == self.twindow:
+            return self.array
 
-        return [
-            self.values[max(0, min(int((t - self.start) / self.step), idx_max))]
-            for t in range(*twindow)
-        ]
+        # Same as int((t - self.start) / self.step) for each t, clamped to the available values
+        indices = np.trunc((np.arange(*twindow, dtype=np.int64) - self.start) / self.step)
+        return self.array[np.clip(indices, 0, len(self.array) - 1).astype(np.intp)]
 
     def downsample(self, twindow: TimeWindow, cf: str | None = "max") -> TimeSeriesValues:
         """Downsample time series by consolidation function
@@ -104,9 +160,44 @@ class TimeSeries:
         cf : str ('max', 'average', 'min')
              consolidation function imitating RRD methods
         """
-        if twindow == self.twindow:
-            return self.values
+        return to_values(self.downsampled(twindow, cf))
 
+    def downsampled(self, twindow: TimeWindow, cf: str | None = "max") -> TimeSeriesArray:
+        """Like downsample(), but as an array"""
+        if twindow == self.twindow:
+            return self.array
+
+        desired_times = np.array(rrd_timestamps(twindow), dtype=np.int64)
+        times = np.array(rrd_timestamps(self.twindow), dtype=np.int64)
+        num_points = min(len(times), len(self.array))
+        values = self.array[:num_points]
+
+        # The number of the target interval of each value
+        buckets = np.searchsorted(desired_times, times[:num_points], side="left")
+        if not _is_regular_bucketing(buckets, len(desired_times)):
+            return to_array(self._downsample_stepwise(twindow, cf))
+
+        result = np.full(len(desired_times), np.nan)
+        if not num_points:
+            return result
+
+        # The values of a target interval are contiguous, aggregate them at once
+        starts = np.flatnonzero(np.diff(buckets, prepend=-1))
+        targets = buckets[starts]
+        # The values beyond the last target interval are dropped
+        if targets[-1] == len(desired_times):
+            values = values[: starts[-1]]
+            starts, targets = starts[:-1], targets[:-1]
+        if not len(starts):
+            return result
+
+        present = ~np.isnan(values)
+        if present.any():
+            result[targets] = _aggregate_runs(values, present, starts, cf)
+        return result
+
+    def _downsample_stepwise(self, twindow: TimeWindow, cf: str | None) -> TimeSeriesValues:
+        """Downsampling for time windows not aligned to the values, one value at a time"""
         dwsa = []
         co: list[TimeSeriesValue] = []
         desired_times = rrd_timestamps(twindow)
@@ -139,17 +230,61 @@ class TimeSeries:
             self.start == other.start
             and self.end == other.end
             and self.step == other.step
-            and self.values == other.values
+            and np.array_equal(self.array, other.array, equal_nan=True)
         )
 
     def __getitem__(self, i: int) -> TimeSeriesValue:
-        return self.values[i]
+        value = float(self.array[i])
+        return None if math.isnan(value) else value
 
     def __len__(self) -> int:
-        return len(self.values)
+        return len(self.array)
 
     def __iter__(self) -> Iterator[TimeSeriesValue]:
         yield from self.values
 
     def count(self, /, v: TimeSeriesValue) -> int:
-        return self.values.count(v)
+        if v is None:
+            return int(np.count_nonzero(np.isnan(self.array)))
+        return int(np.count_nonzero(self.array == v))
+
+
+def _is_regular_bucketing(buckets: npt.NDArray[np.intp], num_buckets: int) -> bool:
+    """Whether each value starts at most one new target interval
+
+    In this case, the target interval of a value is simply the first one ending at or after
+    it. Otherwise the intervals of the target window are not aligned to the values and they are
+    assigned one by one, see TimeSeries._downsample_stepwise().
+    """
+    if not num_buckets:
+        return False
+    if not len(buckets):
+        return True
+    return (
+        buckets[0] <= 1
+        and bool(np.all(np.diff(buckets) <= 1))
+        # Values after the last target interval are not expected
+        and bool(np.all(buckets[:-1] < num_buckets))
+    )
+
+
+def _aggregate_runs(
+    values: TimeSeriesArray,
+    present: npt.NDArray[np.bool_],
+    starts: npt.NDArray[np.intp],
+    cf: str | None,
+) -> TimeSeriesArray:
+    """Aggregate the runs of values beginning at the starts, NaN for runs without a value"""
+    aggr = "max" if cf is None else cf.lower()
+    match aggr:
+        case "average":
+            with np.errstate(invalid="ignore", divide="ignore"):
+                return np.add.reduceat(np.where(present, values, 0.0), starts) / np.add.reduceat(
+                    present.astype(np.int64), starts
+                )
+        case "max":
+            return np.fmax.reduceat(values, starts)
+        case "min":
+            return np.fmin.reduceat(values, starts)
+        case _:
+            raise ValueError(f"Invalid Aggregation function {aggr}, only max, min, average allowed")
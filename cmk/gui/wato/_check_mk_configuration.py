@@ -205,6 +205,7 @@ def register(
     config_variable_registry.register(ConfigVariableSimulationMode)
     config_variable_registry.register(ConfigVariableRestartLocking)
     config_variable_registry.register(ConfigVariableDelayPrecompile)
+    config_variable_registry.register(ConfigVariableNagiosConfigWorkers)
     config_variable_registry.register(ConfigVariableClusterMaxCachefileAge)
     config_variable_registry.register(ConfigVariablePiggybackMaxCachefileAge)
     config_variable_registry.register(ConfigVariableCheckMKPerfdataWithTimes)
@@ -3071,6 +3072,31 @@ class ConfigVariableDelayPrecompile(ConfigVariable):
         )
 
 
+class ConfigVariableNagiosConfigWorkers(ConfigVariable):
+    def group(self) -> type[ConfigVariableGroup]:
+        return ConfigVariableGroupCheckExecution
+
+    def domain(self) -> type[ABCConfigDomain]:
+        return ConfigDomainCore
+
+    def ident(self) -> str:
+        return "nagios_config_workers"
+
+    def valuespec(self) -> ValueSpec:
+        return Integer(
+            title=_("Processes for creating the Nagios configuration"),
+            help=_(
+                "The number of processes creating the object configuration of the Nagios core "
+                "and precompiling the host checks when activating the configuration. With many "
+                "hosts, using several processes reduces the time needed for the activation on "
+                "machines with several CPU cores. The resulting configuration is the same. "
+                "This setting has no effect when using the Checkmk Micro Core."
+            ),
+            minvalue=1,
+            maxvalue=64,
+        )
+
+
 class ConfigVariableClusterMaxCachefileAge(ConfigVariable):
     def group(self) -> type[ConfigVariableGroup]:
         return ConfigVariableGroupCheckExecution
@@ -18,13 +18,13 @@ from __future__ import annotations
 import ast
 import enum
 import errno
-import hashlib
 import io
 import logging
 import multiprocessing
 import os
 import re
 import shutil
+import stat
 import subprocess
 import time
 import traceback
@@ -34,7 +34,7 @@ from datetime import datetime
 from itertools import filterfalse
 from multiprocessing.pool import AsyncResult, ThreadPool
 from pathlib import Path
-from typing import Any, Literal, NamedTuple, TypedDict
+from typing import Any, Literal, NamedTuple, TypedDict, TypeVar
 
 from setproctitle import setthreadtitle
 
@@ -101,6 +101,7 @@ from cmk.gui.watolib.config_sync import (
     ReplicationPath,
     SnapshotSettings,
 )
+from cmk.gui.watolib.config_sync_hashes import ConfigSyncHashIndex
 from cmk.gui.watolib.global_settings import save_site_global_settings
 from cmk.gui.watolib.hosts_and_folders import (
     collect_all_hosts,
@@ -1049,15 +1050,9 @@ class ActivateChanges:
 
     @staticmethod
     def _get_number_of_pending_changes() -> int:
-        changes_counter = 0
         # Astroid 2.x bug prevents us from using NewType https://github.com/PyCQA/pylint/issues/2296
         # pylint: disable=not-an-iterable
-        for site_id in activation_sites():
-            changes = SiteChanges(site_id).read()
-            changes_counter += len(
-                list(change for change in changes if not has_been_activated(change))
-            )
-        return changes_counter
+        return sum(SiteChanges(site_id).num_pending() for site_id in activation_sites())
 
     @staticmethod
     def _make_changes_message(number_of_changes: int) -> str | None:
@@ -2084,8 +2079,9 @@ class ReplicationPathType(enum.StrEnum):
 
 def _get_config_sync_file_infos_per_inode(
     replication_paths: Sequence[ReplicationPath],
+    hash_index: ConfigSyncHashIndex,
 ) -> Mapping[int, ConfigSyncFileInfo]:
-    inode_sync_states = {}
+    file_paths_per_inode: dict[int, str] = {}
 
     for replication_path in replication_paths:
         replication_path_full = os.path.join(cmk.utils.paths.omd_root, replication_path.site_path)
@@ -2094,21 +2090,19 @@ def _get_config_sync_file_infos_per_inode(
             continue
 
         if replication_path.ty == ReplicationPathType.FILE:
-            inode_sync_states[os.stat(replication_path_full).st_ino] = _get_config_sync_file_info(
-                replication_path_full
-            )
+            file_paths_per_inode[os.stat(replication_path_full).st_ino] = replication_path_full
         elif replication_path.ty == ReplicationPathType.DIR:
-            _get_replication_dir_config_sync_file_infos_per_inode(
-                inode_sync_states, replication_path_full, replication_path.excludes
+            _get_replication_dir_file_paths_per_inode(
+                file_paths_per_inode, replication_path_full, replication_path.excludes
             )
         else:
             raise NotImplementedError()
 
-    return inode_sync_states
+    return _get_config_sync_file_infos_of_paths(file_paths_per_inode, hash_index)
 
 
-def _get_replication_dir_config_sync_file_infos_per_inode(
-    inode_sync_states: MutableMapping[int, ConfigSyncFileInfo],
+def _get_replication_dir_file_paths_per_inode(
+    file_paths_per_inode: MutableMapping[int, str],
     replication_path: str,
     replication_path_excludes: Sequence[str],
 ) -> None:
@@ -2125,12 +2119,12 @@ def _get_replication_dir_config_sync_file_infos_per_inode(
                 and os.path.islink(dir_path)
                 and not dir_name == GENERAL_DIR_EXCLUDE
             ):
-                inode_sync_states[os.stat(dir_path).st_ino] = _get_config_sync_file_info(dir_path)
+                file_paths_per_inode[os.stat(dir_path).st_ino] = dir_path
 
         for file_name in file_names:
             file_path = os.path.join(root, file_name)
             if os.path.exists(file_path):
-                inode_sync_states[os.stat(file_path).st_ino] = _get_config_sync_file_info(file_path)
+                file_paths_per_inode[os.stat(file_path).st_ino] = file_path
 
 
 def _prepare_for_activation_tasks(
@@ -2140,8 +2134,10 @@ def _prepare_for_activation_tasks(
     time_started: float,
     source: ActivationSource,
 ) -> tuple[Mapping[SiteId, ConfigSyncFileInfos], Mapping[SiteId, SiteActivationState]]:
+    start = time.time()
+    hash_index = _config_sync_hash_index()
     config_sync_file_infos_per_inode = _get_config_sync_file_infos_per_inode(
-        get_replication_paths()
+        get_replication_paths(), hash_index
     )
     central_file_infos_per_site = {}
     site_activation_states_per_site = {}
@@ -2159,30 +2155,48 @@ def _prepare_for_activation_tasks(
 
             if activate_changes.is_sync_needed(site_id):
                 central_file_infos_per_site[site_id] = _get_site_central_file_infos(
-                    site_id, snapshot_settings, config_sync_file_infos_per_inode
+                    site_id, snapshot_settings, config_sync_file_infos_per_inode, hash_index
                 )
         except Exception as e:
             _handle_activation_changes_exception(
                 logger.getChild(f"site[{site_id}]"), str(e), site_activation_state
             )
             _cleanup_activation(site_id, activation_id, source)
+
+    hash_index.save()
+    _log_config_sync_hashing(hash_index, time.time() - start)
     return central_file_infos_per_site, site_activation_states_per_site
 
 
+def _config_sync_hash_index() -> ConfigSyncHashIndex:
+    return ConfigSyncHashIndex(
+        wato_var_dir() / "config_sync_hashes.pickle", workers=min(8, os.cpu_count() or 1)
+    )
+
+
+def _log_config_sync_hashing(hash_index: ConfigSyncHashIndex, duration: float) -> None:
+    stats = hash_index.stats()
+    logger.info(
+        "Computed the config sync file infos in %.3fs: %d files, %d of them hashed in %.3fs",
+        duration,
+        stats.files,
+        stats.hashed,
+        stats.seconds,
+    )
+
+
 def _get_site_central_file_infos(
     site_id: SiteId,
     snapshot_settings: SnapshotSettings,
     config_sync_file_infos_per_inode: Mapping[int, ConfigSyncFileInfo],
+    hash_index: ConfigSyncHashIndex,
 ) -> ConfigSyncFileInfos:
-    # In case we experience performance issues here, we could postpone the hashing of the
-    # central files to only be done ad-hoc in get_file_names_to_sync when the other attributes
-    # are not enough to detect a differing file.
-
     site_config_dir = Path(snapshot_settings.work_dir)
     central_file_infos = _get_config_sync_file_infos(
         snapshot_settings.snapshot_components,
         site_config_dir,
         config_sync_file_infos_per_inode,
+        hash_index,
     )
 
     logger.getChild(f"site[{site_id}]").debug(
@@ -2915,7 +2929,13 @@ class AutomationGetConfigSyncState(AutomationCommand):
 
     def execute(self, api_request: list[ReplicationPath]) -> GetConfigSyncStateResponse:
         with store.lock_checkmk_configuration(configuration_lockfile):
-            file_infos = _get_config_sync_file_infos(api_request, base_dir=cmk.utils.paths.omd_root)
+            start = time.time()
+            hash_index = _config_sync_hash_index()
+            file_infos = _get_config_sync_file_infos(
+                api_request, base_dir=cmk.utils.paths.omd_root, hash_index=hash_index
+            )
+            hash_index.save()
+            _log_config_sync_hashing(hash_index, time.time() - start)
             transport_file_infos = {
                 k: (v.st_mode, v.st_size, v.link_target, v.file_hash) for k, v in file_infos.items()
             }
@@ -2955,6 +2975,7 @@ def _get_config_sync_file_infos(
     replication_paths: list[ReplicationPath],
     base_dir: Path,
     config_sync_file_infos_per_inode: Mapping[int, ConfigSyncFileInfo] | None = None,
+    hash_index: ConfigSyncHashIndex | None = None,
 ) -> ConfigSyncFileInfos:
     """Scans the given replication paths for the information needed for the config sync
 
@@ -2966,7 +2987,9 @@ def _get_config_sync_file_infos(
     if config_sync_file_infos_per_inode is None:
         config_sync_file_infos_per_inode = {}
 
-    infos = {}
+    infos: dict[str, ConfigSyncFileInfo] = {}
+    # The files not found in config_sync_file_infos_per_inode, by their site path
+    file_paths: dict[str, str] = {}
     for replication_path in replication_paths:
         replication_path_full = str(base_dir.joinpath(replication_path.site_path))
 
@@ -2974,11 +2997,12 @@ def _get_config_sync_file_infos(
             continue  # Only report back existing things
 
         if replication_path.ty == ReplicationPathType.FILE:
-            infos[replication_path.site_path] = _get_config_sync_file_info(replication_path_full)
+            file_paths[replication_path.site_path] = replication_path_full
 
         elif replication_path.ty == ReplicationPathType.DIR:
             _get_replication_dir_config_sync_file_infos(
                 infos,
+                file_paths,
                 config_sync_file_infos_per_inode,
                 base_dir,
                 replication_path_full,
@@ -2986,11 +3010,16 @@ def _get_config_sync_file_infos(
             )
         else:
             raise NotImplementedError()
+
+    infos.update(
+        _get_config_sync_file_infos_of_paths(file_paths, hash_index or ConfigSyncHashIndex(None))
+    )
     return infos
 
 
 def _get_replication_dir_config_sync_file_infos(
     infos: MutableMapping[str, ConfigSyncFileInfo],
+    file_paths: MutableMapping[str, str],
     config_sync_file_infos_per_inode: Mapping[int, ConfigSyncFileInfo],
     base_dir: Path,
     replication_path: str,
@@ -3014,31 +3043,35 @@ def _get_replication_dir_config_sync_file_infos(
                 ):
                     infos[valid_site_path] = sync_file_info
                 else:
-                    infos[valid_site_path] = _get_config_sync_file_info(config_sync_path)
+                    file_paths[valid_site_path] = config_sync_path
             except FileNotFoundError:  # e.g. broken symlinks
-                infos[valid_site_path] = _get_config_sync_file_info(config_sync_path)
+                file_paths[valid_site_path] = config_sync_path
 
 
-def _get_config_sync_file_info(file_path: str) -> ConfigSyncFileInfo:
-    stat = os.lstat(file_path)
-    is_symlink = os.path.islink(file_path)
-    return ConfigSyncFileInfo(
-        stat.st_mode,
-        stat.st_size,
-        os.readlink(str(file_path)) if is_symlink else None,
-        _create_config_sync_file_hash(file_path) if not is_symlink else None,
-    )
+_TFileKey = TypeVar("_TFileKey", int, str)
 
 
-def _create_config_sync_file_hash(file_path: str) -> str:
-    sha256 = hashlib.sha256()
-    with open(file_path, "rb") as f:
-        while True:
-            chunk = f.read(65536)
-            if not chunk:
-                break
-            sha256.update(chunk)
-    return sha256.hexdigest()
+def _get_config_sync_file_infos_of_paths(
+    file_paths: Mapping[_TFileKey, str], hash_index: ConfigSyncHashIndex
+) -> dict[_TFileKey, ConfigSyncFileInfo]:
+    """Compute the sync file infos of the files, the file hashes are looked up in the index"""
+    file_stats = {key: os.lstat(file_path) for key, file_path in file_paths.items()}
+    file_hashes = hash_index.hashes(
+        {
+            file_paths[key]: file_stat
+            for key, file_stat in file_stats.items()
+            if not stat.S_ISLNK(file_stat.st_mode)
+        }
+    )
+    return {
+        key: ConfigSyncFileInfo(
+            file_stat.st_mode,
+            file_stat.st_size,
+            os.readlink(file_paths[key]) if stat.S_ISLNK(file_stat.st_mode) else None,
+            file_hashes.get(file_paths[key]),
+        )
+        for key, file_stat in file_stats.items()
+    }
 
 
 def update_config_generation() -> None:
@@ -5,11 +5,13 @@
 
 import abc
 import ast
+import math
 import os
-from collections.abc import Iterator, Sequence
+import struct
+from collections.abc import Iterable, Iterator, Sequence
 from contextlib import contextmanager
 from pathlib import Path
-from typing import Generic, TypeVar
+from typing import Final, Generic, NamedTuple, TypeVar
 
 from cmk.gui.exceptions import MKUserError
 from cmk.gui.i18n import _
@@ -19,11 +21,52 @@ from cmk.ccc.exceptions import MKGeneralException
 
 _VT = TypeVar("_VT")
 
+_INDEX_MAGIC: Final = b"CMKA"
+# magic, inode and size of the data file described by the index
+_INDEX_HEADER: Final = struct.Struct("<4sQQ")
+# offset and length in the data file, earliest and latest time, number of entries and of
+# pending entries
+_SEGMENT: Final = struct.Struct("<QQddII")
+_ENTRIES_PER_SEGMENT: Final = 1000
+
+
+class _Segment(NamedTuple):
+    offset: int
+    length: int
+    min_time: float
+    max_time: float
+    num_entries: int
+    num_pending: int
+
+    @property
+    def end(self) -> int:
+        return self.offset + self.length
+
+    def add(self, length: int, entry_time: float | None, pending: bool) -> "_Segment":
+        return _Segment(
+            self.offset,
+            self.length + length,
+            -math.inf if entry_time is None else min(self.min_time, entry_time),
+            math.inf if entry_time is None else max(self.max_time, entry_time),
+            self.num_entries + 1,
+            self.num_pending + pending,
+        )
+
+    @classmethod
+    def empty(cls, offset: int) -> "_Segment":
+        return cls(offset, 0, math.inf, -math.inf, 0, 0)
+
 
 class ABCAppendStore(Generic[_VT], abc.ABC):
     """Managing a file with structured data that can be appended in a cheap way
 
     The file holds basic python structures separated by "\\0".
+
+    Next to the file, a small binary index describes the file in segments of up to
+    _ENTRIES_PER_SEGMENT entries: their position in the file, the time range of their entries
+    and the number of their pending entries. Reading the entries of a time range or the last
+    entries only parses the segments concerned. The index is rebuilt from the file whenever it
+    does not match the file, e.g. after an update or if the file was changed by hand.
     """
 
     @staticmethod
@@ -50,23 +93,30 @@ class ABCAppendStore(Generic[_VT], abc.ABC):
         Override this to execute some logic after literal_eval() to produce _VT objects"""
         raise NotImplementedError()
 
+    @staticmethod
+    def _timestamp(entry: _VT) -> float | None:
+        """Override this to make the entries accessible by read_time_range()"""
+        return None
+
+    @staticmethod
+    def _is_pending(entry: _VT) -> bool:
+        """Override this to count the entries by num_pending()"""
+        return False
+
     def __init__(self, path: Path) -> None:
         self._path = path
+        self._index_path = path.with_name(f".{path.name}.idx")
 
     def exists(self) -> bool:
         return self._path.exists()
 
-    def __read(self) -> list[_VT]:
-        """Parse the file and return the entries"""
+    def _parse(self, raw: bytes, name: str) -> list[_VT]:
         try:
-            with self._path.open("rb") as f:
-                return [
-                    self._deserialize(ast.literal_eval(entry.decode("utf-8")))
-                    for entry in f.read().split(b"\0")
-                    if entry
-                ]
-        except FileNotFoundError:
-            return []
+            return [
+                self._deserialize(ast.literal_eval(entry.decode("utf-8")))
+                for entry in raw.split(b"\0")
+                if entry
+            ]
         except SyntaxError as e:
             raise MKUserError(
                 None,
@@ -76,24 +126,195 @@ class ABCAppendStore(Generic[_VT], abc.ABC):
                     "content or remove the file before you visit this page "
                     "again.<br><br>The problematic entry is:<br>%s"
                 )
-                % (f.name, e.text),
+                % (name, e.text),
             )
 
+    def __read(self) -> list[_VT]:
+        """Parse the file and return the entries"""
+        try:
+            return self._parse(self._path.read_bytes(), str(self._path))
+        except FileNotFoundError:
+            return []
+
+    def _read_segments(self, segments: Iterable[_Segment]) -> list[_VT]:
+        entries: list[_VT] = []
+        try:
+            with self._path.open("rb") as f:
+                for segment in segments:
+                    f.seek(segment.offset)
+                    entries.extend(self._parse(f.read(segment.length), f.name))
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def _build_segments(self, entries: Iterable[tuple[int, _VT]]) -> list[_Segment]:
+        """Describe the file made of the entries, given with the length of their record"""
+        segments: list[_Segment] = []
+        segment = _Segment.empty(0)
+        for length, entry in entries:
+            if segment.num_entries == _ENTRIES_PER_SEGMENT:
+                segments.append(segment)
+                segment = _Segment.empty(segment.end)
+            segment = segment.add(length, self._timestamp(entry), self._is_pending(entry))
+        if segment.num_entries:
+            segments.append(segment)
+        return segments
+
+    def _save_index(self, segments: Sequence[_Segment]) -> None:
+        stat = self._path.stat()
+        store.save_bytes_to_file(
+            self._index_path,
+            _INDEX_HEADER.pack(_INDEX_MAGIC, stat.st_ino, stat.st_size)
+            + b"".join(_SEGMENT.pack(*segment) for segment in segments),
+        )
+
+    def _remove_index(self) -> None:
+        self._index_path.unlink(missing_ok=True)
+
+    def _rebuild_index(self) -> list[_Segment]:
+        try:
+            raw = self._path.read_bytes()
+        except FileNotFoundError:
+            return []
+        records = raw.split(b"\0")
+        entries: list[tuple[int, _VT]] = []
+        # Empty records are accounted to the next entry, so the segments cover the whole file
+        length = 0
+        for n, record in enumerate(records, start=1):
+            length += len(record) + (n < len(records))
+            if record:
+                for entry in self._parse(record, str(self._path)):
+                    entries.append((length, entry))
+                    length = 0
+        segments = self._build_segments(entries)
+        if length:
+            last = segments.pop() if segments else _Segment.empty(0)
+            segments.append(last._replace(length=last.length + length))
+        self._save_index(segments)
+        return segments
+
+    def _index_header_matches(self, header: bytes) -> bool:
+        try:
+            magic, inode, size = _INDEX_HEADER.unpack(header)
+            stat = self._path.stat()
+        except (struct.error, FileNotFoundError):
+            return False
+        return magic == _INDEX_MAGIC and (inode, size) == (stat.st_ino, stat.st_size)
+
+    def _load_index(self) -> list[_Segment]:
+        """Return the segments of the file, has to be called with the file being locked"""
+        if not self._path.exists():
+            return []
+        try:
+            raw = self._index_path.read_bytes()
+        except FileNotFoundError:
+            return self._rebuild_index()
+
+        if not self._index_header_matches(raw[: _INDEX_HEADER.size]) or (
+            (len(raw) - _INDEX_HEADER.size) % _SEGMENT.size
+        ):
+            return self._rebuild_index()
+
+        segments = [_Segment(*fields) for fields in _SEGMENT.iter_unpack(raw[_INDEX_HEADER.size :])]
+        if sum(segment.length for segment in segments) != self._path.stat().st_size:
+            return self._rebuild_index()
+        return segments
+
     def read(self) -> Sequence[_VT]:
         with store.locked(self._path):
             return self.__read()
 
+    def read_time_range(self, since: float | None = None, until: float | None = None) -> list[_VT]:
+        """Return the entries of all segments overlapping the time range (bounds included)
+
+        Only the segments concerned are parsed, so the result may contain entries outside of
+        the time range, which have to be filtered by the caller.
+        """
+        with store.locked(self._path):
+            return self._read_segments(
+                segment
+                for segment in self._load_index()
+                if (since is None or segment.max_time >= since)
+                and (until is None or segment.min_time <= until)
+            )
+
+    def read_last(self, count: int) -> list[_VT]:
+        """Return the last `count` entries"""
+        if count <= 0:
+            return []
+        with store.locked(self._path):
+            segments = self._load_index()
+            first = len(segments)
+            num_entries = 0
+            while first > 0 and num_entries < count:
+                first -= 1
+                num_entries += segments[first].num_entries
+            return self._read_segments(segments[first:])[-count:]
+
+    def num_pending(self) -> int:
+        """Return the number of pending entries without parsing the file"""
+        with store.locked(self._path):
+            return sum(segment.num_pending for segment in self._load_index())
+
     def append(self, entry: _VT) -> None:
         with store.locked(self._path):
             try:
-                with self._path.open("ab+") as f:
-                    f.write(repr(self._serialize(entry)).encode("utf-8") + b"\0")
-                    f.flush()
-                    os.fsync(f.fileno())
-                self._path.chmod(0o660)
+                self.__append(entry)
+            except MKUserError:
+                raise
             except Exception as e:
                 raise MKGeneralException(_('Cannot write file "%s": %s') % (self._path, e))
 
+    def _last_segment(self) -> tuple[int, _Segment | None] | None:
+        """Return the position and the last segment of the index, None if it does not match"""
+        try:
+            with self._index_path.open("rb") as f:
+                header = f.read(_INDEX_HEADER.size)
+                index_size = f.seek(0, os.SEEK_END)
+                if not self._index_header_matches(header) or (
+                    (index_size - _INDEX_HEADER.size) % _SEGMENT.size
+                ):
+                    return None
+                if index_size == _INDEX_HEADER.size:
+                    return index_size, None
+                f.seek(index_size - _SEGMENT.size)
+                return index_size - _SEGMENT.size, _Segment(*_SEGMENT.unpack(f.read()))
+        except FileNotFoundError:
+            return None
+
+    def __append(self, entry: _VT) -> None:
+        record = repr(self._serialize(entry)).encode("utf-8") + b"\0"
+        # Only an index describing the whole file is updated, any other is rebuilt
+        last_segment = self._last_segment()
+        with self._path.open("ab+") as f:
+            offset = f.tell()
+            f.write(record)
+            f.flush()
+            os.fsync(f.fileno())
+        self._path.chmod(0o660)
+
+        if offset == 0:
+            self._save_index(self._build_segments([(len(record), entry)]))
+            return
+        if last_segment is None or (last := last_segment[1]) is None or last.end != offset:
+            self._rebuild_index()
+            return
+
+        position = last_segment[0]
+        if last.num_entries == _ENTRIES_PER_SEGMENT:
+            position += _SEGMENT.size
+            last = _Segment.empty(offset)
+        stat = self._path.stat()
+        with self._index_path.open("r+b") as f:
+            f.seek(position)
+            f.write(
+                _SEGMENT.pack(
+                    *last.add(len(record), self._timestamp(entry), self._is_pending(entry))
+                )
+            )
+            f.seek(0)
+            f.write(_INDEX_HEADER.pack(_INDEX_MAGIC, stat.st_ino, stat.st_size))
+
     @contextmanager
     def mutable_view(self) -> Iterator[list[_VT]]:
         with store.locked(self._path):
@@ -101,7 +322,14 @@ class ABCAppendStore(Generic[_VT], abc.ABC):
             try:
                 yield entries
             finally:
-                with self._path.open("wb"):  # truncate the file
-                    pass
-                for entry in entries:
-                    self.append(entry)
+                records = [
+                    repr(self._serialize(entry)).encode("utf-8") + b"\0" for entry in entries
+                ]
+                # Replace the file at once instead of truncating and appending each entry
+                store.save_bytes_to_file(self._path, b"".join(records))
+                self._path.chmod(0o660)
+                self._save_index(
+                    self._build_segments(
+                        (len(record), entry) for record, entry in zip(records, entries)
+                    )
+                )
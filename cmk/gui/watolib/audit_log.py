@@ -91,6 +91,10 @@ class AuditLogStore(ABCAppendStore["AuditLogStore.Entry"]):
     def _deserialize(raw: object) -> AuditLogStore.Entry:
         return AuditLogStore.Entry.deserialize(raw)
 
+    @staticmethod
+    def _timestamp(entry: AuditLogStore.Entry) -> float:
+        return entry.time
+
     def clear(self) -> None:
         """Instead of just removing, like ABCAppendStore, archive the existing file"""
         if not self.exists():
@@ -107,12 +111,17 @@ class AuditLogStore(ABCAppendStore["AuditLogStore.Entry"]):
                     break
 
         self._path.rename(newpath)
+        self._remove_index()
 
     def read(self, options: AuditLogFilter | None = None) -> Sequence[AuditLogStore.Entry]:
-        entries = super().read()
-
         if options is None:
-            return entries
+            return super().read()
+
+        entries = (
+            self.read_time_range(options.get("timestamp_from"), options.get("timestamp_to"))
+            if "timestamp_from" in options or "timestamp_to" in options
+            else super().read()
+        )
 
         return [entry for entry in entries if AuditLogStore.filter_entry(entry, options)]
 
@@ -150,7 +159,7 @@ class AuditLogStore(ABCAppendStore["AuditLogStore.Entry"]):
         return True
 
     def get_entries_since(self, timestamp: int) -> Sequence[AuditLogStore.Entry]:
-        return [entry for entry in self.read() if entry.time > timestamp]
+        return [entry for entry in self.read_time_range(since=timestamp) if entry.time > timestamp]
 
     @classmethod
     def to_json(cls, entries: Sequence[AuditLogStore.Entry]) -> str:
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Persistent index of the hashes of the files to be synchronized
+
+Hashing all files of the replication paths is the most expensive part of preparing the config
+sync. As most of the files do not change between two activations, their hashes are remembered
+by inode, size and modification time, and only new or modified files are hashed again.
+
+The files synchronized to the different sites are hard links of the same files, so they share
+their entries in the index.
+"""
+
+import hashlib
+import os
+import pickle
+import time
+from collections.abc import Mapping
+from multiprocessing.pool import ThreadPool
+from pathlib import Path
+from typing import Final, NamedTuple
+
+from cmk.ccc import store
+from cmk.ccc.exceptions import MKGeneralException
+
+__all__ = ["ConfigSyncHashIndex", "HashingStats"]
+
+# inode, size, modification time in ns
+_Key = tuple[int, int, int]
+
+
+class HashingStats(NamedTuple):
+    files: int
+    hashed: int
+    seconds: float
+
+
+def _key(stat: os.stat_result) -> _Key:
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+def _hash_file(file_path: str) -> bytes:
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while True:
+            chunk = f.read(65536)
+            if not chunk:
+                break
+            sha256.update(chunk)
+    return sha256.digest()
+
+
+class ConfigSyncHashIndex:
+    """SHA256 hashes of files by inode, size and modification time
+
+    A file which is modified without changing its size within the resolution of the file system
+    timestamps would go unnoticed. This is why the hashes of files which have been modified less
+    than `settle_time` seconds ago are not remembered.
+
+    Without a path, nothing is loaded or saved.
+    """
+
+    def __init__(self, path: Path | None, *, workers: int = 4, settle_time: float = 2.0) -> None:
+        self.path: Final = path
+        self._workers: Final = workers
+        self._settle_time_ns: Final = int(settle_time * 1e9)
+        self._known = self._load()
+        # The entries of the files seen since loading the index
+        self._seen: dict[_Key, bytes] = {}
+        self._files = 0
+        self._hashed = 0
+        self._seconds = 0.0
+
+    def _load(self) -> dict[_Key, bytes]:
+        if self.path is None:
+            return {}
+        try:
+            known = store.load_object_from_pickle_file(self.path, default={})
+        except (MKGeneralException, pickle.UnpicklingError, EOFError, ValueError):
+            return {}  # It is only a cache, so just hash everything again
+        return known if isinstance(known, dict) else {}
+
+    def hashes(self, file_stats: Mapping[str, os.stat_result]) -> dict[str, str]:
+        """Return the hex digests of the files, given by their path and stat result
+
+        The files not found in the index are hashed in a pool of worker threads.
+        """
+        start = time.monotonic()
+        digests: dict[str, str] = {}
+        missing: list[tuple[str, _Key]] = []
+        for file_path, stat in file_stats.items():
+            key = _key(stat)
+            if (digest := self._known.get(key)) is None:
+                missing.append((file_path, key))
+            else:
+                self._seen[key] = digest
+                digests[file_path] = digest.hex()
+
+        settled_before = time.time_ns() - self._settle_time_ns
+        for (file_path, key), digest in zip(missing, self._hash_files([p for p, _k in missing])):
+            digests[file_path] = digest.hex()
+            if key[2] < settled_before:
+                self._known[key] = self._seen[key] = digest
+
+        self._files += len(file_stats)
+        self._hashed += len(missing)
+        self._seconds += time.monotonic() - start
+        return digests
+
+    def _hash_files(self, file_paths: list[str]) -> list[bytes]:
+        if len(file_paths) < 2 or self._workers < 2:
+            return [_hash_file(file_path) for file_path in file_paths]
+        # Reading the files and hashing them releases the GIL, so threads are enough
+        with ThreadPool(processes=min(self._workers, len(file_paths))) as pool:
+            return pool.map(_hash_file, file_paths, chunksize=16)
+
+    def save(self) -> None:
+        """Save the entries of the files seen since loading, the others are gone or outdated"""
+        if self.path is not None:
+            store.save_object_to_pickle_file(self.path, self._seen)
+
+    def stats(self) -> HashingStats:
+        return HashingStats(self._files, self._hashed, self._seconds)
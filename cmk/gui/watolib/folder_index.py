@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""File based index of the metadata of the Setup folders
+
+This is the counterpart of the folder metadata kept in Redis for sites without a Redis server.
+The index is an SQLite database, so the metadata of a single folder or of all folders below a
+folder is looked up without reading the .wato files of all folders.
+
+The paths of the folders end with a slash, just as in Redis. The path of the main folder is "/".
+"""
+
+import contextlib
+import sqlite3
+from collections.abc import Iterable, Iterator, Sequence
+from pathlib import Path
+from typing import Final, NamedTuple
+
+__all__ = ["FolderIndex", "FolderIndexEntry"]
+
+_SQLITE_PRAGMAS: Final = (
+    "PRAGMA journal_mode=WAL;",
+    "PRAGMA synchronous=NORMAL;",
+    "PRAGMA busy_timeout=10000;",
+)
+
+_SQLITE_SCHEMA: Final = (
+    """CREATE TABLE IF NOT EXISTS folders (
+        path TEXT PRIMARY KEY,
+        title TEXT NOT NULL,
+        title_path_without_root TEXT NOT NULL,
+        num_hosts INTEGER NOT NULL,
+        permitted_contact_groups TEXT NOT NULL
+    ) WITHOUT ROWID;""",
+    """CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    ) WITHOUT ROWID;""",
+)
+
+_COLUMNS: Final = "path, title, title_path_without_root, num_hosts, permitted_contact_groups"
+
+
+class FolderIndexEntry(NamedTuple):
+    path: str
+    title: str
+    title_path_without_root: str
+    num_hosts: int
+    permitted_contact_groups: Sequence[str]
+
+
+def _to_row(entry: FolderIndexEntry) -> tuple[str, str, str, int, str]:
+    return (
+        entry.path,
+        entry.title,
+        entry.title_path_without_root,
+        entry.num_hosts,
+        ",".join(sorted(entry.permitted_contact_groups)),
+    )
+
+
+def _from_row(row: tuple[str, str, str, int, str]) -> FolderIndexEntry:
+    path, title, title_path_without_root, num_hosts, groups = row
+    return FolderIndexEntry(
+        path, title, title_path_without_root, num_hosts, groups.split(",") if groups else []
+    )
+
+
+def _path_range(path: str) -> tuple[str, str]:
+    """The range of the paths of the folder and all folders below it
+
+    >>> _path_range("a/")
+    ('a/', 'a0')
+    >>> _path_range("/")
+    ('', '\\U0010ffff')
+    """
+    if path == "/":
+        return "", chr(0x10FFFF)
+    return path, path[:-1] + chr(ord(path[-1]) + 1)
+
+
+class FolderIndex:
+    def __init__(self, path: Path) -> None:
+        self.path: Final = path
+
+    @contextlib.contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """Leaving the context commits the changes, unless there is an error"""
+        self.path.parent.mkdir(mode=0o770, exist_ok=True, parents=True)
+        with contextlib.closing(sqlite3.connect(self.path)) as connection:
+            for pragma in _SQLITE_PRAGMAS:
+                connection.execute(pragma)
+            with connection:
+                for statement in _SQLITE_SCHEMA:
+                    connection.execute(statement)
+            with connection:
+                yield connection
+
+    def last_update(self) -> str | None:
+        with self._connection() as connection:
+            row = connection.execute("SELECT value FROM meta WHERE key = 'last_update'").fetchone()
+        return None if row is None else row[0]
+
+    def set_last_update(self, last_update: str) -> None:
+        with self._connection() as connection:
+            self._set_last_update(connection, last_update)
+
+    @staticmethod
+    def _set_last_update(connection: sqlite3.Connection, last_update: str) -> None:
+        connection.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('last_update', ?)", (last_update,)
+        )
+
+    def replace_all(self, entries: Iterable[FolderIndexEntry], last_update: str) -> None:
+        """Replace the entries of all folders in a single transaction"""
+        with self._connection() as connection:
+            connection.execute("DELETE FROM folders")
+            connection.executemany(
+                f"INSERT INTO folders ({_COLUMNS}) VALUES (?, ?, ?, ?, ?)",
+                (_to_row(e) for e in entries),
+            )
+            self._set_last_update(connection, last_update)
+
+    def save(self, entry: FolderIndexEntry, last_update: str) -> None:
+        with self._connection() as connection:
+            connection.execute(
+                f"INSERT OR REPLACE INTO folders ({_COLUMNS}) VALUES (?, ?, ?, ?, ?)",
+                _to_row(entry),
+            )
+            self._set_last_update(connection, last_update)
+
+    def folder_paths(self) -> tuple[str, ...]:
+        with self._connection() as connection:
+            return tuple(path for (path,) in connection.execute("SELECT path FROM folders"))
+
+    def folder(self, path: str) -> FolderIndexEntry | None:
+        with self._connection() as connection:
+            row = connection.execute(
+                f"SELECT {_COLUMNS} FROM folders WHERE path = ?", (path,)
+            ).fetchone()
+        return None if row is None else _from_row(row)
+
+    def folders(self) -> list[FolderIndexEntry]:
+        with self._connection() as connection:
+            return [_from_row(row) for row in connection.execute(f"SELECT {_COLUMNS} FROM folders")]
+
+    def folders_below(self, path: str) -> list[FolderIndexEntry]:
+        """Return the entries of the folder and all folders below it"""
+        with self._connection() as connection:
+            return [
+                _from_row(row)
+                for row in connection.execute(
+                    f"SELECT {_COLUMNS} FROM folders WHERE path >= ? AND path < ?",
+                    _path_range(path),
+                )
+            ]
@@ -79,6 +79,7 @@ from cmk.gui.watolib.config_domain_name import (
     generate_hosts_to_update_settings,
     SerializedSettings,
 )
+from cmk.gui.watolib.folder_index import FolderIndex, FolderIndexEntry
 from cmk.gui.watolib.host_attributes import (
     collect_attributes,
     host_attribute_registry,
@@ -130,7 +131,7 @@ class WATOFolderInfo(TypedDict, total=False):
 
 class FolderMetaData:
     """Stores meta information for one Folder.
-    Usually this class is instantiated with data from Redis"""
+    Usually this class is instantiated with data from Redis or the folder index"""
 
     def __init__(
         self,
@@ -170,10 +171,10 @@ class FolderMetaData:
     @property
     def num_hosts_recursively(self) -> int:
         if self._num_hosts_recursively is None:
-            if may_use_redis():
-                self._num_hosts_recursively = get_wato_redis_client(
+            if may_use_folder_metadata_cache():
+                self._num_hosts_recursively = get_folder_metadata_cache(
                     self.tree
-                ).num_hosts_recursively_lua(self._path)
+                ).num_hosts_recursively(self._path)
             else:
                 self._num_hosts_recursively = self.tree.folder(
                     self._path.rstrip("/")
@@ -285,17 +286,18 @@ class _MoveType(Enum):
     Folder = "folder"
 
 
-class _RedisHelper:
+class _ABCFolderMetaDataCache:
     """
     This class
-    - communicates with redis
-    - handles the entire redis cache and checks its integrity
-    - computes the metadata out of Folder instances and stores it in redis
-    - provides functions to compute the number of hosts and fetch the metadata for folders"""
+    - handles the entire cache of the folder metadata and checks its integrity
+    - computes the metadata out of Folder instances and stores it in the cache
+    - provides functions to compute the number of hosts and fetch the metadata for folders
+
+    The metadata is either kept in redis or, on sites without a redis server, in an SQLite
+    database (see cmk.gui.watolib.folder_index)."""
 
     def __init__(self, tree: FolderTree) -> None:
         self.tree = tree
-        self._client = get_redis_client()
         self._folder_metadata: dict[str, FolderMetaData] = {}
 
         self._loaded_wato_folders: Mapping[PathWithoutSlash, Folder] | None = None
@@ -319,9 +321,12 @@ class _RedisHelper:
     @property
     def folder_paths(self) -> Sequence[PathWithSlash]:
         if self._folder_paths is None:
-            self._folder_paths = tuple(self._client.smembers("wato:folder_list"))
+            self._folder_paths = self._load_folder_paths()
         return self._folder_paths
 
+    def _load_folder_paths(self) -> tuple[PathWithSlash, ...]:
+        raise NotImplementedError()
+
     def recursive_subfolders_for_path(self, path: PathWithSlash) -> list[PathWithSlash]:
         return [x for x in self.folder_paths if x.startswith(path)]
 
@@ -366,27 +371,177 @@ class _RedisHelper:
     def folder_metadata(self, path: PathWithoutSlash) -> FolderMetaData | None:
         path_with_slash = f"{path}/"
         if path_with_slash not in self._folder_metadata:
-            results = self._client.hmget(
-                f"wato:folders:{path_with_slash}",
-                "title",
-                "title_path_without_root",
-                "permitted_contact_groups",
-            )
-            if not results:
+            if (metadata := self._load_folder_metadata(path_with_slash)) is None:
                 return None
+            self._folder_metadata[path_with_slash] = metadata
 
-            # Redis hmget typing states that the field can be None
-            # It won't happen if the key is found, adding fallbacks anyway.
-            permitted_groups = results[2].split(",") if results[2] is not None else []
-            self._folder_metadata[path_with_slash] = FolderMetaData(
-                self.tree,
-                path_with_slash,
-                results[0] or path_with_slash,
-                results[1] or path_with_slash,
-                permitted_groups,
+        return self._folder_metadata.get(path_with_slash)
+
+    def _load_folder_metadata(self, path_with_slash: PathWithSlash) -> FolderMetaData | None:
+        raise NotImplementedError()
+
+    def _fetch_all_metadata(self) -> None:
+        raise NotImplementedError()
+
+    def _create_cache_from_scratch(
+        self,
+        update_timestamp: str,
+        all_folders: Mapping[PathWithSlash, Folder],
+    ) -> None:
+        raise NotImplementedError()
+
+    def num_hosts_recursively(self, path_with_slash: PathWithSlash) -> int:
+        """Returns the number of hosts in subfolder, excluding hosts not visible to the current user"""
+        raise NotImplementedError()
+
+    @staticmethod
+    def _num_permitted_hosts(
+        permitted_groups_and_num_hosts: Iterable[tuple[Iterable[_ContactgroupName], int]]
+    ) -> int:
+        if (
+            user.may("wato.see_all_folders")
+            or not active_config.wato_hide_folders_without_read_permissions
+        ):
+            return sum(num_hosts for _groups, num_hosts in permitted_groups_and_num_hosts)
+
+        assert user.id is not None
+        user_cgs = set(userdb.contactgroups_of_user(user.id))
+        return sum(
+            num_hosts
+            for folder_cgs, num_hosts in permitted_groups_and_num_hosts
+            if user_cgs.intersection(folder_cgs)
+        )
+
+    def _cache_integrity_ok(self) -> bool:
+        return self._get_latest_timestamps_from_disk()[-1] == self._get_last_update()
+
+    def _partial_data_update_possible(self, allowed_timestamps: list[str]) -> bool:
+        """Checks whether a partial update is possible at all
+        It is important that the in memory cache does not deviate from the data on disk.
+        The fasted way to accomplish this (with a sufficient reliability) is to compare
+        the latest changed timestamps from disk with
+         - the latest known timestamp of the cache itself
+         - the allowed timestamps, which reflect the file timestamps of the latest changed
+           host/folder/rule files
+
+        For example. Every time a .wato file is updated, the timestamp of the .wato file and its
+        folder updates. To check whether a partial update is possible
+        - Determine allowed_timestamps (.wato + folder)
+        - Get last_update from the cache
+        - Get the latest few timestamps from disk and removed the allowed_timestamps from them
+        - The remaining newest timestamp must be equal or older than the last update of the cache
+              If this condition is true, a partial update is possible since there were no
+              unobserved changes, again -> with a sufficient reliability.
+        """
+
+        remaining_timestamps = [
+            x for x in self._get_latest_timestamps_from_disk() if x not in allowed_timestamps
+        ]
+
+        if remaining_timestamps and remaining_timestamps[-1] > self._get_last_update():
+            return False
+
+        return True
+
+    def _get_allowed_folder_timestamps(self, folder: Folder) -> list[str]:
+        wato_info_path = folder.wato_info_path()
+        return sorted(
+            [
+                self._timestamp_to_fixed_precision_str(os.stat(wato_info_path).st_mtime),
+                self._timestamp_to_fixed_precision_str(
+                    os.stat(os.path.dirname(wato_info_path)).st_mtime
+                ),
+            ]
+        )
+
+    def folder_updated(self, filesystem_path: str) -> None:
+        try:
+            folder_timestamp = self._timestamp_to_fixed_precision_str(
+                os.stat(filesystem_path).st_mtime
             )
+        except FileNotFoundError:
+            return
 
-        return self._folder_metadata.get(path_with_slash)
+        self._set_last_update(folder_timestamp)
+
+    def save_folder_info(
+        self,
+        folder: Folder,
+    ) -> None:
+        allowed_timestamps = self._get_allowed_folder_timestamps(folder)
+        if not self._partial_data_update_possible(allowed_timestamps):
+            # Something unexpected was modified in the meantime, rewrite cache
+            self._create_cache_from_scratch(*self._get_latest_timestamp_and_folders())
+
+        self._save_folder_details(folder, allowed_timestamps[-1])
+
+    def _save_folder_details(self, folder: Folder, update_timestamp: str) -> None:
+        raise NotImplementedError()
+
+    def _timestamp_to_fixed_precision_str(self, timestamp: float) -> str:
+        return "%.5f" % timestamp
+
+    def _get_latest_timestamps_from_disk(self) -> _WATOFolderScanTimestamps:
+        """Note: We are using the find command from the command line since it is considerable
+        faster than any python implementation. For example 9k files:
+        Path.glob             -> 1.12 seconds
+        os.walk               -> 0.34 seconds
+        find (+spawn process) -> 0.14 seconds
+        """
+        result = subprocess.run(  # nosec B602 # BNS:248184
+            f"find {cmk.utils.paths.check_mk_config_dir}/wato -type d -printf '%T@\n' -o -name .wato -printf '%T@\n' | sort -n | tail -6 | uniq",
+            shell=True,
+            capture_output=True,
+            check=True,
+            encoding="utf-8",
+        )
+        try:
+            return _WATOFolderScanTimestamps(
+                self._timestamp_to_fixed_precision_str(float(x))
+                for x in result.stdout.split("\n")
+                if x
+            ) or _WATOFolderScanTimestamps([self._timestamp_to_fixed_precision_str(0.0)])
+        except ValueError:
+            fixed_zero = self._timestamp_to_fixed_precision_str(0.0)
+            return _WATOFolderScanTimestamps([fixed_zero] * 3)
+
+    def _get_last_update(self) -> str:
+        raise NotImplementedError()
+
+    def _set_last_update(self, timestamp: str) -> None:
+        raise NotImplementedError()
+
+
+class _RedisHelper(_ABCFolderMetaDataCache):
+    """Keeps the folder metadata in redis"""
+
+    def __init__(self, tree: FolderTree) -> None:
+        self._client = get_redis_client()
+        super().__init__(tree)
+
+    def _load_folder_paths(self) -> tuple[PathWithSlash, ...]:
+        return tuple(self._client.smembers("wato:folder_list"))
+
+    def _load_folder_metadata(self, path_with_slash: PathWithSlash) -> FolderMetaData | None:
+        results = self._client.hmget(
+            f"wato:folders:{path_with_slash}",
+            "title",
+            "title_path_without_root",
+            "permitted_contact_groups",
+        )
+        if not results:
+            return None
+
+        # Redis hmget typing states that the field can be None
+        # It won't happen if the key is found, adding fallbacks anyway.
+        permitted_groups = results[2].split(",") if results[2] is not None else []
+        return FolderMetaData(
+            self.tree,
+            path_with_slash,
+            results[0] or path_with_slash,
+            results[1] or path_with_slash,
+            permitted_groups,
+        )
 
     def _fetch_all_metadata(self) -> None:
         pipeline = self._client.pipeline()
@@ -534,93 +689,23 @@ class _RedisHelper:
         recursive_hosts(keys=keys, args=args, client=pipeline)
         results = pipeline.execute()
 
-        total_hosts = 0
         if not results:
-            return total_hosts
-
-        if (
-            user.may("wato.see_all_folders")
-            or not active_config.wato_hide_folders_without_read_permissions
-        ):
-            return sum(map(int, results[0][1::2]))
+            return 0
 
         def pairwise(iterable: Iterable[str]) -> Iterator[tuple[str, str]]:
             """s -> (s0,s1), (s2,s3), (s4, s5), ..."""
             a = iter(iterable)
             return zip(a, a)
 
-        assert user.id is not None
-        user_cgs = set(userdb.contactgroups_of_user(user.id))
-        for folder_cgs, num_hosts in pairwise(results[0]):
-            cgs = set(folder_cgs.split(","))
-            if user_cgs.intersection(cgs):
-                total_hosts += int(num_hosts)
-
-        return total_hosts
-
-    def _cache_integrity_ok(self) -> bool:
-        return self._get_latest_timestamps_from_disk()[-1] == self._get_last_update_from_redis()
-
-    def _partial_data_update_possible(self, allowed_timestamps: list[str]) -> bool:
-        """Checks whether a partial update is possible at all
-        It is important that the in memory cache does not deviate from the data on disk.
-        The fasted way to accomplish this (with a sufficient reliability) is to compare
-        the latest changed timestamps from disk with
-         - the latest known timestamp of the cache itself
-         - the allowed timestamps, which reflect the file timestamps of the latest changed
-           host/folder/rule files
-
-        For example. Every time a .wato file is updated, the timestamp of the .wato file and its
-        folder updates. To check whether a partial update is possible
-        - Determine allowed_timestamps (.wato + folder)
-        - Get last_update from redis
-        - Get the latest few timestamps from disk and removed the allowed_timestamps from them
-        - The remaining newest timestamp must be equal or older than the last update from redis
-              If this condition is true, a partial update is possible since there were no
-              unobserved changes, again -> with a sufficient reliability.
-        """
-
-        remaining_timestamps = [
-            x for x in self._get_latest_timestamps_from_disk() if x not in allowed_timestamps
-        ]
-
-        if remaining_timestamps and remaining_timestamps[-1] > self._get_last_update_from_redis():
-            return False
-
-        return True
-
-    def _get_allowed_folder_timestamps(self, folder: Folder) -> list[str]:
-        wato_info_path = folder.wato_info_path()
-        return sorted(
-            [
-                self._timestamp_to_fixed_precision_str(os.stat(wato_info_path).st_mtime),
-                self._timestamp_to_fixed_precision_str(
-                    os.stat(os.path.dirname(wato_info_path)).st_mtime
-                ),
-            ]
+        return self._num_permitted_hosts(
+            (folder_cgs.split(","), int(num_hosts))
+            for folder_cgs, num_hosts in pairwise(results[0])
         )
 
-    def folder_updated(self, filesystem_path: str) -> None:
-        try:
-            folder_timestamp = self._timestamp_to_fixed_precision_str(
-                os.stat(filesystem_path).st_mtime
-            )
-        except FileNotFoundError:
-            return
-
-        pipeline = self._client.pipeline()
-        self._add_last_folder_update_to_pipeline(pipeline, folder_timestamp)
-        pipeline.execute()
-
-    def save_folder_info(
-        self,
-        folder: Folder,
-    ) -> None:
-        allowed_timestamps = self._get_allowed_folder_timestamps(folder)
-        if not self._partial_data_update_possible(allowed_timestamps):
-            # Something unexpected was modified in the meantime, rewrite cache
-            self._create_cache_from_scratch(*self._get_latest_timestamp_and_folders())
+    def num_hosts_recursively(self, path_with_slash: PathWithSlash) -> int:
+        return self.num_hosts_recursively_lua(path_with_slash)
 
+    def _save_folder_details(self, folder: Folder, update_timestamp: str) -> None:
         pipeline = self._client.pipeline()
         self._add_folder_details_to_pipeline(
             pipeline,
@@ -631,37 +716,10 @@ class _RedisHelper:
             folder.groups()[0],
         )
         pipeline.sadd("wato:folder_list", f"{folder.path()}/")
-        self._add_last_folder_update_to_pipeline(pipeline, allowed_timestamps[-1])
+        self._add_last_folder_update_to_pipeline(pipeline, update_timestamp)
         pipeline.execute()
 
-    def _timestamp_to_fixed_precision_str(self, timestamp: float) -> str:
-        return "%.5f" % timestamp
-
-    def _get_latest_timestamps_from_disk(self) -> _WATOFolderScanTimestamps:
-        """Note: We are using the find command from the command line since it is considerable
-        faster than any python implementation. For example 9k files:
-        Path.glob             -> 1.12 seconds
-        os.walk               -> 0.34 seconds
-        find (+spawn process) -> 0.14 seconds
-        """
-        result = subprocess.run(  # nosec B602 # BNS:248184
-            f"find {cmk.utils.paths.check_mk_config_dir}/wato -type d -printf '%T@\n' -o -name .wato -printf '%T@\n' | sort -n | tail -6 | uniq",
-            shell=True,
-            capture_output=True,
-            check=True,
-            encoding="utf-8",
-        )
-        try:
-            return _WATOFolderScanTimestamps(
-                self._timestamp_to_fixed_precision_str(float(x))
-                for x in result.stdout.split("\n")
-                if x
-            )
-        except ValueError:
-            fixed_zero = self._timestamp_to_fixed_precision_str(0.0)
-            return _WATOFolderScanTimestamps([fixed_zero] * 3)
-
-    def _get_last_update_from_redis(self) -> str:
+    def _get_last_update(self) -> str:
         try:
             if (value := self._client.get("wato:folder_list:last_update")) is not None:
                 return value
@@ -669,6 +727,87 @@ class _RedisHelper:
             pass
         return self._timestamp_to_fixed_precision_str(0.0)
 
+    def _set_last_update(self, timestamp: str) -> None:
+        pipeline = self._client.pipeline()
+        self._add_last_folder_update_to_pipeline(pipeline, timestamp)
+        pipeline.execute()
+
+
+class _SQLiteHelper(_ABCFolderMetaDataCache):
+    """Keeps the folder metadata in an SQLite database, for sites without a redis server"""
+
+    def __init__(self, tree: FolderTree) -> None:
+        self._index = FolderIndex(Path(cmk.utils.paths.var_dir, "wato", "folder_index.sqlite"))
+        super().__init__(tree)
+
+    def _metadata(self, entry: FolderIndexEntry) -> FolderMetaData:
+        return FolderMetaData(
+            self.tree,
+            entry.path,
+            entry.title,
+            entry.title_path_without_root,
+            list(entry.permitted_contact_groups),
+        )
+
+    def _load_folder_paths(self) -> tuple[PathWithSlash, ...]:
+        return self._index.folder_paths()
+
+    def _load_folder_metadata(self, path_with_slash: PathWithSlash) -> FolderMetaData | None:
+        if (entry := self._index.folder(path_with_slash)) is None:
+            return None
+        return self._metadata(entry)
+
+    def _fetch_all_metadata(self) -> None:
+        for entry in self._index.folders():
+            self._folder_metadata[entry.path] = self._metadata(entry)
+
+    def _create_cache_from_scratch(
+        self,
+        update_timestamp: str,
+        all_folders: Mapping[PathWithSlash, Folder],
+    ) -> None:
+        logger.info("Creating wato folder index")
+        folder_groups = _get_permitted_groups_of_all_folders(all_folders)
+        self._index.replace_all(
+            (
+                FolderIndexEntry(
+                    f"{folder_path}/",
+                    folder.title(),
+                    "/".join(str(p) for p in folder.title_path_without_root()),
+                    folder.num_hosts(),
+                    list(folder_groups[folder_path].actual_groups),
+                )
+                for folder_path, folder in all_folders.items()
+            ),
+            update_timestamp,
+        )
+
+    def num_hosts_recursively(self, path_with_slash: PathWithSlash) -> int:
+        return self._num_permitted_hosts(
+            (entry.permitted_contact_groups, entry.num_hosts)
+            for entry in self._index.folders_below(path_with_slash)
+        )
+
+    def _save_folder_details(self, folder: Folder, update_timestamp: str) -> None:
+        self._index.save(
+            FolderIndexEntry(
+                f"{folder.path()}/",
+                folder.title(),
+                "/".join(str(p) for p in folder.title_path_without_root()),
+                folder.num_hosts(),
+                list(folder.groups()[0]),
+            ),
+            update_timestamp,
+        )
+
+    def _get_last_update(self) -> str:
+        if (value := self._index.last_update()) is not None:
+            return value
+        return self._timestamp_to_fixed_precision_str(0.0)
+
+    def _set_last_update(self, timestamp: str) -> None:
+        self._index.set_last_update(timestamp)
+
 
 def _get_fully_loaded_wato_folders(tree: FolderTree) -> Mapping[PathWithoutSlash, Folder]:
     wato_folders: dict[PathWithoutSlash, Folder] = {}
@@ -878,6 +1017,15 @@ def get_wato_redis_client(tree: FolderTree) -> _RedisHelper:
     return g.wato_redis_client
 
 
+def get_folder_metadata_cache(tree: FolderTree) -> _ABCFolderMetaDataCache:
+    """Return the folder metadata kept in redis or, without a redis server, in the folder index"""
+    if may_use_redis():
+        return get_wato_redis_client(tree)
+    if "wato_folder_index" not in g:
+        g.wato_folder_index = _SQLiteHelper(tree)
+    return g.wato_folder_index
+
+
 class WATOHosts(TypedDict):
     locked: bool
     host_attributes: Mapping[HostName, HostAttributes]
@@ -896,6 +1044,12 @@ def may_use_redis() -> bool:
     return redis_enabled() and _REDIS_ENABLED_LOCALLY and _redis_available()
 
 
+def may_use_folder_metadata_cache() -> bool:
+    # The folder index does not need a server, but the other restrictions of may_use_redis()
+    # apply as well
+    return may_use_redis() or (redis_enabled() and _REDIS_ENABLED_LOCALLY)
+
+
 @request_memoize()
 def _redis_available() -> bool:
     return redis_server_reachable(get_redis_client())
@@ -913,16 +1067,16 @@ def _disable_redis_locally() -> Iterator[None]:
 
 
 def _wato_folders_factory(tree: FolderTree) -> Mapping[PathWithoutSlash, Folder]:
-    if not may_use_redis():
+    if not may_use_folder_metadata_cache():
         return _get_fully_loaded_wato_folders(tree)
 
-    wato_redis_client = get_wato_redis_client(tree)
-    if wato_redis_client.loaded_wato_folders is not None:
+    metadata_cache = get_folder_metadata_cache(tree)
+    if metadata_cache.loaded_wato_folders is not None:
         # Folders were already completely loaded during cache generation -> use these
-        return wato_redis_client.loaded_wato_folders
+        return metadata_cache.loaded_wato_folders
 
     # Provide a dict where the values are generated on demand
-    return WATOFoldersOnDemand(tree, {x.rstrip("/"): None for x in wato_redis_client.folder_paths})
+    return WATOFoldersOnDemand(tree, {x.rstrip("/"): None for x in metadata_cache.folder_paths})
 
 
 def _generate_domain_settings(
@@ -984,8 +1138,8 @@ class FolderTree:
 
     def invalidate_caches(self) -> None:
         self.root_folder().drop_caches()
-        if may_use_redis():
-            get_wato_redis_client(self).clear_cached_folders()
+        if may_use_folder_metadata_cache():
+            get_folder_metadata_cache(self).clear_cached_folders()
         g.pop("wato_folders", {})
         for cache_id in ["folder_choices", "folder_choices_full_title"]:
             g.pop(cache_id, None)
@@ -1310,9 +1464,9 @@ class Folder(FolderProtocol):
                 host.drop_caches()
 
             self._save_hosts_file()
-            if may_use_redis():
-                # Inform redis that the modified-timestamp of the folder has been updated.
-                get_wato_redis_client(self.tree).folder_updated(self.filesystem_path())
+            if may_use_folder_metadata_cache():
+                # Inform the cache that the modified-timestamp of the folder has been updated.
+                get_folder_metadata_cache(self.tree).folder_updated(self.filesystem_path())
 
         call_hook_hosts_changed(self)
 
@@ -1551,8 +1705,8 @@ class Folder(FolderProtocol):
         self.attributes = update_metadata(self.attributes)
         store.makedirs(os.path.dirname(self.wato_info_path()))
         self.wato_info_storage_manager().write(Path(self.wato_info_path()), self.serialize())
-        if may_use_redis():
-            get_wato_redis_client(self.tree).save_folder_info(self)
+        if may_use_folder_metadata_cache():
+            get_folder_metadata_cache(self.tree).save_folder_info(self)
 
     def has_rules(self) -> bool:
         return Path(self.rules_file_path()).exists()
@@ -1652,8 +1806,8 @@ class Folder(FolderProtocol):
         return self._num_hosts
 
     def num_hosts_recursively(self) -> int:
-        if may_use_redis():
-            if folder_metadata := get_wato_redis_client(self.tree).folder_metadata(self.path()):
+        if may_use_folder_metadata_cache():
+            if folder_metadata := get_folder_metadata_cache(self.tree).folder_metadata(self.path()):
                 return folder_metadata.num_hosts_recursively
             return 0
 
@@ -1794,9 +1948,11 @@ class Folder(FolderProtocol):
     def _choices_for_moving(self, what: str) -> Choices:
         choices: Choices = []
 
-        if may_use_redis():
+        if may_use_folder_metadata_cache():
             return self._get_sorted_choices(
-                get_wato_redis_client(self.tree).choices_for_moving(self.path(), _MoveType(what))
+                get_folder_metadata_cache(self.tree).choices_for_moving(
+                    self.path(), _MoveType(what)
+                )
             )
 
         for folder in folder_tree().all_folders().values():
@@ -65,9 +65,9 @@ from .hosts_and_folders import (
     folder_from_request,
     folder_preserving_link,
     folder_tree,
-    get_wato_redis_client,
+    get_folder_metadata_cache,
     Host,
-    may_use_redis,
+    may_use_folder_metadata_cache,
 )
 from .objref import ObjectRef, ObjectRefType
 from .rulespecs import (
@@ -475,7 +475,7 @@ class RulesetCollection:
 
 class AllRulesets(RulesetCollection):
     def _load_rulesets_recursively(self, folder: Folder) -> None:
-        if may_use_redis():
+        if may_use_folder_metadata_cache():
             self._load_rulesets_via_redis(folder)
             return
 
@@ -490,7 +490,7 @@ class AllRulesets(RulesetCollection):
         # Note: The sort order of the folders does not matter here
         #       self._load_folder_rulesets ultimately puts each folder into a dict
         #       and groups/sorts them later on with a different mechanism
-        all_folders = get_wato_redis_client(tree).recursive_subfolders_for_path(
+        all_folders = get_folder_metadata_cache(tree).recursive_subfolders_for_path(
             f"{folder.path()}/".lstrip("/")
         )
 
@@ -550,7 +550,7 @@ class SingleRulesetRecursively(RulesetCollection):
     def _load_rulesets_recursively(self, folder: Folder, only_varname: RulesetName) -> None:
         # Copy/paste from AllRulesets
 
-        if may_use_redis():
+        if may_use_folder_metadata_cache():
             self._load_rulesets_via_redis(folder, only_varname)
             return
 
@@ -567,7 +567,7 @@ class SingleRulesetRecursively(RulesetCollection):
         # Note: The sort order of the folders does not matter here
         #       self._load_folder_rulesets ultimately puts each folder into a dict
         #       and groups/sorts them later on with a different mechanism
-        all_folders = get_wato_redis_client(tree).recursive_subfolders_for_path(
+        all_folders = get_folder_metadata_cache(tree).recursive_subfolders_for_path(
             f"{folder.path()}/".lstrip("/")
         )
 
@@ -1811,8 +1811,8 @@ class RuleConfigFile(WatoConfigFile[Mapping[RulesetName, Any]]):
                 add_header=not active_config.wato_use_git,
             )
         finally:
-            if may_use_redis():
-                get_wato_redis_client(folder.tree).folder_updated(folder.filesystem_path())
+            if may_use_folder_metadata_cache():
+                get_folder_metadata_cache(folder.tree).folder_updated(folder.filesystem_path())
 
     def read_file_and_validate(self) -> None:
         cfg = self.load_for_reading()
@@ -35,8 +35,17 @@ class SiteChanges(ABCAppendStore[ChangeSpec]):
         raw["object"] = ObjectRef.deserialize(raw["object"]) if raw["object"] else None
         return raw
 
+    @staticmethod
+    def _timestamp(entry: ChangeSpec) -> float:
+        return entry["time"]
+
+    @staticmethod
+    def _is_pending(entry: ChangeSpec) -> bool:
+        return not entry.get("has_been_activated", False)
+
     def clear(self) -> None:
         self._path.unlink(missing_ok=True)
+        self._remove_index()
 
     @staticmethod
     def to_json(entries: Sequence[ChangeSpec]) -> str:
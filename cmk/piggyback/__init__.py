@@ -11,6 +11,7 @@ from ._storage import (
     PiggybackFileInfo,
     PiggybackRawDataInfo,
     remove_source_status_file,
+    store_piggyback_payloads,
     store_piggyback_raw_data,
 )
 
@@ -21,6 +22,7 @@ __all__ = [
     "PiggybackFileInfo",
     "PiggybackRawDataInfo",
     "remove_source_status_file",
+    "store_piggyback_payloads",
     "store_piggyback_raw_data",
     "move_for_host_rename",
 ]
@@ -3,21 +3,25 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+import contextlib
 import datetime
 import errno
+import itertools
 import json
 import logging
 import os
 import shutil
+import sqlite3
 import tempfile
-from collections.abc import Iterable, Mapping, Sequence
+import time
+from collections.abc import Iterable, Iterator, Mapping, Sequence
 from dataclasses import asdict, dataclass
 from pathlib import Path
-from typing import NamedTuple, Self
+from typing import Final, NamedTuple, Self
 
 from cmk.utils.agentdatatype import AgentRawData
 from cmk.utils.hostaddress import HostAddress, HostName
-from cmk.utils.paths import piggyback_dir, piggyback_source_dir
+from cmk.utils.paths import piggyback_catalog_file, piggyback_dir
 
 logger = logging.getLogger(__name__)
 
@@ -49,21 +53,71 @@ class PiggybackRawDataInfo(NamedTuple):
 
 
 # ***** Terminology *****
-# "piggybacked_host_folder":
-# - tmp/check_mk/piggyback/HOST
-#
 # "piggybacked_hostname":
-# - Path(tmp/check_mk/piggyback/HOST).name
+# - the host the piggyback data is about ("target")
+#
+# "source_hostname":
+# - the host that sent the piggyback data ("source")
 #
-# "piggybacked_host_source":
-# - tmp/check_mk/piggyback/HOST/SOURCE
+# "payload_file":
+# - tmp/check_mk/piggyback/SOURCE/TIMESTAMP.XXXX
+# - holds the payloads of all piggybacked hosts sent by a source in one turn
 #
-# "source_state_file":
-# - tmp/check_mk/piggyback_sources/SOURCE
+# "catalog":
+# - tmp/check_mk/piggyback_catalog.sqlite
+# - knows for each piggybacked host and source where the payload is stored and
+#   when it was updated, and for each source when it was seen the last time.
 #
-# "source_hostname":
-# - Path(tmp/check_mk/piggyback/HOST/SOURCE).name
-# - Path(tmp/check_mk/piggyback_sources/SOURCE).name
+# A piggybacked host is looked up in the catalog by its primary key, and a source only writes
+# a single payload file and does a single catalog transaction per turn. No file system
+# metadata is used, so there is neither a directory to be listed nor a file to be stat'ed.
+
+_SQLITE_PRAGMAS: Final = (
+    "PRAGMA journal_mode=WAL;",
+    "PRAGMA synchronous=NORMAL;",
+    "PRAGMA busy_timeout=10000;",
+)
+
+_SQLITE_SCHEMA: Final = (
+    """CREATE TABLE IF NOT EXISTS payloads (
+        target TEXT NOT NULL,
+        source TEXT NOT NULL,
+        last_update INTEGER NOT NULL,
+        payload_file TEXT NOT NULL,
+        offset INTEGER NOT NULL,
+        length INTEGER NOT NULL,
+        PRIMARY KEY (target, source)
+    ) WITHOUT ROWID;""",
+    "CREATE INDEX IF NOT EXISTS idx_payloads_source ON payloads (source);",
+    "CREATE INDEX IF NOT EXISTS idx_payloads_last_update ON payloads (last_update);",
+    """CREATE TABLE IF NOT EXISTS sources (
+        source TEXT PRIMARY KEY,
+        last_contact INTEGER NOT NULL
+    ) WITHOUT ROWID;""",
+)
+
+
+@contextlib.contextmanager
+def _catalog() -> Iterator[sqlite3.Connection]:
+    """Open the catalog. Leaving the context commits the changes, unless there is an error"""
+    piggyback_catalog_file.parent.mkdir(mode=0o770, exist_ok=True, parents=True)
+    with contextlib.closing(sqlite3.connect(piggyback_catalog_file)) as connection:
+        for pragma in _SQLITE_PRAGMAS:
+            connection.execute(pragma)
+        with connection:
+            for statement in _SQLITE_SCHEMA:
+                connection.execute(statement)
+        with connection:
+            yield connection
+
+
+_SELECT_PAYLOADS: Final = (
+    "SELECT p.source, p.last_update, s.last_contact, p.payload_file, p.offset, p.length"
+    " FROM payloads p LEFT JOIN sources s USING (source)"
+    " WHERE p.target = ?"
+)
+# A payload file may be superseded and removed between the lookup and reading it
+_MAX_READ_ATTEMPTS: Final = 3
 
 
 def get_piggyback_raw_data(piggybacked_hostname: HostAddress) -> Sequence[PiggybackRawDataInfo]:
@@ -73,48 +127,84 @@ def get_piggyback_raw_data(piggybacked_hostname: HostAddress) -> Sequence[Piggyb
     the source host name and the second element is the raw
     piggyback data (byte string)
     """
-    piggyback_file_infos = _get_payload_meta_data(piggybacked_hostname)
-    logger.debug("%s piggyback files for '%s'.", len(piggyback_file_infos), piggybacked_hostname)
+    with _catalog() as catalog:
+        rows = catalog.execute(
+            f"{_SELECT_PAYLOADS} ORDER BY p.source", (str(piggybacked_hostname),)
+        ).fetchall()
+    logger.debug("%s piggyback files for '%s'.", len(rows), piggybacked_hostname)
 
     piggyback_data = []
-    for file_info in piggyback_file_infos:
+    for row in rows:
+        if (raw_data_info := _read_payload(piggybacked_hostname, row)) is not None:
+            piggyback_data.append(raw_data_info)
+    return piggyback_data
+
+
+def _read_payload(
+    piggybacked_hostname: HostAddress, row: tuple[str, int, int | None, str, int, int]
+) -> PiggybackRawDataInfo | None:
+    for _attempt in range(_MAX_READ_ATTEMPTS):
+        source, last_update, last_contact, payload_file, offset, length = row
+        file_info = PiggybackFileInfo(
+            source=HostName(source),
+            file_path=piggyback_dir / payload_file,
+            last_update=last_update,
+            last_contact=last_contact,
+        )
         try:
             # Raw data is always stored as bytes. Later the content is
             # converted to unicode in abstact.py:_parse_info which respects
             # 'encoding' in section options.
-            content = file_info.file_path.read_bytes()
-
+            with file_info.file_path.open("rb") as f:
+                f.seek(offset)
+                content = f.read(length)
         except FileNotFoundError:
-            # race condition: file was removed between listing and reading
+            # race condition: the payload has been superseded in the meantime, look it up again
+            with _catalog() as catalog:
+                row = catalog.execute(
+                    f"{_SELECT_PAYLOADS} AND p.source = ?", (str(piggybacked_hostname), source)
+                ).fetchone()
+            if row is None:
+                return None
             continue
 
         logger.debug("Read piggyback file '%s'", file_info.file_path)
-        piggyback_data.append(PiggybackRawDataInfo(info=file_info, raw_data=AgentRawData(content)))
-    return piggyback_data
+        return PiggybackRawDataInfo(info=file_info, raw_data=AgentRawData(content))
+    return None
 
 
 def get_piggybacked_host_with_sources() -> Mapping[HostAddress, Sequence[PiggybackFileInfo]]:
     """Generates all piggyback pig/piggybacked host pairs"""
+    with _catalog() as catalog:
+        rows = catalog.execute(
+            "SELECT p.target, p.source, p.last_update, s.last_contact, p.payload_file"
+            " FROM payloads p LEFT JOIN sources s USING (source)"
+            " ORDER BY p.target, p.source"
+        ).fetchall()
+
     return {
-        piggybacked_host: _get_payload_meta_data(piggybacked_host)
-        for piggybacked_host_folder in _get_piggybacked_host_folders()
-        if (piggybacked_host := HostAddress(piggybacked_host_folder.name))
+        HostAddress(target): [
+            PiggybackFileInfo(
+                source=HostName(source),
+                file_path=piggyback_dir / payload_file,
+                last_update=last_update,
+                last_contact=last_contact,
+            )
+            for _target, source, last_update, last_contact, payload_file in target_rows
+        ]
+        for target, target_rows in itertools.groupby(rows, key=lambda row: row[0])
     }
 
 
-def _remove_piggyback_file(piggyback_file_path: Path) -> bool:
-    try:
-        piggyback_file_path.unlink()
-        return True
-    except FileNotFoundError:
-        return False
-
-
 def remove_source_status_file(source_hostname: HostName) -> bool:
-    """Remove the source_status_file of this piggyback host which will
+    """Forget the last contact of this piggyback source which will
     mark the piggyback data from this source as outdated."""
-    source_status_path = _get_source_status_file_path(source_hostname)
-    return _remove_piggyback_file(source_status_path)
+    with _catalog() as catalog:
+        return bool(
+            catalog.execute(
+                "DELETE FROM sources WHERE source = ?", (str(source_hostname),)
+            ).rowcount
+        )
 
 
 def store_piggyback_raw_data(
@@ -128,43 +218,131 @@ def store_piggyback_raw_data(
         remove_source_status_file(source_hostname)
         return
 
-    piggyback_file_paths = []
-    for piggybacked_hostname, lines in piggybacked_raw_data.items():
-        piggyback_file_path = _get_piggybacked_file_path(source_hostname, piggybacked_hostname)
-        logger.debug("Storing piggyback data for: %r", piggybacked_hostname)
-        # Raw data is always stored as bytes. Later the content is
-        # converted to unicode in abstact.py:_parse_info which respects
-        # 'encoding' in section options.
-        _write_file_with_mtime(
-            file_path=piggyback_file_path, content=b"%s\n" % b"\n".join(lines), mtime=timestamp
-        )
-        piggyback_file_paths.append(piggyback_file_path)
-
-    # Store the last contact with this piggyback source to be able to filter outdated data later
-    # We use the mtime of this file later for comparison.
+    # Raw data is always stored as bytes. Later the content is
+    # converted to unicode in abstact.py:_parse_info which respects
+    # 'encoding' in section options.
+    # Store the last contact with this piggyback source to be able to filter outdated data later.
     # Only do this for hosts that sent piggyback data this turn.
     logger.debug("Received piggyback data for %d hosts", len(piggybacked_raw_data))
-    status_file_path = _get_source_status_file_path(source_hostname)
-    _write_file_with_mtime(file_path=status_file_path, content=b"", mtime=timestamp)
+    _store_payloads(
+        source_hostname,
+        {
+            piggybacked_hostname: (int(timestamp), b"%s\n" % b"\n".join(lines))
+            for piggybacked_hostname, lines in piggybacked_raw_data.items()
+        },
+        int(timestamp),
+    )
 
 
-def _write_file_with_mtime(
-    file_path: Path,
-    content: bytes,
-    mtime: float,
+def store_piggyback_payloads(
+    source_hostname: HostName,
+    payloads: Mapping[HostName, tuple[int, bytes]],
+    last_contact: int | None,
+) -> None:
+    """Store the payloads of a source as received from another site
+
+    Other than with store_piggyback_raw_data, each payload keeps the time of its last update,
+    and the last contact with the source is taken over as it is. A last contact of None means
+    that the source did not send piggyback data in its last turn.
+    """
+    logger.debug("Received piggyback data for %d hosts from a remote site", len(payloads))
+    _store_payloads(source_hostname, payloads, last_contact)
+
+
+def _store_payloads(
+    source_hostname: HostName,
+    payloads: Mapping[HostName, tuple[int, bytes]],
+    last_contact: int | None,
 ) -> None:
-    """Create a file with the given mtime in a race-condition free manner"""
-    file_path.parent.mkdir(mode=0o770, exist_ok=True, parents=True)
+    payload_file, locations = (
+        _write_payload_file(
+            source_hostname,
+            {
+                piggybacked_hostname: payload
+                for piggybacked_hostname, (_last_update, payload) in payloads.items()
+            },
+        )
+        if payloads
+        else ("", {})
+    )
+
+    with _catalog() as catalog:
+        catalog.executemany(
+            "INSERT OR REPLACE INTO payloads VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                (
+                    str(piggybacked_hostname),
+                    str(source_hostname),
+                    payloads[piggybacked_hostname][0],
+                    payload_file,
+                )
+                + location
+                for piggybacked_hostname, location in locations.items()
+            ),
+        )
+        if last_contact is None:
+            catalog.execute("DELETE FROM sources WHERE source = ?", (str(source_hostname),))
+        else:
+            catalog.execute(
+                "INSERT OR REPLACE INTO sources VALUES (?, ?)", (str(source_hostname), last_contact)
+            )
+        referenced = _referenced_payload_files(catalog, source_hostname)
 
+    if not payload_file:
+        return
+
+    # Payload files of earlier turns may be completely superseded by now. Files newer than ours
+    # are left alone: They may belong to a concurrent call that has not updated the catalog yet.
+    for path in _files_in(piggyback_dir / source_hostname):
+        if (
+            path.name < Path(payload_file).name
+            and str(path.relative_to(piggyback_dir)) not in referenced
+        ):
+            _remove_piggyback_file(path)
+
+
+def _write_payload_file(
+    source_hostname: HostName, payloads: Mapping[HostName, bytes]
+) -> tuple[str, Mapping[HostName, tuple[int, int]]]:
+    """Write all payloads of a source into a new file
+
+    The catalog is updated afterwards, so nobody will ever read an incomplete file.
+    Returns the path of the file relative to the piggyback directory and the offset and length
+    of each payload.
+    """
+    source_folder = piggyback_dir / source_hostname
+    source_folder.mkdir(mode=0o770, exist_ok=True, parents=True)
+
+    locations = {}
+    offset = 0
+    # The names of the payload files sort by their creation
     with tempfile.NamedTemporaryFile(
-        "wb", dir=str(file_path.parent), prefix=f".{file_path.name}.new", delete=False
-    ) as tmp:
-        tmp_path = tmp.name
-        tmp.write(content)
+        "wb", dir=source_folder, prefix=f"{time.time_ns():020d}.", delete=False
+    ) as payload_file:
+        for piggybacked_hostname, payload in payloads.items():
+            logger.debug("Storing piggyback data for: %r", piggybacked_hostname)
+            payload_file.write(payload)
+            locations[piggybacked_hostname] = (offset, len(payload))
+            offset += len(payload)
+
+    return str(Path(payload_file.name).relative_to(piggyback_dir)), locations
+
 
-    tmp_stats = os.stat(tmp_path)
-    os.utime(tmp_path, (tmp_stats.st_atime, mtime))
-    os.rename(tmp_path, str(file_path))
+def _referenced_payload_files(catalog: sqlite3.Connection, source_hostname: HostName) -> set[str]:
+    return {
+        payload_file
+        for (payload_file,) in catalog.execute(
+            "SELECT DISTINCT payload_file FROM payloads WHERE source = ?", (str(source_hostname),)
+        )
+    }
+
+
+def _remove_piggyback_file(piggyback_file_path: Path) -> bool:
+    try:
+        piggyback_file_path.unlink()
+        return True
+    except FileNotFoundError:
+        return False
 
 
 #   .--folders/files-------------------------------------------------------.
@@ -177,41 +355,10 @@ def _write_file_with_mtime(
 #   '----------------------------------------------------------------------'
 
 
-def _get_payload_meta_data(piggybacked_hostname: HostName) -> Sequence[PiggybackFileInfo]:
-    """Gather a list of piggyback files to read for further processing.
-
-    Please note that there may be multiple parallel calls executing
-    store_piggyback_raw_data() or cleanup_piggyback_files() functions.
-    All these functions need to deal with suddenly vanishing or updated files/directories.
-    """
-    piggybacked_host_folder = piggyback_dir / Path(piggybacked_hostname)
-    meta_data = []
-    for payload_file in _files_in(piggybacked_host_folder):
-        source = HostAddress(payload_file.name)
-        status_file_path = _get_source_status_file_path(source)
-
-        if (mtime := _get_mtime(payload_file)) is None:
-            continue
-
-        meta_data.append(
-            PiggybackFileInfo(
-                source=source,
-                file_path=payload_file,
-                last_update=mtime,
-                last_contact=_get_mtime(status_file_path),
-            )
-        )
-    return meta_data
-
-
-def _get_piggybacked_host_folders() -> Sequence[Path]:
+def _get_source_folders() -> Sequence[Path]:
     return _files_in(piggyback_dir)
 
 
-def _get_source_state_files() -> Sequence[Path]:
-    return _files_in(piggyback_source_dir)
-
-
 def _files_in(path: Path) -> Sequence[Path]:
     """Return a sorted sequence of files in `path` excluding hidden files.
 
@@ -224,17 +371,6 @@ def _files_in(path: Path) -> Sequence[Path]:
         return []
 
 
-def _get_source_status_file_path(source_hostname: HostName) -> Path:
-    return piggyback_source_dir / str(source_hostname)
-
-
-def _get_piggybacked_file_path(
-    source_hostname: HostName,
-    piggybacked_hostname: HostName | HostAddress,
-) -> Path:
-    return piggyback_dir / piggybacked_hostname / source_hostname
-
-
 # .
 #   .--clean up------------------------------------------------------------.
 #   |                     _                                                |
@@ -250,7 +386,7 @@ def cleanup_piggyback_files(cut_off_timestamp: float) -> None:
     """This is a housekeeping job to clean up different old files from the
     piggyback directories.
 
-    # Source status files and/or piggybacked data files are cleaned up/deleted
+    # Source contacts and/or piggybacked data are cleaned up/deleted
     # if and only if they have exceeded the maximum cache age configured in the
     # global settings or in the rule 'Piggybacked Host Files'."""
     logger.debug(
@@ -259,70 +395,62 @@ def cleanup_piggyback_files(cut_off_timestamp: float) -> None:
         cut_off_timestamp,
     )
 
-    piggybacked_hosts_settings = [
-        (piggybacked_host_folder, _files_in(piggybacked_host_folder))
-        for piggybacked_host_folder in _get_piggybacked_host_folders()
-    ]
-
-    _cleanup_old_source_status_files(_get_source_state_files(), cut_off_timestamp)
-    _cleanup_old_piggybacked_files(piggybacked_hosts_settings, cut_off_timestamp)
-
+    with _catalog() as catalog:
+        removed_sources = catalog.execute(
+            "DELETE FROM sources WHERE last_contact < ?", (cut_off_timestamp,)
+        ).rowcount
+        removed_payloads = catalog.execute(
+            "DELETE FROM payloads WHERE last_update < ?", (cut_off_timestamp,)
+        ).rowcount
+        referenced = {
+            payload_file
+            for (payload_file,) in catalog.execute("SELECT DISTINCT payload_file FROM payloads")
+        }
+    logger.debug(
+        "Removed %d outdated piggyback sources and %d outdated piggybacked payloads.",
+        removed_sources,
+        removed_payloads,
+    )
 
-def _cleanup_old_source_status_files(
-    source_state_files: Sequence[Path],
-    cut_off_timestamp: float,
-) -> None:
-    """Remove source status files which exceed provided maximum age."""
-    for source_state_file in source_state_files:
-        if (mtime := _get_mtime(source_state_file)) is None:
-            continue  # File has been removed, that's OK.
+    _cleanup_unreferenced_payload_files(referenced, cut_off_timestamp)
 
-        if mtime < cut_off_timestamp:
-            logger.debug(
-                "Piggyback source status file '%s' too old (%s). Remove it.",
-                source_state_file,
-                _render_datetime(mtime),
-            )
-            _remove_piggyback_file(source_state_file)
 
+def _cleanup_unreferenced_payload_files(referenced: set[str], cut_off_timestamp: float) -> None:
+    """Remove the payload files not needed anymore
 
-def _cleanup_old_piggybacked_files(
-    piggybacked_hosts_settings: Iterable[tuple[Path, Iterable[Path]]], cut_off_timestamp: float
-) -> None:
-    """Remove piggybacked data files which exceed provided maximum age."""
+    This only walks the folders of the sources, not those of the piggybacked hosts.
+    Files that are not yet in the catalog may just be written, so only old ones are removed.
+    """
+    for source_folder in _get_source_folders():
+        for payload_file in _files_in(source_folder):
+            if str(payload_file.relative_to(piggyback_dir)) in referenced:
+                continue
 
-    for piggybacked_host_folder, source_hosts in piggybacked_hosts_settings:
-        for piggybacked_host_source in source_hosts:
-            if (mtime := _get_mtime(piggybacked_host_source)) is None:
+            if (mtime := _get_mtime(payload_file)) is None or mtime >= cut_off_timestamp:
                 continue
 
-            if mtime < cut_off_timestamp:
-                logger.debug(
-                    "Piggyback file '%s' too old (%s). Remove it.",
-                    piggybacked_host_source,
-                    _render_datetime(mtime),
-                )
-                _remove_piggyback_file(piggybacked_host_source)
+            logger.debug(
+                "Piggyback file '%s' not needed anymore (%s). Remove it.",
+                payload_file,
+                _render_datetime(mtime),
+            )
+            _remove_piggyback_file(payload_file)
 
-        # Remove empty backed host directory
+        # Remove empty source directory
         try:
-            piggybacked_host_folder.rmdir()
+            source_folder.rmdir()
         except OSError as e:
             if e.errno == errno.ENOTEMPTY:
                 continue
             raise
         logger.debug(
             "Piggyback folder '%s' was empty. Removed it.",
-            piggybacked_host_folder,
+            source_folder,
         )
 
 
 def _get_mtime(path: Path) -> int | None:
     try:
-        # Beware:
-        # On POSIX platforms Python reads atime and mtime at nanosecond resolution
-        # but only writes them at microsecond resolution.
-        # (We're using os.utime() in _store_status_file_of())
         return int(path.stat().st_mtime)
     except FileNotFoundError:
         return None
@@ -333,32 +461,29 @@ def _render_datetime(timestamp: float) -> str:
 
 
 def move_for_host_rename(old_host: str, new_host: str) -> tuple[str, ...]:
-    """Move all piggybacked and source files from old_host to new_host
+    """Move all piggybacked and source data from old_host to new_host
 
     Return a tuple of strings representing the actions taken.
     """
+    actions = []
+    with _catalog() as catalog:
+        if catalog.execute("SELECT 1 FROM payloads WHERE target = ?", (old_host,)).fetchone():
+            catalog.execute("DELETE FROM payloads WHERE target = ?", (new_host,))
+            catalog.execute("UPDATE payloads SET target = ? WHERE target = ?", (new_host, old_host))
+            actions.append("piggyback-load")
+
+        if catalog.execute("SELECT 1 FROM payloads WHERE source = ?", (old_host,)).fetchone():
+            catalog.execute("DELETE FROM payloads WHERE source = ?", (new_host,))
+            catalog.execute("DELETE FROM sources WHERE source = ?", (new_host,))
+            catalog.execute(
+                "UPDATE payloads SET source = ?, payload_file = ? || substr(payload_file, ?)"
+                " WHERE source = ?",
+                (new_host, new_host, len(old_host) + 1, old_host),
+            )
+            catalog.execute("UPDATE sources SET source = ? WHERE source = ?", (new_host, old_host))
+            with contextlib.suppress(FileNotFoundError):
+                shutil.rmtree(piggyback_dir / new_host)
+            os.rename(piggyback_dir / old_host, piggyback_dir / new_host)
+            actions.append("piggyback-pig")
 
-    def _rename_piggybacked_dir(old_name: str, new_name: str) -> Iterable[str]:
-        if not (old_path := piggyback_dir / old_name).exists():
-            return
-
-        try:
-            shutil.rmtree(str(new_path := piggyback_dir / new_name))
-        except FileNotFoundError:
-            pass
-
-        os.rename(str(old_path), str(new_path))
-        yield "piggyback-load"
-
-    def _rename_payload_file(basedir: Path, old_name: str, new_name: str) -> Iterable[str]:
-        if not (old_path := basedir / old_name).exists():
-            return
-
-        (new_path := basedir / new_name).unlink(missing_ok=True)
-        old_path.rename(new_path)
-        yield "piggyback-pig"
-
-    return tuple(
-        *_rename_piggybacked_dir(old_host, new_host),
-        *_rename_payload_file(piggyback_dir, old_host, new_host),
-    )
+    return tuple(actions)
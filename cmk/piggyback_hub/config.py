@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Configuration of the piggyback hub
+
+The configuration is read from etc/check_mk/piggyback_hub.json, e.g.:
+
+    {
+        "port": 6559,
+        "peers": {"site_b": ["site-b.example.com", 6559]},
+        "targets": {"vm-01": "site_b", "vm-02": "site_b"}
+    }
+
+"targets" maps the piggybacked hosts to the sites monitoring them. The payloads of all
+piggybacked hosts assigned to other sites are sent to the hubs of these sites. Without a port,
+the hub does not accept payloads from other sites.
+"""
+
+import json
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from livestatus import SiteId
+
+import cmk.utils.paths
+from cmk.utils.hostaddress import HostName
+
+from cmk.ccc.exceptions import MKGeneralException
+
+
+def config_file() -> Path:
+    return cmk.utils.paths.omd_root / "etc/check_mk/piggyback_hub.json"
+
+
+@dataclass(frozen=True)
+class PiggybackHubConfig:
+    site_id: SiteId
+    port: int | None = None
+    peers: Mapping[SiteId, tuple[str, int]] = field(default_factory=dict)
+    targets: Mapping[HostName, SiteId] = field(default_factory=dict)
+
+
+def load_config(path: Path, site_id: SiteId) -> PiggybackHubConfig:
+    try:
+        raw = json.loads(path.read_text())
+    except FileNotFoundError:
+        return PiggybackHubConfig(site_id=site_id)
+    except (OSError, ValueError) as e:
+        raise MKGeneralException(f"Cannot read the piggyback hub configuration {path}: {e}") from e
+
+    try:
+        return PiggybackHubConfig(
+            site_id=site_id,
+            port=None if (port := raw.get("port")) is None else int(port),
+            peers={
+                SiteId(peer_id): (str(address), int(port))
+                for peer_id, (address, port) in raw.get("peers", {}).items()
+            },
+            targets={
+                HostName(host_name): SiteId(target_site_id)
+                for host_name, target_site_id in raw.get("targets", {}).items()
+            },
+        )
+    except (TypeError, ValueError) as e:
+        raise MKGeneralException(f"Invalid piggyback hub configuration {path}: {e}") from e
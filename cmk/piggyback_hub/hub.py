@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Distribution of the piggyback payloads to the sites monitoring the piggybacked hosts
+
+The hub watches the piggyback catalog of its site. The payloads for piggybacked hosts assigned
+to other sites are sent to the hubs of these sites as soon as they are updated, together with
+the last contact of their source. All updates for a site found in one turn are sent as a single
+compressed message.
+
+The receiving hub stores the payloads with their original time of the last update and takes
+over the last contact of their source, so the piggyback data is considered outdated on the
+receiving site just as on the sending one. Outdated payloads are cleaned up by each site
+on its own.
+
+Which payloads have been sent is only known in memory, so all of them are sent again after
+a restart of the hub.
+"""
+
+import logging
+import struct
+import zlib
+from collections.abc import Iterator, Mapping, MutableMapping
+from dataclasses import dataclass, field
+from typing import Final
+
+from livestatus import SiteId
+
+from cmk.utils.hostaddress import HostName
+
+from cmk.piggyback import (
+    get_piggyback_raw_data,
+    get_piggybacked_host_with_sources,
+    store_piggyback_payloads,
+)
+
+from .config import PiggybackHubConfig
+from .transport import Transport
+
+_MAGIC: Final = b"CMKH"
+# magic, length of the name of the sending site
+_MESSAGE_HEADER: Final = struct.Struct("<4sH")
+# length of the name of the source, last contact (-1 for None), number of payloads
+_SOURCE_HEADER: Final = struct.Struct("<HqI")
+# length of the name of the piggybacked host, last update, length of the payload
+_PAYLOAD_HEADER: Final = struct.Struct("<HqI")
+
+
+@dataclass
+class SourceUpdate:
+    last_contact: int | None
+    payloads: MutableMapping[HostName, tuple[int, bytes]] = field(default_factory=dict)
+
+
+def encode_message(site_id: SiteId, updates: Mapping[HostName, SourceUpdate]) -> bytes:
+    def _chunks() -> Iterator[bytes]:
+        for source, update in updates.items():
+            raw_source = source.encode("utf-8")
+            yield _SOURCE_HEADER.pack(
+                len(raw_source),
+                -1 if update.last_contact is None else update.last_contact,
+                len(update.payloads),
+            )
+            yield raw_source
+            for target, (last_update, payload) in update.payloads.items():
+                raw_target = target.encode("utf-8")
+                yield _PAYLOAD_HEADER.pack(len(raw_target), last_update, len(payload))
+                yield raw_target
+                yield payload
+
+    raw_site_id = site_id.encode("utf-8")
+    return (
+        _MESSAGE_HEADER.pack(_MAGIC, len(raw_site_id))
+        + raw_site_id
+        + zlib.compress(b"".join(_chunks()))
+    )
+
+
+def decode_message(message: bytes) -> tuple[SiteId, Mapping[HostName, SourceUpdate]]:
+    """Decode a message, raises ValueError if it is invalid"""
+    try:
+        magic, site_id_length = _MESSAGE_HEADER.unpack_from(message)
+        if magic != _MAGIC:
+            raise ValueError("not a message of a piggyback hub")
+        offset = _MESSAGE_HEADER.size
+        site_id = SiteId(message[offset : offset + site_id_length].decode("utf-8"))
+        raw = zlib.decompress(message[offset + site_id_length :])
+
+        updates: dict[HostName, SourceUpdate] = {}
+        offset = 0
+        while offset < len(raw):
+            source_length, last_contact, num_payloads = _SOURCE_HEADER.unpack_from(raw, offset)
+            offset += _SOURCE_HEADER.size
+            update = updates[HostName(raw[offset : offset + source_length].decode("utf-8"))] = (
+                SourceUpdate(None if last_contact == -1 else last_contact)
+            )
+            offset += source_length
+            for _ in range(num_payloads):
+                target_length, last_update, payload_length = _PAYLOAD_HEADER.unpack_from(
+                    raw, offset
+                )
+                offset += _PAYLOAD_HEADER.size
+                target = HostName(raw[offset : offset + target_length].decode("utf-8"))
+                offset += target_length
+                update.payloads[target] = (last_update, raw[offset : offset + payload_length])
+                offset += payload_length
+    except (struct.error, zlib.error, UnicodeDecodeError) as e:
+        raise ValueError(f"invalid message: {e}") from e
+    return site_id, updates
+
+
+class PiggybackHub:
+    def __init__(
+        self, config: PiggybackHubConfig, transport: Transport, logger: logging.Logger
+    ) -> None:
+        self.config: Final = config
+        self._transport: Final = transport
+        self._logger: Final = logger
+        # What the hubs of the other sites have received
+        self._sent_payloads: Final[dict[SiteId, dict[tuple[HostName, HostName], int]]] = {}
+        self._sent_contacts: Final[dict[SiteId, dict[HostName, int | None]]] = {}
+
+    def _collect_updates(self) -> Mapping[SiteId, Mapping[HostName, SourceUpdate]]:
+        updates: dict[SiteId, dict[HostName, SourceUpdate]] = {}
+        for target, file_infos in get_piggybacked_host_with_sources().items():
+            if (site_id := self.config.targets.get(target)) is None or (
+                site_id == self.config.site_id
+            ):
+                continue
+
+            sent_payloads = self._sent_payloads.get(site_id, {})
+            sent_contacts = self._sent_contacts.get(site_id, {})
+            site_updates = updates.setdefault(site_id, {})
+            for file_info in file_infos:
+                if (
+                    file_info.source not in sent_contacts
+                    or sent_contacts[file_info.source] != file_info.last_contact
+                ):
+                    site_updates.setdefault(file_info.source, SourceUpdate(file_info.last_contact))
+
+            if all(
+                sent_payloads.get((target, file_info.source)) == file_info.last_update
+                for file_info in file_infos
+            ):
+                continue
+
+            for raw_data_info in get_piggyback_raw_data(target):
+                file_info = raw_data_info.info
+                if sent_payloads.get((target, file_info.source)) == file_info.last_update:
+                    continue
+                site_updates.setdefault(
+                    file_info.source, SourceUpdate(file_info.last_contact)
+                ).payloads[target] = (file_info.last_update, raw_data_info.raw_data)
+
+        return {site_id: site_updates for site_id, site_updates in updates.items() if site_updates}
+
+    def send_updates(self) -> int:
+        """Send the updated payloads to the other sites, return the number of payloads sent"""
+        num_sent = 0
+        for site_id, site_updates in self._collect_updates().items():
+            try:
+                self._transport.send(site_id, encode_message(self.config.site_id, site_updates))
+            except OSError as e:
+                # Everything not sent is sent with the next turn
+                self._logger.warning("Cannot send piggyback data to site %s: %s", site_id, e)
+                continue
+
+            sent_payloads = self._sent_payloads.setdefault(site_id, {})
+            sent_contacts = self._sent_contacts.setdefault(site_id, {})
+            for source, update in site_updates.items():
+                sent_contacts[source] = update.last_contact
+                for target, (last_update, _payload) in update.payloads.items():
+                    sent_payloads[(target, source)] = last_update
+                    num_sent += 1
+            self._logger.debug(
+                "Sent piggyback data of %d sources to site %s", len(site_updates), site_id
+            )
+        return num_sent
+
+    def receive_updates(self, timeout: float) -> int:
+        """Store the payloads received from other sites, return the number of payloads stored"""
+        num_received = 0
+        for message in self._transport.receive(timeout):
+            try:
+                site_id, updates = decode_message(message)
+            except ValueError as e:
+                self._logger.warning("Discarding piggyback data: %s", e)
+                continue
+
+            for source, update in updates.items():
+                store_piggyback_payloads(source, update.payloads, update.last_contact)
+                num_received += len(update.payloads)
+            self._logger.debug(
+                "Received piggyback data of %d sources from site %s", len(updates), site_id
+            )
+        return num_received
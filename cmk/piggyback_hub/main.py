@@ -14,15 +14,27 @@ from logging import getLogger
 from logging.handlers import WatchedFileHandler
 from pathlib import Path
 from types import FrameType
+from typing import Final
 
+import cmk.utils.paths
 from cmk.utils.daemon import daemonize, pid_file_lock
 
+from cmk.ccc.site import omd_site
+
+from .config import config_file, load_config
+from .hub import PiggybackHub
+from .transport import TLSTransport
+
 VERBOSITY_MAP = {
     0: logging.INFO,
     1: 15,
     2: logging.DEBUG,
 }
 
+# How often the catalog is checked for payloads to be sent to other sites
+_SEND_INTERVAL: Final = 5.0
+_CONNECT_TIMEOUT: Final = 10.0
+
 
 class SignalException(Exception):
     pass
@@ -89,10 +101,14 @@ def _register_signal_handler() -> None:
     signal.signal(signal.SIGTERM, signal_handler)
 
 
-# a dummy daemon for now
-def run_piggyback_hub():
+def run_piggyback_hub(hub: PiggybackHub) -> None:
+    """Send the updated payloads every few seconds and store the received ones in between"""
+    next_send = 0.0
     while True:
-        time.sleep(5)
+        if (now := time.monotonic()) >= next_send:
+            hub.send_updates()
+            next_send = now + _SEND_INTERVAL
+        hub.receive_updates(timeout=max(0.0, next_send - time.monotonic()))
 
 
 def main(argv: list[str] | None = None) -> int:
@@ -118,7 +134,20 @@ def main(argv: list[str] | None = None) -> int:
 
     try:
         with pid_file_lock(Path(args.pid_file)):
-            run_piggyback_hub()
+            config = load_config(config_file(), omd_site())
+            # Not before daemonizing, the transport runs a thread for the incoming connections
+            transport = TLSTransport(
+                port=config.port,
+                peers=config.peers,
+                site_cert=cmk.utils.paths.site_cert_file,
+                trusted_cas=cmk.utils.paths.trusted_ca_file,
+                timeout=_CONNECT_TIMEOUT,
+                logger=logger,
+            )
+            try:
+                run_piggyback_hub(PiggybackHub(config, transport, logger))
+            finally:
+                transport.close()
     except SignalException:
         logger.info("Stopping Piggyback Hub daemon.")
     except Exception as e:
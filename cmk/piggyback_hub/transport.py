@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Transport of the messages between the piggyback hubs of the sites
+
+A transport sends messages to the hubs of other sites and hands out the messages received.
+It does not care about the content of the messages.
+
+The hubs are connected by TLS connections, authenticated by the site certificates in both
+directions. A message is sent as a frame: its length followed by the message itself.
+"""
+
+import contextlib
+import logging
+import queue
+import socket
+import socketserver
+import ssl
+import struct
+import threading
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+from typing import Any, Final, Protocol
+
+from livestatus import SiteId
+
+__all__ = ["Transport", "LoopbackNetwork", "LoopbackTransport", "TLSTransport"]
+
+_FRAME_HEADER: Final = struct.Struct("!I")
+_MAX_MESSAGE_SIZE: Final = 1024**3
+
+
+class Transport(Protocol):
+    def send(self, site_id: SiteId, message: bytes) -> None:
+        """Send the message to the hub of the site, raises OSError if that failed"""
+
+    def receive(self, timeout: float) -> Sequence[bytes]:
+        """Return the messages received, waiting at most `timeout` seconds for the first one"""
+
+
+def _drain(messages: "queue.SimpleQueue[bytes]", timeout: float) -> Sequence[bytes]:
+    try:
+        received = [messages.get(timeout=timeout)]
+    except queue.Empty:
+        return []
+    with contextlib.suppress(queue.Empty):
+        while True:
+            received.append(messages.get_nowait())
+    return received
+
+
+class LoopbackNetwork:
+    """Connects the transports of several hubs within a single process, used for testing"""
+
+    def __init__(self) -> None:
+        self._mailboxes: Final[dict[SiteId, queue.SimpleQueue[bytes]]] = {}
+
+    def transport(self, site_id: SiteId) -> "LoopbackTransport":
+        self._mailboxes[site_id] = queue.SimpleQueue()
+        return LoopbackTransport(self, site_id)
+
+    def deliver(self, site_id: SiteId, message: bytes) -> None:
+        try:
+            self._mailboxes[site_id].put(message)
+        except KeyError:
+            raise ConnectionRefusedError(f"No hub of site {site_id} is connected") from None
+
+    def mailbox(self, site_id: SiteId) -> "queue.SimpleQueue[bytes]":
+        return self._mailboxes[site_id]
+
+
+class LoopbackTransport:
+    def __init__(self, network: LoopbackNetwork, site_id: SiteId) -> None:
+        self._network: Final = network
+        self.site_id: Final = site_id
+
+    def send(self, site_id: SiteId, message: bytes) -> None:
+        self._network.deliver(site_id, message)
+
+    def receive(self, timeout: float) -> Sequence[bytes]:
+        return _drain(self._network.mailbox(self.site_id), timeout)
+
+
+def _read_frame(stream: socketserver.StreamRequestHandler) -> bytes | None:
+    """Read a single frame, None if the connection is closed before its start"""
+    if not (header := stream.rfile.read(_FRAME_HEADER.size)):
+        return None
+    if len(header) < _FRAME_HEADER.size:
+        raise ConnectionError("Connection closed within a frame header")
+    (size,) = _FRAME_HEADER.unpack(header)
+    if size > _MAX_MESSAGE_SIZE:
+        raise ConnectionError(f"Message of {size} bytes exceeds the maximum size")
+    if len(message := stream.rfile.read(size)) < size:
+        raise ConnectionError("Connection closed within a frame")
+    return message
+
+
+def _common_name(certificate: Mapping[str, Any] | None) -> str | None:
+    if not certificate:
+        return None
+    for rdn in certificate.get("subject", ()):
+        for key, value in rdn:
+            if key == "commonName":
+                return str(value)
+    return None
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    server: "_Server"
+
+    def handle(self) -> None:
+        assert isinstance(self.request, ssl.SSLSocket)
+        try:
+            # Not in the thread accepting the connections, see _Server.get_request
+            self.request.do_handshake()
+        except OSError as e:
+            self.server.logger.warning("Rejected connection from %s: %s", self.client_address, e)
+            return
+        peer = _common_name(self.request.getpeercert())
+        self.server.logger.debug("Connection from the hub of site %s", peer)
+        try:
+            while (message := _read_frame(self)) is not None:
+                self.server.messages.put(message)
+        except OSError as e:
+            self.server.logger.warning("Connection from the hub of site %s failed: %s", peer, e)
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    address_family = socket.AF_INET6
+
+    def __init__(
+        self,
+        port: int,
+        context: ssl.SSLContext,
+        messages: "queue.SimpleQueue[bytes]",
+        logger: logging.Logger,
+    ) -> None:
+        self.context: Final = context
+        self.messages: Final = messages
+        self.logger: Final = logger
+        super().__init__(("::", port), _RequestHandler)
+
+    def server_bind(self) -> None:
+        # Accept IPv4 connections as well
+        self.socket.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_V6ONLY, 0)
+        super().server_bind()
+
+    def get_request(self) -> tuple[socket.socket, object]:
+        sock, address = super().get_request()
+        return (
+            self.context.wrap_socket(sock, server_side=True, do_handshake_on_connect=False),
+            address,
+        )
+
+
+class TLSTransport:
+    """Sends the messages via TLS connections and accepts connections of other hubs
+
+    Both sides present their site certificate, which has to be signed by a trusted CA.
+    The certificate of the remote hub has to be issued for the site it is expected to be.
+    """
+
+    def __init__(
+        self,
+        *,
+        port: int | None,
+        peers: Mapping[SiteId, tuple[str, int]],
+        site_cert: Path,
+        trusted_cas: Path,
+        timeout: float,
+        logger: logging.Logger,
+    ) -> None:
+        self._peers: Final = peers
+        self._timeout: Final = timeout
+        self._logger: Final = logger
+        self._messages: Final[queue.SimpleQueue[bytes]] = queue.SimpleQueue()
+        self._connections: Final[dict[SiteId, ssl.SSLSocket]] = {}
+
+        self._client_context: Final = ssl.create_default_context(cafile=str(trusted_cas))
+        # The remote site is identified by the common name of its certificate, see _connect
+        self._client_context.check_hostname = False
+        self._client_context.load_cert_chain(certfile=site_cert)
+
+        self._server: _Server | None = None
+        if port is not None:
+            server_context = ssl.create_default_context(
+                ssl.Purpose.CLIENT_AUTH, cafile=str(trusted_cas)
+            )
+            server_context.verify_mode = ssl.CERT_REQUIRED
+            server_context.load_cert_chain(certfile=site_cert)
+            self._server = _Server(port, server_context, self._messages, logger)
+            threading.Thread(
+                target=self._server.serve_forever, name="piggyback-hub-server", daemon=True
+            ).start()
+
+    def close(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        for connection in self._connections.values():
+            connection.close()
+        self._connections.clear()
+
+    def _connect(self, site_id: SiteId) -> ssl.SSLSocket:
+        if (connection := self._connections.get(site_id)) is not None:
+            return connection
+
+        try:
+            address = self._peers[site_id]
+        except KeyError:
+            raise ConnectionRefusedError(f"No address of the hub of site {site_id}") from None
+        connection = self._client_context.wrap_socket(
+            socket.create_connection(address, timeout=self._timeout)
+        )
+        if (common_name := _common_name(connection.getpeercert())) != site_id:
+            connection.close()
+            raise ssl.SSLError(f"Hub at {address} identifies as site {common_name}")
+        self._logger.debug("Connected to the hub of site %s at %s", site_id, address)
+        self._connections[site_id] = connection
+        return connection
+
+    def send(self, site_id: SiteId, message: bytes) -> None:
+        connection = self._connect(site_id)
+        try:
+            connection.sendall(_FRAME_HEADER.pack(len(message)) + message)
+        except OSError:
+            # Reconnect with the next message
+            del self._connections[site_id]
+            connection.close()
+            raise
+
+    def receive(self, timeout: float) -> Sequence[bytes]:
+        return _drain(self._messages, timeout)
@@ -3,7 +3,7 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
-from collections.abc import Callable
+from collections.abc import Callable, MutableMapping
 from contextlib import suppress
 
 import cmk.utils.cleanup
@@ -23,7 +23,7 @@ def get_single_oid(
     oid: str,
     *,
     section_name: SectionName | None = None,
-    single_oid_cache: dict[OID, SNMPDecodedString | None],
+    single_oid_cache: MutableMapping[OID, SNMPDecodedString | None],
     backend: SNMPBackend,
     log: Callable[[str], None],
 ) -> SNMPDecodedString | None:
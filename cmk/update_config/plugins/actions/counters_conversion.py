@@ -10,12 +10,18 @@ from pathlib import Path
 
 import cmk.utils.paths
 
+from cmk.base.api.agent_based.value_store import value_store_database
+
 from cmk.update_config.registry import update_action_registry, UpdateAction
 
 
 class ConvertCounters(UpdateAction):
     def __call__(self, logger: Logger) -> None:
-        self.convert_counter_files(Path(cmk.utils.paths.counters_dir))
+        self.convert_counter_files(counters_dir := Path(cmk.utils.paths.counters_dir))
+        if migrated := value_store_database(
+            cmk.utils.paths.counters_database_file, counters_dir
+        ).migrate():
+            logger.debug("Moved the counters of %d hosts to the database", migrated)
 
     @staticmethod
     def convert_counter_files(counters_path: Path) -> None:
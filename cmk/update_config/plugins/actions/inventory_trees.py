@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+from logging import Logger
+from pathlib import Path
+
+import cmk.utils.paths
+from cmk.utils.structured_data import TreeArchive, TreeStore
+
+from cmk.ccc.exceptions import MKGeneralException
+
+from cmk.update_config.registry import update_action_registry, UpdateAction
+
+
+class MigrateInventoryTrees(UpdateAction):
+    """
+    Write the binary files of the HW/SW inventory and status data trees and move the
+    archived inventory trees into the chains of the inventory history.
+
+    The trees are loaded from the binary files, which allow loading single subtrees.
+    Trees without an up to date binary file are still loaded from the tree files, just as the
+    archived tree files are still read, so this is only about performance and disk space.
+    """
+
+    def __call__(self, logger: Logger) -> None:
+        for tree_dir in (cmk.utils.paths.inventory_output_dir, cmk.utils.paths.status_data_dir):
+            if migrated := TreeStore(tree_dir).migrate():
+                logger.debug("Migrated %d trees in %s", len(migrated), tree_dir)
+
+        self.migrate_archives(Path(cmk.utils.paths.inventory_archive_dir), logger)
+
+    @staticmethod
+    def migrate_archives(archive_dir: Path, logger: Logger) -> None:
+        try:
+            host_archive_dirs = sorted(p for p in archive_dir.iterdir() if p.is_dir())
+        except FileNotFoundError:
+            return
+        for host_archive_dir in host_archive_dirs:
+            try:
+                if migrated := TreeArchive(host_archive_dir).migrate():
+                    logger.debug("Migrated %d archived trees in %s", migrated, host_archive_dir)
+            except (OSError, ValueError, MKGeneralException) as e:
+                logger.error("Cannot migrate the archived trees in %s: %s", host_archive_dir, e)
+
+
+update_action_registry.register(
+    MigrateInventoryTrees(
+        name="migrate_inventory_trees",
+        title="Migrate HW/SW inventory trees",
+        sort_index=101,  # can run whenever
+    )
+)
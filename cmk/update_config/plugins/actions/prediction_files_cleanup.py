@@ -31,7 +31,7 @@ class RemoveUnreadablePredictions(UpdateAction):
             data_file = info_file.with_suffix(PredictionStore.DATA_FILE_SUFFIX)
             try:
                 _ = PredictionInfo.model_validate_json(info_file.read_text())
-                _ = PredictionData.model_validate_json(data_file.read_text())
+                _ = PredictionData.deserialize(data_file.read_bytes())
             except (ValueError, FileNotFoundError):
                 info_file.unlink(missing_ok=True)
                 data_file.unlink(missing_ok=True)
@@ -5,12 +5,14 @@
 
 from __future__ import annotations
 
+import concurrent.futures
 import enum
 import socket
-from collections.abc import Iterable, Iterator, Mapping, MutableMapping, Sequence
+import time
+from collections.abc import Callable, Iterable, Iterator, Mapping, MutableMapping, Sequence
 from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, assert_never, Literal, NamedTuple
+from typing import Any, assert_never, Final, Literal, NamedTuple
 
 import cmk.utils.paths
 from cmk.utils.caching import cache_manager
@@ -23,6 +25,12 @@ from cmk.ccc.exceptions import MKIPAddressLookupError, MKTerminate, MKTimeout
 
 IPLookupCacheId = tuple[HostName | HostAddress, socket.AddressFamily]
 
+Resolver = Callable[[HostName | HostAddress, socket.AddressFamily], HostAddress]
+
+# Bounds for resolving many hosts at once, see resolve_concurrently
+_MAX_CONCURRENT_LOOKUPS: Final = 32
+_LOOKUP_TIMEOUT: Final = 10.0
+
 
 _fake_dns: HostAddress | None = None
 _enforce_localhost = False
@@ -201,6 +209,19 @@ def _file_cached_dns_lookup(
     return ipa
 
 
+def _getaddrinfo(host_name: HostName | HostAddress, family: socket.AddressFamily) -> HostAddress:
+    return HostAddress(socket.getaddrinfo(host_name, None, family)[0][4][0])
+
+
+def _lookup_error(
+    host_name: HostName | HostAddress, family: socket.AddressFamily, exc: Exception
+) -> MKIPAddressLookupError:
+    family_str = {socket.AF_INET: "IPv4", socket.AF_INET6: "IPv6"}[family]
+    return MKIPAddressLookupError(
+        f"Failed to lookup {family_str} address of {host_name} via DNS: {exc}"
+    )
+
+
 def _actual_dns_lookup(
     *,
     host_name: HostName | HostAddress,
@@ -208,7 +229,7 @@ def _actual_dns_lookup(
     fallback: HostAddress | None = None,
 ) -> HostAddress:
     try:
-        return HostAddress(socket.getaddrinfo(host_name, None, family)[0][4][0])
+        return _getaddrinfo(host_name, family)
     except (MKTerminate, MKTimeout):
         # We should be more specific with the exception handler below, then we
         # could drop this special handling here
@@ -216,10 +237,134 @@ def _actual_dns_lookup(
     except Exception as e:
         if fallback:
             return fallback
-        family_str = {socket.AF_INET: "IPv4", socket.AF_INET6: "IPv6"}[family]
-        raise MKIPAddressLookupError(
-            f"Failed to lookup {family_str} address of {host_name} via DNS: {e}"
-        )
+        raise _lookup_error(host_name, family, e)
+
+
+def resolve_concurrently(
+    cache_ids: Iterable[IPLookupCacheId],
+    *,
+    resolver: Resolver = _getaddrinfo,
+    max_workers: int = _MAX_CONCURRENT_LOOKUPS,
+    timeout: float = _LOOKUP_TIMEOUT,
+) -> dict[IPLookupCacheId, HostAddress | Exception]:
+    """Resolve many host names at once, return the address or the error for each of them
+
+    At most `max_workers` lookups run at the same time. A lookup that has not finished
+    `timeout` seconds after it started fails with a TimeoutError. Its thread can not be
+    stopped, it ends with the timeout of the system resolver.
+    """
+    started: dict[IPLookupCacheId, float] = {}
+
+    def _lookup(cache_id: IPLookupCacheId) -> HostAddress:
+        started[cache_id] = time.monotonic()
+        return resolver(*cache_id)
+
+    results: dict[IPLookupCacheId, HostAddress | Exception] = {}
+    executor = concurrent.futures.ThreadPoolExecutor(
+        max_workers=max_workers, thread_name_prefix="dns-lookup"
+    )
+    try:
+        pending = {
+            executor.submit(_lookup, cache_id): cache_id for cache_id in dict.fromkeys(cache_ids)
+        }
+        while pending:
+            deadlines = [started[c] + timeout for c in pending.values() if c in started]
+            done, _not_done = concurrent.futures.wait(
+                pending,
+                timeout=max(0.0, min(deadlines) - time.monotonic()) if deadlines else timeout,
+                return_when=concurrent.futures.FIRST_COMPLETED,
+            )
+            for future in done:
+                cache_id = pending.pop(future)
+                try:
+                    results[cache_id] = future.result()
+                except Exception as e:
+                    results[cache_id] = e
+
+            now = time.monotonic()
+            for future, cache_id in list(pending.items()):
+                if cache_id in started and started[cache_id] + timeout <= now:
+                    del pending[future]
+                    results[cache_id] = TimeoutError(f"No answer within {timeout} seconds")
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return results
+
+
+def cached_dns_lookups(
+    cache_ids: Iterable[IPLookupCacheId],
+    *,
+    force_file_cache_renewal: bool,
+    resolver: Resolver = _getaddrinfo,
+) -> None:
+    """Fill both caching layers of cached_dns_lookup() for many hosts at once
+
+    The host names not yet known are resolved concurrently and the file cache is written
+    once for all of them. Afterwards, cached_dns_lookup() answers from the config cache.
+    """
+    cache: dict[
+        tuple[HostName | HostAddress, socket.AddressFamily], HostAddress | MKIPAddressLookupError
+    ] = cache_manager.obtain_cache("cached_dns_lookup")
+    ip_lookup_cache = _get_ip_lookup_cache()
+
+    fallbacks: dict[IPLookupCacheId, HostAddress | None] = {}
+    for cache_id in cache_ids:
+        if cache_id in cache:
+            continue
+        cached_ip = ip_lookup_cache.get(cache_id)
+        if cached_ip and not force_file_cache_renewal:
+            cache[cache_id] = cached_ip
+            continue
+        fallbacks[cache_id] = cached_ip
+
+    if not fallbacks:
+        return
+
+    console.verbose(f"Resolving {len(fallbacks)} host names via DNS...")
+    with ip_lookup_cache.batched_updates():
+        for (hostname, family), result in resolve_concurrently(
+            fallbacks, resolver=resolver
+        ).items():
+            cached_ip = fallbacks[(hostname, family)]
+            if isinstance(result, Exception):
+                if not cached_ip:
+                    cache[(hostname, family)] = _lookup_error(hostname, family, result)
+                    continue
+                result = cached_ip
+
+            if result != cached_ip:
+                family_str = {socket.AF_INET: "IPv4", socket.AF_INET6: "IPv6"}[family]
+                console.verbose(f"Updating {family_str} DNS cache for {hostname}: {result}")
+                ip_lookup_cache[(hostname, family)] = result
+            cache[(hostname, family)] = result
+
+
+def prefetch_dns_lookups(
+    *,
+    ip_lookup_configs: Iterable[IPLookupConfig],
+    configured_ipv4_addresses: Mapping[HostName | HostAddress, HostAddress],
+    configured_ipv6_addresses: Mapping[HostName | HostAddress, HostAddress],
+    simulation_mode: bool,
+    override_dns: HostAddress | None,
+    force_file_cache_renewal: bool,
+) -> None:
+    """Resolve all hosts lookup_ip_address() would resolve via DNS, see cached_dns_lookups"""
+    if _fake_dns or override_dns or simulation_mode or _enforce_localhost:
+        return
+
+    cached_dns_lookups(
+        (
+            (host_name, family)
+            for host_name, host_config, family in _annotate_family(ip_lookup_configs)
+            if not (host_config.is_use_walk_host and host_config.is_snmp_host)
+            and not host_config.is_dyndns_host
+            and not (
+                configured_ipv4_addresses if family is socket.AF_INET else configured_ipv6_addresses
+            ).get(host_name)
+        ),
+        force_file_cache_renewal=force_file_cache_renewal,
+    )
 
 
 class IPLookupCacheSerializer:
@@ -254,6 +399,7 @@ class IPLookupCache:
     def __init__(self, cache: MutableMapping[IPLookupCacheId, HostAddress]) -> None:
         self._cache = cache
         self._persist_on_update = True
+        self._batched_updates: dict[IPLookupCacheId, HostAddress] | None = None
         self._store = store.ObjectStore(self.PATH, serializer=IPLookupCacheSerializer())
 
     @contextmanager
@@ -265,6 +411,22 @@ class IPLookupCache:
         finally:
             self._persist_on_update = old_persist_flag
 
+    @contextmanager
+    def batched_updates(self) -> Iterator[None]:
+        """Persist all updates made within the context at once when leaving it"""
+        if self._batched_updates is not None:
+            yield
+            return
+
+        updates: dict[IPLookupCacheId, HostAddress] = {}
+        self._batched_updates = updates
+        try:
+            yield
+        finally:
+            self._batched_updates = None
+            if updates:
+                self._persist(updates)
+
     def __repr__(self) -> str:
         return f"{type(self).__name__}({self._cache!r})"
 
@@ -297,17 +459,9 @@ class IPLookupCache:
         """Updates the cache with a new / changed entry
 
         When self.persist_on_update update is disabled, this simply updates the in-memory
-        cache without any persistence interaction. Otherwise:
-
-        The cache that was previously loaded into this IPLookupCache with load_persisted()
-        might be outdated compared to the current persisted lookup cache. Another process
-        might have updated the cache in the meantime.
-
-        The approach here is to load the currently persisted cache with a lock, then update
-        the current IPLookupCache with it, add the given new / changed entry and then write
-        out the resulting data structure.
-
-        This could really be solved in a better way, but may be sufficient for the moment.
+        cache without any persistence interaction. Within batched_updates(), the entry is
+        persisted together with all other updates when leaving the context. Otherwise it is
+        persisted right away, see _persist.
 
         The cache can only be cleaned up with the "Update DNS cache" option in WATO
         or the "cmk --update-dns-cache" call that both call update_dns_cache().
@@ -316,10 +470,30 @@ class IPLookupCache:
             self._cache[cache_id] = ipa
             return
 
-        with self._store.locked():
-            self._cache.update(self._store.read_obj(default={}))
+        if self._batched_updates is not None:
             self._cache[cache_id] = ipa
-            self.save_persisted()
+            self._batched_updates[cache_id] = ipa
+            return
+
+        self._persist({cache_id: ipa})
+
+    def _persist(self, updates: Mapping[IPLookupCacheId, HostAddress]) -> None:
+        """Add the new / changed entries to the persisted cache
+
+        The cache that was previously loaded into this IPLookupCache with load_persisted()
+        might be outdated compared to the current persisted lookup cache. Another process
+        might have updated the cache in the meantime.
+
+        The currently persisted cache is loaded with a lock and merged into this IPLookupCache
+        together with the updates. The result is only written out if the updates are not
+        persisted already.
+        """
+        with self._store.locked():
+            persisted = self._store.read_obj(default={})
+            self._cache.update(persisted)
+            self._cache.update(updates)
+            if any(persisted.get(cache_id) != ipa for cache_id, ipa in updates.items()):
+                self.save_persisted()
 
     def save_persisted(self) -> None:
         self._store.write_obj(self._cache)
@@ -354,12 +528,21 @@ def update_dns_cache(
     failed = []
 
     ip_lookup_cache = _get_ip_lookup_cache()
+    ip_lookup_configs = list(ip_lookup_configs)
 
     with ip_lookup_cache.persisting_disabled():
         console.verbose("Cleaning up existing DNS cache...")
         ip_lookup_cache.clear()
 
         console.verbose("Updating DNS cache...")
+        prefetch_dns_lookups(
+            ip_lookup_configs=ip_lookup_configs,
+            configured_ipv4_addresses=configured_ipv4_addresses,
+            configured_ipv6_addresses=configured_ipv6_addresses,
+            simulation_mode=simulation_mode,
+            override_dns=override_dns,
+            force_file_cache_renewal=True,
+        )
         # `_annotate_family()` handles DUAL_STACK and NO_IP
         for host_name, host_config, family in _annotate_family(ip_lookup_configs):
             console.verbose_no_lf(f"{host_name} ({family})...")
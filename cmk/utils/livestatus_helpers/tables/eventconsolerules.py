@@ -23,3 +23,24 @@ class Eventconsolerules(Table):
         description='The ID of the rule',
     )
     """The ID of the rule"""
+
+    rule_match_time = Column(
+        'rule_match_time',
+        col_type='float',
+        description='The time spent trying the rule on messages in seconds',
+    )
+    """The time spent trying the rule on messages in seconds"""
+
+    rule_prefiltered = Column(
+        'rule_prefiltered',
+        col_type='int',
+        description='The times the rule has been skipped because a required literal was missing in a message',
+    )
+    """The times the rule has been skipped because a required literal was missing in a message"""
+
+    rule_tries = Column(
+        'rule_tries',
+        col_type='int',
+        description='The times the rule has been tried on a message',
+    )
+    """The times the rule has been tried on a message"""
@@ -78,7 +78,8 @@ base_discovered_host_labels_dir = _omd_path("var/check_mk/discovered_host_labels
 discovered_host_labels_dir = base_discovered_host_labels_dir
 autodiscovery_dir = _omd_path_str("var/check_mk/autodiscovery")
 piggyback_dir = Path(tmp_dir, "piggyback")
-piggyback_source_dir = Path(tmp_dir, "piggyback_sources")
+piggyback_catalog_file = Path(tmp_dir, "piggyback_catalog.sqlite")
+counters_database_file = Path(tmp_dir, "counters.sqlite")
 profile_dir = Path(var_dir, "web")
 crash_dir = Path(var_dir, "crashes")
 diagnostics_dir = Path(var_dir, "diagnostics")
@@ -5,9 +5,10 @@
 
 import logging
 import math
+import struct
 from collections.abc import Callable, Iterable, Iterator, Sequence
 from pathlib import Path
-from typing import Final, Literal, NamedTuple, Protocol, Self
+from typing import Final, Literal, NamedTuple, Protocol, Self, TYPE_CHECKING
 
 from pydantic import BaseModel
 
@@ -15,6 +16,10 @@ from cmk.agent_based.prediction_backend import PredictionInfo
 
 from ._grouping import time_slices
 
+if TYPE_CHECKING:
+    import numpy as np
+    import numpy.typing as npt
+
 logger = logging.getLogger("cmk.prediction")
 
 
@@ -38,16 +43,10 @@ class DataStat(NamedTuple):
     max_: float
     stdev: float | None
 
-    @classmethod
-    def from_values(cls, values: Sequence[float]) -> Self:
-        """Statistically summarize all the measured values"""
-        average = sum(values) / float(len(values))
-        return cls(
-            average=average,
-            min_=min(values),
-            max_=max(values),
-            stdev=_std_dev(values, average),
-        )
+
+# magic, start, step
+_BINARY_HEADER = struct.Struct("<8sqq")
+_BINARY_MAGIC = b"CMKPRED1"
 
 
 class PredictionData(BaseModel, frozen=True):
@@ -55,6 +54,53 @@ class PredictionData(BaseModel, frozen=True):
     start: int
     step: int
 
+    def serialize(self) -> bytes:
+        """The compact binary form: A header followed by four little endian doubles per point
+
+        Missing points are stored as four NaNs, a missing standard deviation as NaN.
+        """
+        nan = float("nan")
+        values = [
+            value
+            for point in self.points
+            for value in (
+                (nan, nan, nan, nan)
+                if point is None
+                else (
+                    point.average,
+                    point.min_,
+                    point.max_,
+                    nan if point.stdev is None else point.stdev,
+                )
+            )
+        ]
+        return _BINARY_HEADER.pack(_BINARY_MAGIC, self.start, self.step) + struct.pack(
+            f"<{len(values)}d", *values
+        )
+
+    @classmethod
+    def deserialize(cls, raw: bytes) -> Self:
+        """Read the binary form, or the JSON written by older versions"""
+        if not raw.startswith(_BINARY_MAGIC):
+            return cls.model_validate_json(raw)
+        size = len(raw) - _BINARY_HEADER.size
+        if size < 0 or size % 32:
+            raise ValueError("Invalid prediction data: Incomplete header or point")
+        _magic, start, step = _BINARY_HEADER.unpack_from(raw)
+        values = struct.unpack_from(f"<{size // 8}d", raw, _BINARY_HEADER.size)
+        return cls(
+            points=[
+                (
+                    None
+                    if math.isnan(average)
+                    else DataStat(average, min_, max_, None if math.isnan(stdev) else stdev)
+                )
+                for average, min_, max_, stdev in zip(*[iter(values)] * 4)
+            ],
+            start=start,
+            step=step,
+        )
+
     def predict(self, timestamp: float) -> DataStat | None:
         unbound_index = round((timestamp - self.start) / self.step)
         # NOTE: A one hour prediction is valid for 24 hours, while the time range only covers one hour.
@@ -106,7 +152,7 @@ class PredictionStore:
     def save_prediction(self, meta: PredictionInfo, prediction: PredictionData) -> None:
         data_file = self._data_file(meta)
         data_file.parent.mkdir(exist_ok=True, parents=True)
-        data_file.write_text(prediction.model_dump_json())
+        data_file.write_bytes(prediction.serialize())
 
     def iter_all_metadata_files(self) -> Iterable[Path]:
         if not self.path.exists():
@@ -136,7 +182,7 @@ class PredictionStore:
             data_path = info_path.with_suffix(self.DATA_FILE_SUFFIX)
             try:
                 if info_path.stat().st_mtime >= data_path.stat().st_mtime:
-                    yield meta, PredictionData.model_validate_json(data_path.read_text())
+                    yield meta, PredictionData.deserialize(data_path.read_bytes())
             except FileNotFoundError:
                 pass
 
@@ -189,32 +235,86 @@ def _calculate_data_for_prediction(
 
 def _forward_fill_resample(
     current_range: range, values: Sequence[float | None], new_range: range
-) -> Sequence[float | None]:
+) -> "npt.NDArray[np.float64]":
+    """The values at the times of the new range, missing values are NaN"""
+    import numpy as np  # pylint: disable=import-outside-toplevel # only needed when predicting
+
+    array = np.array(values, dtype=np.float64)
     if current_range == new_range:
-        return values
+        return array
 
-    idx_max = len(values) - 1
-    return [
-        values[max(0, min(int((t - current_range.start) / current_range.step), idx_max))]
-        for t in new_range
-    ]
+    # Same as int((t - start) / step) for each t, clamped to the available values
+    indices = np.trunc(
+        (
+            np.arange(new_range.start, new_range.stop, new_range.step, dtype=np.int64)
+            - current_range.start
+        )
+        / current_range.step
+    )
+    return array[np.clip(indices, 0, len(array) - 1).astype(np.intp)]
 
 
 def _data_stats(slices: Iterable[Iterable[float | None]]) -> list[DataStat | None]:
-    "Statistically summarize all the upsampled RRD data"
-    return [  # can't inline this b/c it is unit tested :-/
+    """Statistically summarize all the upsampled RRD data
+
+    The slices are stacked into one array, the statistics are computed for each time column
+    over the slices with a value.
+    """
+    import numpy as np  # pylint: disable=import-outside-toplevel # only needed when predicting
+
+    rows = [np.asarray(s, dtype=np.float64) for s in slices]
+    if not rows:
+        return []
+    width = min(len(row) for row in rows)  # like zip()
+    data = np.stack([row[:width] for row in rows])
+
+    present = ~np.isnan(data)
+    samples = present.sum(axis=0)
+    values = np.where(present, data, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore", over="ignore"):
+        average = _sum(values) / samples
+        squares = _sum(values * values)
+        stdev = np.sqrt(np.abs(squares - average * average * samples) / (samples - 1))
+        minimum = np.fmin.reduce(data, axis=0)
+        maximum = np.fmax.reduce(data, axis=0)
+
+    return [
         (
-            DataStat.from_values(point_line)
-            if (point_line := [x for x in time_column if x is not None])
+            DataStat(
+                average=avg,
+                min_=min_,
+                max_=max_,
+                # In the case of a single data-point an unbiased standard deviation is undefined.
+                stdev=None if count == 1 else dev,
+            )
+            if count
             else None
         )
-        for time_column in zip(*slices)
+        for avg, min_, max_, dev, count in zip(
+            average.tolist(),
+            minimum.tolist(),
+            maximum.tolist(),
+            stdev.tolist(),
+            samples.tolist(),
+        )
     ]
 
 
-def _std_dev(point_line: Sequence[float], average: float) -> float | None:
-    samples = len(point_line)
-    # In the case of a single data-point an unbiased standard deviation is undefined.
-    if samples == 1:
-        return None
-    return math.sqrt(abs(sum(p**2 for p in point_line) - average**2 * samples) / float(samples - 1))
+def _sum(values: "npt.NDArray[np.float64]") -> "npt.NDArray[np.float64]":
+    """The column sums, computed exactly like the builtin sum() of Python floats
+
+    Python (since 3.12) sums up floats with Neumaier's compensated summation, which we have
+    to do as well (row by row) in order to get the same results. Adding 0.0 does not change
+    the sum, so missing values can be zeroed.
+    """
+    import numpy as np  # pylint: disable=import-outside-toplevel # only needed when predicting
+
+    total = np.zeros(values.shape[1])
+    compensation = np.zeros(values.shape[1])
+    for row in values:
+        new_total = total + row
+        compensation += np.where(
+            np.abs(total) >= np.abs(row), (total - new_total) + row, (row - new_total) + total
+        )
+        total = new_total
+    return np.where((compensation != 0) & np.isfinite(compensation), total + compensation, total)
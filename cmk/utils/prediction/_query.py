@@ -39,7 +39,7 @@ class PredictionQuerier:
 
     def query_prediction_data(self, meta: PredictionInfo) -> PredictionData:
         rel_filename = PredictionStore.relative_data_file(meta)
-        return PredictionData.model_validate_json(self._query_prediction_file_content(rel_filename))
+        return PredictionData.deserialize(self._query_prediction_file_content(rel_filename))
 
     def _query_prediction_files(self) -> Iterator[Path]:
         yield from (
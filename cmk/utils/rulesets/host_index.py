@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Inverted index of the configured hosts for the ruleset matching
+
+Every host gets a fixed bit position. Sets of hosts are represented as python integers
+("bitmaps") with one bit per host. This way the host conditions of a rule can be evaluated
+with a handful of bitwise operations instead of checking host by host.
+
+The bitmaps of the tags are computed upfront. Everything that is either expensive to compute
+(labels) or may have a lot of distinct values (folders, host name regexes) is evaluated lazily
+and only for the hosts that are actually asked for.
+"""
+
+import itertools
+from collections.abc import Callable, Iterable, Mapping, Sequence
+
+from cmk.utils.hostaddress import HostName
+from cmk.utils.labels import Labels
+from cmk.utils.regex import regex
+from cmk.utils.tags import TagGroupID, TagID
+
+__all__ = ["HostBitmapIndex"]
+
+# Translates the characters of a binary number string to "0x00" and "0x01" bytes which
+# can directly be used as selectors for itertools.compress()
+_BIT_SELECTORS = bytes.maketrans(b"01", b"\x00\x01")
+# Bitmaps with fewer than one host in _DENSE_RATIO set are built bit by bit. Denser ones are
+# parsed from a binary number string, which takes time proportional to the number of hosts.
+_DENSE_RATIO = 128
+
+
+class _LazyBitmap:
+    """Bitmap of a host predicate that is only evaluated for the hosts asked for"""
+
+    __slots__ = ("matches", "evaluated")
+
+    def __init__(self) -> None:
+        self.matches = 0
+        self.evaluated = 0
+
+
+class HostBitmapIndex:
+    def __init__(
+        self,
+        hosts: Iterable[HostName],
+        host_tags: Mapping[HostName, Iterable[tuple[TagGroupID, TagID | None]]],
+        host_paths: Mapping[HostName, str],
+    ) -> None:
+        self._hosts: Sequence[HostName] = list(dict.fromkeys(hosts))
+        self._positions: Mapping[str, int] = {
+            host_name: pos for pos, host_name in enumerate(self._hosts)
+        }
+        self.all_hosts = (1 << len(self._hosts)) - 1
+
+        tag_positions: dict[tuple[TagGroupID, TagID | None], list[int]] = {}
+        path_positions: dict[str, list[int]] = {}
+        for pos, host_name in enumerate(self._hosts):
+            for tag in host_tags.get(host_name, ()):
+                tag_positions.setdefault(tag, []).append(pos)
+            path_positions.setdefault(host_paths.get(host_name, "/"), []).append(pos)
+
+        self._tags = {tag: self._from_positions(pos) for tag, pos in tag_positions.items()}
+        self._path_positions = path_positions
+        self._folders: dict[str, int] = {}
+        self._labels: dict[tuple[str, str], _LazyBitmap] = {}
+        self._host_name_regexes: dict[str, _LazyBitmap] = {}
+
+    def clear_label_cache(self) -> None:
+        self._labels.clear()
+
+    def _from_positions(self, positions: Iterable[int]) -> int:
+        positions = list(positions)
+        if len(positions) * _DENSE_RATIO < len(self._hosts):
+            bitmap = 0
+            for pos in positions:
+                bitmap |= 1 << pos
+            return bitmap
+
+        bits = bytearray(b"0") * len(self._hosts)
+        for pos in positions:
+            bits[pos] = 0x31  # ASCII "1"
+        # The first host is the least significant bit
+        return int(bits[::-1], 2) if bits else 0
+
+    def bitmap(self, host_names: Iterable[str]) -> int:
+        """Returns the bitmap of the given hosts. Unknown hosts are ignored."""
+        return self._from_positions(
+            pos for host_name in host_names if (pos := self._positions.get(host_name)) is not None
+        )
+
+    def hosts(self, bitmap: int) -> set[HostName]:
+        """Returns the names of the hosts set in the bitmap"""
+        if not bitmap:
+            return set()
+        # bin() gives the most significant bit first, so reverse it and strip the "0b" prefix
+        return set(
+            itertools.compress(
+                self._hosts, bin(bitmap)[:1:-1].encode("ascii").translate(_BIT_SELECTORS)
+            )
+        )
+
+    def tag(self, taggroup_id: TagGroupID, tag_id: TagID | None) -> int:
+        return self._tags.get((taggroup_id, tag_id), 0)
+
+    def folder(self, folder_path: str) -> int:
+        """Returns the hosts located in the given folder or one of its subfolders"""
+        try:
+            return self._folders[folder_path]
+        except KeyError:
+            pass
+
+        return self._folders.setdefault(
+            folder_path,
+            self._from_positions(
+                pos
+                for host_path, positions in self._path_positions.items()
+                if host_path.startswith(folder_path)
+                for pos in positions
+            ),
+        )
+
+    def label(
+        self,
+        key: str,
+        value: str,
+        candidates: int,
+        labels_of_host: Callable[[HostName], Labels],
+    ) -> int:
+        """Returns the candidates having the label key:value
+
+        The labels are only looked up for candidates that have not been asked for before.
+        """
+        return self._evaluate_lazily(
+            self._labels.setdefault((key, value), _LazyBitmap()),
+            candidates,
+            lambda host_name: labels_of_host(host_name).get(key) == value,
+        )
+
+    def host_name_regex(self, pattern: str, candidates: int) -> int:
+        """Returns the candidates whose names match the regex pattern"""
+        compiled = regex(pattern)
+        return self._evaluate_lazily(
+            self._host_name_regexes.setdefault(pattern, _LazyBitmap()),
+            candidates,
+            lambda host_name: compiled.match(host_name) is not None,
+        )
+
+    def _evaluate_lazily(
+        self, lazy: _LazyBitmap, candidates: int, predicate: Callable[[HostName], bool]
+    ) -> int:
+        if missing := candidates & ~lazy.evaluated:
+            lazy.matches |= self.bitmap(
+                host_name for host_name in self.hosts(missing) if predicate(host_name)
+            )
+            lazy.evaluated |= missing
+        return lazy.matches & candidates
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Precomputed results of the host ruleset matching
+
+The config generation matches all host rulesets against all hosts anyway. The short living
+helper processes would have to do the same on every start, only to answer questions about
+a single host. Instead, the indices of the matching rules of every host are stored next to
+the core config. The helpers memory map that file and only unpickle the record of the host
+they are asked for.
+
+File layout:
+
+    header | host record | host record | ... | index
+
+The header contains the digest of the config the matches were computed for and the location
+of the index. The index maps the fingerprints of the rulesets to their number and the host
+names to the location of their record. A host record maps the number of a ruleset to the
+indices of the rules matching the host.
+"""
+
+from __future__ import annotations
+
+import mmap
+import pickle
+import struct
+from collections.abc import Iterable, Mapping, Sequence
+from pathlib import Path
+from typing import Final
+
+from cmk.utils.config_path import ConfigPath
+from cmk.utils.hostaddress import HostName
+
+__all__ = [
+    "HostRuleMatchCache",
+    "PrecomputedHostRuleMatchesStore",
+]
+
+_MAGIC: Final = b"CMKHRM01"
+# magic, config digest, offset of the index, length of the index
+_HEADER: Final = struct.Struct("<8s32sQQ")
+
+
+class HostRuleMatchCache:
+    def __init__(self, data: mmap.mmap) -> None:
+        self._data: Final = data
+        _magic, _digest, index_offset, index_length = _HEADER.unpack_from(data)
+        fingerprints, self._records = pickle.loads(  # nosec B301 # BNS:c3c5e9
+            data[index_offset : index_offset + index_length]
+        )
+        self._ruleset_numbers: Mapping[str, int] = {
+            fingerprint: number for number, fingerprint in enumerate(fingerprints)
+        }
+        self._host_records: dict[HostName, Mapping[int, Sequence[int]]] = {}
+
+    def rule_indices(self, host_name: HostName, fingerprint: str) -> Sequence[int] | None:
+        """Returns the indices of the rules matching the host
+
+        None is returned in case the host or the ruleset has not been precomputed.
+        """
+        if (ruleset_number := self._ruleset_numbers.get(fingerprint)) is None:
+            return None
+
+        try:
+            record = self._host_records[host_name]
+        except KeyError:
+            if (location := self._records.get(host_name)) is None:
+                return None
+            offset, length = location
+            record = self._host_records.setdefault(
+                host_name,
+                pickle.loads(self._data[offset : offset + length]),  # nosec B301 # BNS:c3c5e9
+            )
+
+        return record.get(ruleset_number, ())
+
+
+class PrecomputedHostRuleMatchesStore:
+    """Caring about persistence of the precomputed host ruleset matches"""
+
+    def __init__(self, path: Path) -> None:
+        self.path: Final = path
+
+    @classmethod
+    def from_serial(cls, config_path: ConfigPath) -> PrecomputedHostRuleMatchesStore:
+        return cls(Path(config_path) / "precomputed_host_rule_matches")
+
+    def write(
+        self,
+        config_digest: bytes,
+        host_names: Iterable[HostName],
+        matches: Mapping[str, Mapping[HostName, Sequence[int]]],
+    ) -> None:
+        """Store the matches of the rulesets
+
+        The matches map the fingerprints of the rulesets (see ruleset_fingerprint()) to the
+        indices of the matching rules per host. Every host of host_names is treated as
+        precomputed, even if no rule at all matches it.
+        """
+        # Sorted, so the same matches always result in the same file
+        fingerprints = sorted(matches)
+        host_records: dict[HostName, dict[int, tuple[int, ...]]] = {
+            host_name: {} for host_name in sorted(host_names)
+        }
+        for number, fingerprint in enumerate(fingerprints):
+            for host_name, indices in matches[fingerprint].items():
+                if (record := host_records.get(host_name)) is not None:
+                    record[number] = tuple(sorted(indices))
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".new")
+        with tmp_path.open("wb") as f:
+            f.write(b"\0" * _HEADER.size)
+            locations: dict[HostName, tuple[int, int]] = {}
+            for host_name, record in host_records.items():
+                raw = pickle.dumps(record)
+                locations[host_name] = f.tell(), len(raw)
+                f.write(raw)
+
+            index_offset = f.tell()
+            raw_index = pickle.dumps((fingerprints, locations))
+            f.write(raw_index)
+
+            f.seek(0)
+            f.write(_HEADER.pack(_MAGIC, config_digest, index_offset, len(raw_index)))
+        tmp_path.rename(self.path)
+
+    def load(self, config_digest: bytes) -> HostRuleMatchCache | None:
+        """Returns the precomputed matches, if they have been computed for the given config"""
+        try:
+            with self.path.open("rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            # ValueError: mmap of an empty file
+            return None
+
+        if len(data) < _HEADER.size or _HEADER.unpack_from(data)[:2] != (_MAGIC, config_digest):
+            data.close()
+            return None
+
+        return HostRuleMatchCache(data)
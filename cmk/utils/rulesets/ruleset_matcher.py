@@ -6,6 +6,7 @@
 
 import contextlib
 import dataclasses
+import hashlib
 from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
 from re import Pattern
 from typing import (
@@ -42,6 +43,8 @@ from cmk.utils.servicename import Item, ServiceName
 from cmk.utils.tags import TagConfig, TagGroupID, TagID
 
 from .conditions import HostOrServiceConditions, HostOrServiceConditionsSimple
+from .host_index import HostBitmapIndex
+from .match_cache import HostRuleMatchCache
 
 RulesetName = str  # Could move to a less cluttered module as it is often used on its own.
 TRuleValue = TypeVar("TRuleValue")
@@ -144,6 +147,17 @@ def is_disabled(rule: RuleSpec[TRuleValue]) -> bool:
     return "options" in rule and bool(rule["options"].get("disabled", False))
 
 
+def ruleset_fingerprint(ruleset: Sequence[RuleSpec[TRuleValue]]) -> str:
+    """Identifies a ruleset by everything that influences the matching of the hosts
+
+    The identity of the ruleset objects can not be used for this, because they differ between
+    the process computing and the processes using precomputed matches.
+    """
+    return hashlib.sha256(
+        repr([(rule["condition"], is_disabled(rule)) for rule in ruleset]).encode("utf-8")
+    ).hexdigest()
+
+
 class LabelManager(NamedTuple):
     """Helper class to manage access to the host and service labels"""
 
@@ -261,6 +275,13 @@ class RulesetMatcher:
     ) -> Sequence[TRuleValue]:
         """Returns a generator of the values of the matched rules."""
 
+        if (
+            not self._debug_matching_stats
+            and (precomputed := self.ruleset_optimizer.precomputed_host_values(hostname, ruleset))
+            is not None
+        ):
+            return precomputed
+
         # When the requested host is part of the local sites configuration,
         # then use only the sites hosts for processing the rules
         with_foreign_hosts = hostname not in self.ruleset_optimizer.all_processed_hosts()
@@ -510,8 +531,6 @@ class RulesetOptimizer:
         self.__labels_of_host: dict[HostName, Labels] = {}
         self._ruleset_matcher = ruleset_matcher
         self._label_manager = label_manager
-        self._host_tags = {hn: set(tags_of_host.items()) for hn, tags_of_host in host_tags.items()}
-        self._host_paths = host_paths
         self._clusters_of = clusters_of
         self._nodes_of = nodes_of
 
@@ -522,27 +541,28 @@ class RulesetOptimizer:
         # is enabled.
         self._all_processed_hosts = self._all_configured_hosts
 
-        # A factor which indicates how much hosts share the same host tag configuration (excluding folders).
-        # len(all_processed_hosts) / len(different tag combinations)
-        # It is used to determine the best rule evualation method
-        self._all_processed_hosts_similarity = 1.0
+        # One bitmap per tag, label and folder. The host conditions of the rules are
+        # evaluated as bitmap operations on this index.
+        self._host_index = HostBitmapIndex(
+            self._all_configured_hosts,
+            {hn: tags_of_host.items() for hn, tags_of_host in host_tags.items()},
+            host_paths,
+        )
+        self._all_processed_hosts_bitmap = self._host_index.all_hosts
+
+        # Host ruleset matches computed by another process, e.g. during the config generation
+        self._precomputed_host_matches: HostRuleMatchCache | None = None
+        # The rulesets are kept, so their ids are not reused by other rulesets
+        self._ruleset_fingerprints: dict[int, tuple[Sequence[RuleSpec[Any]], str]] = {}
 
         self.__service_ruleset_cache: dict[tuple[int, bool], PreprocessedServiceRuleset] = {}
         self.__host_ruleset_cache: dict[tuple[int, bool], Mapping[HostAddress, Sequence[Any]]] = {}
         self._all_matching_hosts_match_cache: dict[tuple[ConditionCacheID, bool], set[HostName]] = (
             {}
         )
-
-        # Reference dirname -> hosts in this dir including subfolders
-        self._folder_host_lookup: dict[tuple[bool, str], set[HostName]] = {}
-
-        # Provides a list of hosts with the same hosttags, excluding the folder
-        self._hosts_grouped_by_tags: dict[tuple[tuple[TagGroupID, TagID], ...], set[HostName]] = {}
-        # Reference hostname -> tag group reference
-        self._host_grouped_ref: dict[HostName, tuple[tuple[TagGroupID, TagID], ...]] = {}
-
-        # TODO: Clean this one up?
-        self._initialize_host_lookup()
+        # The hosts of the rules without host conditions. Labels do not matter for them, so
+        # this is only cleared when the processed hosts change.
+        self._hosts_within_folder_cache: dict[tuple[str, bool], set[HostName]] = {}
 
         self._debug_matching_stats = debug_matching_stats
         self.matching_stats: dict[int, HostRulesetMatchingStats | ServiceRulesetMatchingStats] = {}
@@ -554,6 +574,46 @@ class RulesetOptimizer:
     def clear_caches(self) -> None:
         self.__host_ruleset_cache.clear()
         self._all_matching_hosts_match_cache.clear()
+        self._host_index.clear_label_cache()
+        # The labels of the hosts may have changed, so the precomputed matches are outdated
+        self._precomputed_host_matches = None
+        self._ruleset_fingerprints.clear()
+
+    def set_precomputed_host_matches(self, precomputed: HostRuleMatchCache | None) -> None:
+        self._precomputed_host_matches = precomputed
+
+    def precomputed_host_values(
+        self, hostname: HostName | HostAddress, ruleset: Sequence[RuleSpec[TRuleValue]]
+    ) -> Sequence[TRuleValue] | None:
+        """Returns the values of the matching rules, if they have been precomputed"""
+        if self._precomputed_host_matches is None:
+            return None
+
+        try:
+            _ruleset, fingerprint = self._ruleset_fingerprints[id(ruleset)]
+        except KeyError:
+            _ruleset, fingerprint = self._ruleset_fingerprints.setdefault(
+                id(ruleset), (ruleset, ruleset_fingerprint(ruleset))
+            )
+
+        if (indices := self._precomputed_host_matches.rule_indices(hostname, fingerprint)) is None:
+            return None
+        return [ruleset[index]["value"] for index in indices]
+
+    def host_rule_indices(
+        self, ruleset: Sequence[RuleSpec[TRuleValue]]
+    ) -> Mapping[HostName, Sequence[int]]:
+        """Returns the indices of the rules matching each of the processed hosts
+
+        This is the input for the precomputed host matches of other processes.
+        """
+        host_rule_indices: dict[HostName, list[int]] = {}
+        for index, rule in enumerate(ruleset):
+            if is_disabled(rule):
+                continue
+            for hostname in self._all_matching_hosts(rule["condition"], with_foreign_hosts=False):
+                host_rule_indices.setdefault(hostname, []).append(index)
+        return host_rule_indices
 
     def all_processed_hosts(self) -> Sequence[HostName]:
         """Returns a set of all processed hosts"""
@@ -575,24 +635,8 @@ class RulesetOptimizer:
         # Only add references to configured hosts
         nodes_and_clusters.intersection_update(self._all_configured_hosts)
         self._all_processed_hosts = list(nodes_and_clusters)
-
-        # The folder host lookup includes a list of all -processed- hosts within a given
-        # folder. Any update with set_all_processed hosts invalidates this cache, because
-        # the scope of relevant hosts has changed. This is -good-, since the values in this
-        # lookup are iterated one by one later on in all_matching_hosts
-        self._folder_host_lookup = {}
-
-        used_groups = {
-            self._host_grouped_ref.get(hostname, ()) for hostname in self._all_processed_hosts
-        }
-
-        if not used_groups:
-            self._all_processed_hosts_similarity = 1.0
-            return
-
-        self._all_processed_hosts_similarity = (
-            1.0 * len(self._all_processed_hosts) / len(used_groups)
-        )
+        self._all_processed_hosts_bitmap = self._host_index.bitmap(self._all_processed_hosts)
+        self._hosts_within_folder_cache.clear()
 
     def _compute_all_matching_hosts_stats(
         self, ruleset_id: int, condition_id: tuple[ConditionCacheID, bool]
@@ -745,7 +789,7 @@ class RulesetOptimizer:
             with_foreign_hosts,
         )
 
-    def _all_matching_hosts(  # pylint: disable=too-many-branches
+    def _all_matching_hosts(
         self, condition: RuleConditionsSpec, with_foreign_hosts: bool
     ) -> set[HostName]:
         """Returns a set containing the names of hosts that match the given
@@ -761,64 +805,42 @@ class RulesetOptimizer:
         except KeyError:
             pass
 
-        # Thin out the valid hosts further. If the rule is located in a folder
-        # we only need the intersection of the folders hosts and the previously determined valid_hosts
-        valid_hosts = self._get_hosts_within_folder(rule_path, with_foreign_hosts)
-
-        if tag_conditions and hostlist is None and not label_groups:
-            # TODO: Labels could also be optimized like the tags
-            matched_by_tags = self._match_hosts_by_tags(cache_id, valid_hosts, tag_conditions)
-            if matched_by_tags is not None:
-                return matched_by_tags
-
-        matching: set[HostName] = set()
-        only_specific_hosts = (
-            hostlist is not None
-            and not isinstance(hostlist, dict)
-            and all(not isinstance(x, dict) for x in hostlist)
-        )
-
         if hostlist == []:
-            pass  # Empty host list -> Nothing matches
-
-        elif not tag_conditions and not label_groups and not hostlist:
-            # If no tags are specified and the hostlist only include @all (all hosts)
-            matching = valid_hosts
+            # Empty host list -> Nothing matches
+            return self._all_matching_hosts_match_cache.setdefault(cache_id, set())
 
-        elif (
-            not tag_conditions and not label_groups and only_specific_hosts and hostlist is not None
-        ):
-            # If no tags are specified and there are only specific hosts we already have the matches
-            matching = valid_hosts.intersection(hostlist)
-
-        else:
-            # If the rule has only exact host restrictions, we can thin out the list of hosts to check
-            if only_specific_hosts and hostlist is not None:
-                hosts_to_check = valid_hosts.intersection(hostlist)
-            else:
-                hosts_to_check = valid_hosts
-
-            for hostname in hosts_to_check:
-                # When no tag matching is requested, do not filter by tags. Accept all hosts
-                # and filter only by hostlist
-                if tag_conditions and not matches_host_tags(
-                    self._host_tags[hostname],
-                    tag_conditions,
-                ):
-                    continue
-
-                if label_groups:
-                    host_labels = self.labels_of_host(hostname)
-                    if not matches_labels(host_labels, label_groups):
-                        continue
+        if not tag_conditions and not hostlist and not label_groups:
+            return self._all_matching_hosts_match_cache.setdefault(
+                cache_id, self._get_hosts_within_folder(rule_path, with_foreign_hosts)
+            )
 
-                if not matches_host_name(hostlist, hostname):
-                    continue
+        # Every condition thins out the candidates further, so the cheap ones come first.
+        # The labels are only computed for the hosts that are left over at the end.
+        candidates = self._folder_candidates(rule_path, with_foreign_hosts)
+        if candidates and tag_conditions:
+            candidates = self._match_host_tags(candidates, tag_conditions)
+        if candidates and hostlist:
+            candidates = self._match_host_name(candidates, hostlist)
+        if candidates and label_groups:
+            candidates = self._match_host_labels(candidates, label_groups)
+
+        return self._all_matching_hosts_match_cache.setdefault(
+            cache_id, self._host_index.hosts(candidates)
+        )
 
-                matching.add(hostname)
+    def _folder_candidates(self, rule_path: str, with_foreign_hosts: bool) -> int:
+        return self._host_index.folder(rule_path) & (
+            self._host_index.all_hosts if with_foreign_hosts else self._all_processed_hosts_bitmap
+        )
 
-        self._all_matching_hosts_match_cache[cache_id] = matching
-        return matching
+    def _get_hosts_within_folder(self, rule_path: str, with_foreign_hosts: bool) -> set[HostName]:
+        try:
+            return self._hosts_within_folder_cache[(rule_path, with_foreign_hosts)]
+        except KeyError:
+            return self._hosts_within_folder_cache.setdefault(
+                (rule_path, with_foreign_hosts),
+                self._host_index.hosts(self._folder_candidates(rule_path, with_foreign_hosts)),
+            )
 
     @staticmethod
     def _condition_cache_id(
@@ -854,98 +876,76 @@ class RulesetOptimizer:
             rule_path,
         )
 
-    # TODO: Generalize this optimization: Build some kind of key out of the tag conditions
-    # (positive, negative, ...). Make it work with the new tag group based "$or" handling.
-    def _match_hosts_by_tags(
-        self,
-        cache_id: tuple[ConditionCacheID, bool],
-        valid_hosts: set[HostName],
-        tag_conditions: Mapping[TagGroupID, TagCondition],
-    ) -> set[HostName] | None:
-        matching = set()
-        negative_match_tags = set()
-        positive_match_tags = set()
+    def _match_host_tags(
+        self, candidates: int, tag_conditions: Mapping[TagGroupID, TagCondition]
+    ) -> int:
+        """Bitmap version of matches_host_tags()"""
         for taggroup_id, tag_condition in tag_conditions.items():
             if isinstance(tag_condition, dict):
                 if "$ne" in tag_condition:
-                    negative_match_tags.add(
-                        (
-                            taggroup_id,
-                            cast(TagConditionNE, tag_condition)["$ne"],
-                        )
+                    candidates &= ~self._host_index.tag(
+                        taggroup_id, cast(TagConditionNE, tag_condition)["$ne"]
                     )
-                    continue
-
-                if "$or" in tag_condition:
-                    return None  # Can not be optimized, makes _all_matching_hosts proceed
-
-                if "$nor" in tag_condition:
-                    return None  # Can not be optimized, makes _all_matching_hosts proceed
-
-                raise NotImplementedError()
-
-            positive_match_tags.add((taggroup_id, tag_condition))
-
-        # TODO:
-        # if has_specific_folder_tag or self._all_processed_hosts_similarity < 3.0:
-        if self._all_processed_hosts_similarity < 3.0:
-            # Without shared folders
-            for hostname in valid_hosts:
-                if positive_match_tags <= self._host_tags[
-                    hostname
-                ] and not negative_match_tags.intersection(self._host_tags[hostname]):
-                    matching.add(hostname)
-
-            self._all_matching_hosts_match_cache[cache_id] = matching
-            return matching
+                elif "$or" in tag_condition:
+                    candidates &= self._any_host_tag(
+                        taggroup_id, cast(TagConditionOR, tag_condition)["$or"]
+                    )
+                elif "$nor" in tag_condition:
+                    candidates &= ~self._any_host_tag(
+                        taggroup_id, cast(TagConditionNOR, tag_condition)["$nor"]
+                    )
+                else:
+                    raise NotImplementedError()
+            else:
+                candidates &= self._host_index.tag(taggroup_id, tag_condition)
 
-        # With shared folders
-        checked_hosts: set[str] = set()
-        for hostname in valid_hosts:
-            if hostname in checked_hosts:
-                continue
+            if not candidates:
+                break
 
-            hosts_with_same_tag = self._filter_hosts_with_same_tags_as_host(hostname, valid_hosts)
-            checked_hosts.update(hosts_with_same_tag)
+        return candidates
 
-            if positive_match_tags <= self._host_tags[
-                hostname
-            ] and not negative_match_tags.intersection(self._host_tags[hostname]):
-                matching.update(hosts_with_same_tag)
+    def _any_host_tag(self, taggroup_id: TagGroupID, tag_ids: Iterable[TagID | None]) -> int:
+        bitmap = 0
+        for tag_id in tag_ids:
+            bitmap |= self._host_index.tag(taggroup_id, tag_id)
+        return bitmap
 
-        self._all_matching_hosts_match_cache[cache_id] = matching
-        return matching
+    def _match_host_name(self, candidates: int, hostlist: HostOrServiceConditions) -> int:
+        """Bitmap version of matches_host_name()"""
+        negate, host_entries = parse_negated_condition_list(hostlist)
 
-    def _filter_hosts_with_same_tags_as_host(
-        self,
-        hostname: HostName,
-        hosts: set[HostName],
-    ) -> set[HostName]:
-        return self._hosts_grouped_by_tags[self._host_grouped_ref[hostname]].intersection(hosts)
-
-    def _get_hosts_within_folder(self, folder_path: str, with_foreign_hosts: bool) -> set[HostName]:
-        cache_id = with_foreign_hosts, folder_path
-        if cache_id not in self._folder_host_lookup:
-            hosts_in_folder = set()
-            relevant_hosts = (
-                self._all_configured_hosts if with_foreign_hosts else self._all_processed_hosts
-            )
+        matching = self._host_index.bitmap(
+            entry for entry in host_entries if not isinstance(entry, dict)
+        )
+        for entry in host_entries:
+            if isinstance(entry, dict):
+                matching |= self._host_index.host_name_regex(entry["$regex"], candidates)
+
+        return candidates & ~matching if negate else candidates & matching
+
+    def _match_host_labels(self, candidates: int, label_groups: LabelGroups) -> int:
+        """Bitmap version of matches_labels()"""
+        overall_match = candidates
+        for group_operator, label_group in label_groups:
+            group_match = candidates
+            for label_operator, label in label_group:
+                if not label:
+                    continue
 
-            for hostname in relevant_hosts:
-                host_path = self._host_paths.get(hostname, "/")
-                if host_path.startswith(folder_path):
-                    hosts_in_folder.add(hostname)
+                try:
+                    key, value = label.split(":")
+                except ValueError:
+                    raise NotImplementedError(f"Invalid label condition: {label}")
 
-            self._folder_host_lookup[cache_id] = hosts_in_folder
-            return hosts_in_folder
+                group_match = _and_or_not_bitmap_match(
+                    group_match,
+                    self._host_index.label(key, value, candidates, self.labels_of_host),
+                    label_operator,
+                )
 
-        return self._folder_host_lookup[cache_id]
+            overall_match = _and_or_not_bitmap_match(overall_match, group_match, group_operator)
 
-    def _initialize_host_lookup(self) -> None:
-        for hostname in self._all_configured_hosts:
-            group_ref = tuple(sorted(self._host_tags[hostname]))
-            self._hosts_grouped_by_tags.setdefault(group_ref, set()).add(hostname)
-            self._host_grouped_ref[hostname] = group_ref
+        return overall_match
 
     def labels_of_host(self, hostname: HostName) -> Labels:
         """Returns the effective set of host labels from all available sources
@@ -1172,6 +1172,16 @@ def _and_or_not_group_match(
             return given_group_match and not new_single_match
 
 
+def _and_or_not_bitmap_match(given_match: int, new_match: int, operator: AndOrNotLiteral) -> int:
+    match operator:
+        case "and":
+            return given_match & new_match
+        case "or":
+            return given_match | new_match
+        case "not":
+            return given_match & ~new_match
+
+
 def matches_service_conditions(
     service_description_condition: tuple[bool, Pattern[str]],
     service_labels_condition: LabelGroups,
@@ -9,9 +9,14 @@ structured monitoring data of Check_MK.
 
 from __future__ import annotations
 
+import functools
 import gzip
-import io
+import marshal
+import os
 import pprint
+import shutil
+import struct
+import zlib
 from collections import Counter
 from collections.abc import Callable, Iterable, Mapping, Sequence
 from dataclasses import dataclass, field
@@ -1635,13 +1640,131 @@ def load_tree(filepath: Path) -> ImmutableTree:
     return ImmutableTree()
 
 
+# The binary tree files consist of a header, an index and the nodes. The nodes are stored in
+# pre-order, so the nodes of a subtree are contiguous. Each entry of the index is the path of a
+# node with the offset and length of its attributes and table, marshalled on their own.
+# The header records the size and modification time of the tree file written along with the
+# binary file. The tree files remain the files for Livestatus (mk_inventory, structured_status);
+# when they have been written by someone else, the binary file is outdated and ignored.
+_BINARY_TREE_SUFFIX = ".sdt"
+_BINARY_TREE_MAGIC = b"CMKSDT"
+_BINARY_TREE_VERSION = 1
+# magic, version, size and modification time (ns) of the tree file, length of the index
+_BINARY_TREE_HEADER = struct.Struct("<6sBxqqq")
+
+_BinaryTreeIndex = list[tuple[SDPath, int, int]]
+
+
+def _serialize_binary_tree(raw_tree: SDRawTree, tree_file_stat: os.stat_result) -> bytes:
+    index: _BinaryTreeIndex = []
+    chunks: list[bytes] = []
+    offset = 0
+    # Pre-order, children in the order of the raw tree
+    stack: list[tuple[SDPath, SDRawTree]] = [((), raw_tree)]
+    while stack:
+        path, raw_node = stack.pop()
+        # TypedDicts are plain dicts
+        chunk = marshal.dumps((raw_node["Attributes"], raw_node["Table"]))  # type: ignore[arg-type]
+        index.append((path, offset, len(chunk)))
+        chunks.append(chunk)
+        offset += len(chunk)
+        stack.extend(
+            (path + (name,), raw_child) for name, raw_child in reversed(raw_node["Nodes"].items())
+        )
+
+    raw_index = marshal.dumps(index)
+    return b"".join(
+        [
+            _BINARY_TREE_HEADER.pack(
+                _BINARY_TREE_MAGIC,
+                _BINARY_TREE_VERSION,
+                tree_file_stat.st_size,
+                tree_file_stat.st_mtime_ns,
+                len(raw_index),
+            ),
+            raw_index,
+            *chunks,
+        ]
+    )
+
+
+def _with_ancestors(path: SDPath, tree: ImmutableTree) -> ImmutableTree:
+    """Place the tree at the path into otherwise empty nodes"""
+    for depth in reversed(range(len(path))):
+        tree = ImmutableTree(path=path[:depth], nodes_by_name={path[depth]: tree})
+    return tree
+
+
+def _load_binary_tree(
+    filepath: Path, tree_file_stat: os.stat_result, path: SDPath
+) -> ImmutableTree | None:
+    """Load the subtree at the path, None if the binary file is missing, unreadable or outdated"""
+    try:
+        with filepath.open("rb") as f:
+            magic, version, size, mtime_ns, index_length = _BINARY_TREE_HEADER.unpack(
+                f.read(_BINARY_TREE_HEADER.size)
+            )
+            if (
+                magic != _BINARY_TREE_MAGIC
+                or version != _BINARY_TREE_VERSION
+                or (size, mtime_ns) != (tree_file_stat.st_size, tree_file_stat.st_mtime_ns)
+            ):
+                return None
+
+            index: _BinaryTreeIndex = marshal.loads(f.read(index_length))
+            selected = [entry for entry in index if entry[0][: len(path)] == path]
+            if not selected:
+                return ImmutableTree()
+
+            start = selected[0][1]
+            f.seek(_BINARY_TREE_HEADER.size + index_length + start)
+            data = memoryview(f.read(selected[-1][1] + selected[-1][2] - start))
+            raw_nodes = [
+                (node_path, marshal.loads(data[offset - start : offset - start + length]))
+                for node_path, offset, length in selected
+            ]
+    except (OSError, EOFError, ValueError, TypeError, struct.error):
+        return None
+
+    # Bottom-up, the children of a node are collected before the node itself
+    children_by_path: dict[SDPath, dict[SDNodeName, ImmutableTree]] = {}
+    node = ImmutableTree()
+    for node_path, (raw_attributes, raw_table) in reversed(raw_nodes):
+        node = ImmutableTree(
+            path=node_path,
+            attributes=ImmutableAttributes.deserialize(raw_attributes),
+            table=ImmutableTable.deserialize(raw_table),
+            nodes_by_name=dict(reversed(children_by_path.pop(node_path, {}).items())),
+        )
+        if len(node_path) > len(path):
+            children_by_path.setdefault(node_path[:-1], {})[node_path[-1]] = node
+    return _with_ancestors(path, node)
+
+
 class TreeStore:
     def __init__(self, tree_dir: Path | str) -> None:
         self._tree_dir = Path(tree_dir)
         self._last_filepath = Path(tree_dir) / ".last"
 
-    def load(self, *, host_name: HostName) -> ImmutableTree:
-        return load_tree(self._tree_file(host_name))
+    def load(self, *, host_name: HostName, path: SDPath = ()) -> ImmutableTree:
+        """Load the tree of the host, or only the subtree at the path and its ancestors
+
+        The subtrees are deserialized from the binary file, if it is up to date. Otherwise, the
+        whole tree is loaded from the tree file.
+        """
+        tree_file = self._tree_file(host_name)
+        try:
+            tree_file_stat = tree_file.stat()
+        except FileNotFoundError:
+            return ImmutableTree()
+
+        if (
+            tree := _load_binary_tree(self._binary_file(host_name), tree_file_stat, path)
+        ) is not None:
+            return tree
+
+        tree = load_tree(tree_file)
+        return _with_ancestors(path, tree.get_tree(path)) if path else tree
 
     def save(self, *, host_name: HostName, tree: MutableTree, pretty: bool = False) -> None:
         self._tree_dir.mkdir(parents=True, exist_ok=True)
@@ -1649,19 +1772,47 @@ class TreeStore:
         tree_file = self._tree_file(host_name)
 
         output = tree.serialize()
-        store.save_object_to_file(tree_file, output, pretty=pretty)
-
-        buf = io.BytesIO()
-        with gzip.GzipFile(fileobj=buf, mode="wb") as f:
-            f.write((repr(output) + "\n").encode("utf-8"))
-        store.save_bytes_to_file(self._gz_file(host_name), buf.getvalue())
+        raw_output = repr(output) + "\n"
+        store.save_text_to_file(tree_file, pprint.pformat(output) + "\n" if pretty else raw_output)
+        store.save_bytes_to_file(
+            self._gz_file(host_name), gzip.compress(raw_output.encode("utf-8"))
+        )
+        self._save_binary(host_name, output)
 
         # Inform Livestatus about the latest inventory update
         self._last_filepath.touch()
 
+    def _save_binary(self, host_name: HostName, raw_tree: SDRawTree) -> None:
+        binary_file = self._binary_file(host_name)
+        try:
+            content = _serialize_binary_tree(raw_tree, self._tree_file(host_name).stat())
+        except ValueError:
+            # Values marshal does not support. The tree file is loaded instead.
+            binary_file.unlink(missing_ok=True)
+            return
+        store.save_bytes_to_file(binary_file, content)
+
+    def migrate(self) -> list[HostName]:
+        """Write the binary files of the tree files having none or an outdated one
+
+        Returns the names of the hosts whose binary files have been written.
+        """
+        migrated = []
+        for tree_file in sorted(self._tree_dir.glob("[!.]*")):
+            if tree_file.suffix in (".gz", _BINARY_TREE_SUFFIX) or not tree_file.is_file():
+                continue
+            host_name = HostName(tree_file.name)
+            tree_file_stat = tree_file.stat()
+            if _load_binary_tree(self._binary_file(host_name), tree_file_stat, ()) is not None:
+                continue
+            self._save_binary(host_name, load_tree(tree_file).serialize())
+            migrated.append(host_name)
+        return migrated
+
     def remove(self, *, host_name: HostName) -> None:
         self._tree_file(host_name).unlink(missing_ok=True)
         self._gz_file(host_name).unlink(missing_ok=True)
+        self._binary_file(host_name).unlink(missing_ok=True)
 
     def _tree_file(self, host_name: HostName) -> Path:
         return self._tree_dir / str(host_name)
@@ -1669,6 +1820,405 @@ class TreeStore:
     def _gz_file(self, host_name: HostName) -> Path:
         return self._tree_dir / f"{host_name}.gz"
 
+    def _binary_file(self, host_name: HostName) -> Path:
+        return self._tree_dir / f"{host_name}{_BINARY_TREE_SUFFIX}"
+
+
+# The trees archived for a host are stored as chains: a full tree (checkpoint) followed by
+# patches against the respective previous tree, with a checkpoint every few trees. A tree is
+# restored from the latest checkpoint before it, so the number of patches to apply is bounded.
+# Every chain is a segment file of its own, numbered in the order of their creation. The index
+# of the timestamps, segments, offsets and lengths of the records is a separate file. Each
+# record is a flat list of nodes, marshalled and compressed.
+# The diskspace cleanup removes the oldest files of the archive directories. Removing a whole
+# segment removes the oldest trees, the trees of missing segments are dropped from the index.
+_ARCHIVE_SEGMENT_PREFIX = "trees."
+_ARCHIVE_INDEX_FILE = "trees.index"
+_ARCHIVE_CHECKPOINT_INTERVAL = 16
+
+# timestamp, segment, offset, length, whether it is a checkpoint
+_ArchiveIndex = list[tuple[int, int, int, int, bool]]
+_FlatTree = dict[SDPath, tuple[ImmutableAttributes, ImmutableTable]]
+# rows (new or changed), idents of the removed rows, retentions if changed, the order of the
+# rows if it differs from the order after applying the patch (new rows last)
+_RawTablePatch = (
+    tuple[Literal["full"], SDRawTable]
+    | tuple[
+        Literal["rows"],
+        list[Mapping[SDKey, SDValue]],
+        list[SDRowIdent],
+        Mapping[SDRowIdent, Mapping[SDKey, tuple]] | None,
+        list[SDRowIdent] | None,
+    ]
+)
+# changed or new nodes with their attributes and table, if changed, and the removed nodes
+_RawTreePatch = tuple[
+    list[tuple[SDPath, SDRawAttributes | None, _RawTablePatch | None]], list[SDPath]
+]
+
+
+def _flatten_tree(tree: ImmutableTree) -> _FlatTree:
+    flat_tree: _FlatTree = {}
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        flat_tree[node.path] = (node.attributes, node.table)
+        stack.extend(reversed(node.nodes_by_name.values()))
+    return flat_tree
+
+
+def _unflatten_tree(flat_tree: _FlatTree) -> ImmutableTree:
+    child_paths_by_path: dict[SDPath, list[SDPath]] = {}
+    for path in flat_tree:
+        if path:
+            child_paths_by_path.setdefault(path[:-1], []).append(path)
+
+    def _make_node(path: SDPath) -> ImmutableTree:
+        attributes, table = flat_tree[path]
+        return ImmutableTree(
+            path=path,
+            attributes=attributes,
+            table=table,
+            nodes_by_name={p[-1]: _make_node(p) for p in child_paths_by_path.get(path, [])},
+        )
+
+    return _make_node(()) if () in flat_tree else ImmutableTree()
+
+
+def _serialize_flat_tree(
+    flat_tree: _FlatTree,
+) -> list[tuple[SDPath, SDRawAttributes, SDRawTable]]:
+    return [(path, a.serialize(), t.serialize()) for path, (a, t) in flat_tree.items()]
+
+
+def _deserialize_flat_tree(
+    raw_flat_tree: list[tuple[SDPath, SDRawAttributes, SDRawTable]]
+) -> _FlatTree:
+    return {
+        path: (ImmutableAttributes.deserialize(raw_a), ImmutableTable.deserialize(raw_t))
+        for path, raw_a, raw_t in raw_flat_tree
+    }
+
+
+def _make_table_patch(previous: ImmutableTable, current: ImmutableTable) -> _RawTablePatch | None:
+    if list(previous.key_columns) != list(current.key_columns):
+        return ("full", current.serialize())
+
+    rows = [
+        row
+        for ident, row in current.rows_by_ident.items()
+        if previous.rows_by_ident.get(ident) != row
+    ]
+    removed_idents = [i for i in previous.rows_by_ident if i not in current.rows_by_ident]
+    retentions_changed = previous.retentions != current.retentions
+    if not (rows or removed_idents or retentions_changed):
+        return None
+
+    order = list(current.rows_by_ident)
+    patched_order = [i for i in previous.rows_by_ident if i in current.rows_by_ident] + [
+        i for i in current.rows_by_ident if i not in previous.rows_by_ident
+    ]
+    return (
+        "rows",
+        rows,
+        removed_idents,
+        current.serialize().get("Retentions", {}) if retentions_changed else None,
+        None if order == patched_order else order,
+    )
+
+
+def _apply_table_patch(table: ImmutableTable, raw_table_patch: _RawTablePatch) -> ImmutableTable:
+    if raw_table_patch[0] == "full":
+        return ImmutableTable.deserialize(raw_table_patch[1])
+
+    _kind, rows, removed_idents, raw_retentions, order = raw_table_patch
+    rows_by_ident = dict(table.rows_by_ident)
+    for ident in removed_idents:
+        rows_by_ident.pop(ident, None)
+    for row in rows:
+        rows_by_ident[_make_row_ident(table.key_columns, row)] = row
+    return ImmutableTable(
+        key_columns=table.key_columns,
+        rows_by_ident=rows_by_ident if order is None else {i: rows_by_ident[i] for i in order},
+        retentions=(
+            table.retentions
+            if raw_retentions is None
+            else ImmutableTable.deserialize({"Retentions": raw_retentions}).retentions
+        ),
+    )
+
+
+def _make_tree_patch(previous: _FlatTree, current: _FlatTree) -> _RawTreePatch:
+    empty = (ImmutableAttributes(), ImmutableTable())
+    nodes: list[tuple[SDPath, SDRawAttributes | None, _RawTablePatch | None]] = []
+    for path, (attributes, table) in current.items():
+        previous_attributes, previous_table = previous.get(path, empty)
+        raw_attributes = (
+            None
+            if (
+                path in previous
+                and previous_attributes.pairs == attributes.pairs
+                and previous_attributes.retentions == attributes.retentions
+            )
+            else attributes.serialize()
+        )
+        raw_table_patch = _make_table_patch(previous_table, table)
+        if raw_attributes is not None or raw_table_patch is not None:
+            nodes.append((path, raw_attributes, raw_table_patch))
+    return nodes, [path for path in previous if path not in current]
+
+
+def _apply_tree_patch(flat_tree: _FlatTree, raw_tree_patch: _RawTreePatch) -> _FlatTree:
+    nodes, removed_paths = raw_tree_patch
+    patched = dict(flat_tree)
+    for path in removed_paths:
+        patched.pop(path, None)
+    for path, raw_attributes, raw_table_patch in nodes:
+        attributes, table = patched.get(path, (ImmutableAttributes(), ImmutableTable()))
+        patched[path] = (
+            (
+                attributes
+                if raw_attributes is None
+                else ImmutableAttributes.deserialize(raw_attributes)
+            ),
+            table if raw_table_patch is None else _apply_table_patch(table, raw_table_patch),
+        )
+    return patched
+
+
+class TreeArchive:
+    """The archived trees of a host
+
+    Besides the chains of trees, the archive directory may contain tree files named after their
+    timestamps. These have been written by older versions and are read as well, see migrate().
+    """
+
+    def __init__(
+        self, archive_dir: Path | str, *, checkpoint_interval: int = _ARCHIVE_CHECKPOINT_INTERVAL
+    ) -> None:
+        self.archive_dir = Path(archive_dir)
+        self._index_file = self.archive_dir / _ARCHIVE_INDEX_FILE
+        self._checkpoint_interval = checkpoint_interval
+        self._index: _ArchiveIndex | None = None
+        # Also counting the removed segments, their numbers are not reused
+        self._last_segment = 0
+        # The last restored tree, the next one is restored from it with a single patch
+        self._restored: tuple[int, _FlatTree] | None = None
+
+    def _segment_file(self, segment: int) -> Path:
+        return self.archive_dir / f"{_ARCHIVE_SEGMENT_PREFIX}{segment}"
+
+    def _segment_sizes(self) -> dict[int, int]:
+        sizes = {}
+        try:
+            for path in self.archive_dir.iterdir():
+                if (
+                    path.name.startswith(_ARCHIVE_SEGMENT_PREFIX)
+                    and (suffix := path.name[len(_ARCHIVE_SEGMENT_PREFIX) :]).isdigit()
+                ):
+                    sizes[int(suffix)] = path.stat().st_size
+        except FileNotFoundError:
+            # The archive or a segment has just been removed
+            pass
+        return sizes
+
+    def _load_index(self) -> _ArchiveIndex:
+        """The index of the trees that are still there
+
+        Trees are skipped if their segment has been removed or is shorter than expected.
+        """
+        if self._index is None:
+            try:
+                raw_index = self._index_file.read_bytes()
+            except FileNotFoundError:
+                raw_index = b""
+            try:
+                # Empty if only locked so far
+                index = marshal.loads(raw_index) if raw_index else []
+                if not all(isinstance(e, tuple) and len(e) == 5 for e in index):
+                    raise ValueError("unknown format")
+            except (EOFError, ValueError, TypeError) as e:
+                raise ValueError(f"Cannot read {self._index_file}: {e}") from e
+            self._last_segment = max((e[1] for e in index), default=0)
+            sizes = self._segment_sizes()
+            self._index = [
+                entry
+                for entry in index
+                if entry[2] + entry[3] <= sizes.get(entry[1], -1)  # offset + length <= size
+            ]
+        return self._index
+
+    def _legacy_files(self) -> dict[int, Path]:
+        try:
+            return {int(p.name): p for p in self.archive_dir.iterdir() if p.name.isdigit()}
+        except FileNotFoundError:
+            return {}
+
+    def timestamps(self) -> Sequence[int]:
+        return sorted(self._legacy_files().keys() | {e[0] for e in self._load_index()})
+
+    def load(self, timestamp: int) -> ImmutableTree:
+        """Load the tree archived at the timestamp
+
+        Raises FileNotFoundError if there is no such tree and ValueError if it is unreadable.
+        """
+        index = self._load_index()
+        # The last one if trees have been archived twice within a second
+        for position in range(len(index) - 1, -1, -1):
+            if index[position][0] == timestamp:
+                return _unflatten_tree(self._restore(index, position))
+        if (legacy_file := self._legacy_files().get(timestamp)) is not None:
+            return load_tree(legacy_file)
+        raise FileNotFoundError(f"No tree archived at {timestamp} in {self.archive_dir}")
+
+    def load_latest(self) -> ImmutableTree:
+        if not (timestamps := self.timestamps()):
+            return ImmutableTree()
+        return self.load(timestamps[-1])
+
+    def difference(self, previous_timestamp: int, current_timestamp: int) -> ImmutableDeltaTree:
+        """The changes between the trees archived at both timestamps"""
+        return self.load(current_timestamp).difference(self.load(previous_timestamp))
+
+    def _restore(self, index: _ArchiveIndex, position: int) -> _FlatTree:
+        if self._restored is not None and self._restored[0] == position:
+            return self._restored[1]
+
+        segment = index[position][1]
+        try:
+            # Every segment starts with a checkpoint
+            checkpoint = next(
+                p for p in range(position, -1, -1) if index[p][4] and index[p][1] == segment
+            )
+        except StopIteration:
+            raise ValueError(f"No checkpoint in {self._segment_file(segment)}") from None
+
+        if self._restored is not None and checkpoint <= self._restored[0] < position:
+            first, flat_tree = self._restored[0] + 1, self._restored[1]
+        else:
+            first, flat_tree = checkpoint, {}
+
+        segment_file = self._segment_file(segment)
+        start = index[first][2]
+        size = index[position][2] + index[position][3] - start
+        try:
+            with segment_file.open("rb") as f:
+                f.seek(start)
+                data = f.read(size)
+            if len(data) < size:
+                raise ValueError("file is too short")
+            for _timestamp, _segment, offset, length, is_checkpoint in index[first : position + 1]:
+                raw = marshal.loads(zlib.decompress(data[offset - start : offset - start + length]))
+                flat_tree = (
+                    _deserialize_flat_tree(raw)
+                    if is_checkpoint
+                    else _apply_tree_patch(flat_tree, raw)
+                )
+        except (EOFError, ValueError, TypeError, zlib.error) as e:
+            raise ValueError(f"Cannot read {segment_file}: {e}") from e
+
+        self._restored = position, flat_tree
+        return flat_tree
+
+    def _needs_checkpoint(self, index: _ArchiveIndex) -> bool:
+        if not index:
+            return True
+        last_checkpoint = next((p for p in range(len(index) - 1, -1, -1) if index[p][4]), -1)
+        return len(index) - last_checkpoint >= self._checkpoint_interval
+
+    def append(self, timestamp: int, tree: ImmutableTree) -> None:
+        """Archive the tree, as a patch against the last archived tree or as a checkpoint
+
+        A tree that cannot be patched, e.g. because the last segment is missing or unreadable,
+        starts a new segment with a checkpoint.
+        """
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        with store.locked(self._index_file):
+            self._index = None
+            self._restored = None
+            try:
+                index = self._load_index()
+            except ValueError:
+                # The trees of an unreadable index are lost, the diskspace cleanup removes
+                # their segments eventually
+                index = self._index = []
+            flat_tree = _flatten_tree(tree)
+
+            raw_patch: _RawTreePatch | None = None
+            if not self._needs_checkpoint(index):
+                try:
+                    raw_patch = _make_tree_patch(self._restore(index, len(index) - 1), flat_tree)
+                except (FileNotFoundError, ValueError):
+                    self._restored = None
+
+            if raw_patch is None:
+                segment = max(self._segment_sizes().keys() | {self._last_segment}) + 1
+                record = zlib.compress(marshal.dumps(_serialize_flat_tree(flat_tree)))
+            else:
+                segment = index[-1][1]
+                record = zlib.compress(marshal.dumps(raw_patch))
+
+            with self._segment_file(segment).open("ab") as f:
+                # Behind the records of an interrupted append, if any
+                offset = f.tell()
+                f.write(record)
+            index.append((timestamp, segment, offset, len(record), raw_patch is None))
+            store.save_bytes_to_file(self._index_file, marshal.dumps(index))
+            self._restored = len(index) - 1, flat_tree
+
+    def migrate(self) -> int:
+        """Move the trees of the tree files written by older versions into the chains
+
+        Returns the number of migrated tree files.
+        """
+        if not (legacy_files := self._legacy_files()):
+            return 0
+
+        with store.locked(self._index_file):
+            self._index = None
+            self._restored = None
+            trees_by_timestamp: dict[int, Callable[[], ImmutableTree]] = {
+                timestamp: functools.partial(load_tree, filepath)
+                for timestamp, filepath in legacy_files.items()
+            }
+            trees_by_timestamp |= {
+                timestamp: functools.partial(self.load, timestamp)
+                for timestamp, *_rest in self._load_index()
+            }
+            migrated = TreeArchive(
+                self.archive_dir / ".migrating", checkpoint_interval=self._checkpoint_interval
+            )
+            shutil.rmtree(migrated.archive_dir, ignore_errors=True)
+            for timestamp in sorted(trees_by_timestamp):
+                migrated.append(timestamp, trees_by_timestamp[timestamp]())
+
+            # The migrated segments are numbered behind the existing ones, so the current index
+            # stays valid until it is replaced
+            old_segments = self._segment_sizes()
+            shift = max(old_segments, default=0)
+            migrated_index = migrated._load_index()  # pylint: disable=protected-access
+            for segment in {e[1] for e in migrated_index}:
+                migrated._segment_file(segment).rename(  # pylint: disable=protected-access
+                    self._segment_file(segment + shift)
+                )
+            store.save_bytes_to_file(
+                self._index_file,
+                marshal.dumps(
+                    [
+                        (timestamp, segment + shift, offset, length, is_checkpoint)
+                        for timestamp, segment, offset, length, is_checkpoint in migrated_index
+                    ]
+                ),
+            )
+            shutil.rmtree(migrated.archive_dir)
+            for segment in old_segments:
+                self._segment_file(segment).unlink(missing_ok=True)
+            for filepath in legacy_files.values():
+                filepath.unlink()
+            self._index = None
+            self._restored = None
+        return len(legacy_files)
+
 
 class TreeOrArchiveStore(TreeStore):
     def __init__(self, tree_dir: Path | str, archive: Path | str) -> None:
@@ -1676,25 +2226,23 @@ class TreeOrArchiveStore(TreeStore):
         self._archive_dir = Path(archive)
 
     def load_previous(self, *, host_name: HostName) -> ImmutableTree:
-        if (tree_file := self._tree_file(host_name=host_name)).exists():
-            return load_tree(tree_file)
+        if self._tree_file(host_name=host_name).exists():
+            return self.load(host_name=host_name)
 
         try:
-            latest_archive_tree_file = max(
-                self._archive_host_dir(host_name).iterdir(), key=lambda tp: int(tp.name)
-            )
+            return self._tree_archive(host_name).load_latest()
         except (FileNotFoundError, ValueError):
             return ImmutableTree()
 
-        return load_tree(latest_archive_tree_file)
-
-    def _archive_host_dir(self, host_name: HostName) -> Path:
-        return self._archive_dir / str(host_name)
+    def _tree_archive(self, host_name: HostName) -> TreeArchive:
+        return TreeArchive(self._archive_dir / str(host_name))
 
     def archive(self, *, host_name: HostName) -> None:
         if not (tree_file := self._tree_file(host_name)).exists():
             return
-        target_dir = self._archive_host_dir(host_name)
-        target_dir.mkdir(parents=True, exist_ok=True)
-        tree_file.rename(target_dir / str(int(tree_file.stat().st_mtime)))
+        self._tree_archive(host_name).append(
+            int(tree_file.stat().st_mtime), self.load(host_name=host_name)
+        )
+        tree_file.unlink()
         self._gz_file(host_name).unlink(missing_ok=True)
+        self._binary_file(host_name).unlink(missing_ok=True)
@@ -252,8 +252,11 @@ def save_tmpfs_dump(site_dir: str, site_tmp_dir: str) -> None:
     """
     save_paths = [
         Path(site_tmp_dir) / "check_mk" / "piggyback",
-        Path(site_tmp_dir) / "check_mk" / "piggyback_sources",
+        Path(site_tmp_dir) / "check_mk" / "piggyback_catalog.sqlite",
+        Path(site_tmp_dir) / "check_mk" / "piggyback_catalog.sqlite-wal",
         Path(site_tmp_dir) / "check_mk" / "counters",
+        Path(site_tmp_dir) / "check_mk" / "counters.sqlite",
+        Path(site_tmp_dir) / "check_mk" / "counters.sqlite-wal",
     ]
 
     dump_path = Path(site_dir, "var/omd/tmpfs-dump.tar")
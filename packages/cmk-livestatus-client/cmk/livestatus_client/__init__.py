@@ -17,6 +17,7 @@ import json
 import os
 import re
 import select
+import selectors
 import socket
 import ssl
 import threading
@@ -236,6 +237,13 @@ def create_client_socket(
     if not tls:
         return sock
 
+    return create_client_ssl_context(verify, ca_file_path).wrap_socket(
+        sock, do_handshake_on_connect=do_handshake_on_connect
+    )
+
+
+def create_client_ssl_context(verify: bool, ca_file_path: str | None) -> ssl.SSLContext:
+    """Create the TLS context for encrypted livestatus connections"""
     context = ssl.create_default_context()
     context.check_hostname = False
     context.verify_mode = ssl.CERT_REQUIRED if verify else ssl.CERT_NONE
@@ -247,7 +255,7 @@ def create_client_socket(
     except Exception as e:
         raise MKLivestatusConfigError(f"Failed to load CA file '{ca_file_path}': {e}")
 
-    return context.wrap_socket(sock, do_handshake_on_connect=do_handshake_on_connect)
+    return context
 
 
 # .
@@ -694,24 +702,13 @@ class SingleSiteConnection(Helpers):
                 raise
 
     def build_query(self, query_obj: Query, add_headers: str) -> str:
-        # Prevent injection of further livestatus commands inside AuthUser header.
-        if "\n" in self.auth_header[:-1]:
-            raise MKLivestatusQueryError("Refusing to build query with invalid AuthUser header.")
-
-        query = str(query_obj)
-        if not self.allow_cache:
-            query = remove_cache_regex.sub("", query)
-
-        headers = [
-            self.auth_header,
-            f"Localtime: {int(time.time()):d}",
-            "OutputFormat: %s" % self._output_format.value,
-            "KeepAlive: on",
-            "ResponseHeader: fixed16",
-            add_headers,
-        ]
-
-        return _combine_query(query, headers)
+        return build_query(
+            query_obj,
+            auth_header=self.auth_header,
+            allow_cache=self.allow_cache,
+            output_format=self._output_format,
+            add_headers=add_headers,
+        )
 
     def send_query(self, query: str, do_reconnect: bool = True) -> None:
         if self.socket is None:
@@ -745,38 +742,12 @@ class SingleSiteConnection(Helpers):
         timeout_at: float | None = None,
     ) -> bytes:
         try:
-            # Headers are always ASCII encoded
-            resp = self.receive_data(16)
-            code = resp[0:3].decode("ascii")
-            try:
-                length = int(resp[4:15].lstrip())
-            except Exception:
-                self.disconnect()
-                raise MKLivestatusSocketError(
-                    f"Malformed response header {resp!r}. Livestatus TCP socket might be "
-                    "unreachable or wrong encryption settings are used."
-                )
-
+            code, length = self.parse_response_header(self.receive_data(16))
             # Apply a lower timeout for the content because the data is already available
             # in the socket. The liveproxyd (same system) has the complete data available
             # while the data from a standard connection can still take some time.
             # 30 seconds should be more than enough for the maximum telegram size of 100MB
-            data = self.receive_data(length, 30)
-
-            if code == "200":
-                return data
-
-            error_info = data.decode("utf-8")
-            if code == "404":
-                raise MKLivestatusTableNotFoundError(f"Not Found ({code}): {error_info!r}")
-
-            if code == "413":
-                raise MKLivestatusPayloadTooLargeError(error_info)
-
-            if code == "502":
-                raise MKLivestatusBadGatewayError(error_info)
-
-            raise MKLivestatusQueryError(f"{code}: {error_info}")
+            return response_payload(code, self.receive_data(length, RESPONSE_DATA_TIMEOUT))
 
         except (MKLivestatusSocketClosed, OSError) as e:
             # In case of an IO error or the other side having
@@ -816,15 +787,16 @@ class SingleSiteConnection(Helpers):
             # FIXME: ? self.disconnect()
             raise MKLivestatusSocketError("Unhandled exception: %s" % e)
 
-    def parse_raw_response(self, raw_response: bytes, query: Query) -> LivestatusResponse:
-        data = raw_response.decode("utf-8")
+    def parse_response_header(self, resp: bytes) -> tuple[str, int]:
+        """Return the status code and the length of the data from the fixed16 header"""
         try:
-            response: LivestatusResponse = (
-                json.loads(data) if query.supports_json_format() else ast.literal_eval(data)
-            )
-            return response
-        except (ValueError, SyntaxError):
-            raise MKLivestatusQueryError("Malformed raw response output")
+            return parse_response_header(resp)
+        except MKLivestatusSocketError:
+            self.disconnect()
+            raise
+
+    def parse_raw_response(self, raw_response: bytes, query: Query) -> LivestatusResponse:
+        return parse_raw_response(raw_response, query)
 
     def set_prepend_site(self, p: bool) -> None:
         self.prepend_site = p
@@ -899,6 +871,161 @@ class SingleSiteConnection(Helpers):
             self.auth_header = ""
 
 
+# Seconds to wait for the data of a response once its header has been received
+RESPONSE_DATA_TIMEOUT = 30
+
+
+def build_query(
+    query_obj: Query,
+    *,
+    auth_header: str,
+    allow_cache: bool,
+    output_format: LivestatusOutputFormat,
+    add_headers: str,
+) -> str:
+    """Add the headers to a query, which are needed by the connections of this module"""
+    # Prevent injection of further livestatus commands inside AuthUser header.
+    if "\n" in auth_header[:-1]:
+        raise MKLivestatusQueryError("Refusing to build query with invalid AuthUser header.")
+
+    query = str(query_obj)
+    if not allow_cache:
+        query = remove_cache_regex.sub("", query)
+
+    headers = [
+        auth_header,
+        f"Localtime: {int(time.time()):d}",
+        "OutputFormat: %s" % output_format.value,
+        "KeepAlive: on",
+        "ResponseHeader: fixed16",
+        add_headers,
+    ]
+
+    return _combine_query(query, headers)
+
+
+def parse_response_header(resp: bytes) -> tuple[str, int]:
+    """Return the status code and the length of the data from a fixed16 header"""
+    # Headers are always ASCII encoded
+    code = resp[0:3].decode("ascii")
+    try:
+        return code, int(resp[4:15].lstrip())
+    except Exception:
+        raise MKLivestatusSocketError(
+            f"Malformed response header {resp!r}. Livestatus TCP socket might be "
+            "unreachable or wrong encryption settings are used."
+        )
+
+
+def parse_raw_response(raw_response: bytes, query: Query) -> LivestatusResponse:
+    data = raw_response.decode("utf-8")
+    try:
+        response: LivestatusResponse = (
+            json.loads(data) if query.supports_json_format() else ast.literal_eval(data)
+        )
+        return response
+    except (ValueError, SyntaxError):
+        raise MKLivestatusQueryError("Malformed raw response output")
+
+
+def response_payload(code: str, data: bytes) -> bytes:
+    """Return the data of a successful response, raise the matching exception otherwise"""
+    if code == "200":
+        return data
+
+    error_info = data.decode("utf-8")
+    if code == "404":
+        raise MKLivestatusTableNotFoundError(f"Not Found ({code}): {error_info!r}")
+
+    if code == "413":
+        raise MKLivestatusPayloadTooLargeError(error_info)
+
+    if code == "502":
+        raise MKLivestatusBadGatewayError(error_info)
+
+    raise MKLivestatusQueryError(f"{code}: {error_info}")
+
+
+class _ResponseReceiver:
+    """Receives the response to a query piece by piece, whenever the socket is readable
+
+    This is the non-blocking counterpart of SingleSiteConnection.receive_raw_response(), which
+    makes it possible to wait for the responses of many sites at once.
+    """
+
+    def __init__(self, connected_site: ConnectedSite, str_query: str) -> None:
+        self.connected_site = connected_site
+        self.str_query = str_query
+        self.reconnected = False
+        # The file descriptor the response is waited for on
+        self.fileno = -1
+        self._header = b""
+        self._data = BytesIO()
+        self._code = ""
+        self._length: int | None = None
+        self._data_deadline = 0.0
+
+    @property
+    def socket(self) -> socket.socket:
+        if (site_socket := self.connected_site.connection.socket) is None:
+            raise MKLivestatusSocketError(
+                "Socket to '%s' is not connected" % self.connected_site.connection.socketurl
+            )
+        return site_socket
+
+    def has_pending_data(self) -> bool:
+        """Whether there is data select() does not know about, see is_socket_readable()"""
+        site_socket = self.connected_site.connection.socket
+        return isinstance(site_socket, ssl.SSLSocket) and site_socket.pending() > 0
+
+    def reconnect(self) -> None:
+        """Send the query again on a new connection, like receive_raw_response() does"""
+        connection = self.connected_site.connection
+        connection.disconnect()
+        time.sleep(0.1)
+        connection.connect()
+        connection.send_query(self.str_query)
+        self.reconnected = True
+        self._header = b""
+        self._data = BytesIO()
+        self._length = None
+
+    def check_timeout(self, now: float) -> None:
+        if self._length is not None and now > self._data_deadline:
+            raise MKLivestatusSocketError(
+                f"{RESPONSE_DATA_TIMEOUT}s while reading data from socket. "
+                f"Received data: {self._data.getbuffer().nbytes}/{self._length} bytes"
+            )
+
+    def receive(self) -> bytes | None:
+        """Read the available data, return the payload as soon as the response is complete"""
+        if self._length is None:
+            self._header += self._recv(16 - len(self._header))
+            if len(self._header) < 16:
+                return None
+            self._code, self._length = self.connected_site.connection.parse_response_header(
+                self._header
+            )
+            self._data_deadline = time.time() + RESPONSE_DATA_TIMEOUT
+        elif (missing := self._length - self._data.getbuffer().nbytes) > 0:
+            self._data.write(self._recv(min(missing, 1024 * 1024)))
+
+        if self._data.getbuffer().nbytes < self._length:
+            return None
+        return response_payload(self._code, self._data.getvalue())
+
+    def _recv(self, size: int) -> bytes:
+        try:
+            packet = self.socket.recv(size)
+        except ssl.SSLWantReadError:
+            return b""  # Only a part of a TLS record has arrived yet
+        if not packet:
+            raise MKLivestatusSocketClosed(
+                "Read zero data from socket, remote peer closed connection."
+            )
+        return packet
+
+
 # .
 #   .--MultiSiteConn-------------------------------------------------------.
 #   |     __  __       _ _   _ ____  _ _        ____                       |
@@ -1192,89 +1319,153 @@ class MultiSiteConnection(Helpers):
     # New parallelized version of query(). The semantics differs in the handling
     # of Limit: since all sites are queried in parallel, the Limit: is simply
     # applied to all sites - resulting in possibly more results then Limit requests.
-    def query_parallel(  # pylint: disable=too-many-branches
+    def query_parallel(
         self,
         query: Query,
         add_headers: str = "",
     ) -> LivestatusResponse:
-        stillalive = []
+        site_order = {connected_site.id: nr for nr, connected_site in enumerate(self.connections)}
+        responses = sorted(
+            self._receive_parallel(query, add_headers),
+            key=lambda response: site_order[response[0].id],
+        )
+        return LivestatusResponse([row for _connected_site, rows in responses for row in rows])
+
+    def query_iter(self, query: QueryTypes, add_headers: str = "") -> Iterator[LivestatusRow]:
+        """Query all sites in parallel and yield the rows of each site as soon as it has answered
+
+        The rows of the fastest sites come first, so the caller does not have to wait for the
+        slowest site before processing the rows. The query is sent on the first iteration.
+        Stopping the iteration early closes the connections to the sites which have not
+        answered yet. They are not considered dead, but connected again on the next query.
+        Limit is handled like in query_parallel().
+        """
+        normalized_query = Query(query) if not isinstance(query, Query) else query
+        for _connected_site, rows in self._receive_parallel(normalized_query, add_headers):
+            yield from rows
+
+    def _receive_parallel(  # pylint: disable=too-many-branches
+        self,
+        query: Query,
+        add_headers: str,
+    ) -> Iterator[tuple[ConnectedSite, LivestatusResponse]]:
+        """Send the query to all sites, then yield the responses in the order they arrive
+
+        The sockets of all sites are read at the same time, each response is parsed as soon as
+        it is complete. So we are only as slow as the slowest of all connections.
+        """
         if self.only_sites is not None:
-            connect_to_sites = [c for c in self.connections if c[0] in self.only_sites]
-            # Unused sites are assumed to be alive
-            stillalive.extend([c for c in self.connections if c[0] not in self.only_sites])
+            connect_to_sites = [c for c in self.connections if c.id in self.only_sites]
         else:
-            connect_to_sites = self.connections
+            connect_to_sites = list(self.connections)
 
-        limit = self.limit
-        if limit is not None:
-            limit_header = "Limit: %d\n" % limit
-        else:
-            limit_header = ""
+        limit_header = "" if self.limit is None else "Limit: %d\n" % self.limit
+        failed_sites: set[SiteId] = set()
 
-        # First send all queries
-        retrieve_responses: list[tuple[str, ConnectedSite]] = []
-        for connected_site in connect_to_sites:
-            try:
-                str_query = connected_site.connection.build_query(query, add_headers + limit_header)
-                connected_site.connection.send_query(str_query)
-                retrieve_responses.append((str_query, connected_site))
-            except LivestatusTestingError:
-                raise
-            except Exception as e:
-                self.deadsites[connected_site.id] = {
-                    "exception": e,
-                    "site": connected_site.config,
-                }
+        def site_failed(connected_site: ConnectedSite, e: Exception) -> None:
+            connected_site.connection.disconnect()
+            failed_sites.add(connected_site.id)
+            self.deadsites[connected_site.id] = {
+                "exception": e,
+                "site": connected_site.config,
+            }
 
-        # Then retrieve all raw responses. We will be as slow as the slowest of all connections.
-        site_responses: list[tuple[ConnectedSite, bytes]] = []
-        for str_query, connected_site in retrieve_responses:
-            try:
-                site_responses.append(
-                    (
-                        connected_site,
-                        connected_site.connection.receive_raw_response(
-                            str_query, query.suppress_exceptions
-                        ),
+        # First send all queries
+        pending: list[_ResponseReceiver] = []
+        with _livestatus_output_format_switcher(query, self):
+            for connected_site in connect_to_sites:
+                try:
+                    str_query = connected_site.connection.build_query(
+                        query, add_headers + limit_header
                     )
-                )
-            except query.suppress_exceptions:
-                # Mostly handles exception types MKLivestatusTableNotFoundError
-                stillalive.append(connected_site)
-                continue
-            except LivestatusTestingError:
-                raise
-            except Exception as e:
-                connected_site.connection.disconnect()
-                self.deadsites[connected_site.id] = {
-                    "exception": e,
-                    "site": connected_site.config,
-                }
+                    connected_site.connection.send_query(str_query)
+                    pending.append(_ResponseReceiver(connected_site, str_query))
+                except LivestatusTestingError:
+                    raise
+                except Exception as e:
+                    failed_sites.add(connected_site.id)
+                    self.deadsites[connected_site.id] = {
+                        "exception": e,
+                        "site": connected_site.config,
+                    }
 
-        # Convert responses to python format
-        result: list[LivestatusRow] = []
-        for connected_site, raw_response in site_responses:
-            try:
-                rows = connected_site.connection.parse_raw_response(raw_response, query)
-                stillalive.append(connected_site)
-                if self.prepend_site:
-                    for row in rows:
-                        row.insert(0, connected_site.id)
-                result.extend(rows)
-            except query.suppress_exceptions:
-                stillalive.append(connected_site)
-                continue
-            except LivestatusTestingError:
-                raise
-            except Exception as e:
-                connected_site.connection.disconnect()
-                self.deadsites[connected_site.id] = {
-                    "exception": e,
-                    "site": connected_site.config,
-                }
+        # Then read from all sockets, whichever has something to read
+        selector = selectors.DefaultSelector()
 
-        self.connections = stillalive
-        return LivestatusResponse(result)
+        def watch(receiver: _ResponseReceiver) -> None:
+            receiver.fileno = receiver.socket.fileno()
+            selector.register(receiver.fileno, selectors.EVENT_READ, receiver)
+
+        def done(receiver: _ResponseReceiver) -> None:
+            pending.remove(receiver)
+            if receiver.fileno in selector.get_map():
+                selector.unregister(receiver.fileno)
+
+        try:
+            for receiver in pending:
+                watch(receiver)
+
+            while pending:
+                readable = [receiver for receiver in pending if receiver.has_pending_data()]
+                for key, _events in selector.select(0 if readable else 0.1):
+                    if key.data not in readable:
+                        readable.append(key.data)
+
+                for receiver in readable:
+                    connected_site = receiver.connected_site
+                    try:
+                        try:
+                            raw_response = receiver.receive()
+                        except (MKLivestatusSocketClosed, OSError) as e:
+                            # Reconnect and send the query again, but only once
+                            if receiver.reconnected:
+                                raise MKLivestatusSocketError(str(e))
+                            selector.unregister(receiver.fileno)
+                            receiver.reconnect()
+                            watch(receiver)
+                            continue
+                        except LivestatusTestingError:
+                            raise
+                        except query.suppress_exceptions:
+                            raise
+                        except Exception as e:
+                            raise MKLivestatusSocketError("Unhandled exception: %s" % e)
+                        if raw_response is None:
+                            continue
+                        rows = connected_site.connection.parse_raw_response(raw_response, query)
+                    except query.suppress_exceptions:
+                        # Mostly handles exception types MKLivestatusTableNotFoundError
+                        done(receiver)
+                        continue
+                    except LivestatusTestingError:
+                        raise
+                    except Exception as e:
+                        done(receiver)
+                        site_failed(connected_site, e)
+                        continue
+
+                    done(receiver)
+                    if self.prepend_site:
+                        for row in rows:
+                            row.insert(0, connected_site.id)
+                    yield connected_site, rows
+
+                now = time.time()
+                for receiver in list(pending):
+                    try:
+                        receiver.check_timeout(now)
+                    except MKLivestatusSocketError as e:
+                        done(receiver)
+                        site_failed(
+                            receiver.connected_site,
+                            MKLivestatusSocketError("Unhandled exception: %s" % e),
+                        )
+        finally:
+            selector.close()
+            # The responses not read would be taken for the responses to the next queries
+            for receiver in pending:
+                receiver.connected_site.connection.disconnect()
+            self.connections = [c for c in self.connections if c.id not in failed_sites]
 
     def command(self, command: str, sitename: SiteId | None = SiteId("local")) -> None:
         if sitename in self.deadsites:
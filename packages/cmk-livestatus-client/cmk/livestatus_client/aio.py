@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Asyncio variant of the Livestatus API
+
+Meant for callers issuing many small, independent queries, like the REST API, BI or the
+dashboards. Each site has a bounded pool of keepalive connections, so queries to different
+sites and concurrent queries to the same site do not wait for each other. The queries are
+built and the responses are parsed just like by the blocking connections.
+
+    async with AsyncMultiSiteConnection(sites) as live:
+        rows = await live.query("GET hosts\\nColumns: name state", prepend_site=True)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import socket
+import ssl
+from collections.abc import AsyncIterator, Sequence
+from types import TracebackType
+from typing import NamedTuple, Self
+
+from cmk.livestatus_client import (
+    build_query,
+    create_client_ssl_context,
+    DeadSite,
+    LivestatusOutputFormat,
+    LivestatusResponse,
+    LivestatusRow,
+    LivestatusTestingError,
+    MKLivestatusSocketError,
+    OnlySites,
+    parse_raw_response,
+    parse_response_header,
+    parse_socket_url,
+    Query,
+    QueryTypes,
+    response_payload,
+    RESPONSE_DATA_TIMEOUT,
+    SiteConfiguration,
+    SiteConfigurations,
+    SiteId,
+    TLSParams,
+    UserId,
+    validate_user_id_regex,
+)
+
+__all__ = ["AsyncConnectionPool", "AsyncMultiSiteConnection", "AsyncSiteConnection"]
+
+
+class _Stream(NamedTuple):
+    reader: asyncio.StreamReader
+    writer: asyncio.StreamWriter
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class AsyncConnectionPool:
+    """At most max_size keepalive connections to one Livestatus socket
+
+    Connections are only opened when all others are busy, and kept open for the next queries
+    afterwards. A query waits for a free connection when max_size queries are in flight.
+    """
+
+    def __init__(
+        self,
+        socketurl: str,
+        *,
+        max_size: int = 4,
+        tls: bool = False,
+        verify: bool = True,
+        ca_file_path: str | None = None,
+        connect_timeout: float | None = None,
+    ) -> None:
+        self.socketurl = socketurl
+        self.max_size = max_size
+        self.connect_timeout = connect_timeout
+        self._family, self._address = parse_socket_url(socketurl)
+        self._tls = tls
+        self._tls_verify = verify
+        self._tls_ca_file_path = ca_file_path
+        self._ssl_context: ssl.SSLContext | None = None
+        self._slots = asyncio.Semaphore(max_size)
+        self._idle: list[_Stream] = []
+        # The number of connections opened so far
+        self.opened = 0
+
+    async def request(self, query: str) -> tuple[str, bytes]:
+        """Send the query and return the status code and the data of the response"""
+        async with self._slots:
+            while True:
+                reused = bool(self._idle)
+                stream = self._idle.pop() if reused else await self._open()
+                try:
+                    response = await _exchange(stream, query)
+                except (OSError, asyncio.IncompleteReadError) as e:
+                    stream.close()
+                    if reused:
+                        continue  # The site may have closed the idle connection in the meantime
+                    raise MKLivestatusSocketError(str(e))
+                except BaseException:
+                    # Also on cancellation: The response would be taken for the next query.
+                    stream.close()
+                    raise
+                self._idle.append(stream)
+                return response
+
+    async def _open(self) -> _Stream:
+        if self._tls and self._ssl_context is None:
+            self._ssl_context = create_client_ssl_context(self._tls_verify, self._tls_ca_file_path)
+        # The hostname is not checked, see create_client_ssl_context()
+        server_hostname = "" if self._ssl_context is not None else None
+        try:
+            async with asyncio.timeout(self.connect_timeout):
+                if self._family == socket.AF_UNIX:
+                    assert isinstance(self._address, str)
+                    reader, writer = await asyncio.open_unix_connection(
+                        self._address, ssl=self._ssl_context, server_hostname=server_hostname
+                    )
+                else:
+                    assert isinstance(self._address, tuple)
+                    reader, writer = await asyncio.open_connection(
+                        *self._address,
+                        family=self._family,
+                        ssl=self._ssl_context,
+                        server_hostname=server_hostname,
+                    )
+        except (OSError, ssl.SSLError) as e:
+            raise MKLivestatusSocketError(f"Cannot connect to '{self.socketurl}': {e}")
+        self.opened += 1
+        return _Stream(reader, writer)
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        for stream in idle:
+            stream.close()
+        for stream in idle:
+            try:
+                await stream.writer.wait_closed()
+            except OSError:
+                pass
+
+
+async def _exchange(stream: _Stream, query: str) -> tuple[str, bytes]:
+    stream.writer.write(query.encode("utf-8") + b"\n\n")
+    await stream.writer.drain()
+    code, length = parse_response_header(await stream.reader.readexactly(16))
+    try:
+        async with asyncio.timeout(RESPONSE_DATA_TIMEOUT):
+            return code, await stream.reader.readexactly(length)
+    except TimeoutError:
+        raise MKLivestatusSocketError(f"{RESPONSE_DATA_TIMEOUT}s while reading data from socket")
+
+
+class AsyncSiteConnection:
+    """Queries to one site, using a pool of connections
+
+    Unlike the blocking connections, all options affecting a single query (authorization,
+    deadline) are passed to query(), as many queries may be in flight at the same time.
+    """
+
+    def __init__(
+        self,
+        socketurl: str,
+        *,
+        site_name: SiteId | None = None,
+        pool_size: int = 4,
+        allow_cache: bool = False,
+        tls: bool = False,
+        verify: bool = True,
+        ca_file_path: str | None = None,
+        timeout: float | None = None,
+    ) -> None:
+        self.site_name = site_name
+        self.allow_cache = allow_cache
+        # The default deadline of the queries, in seconds
+        self.timeout = timeout
+        self.pool = AsyncConnectionPool(
+            socketurl,
+            max_size=pool_size,
+            tls=tls,
+            verify=verify,
+            ca_file_path=ca_file_path,
+            connect_timeout=timeout,
+        )
+
+    async def query(
+        self,
+        query: QueryTypes,
+        add_headers: str = "",
+        *,
+        auth_user: UserId | None = None,
+        timeout: float | None = None,
+    ) -> LivestatusResponse:
+        """Send the query and return the parsed response
+
+        The deadline applies to the whole query, including waiting for a free connection.
+        """
+        normalized_query = Query(query) if not isinstance(query, Query) else query
+        if auth_user and validate_user_id_regex.match(auth_user) is None:
+            raise ValueError("Invalid user ID")
+
+        str_query = build_query(
+            normalized_query,
+            auth_header=f"AuthUser: {auth_user}\n" if auth_user else "",
+            allow_cache=self.allow_cache,
+            output_format=(
+                LivestatusOutputFormat.JSON
+                if normalized_query.supports_json_format()
+                else LivestatusOutputFormat.PYTHON
+            ),
+            add_headers=add_headers,
+        )
+        deadline = self.timeout if timeout is None else timeout
+        try:
+            async with asyncio.timeout(deadline):
+                code, data = await self.pool.request(str_query)
+        except TimeoutError:
+            raise MKLivestatusSocketError(
+                f"No response from '{self.pool.socketurl}' within {deadline}s"
+            )
+        return parse_raw_response(response_payload(code, data), normalized_query)
+
+    async def close(self) -> None:
+        await self.pool.close()
+
+
+class AsyncMultiSiteConnection:
+    """Concurrent queries to many sites
+
+    The sites failing a query are reported by dead_sites() until they answer a query again.
+    Their rows are missing from the result, just like with MultiSiteConnection. Status hosts
+    are not supported.
+    """
+
+    def __init__(self, sites: SiteConfigurations, *, pool_size: int = 4) -> None:
+        self.sites = sites
+        self.connections = {
+            site_id: _connect_to_site(site_id, site, pool_size) for site_id, site in sites.items()
+        }
+        self.deadsites: dict[SiteId, DeadSite] = {}
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        await self.close()
+
+    def dead_sites(self) -> dict[SiteId, DeadSite]:
+        return self.deadsites
+
+    async def query(
+        self,
+        query: QueryTypes,
+        add_headers: str = "",
+        *,
+        only_sites: OnlySites = None,
+        prepend_site: bool = False,
+        auth_user: UserId | None = None,
+        timeout: float | None = None,
+    ) -> LivestatusResponse:
+        """Query the sites at the same time, the rows are returned in the order of the sites"""
+        normalized_query = Query(query) if not isinstance(query, Query) else query
+        responses = await asyncio.gather(
+            *(
+                self._query_site(
+                    site_id, normalized_query, add_headers, prepend_site, auth_user, timeout
+                )
+                for site_id in self._selected_sites(only_sites)
+            )
+        )
+        return LivestatusResponse([row for rows in responses for row in rows])
+
+    async def query_iter(
+        self,
+        query: QueryTypes,
+        add_headers: str = "",
+        *,
+        only_sites: OnlySites = None,
+        prepend_site: bool = False,
+        auth_user: UserId | None = None,
+        timeout: float | None = None,
+    ) -> AsyncIterator[LivestatusRow]:
+        """Query the sites at the same time, yield the rows of each site as soon as it answers"""
+        normalized_query = Query(query) if not isinstance(query, Query) else query
+        tasks = [
+            asyncio.create_task(
+                self._query_site(
+                    site_id, normalized_query, add_headers, prepend_site, auth_user, timeout
+                )
+            )
+            for site_id in self._selected_sites(only_sites)
+        ]
+        try:
+            for next_response in asyncio.as_completed(tasks):
+                for row in await next_response:
+                    yield row
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _selected_sites(self, only_sites: OnlySites) -> Sequence[SiteId]:
+        if only_sites is None:
+            return list(self.connections)
+        return [site_id for site_id in self.connections if site_id in only_sites]
+
+    async def _query_site(
+        self,
+        site_id: SiteId,
+        query: Query,
+        add_headers: str,
+        prepend_site: bool,
+        auth_user: UserId | None,
+        timeout: float | None,
+    ) -> list[LivestatusRow]:
+        try:
+            rows = await self.connections[site_id].query(
+                query, add_headers, auth_user=auth_user, timeout=timeout
+            )
+        except query.suppress_exceptions:
+            # Mostly handles exception types MKLivestatusTableNotFoundError
+            self.deadsites.pop(site_id, None)
+            return []
+        except LivestatusTestingError:
+            raise
+        except Exception as e:
+            self.deadsites[site_id] = {
+                "exception": e,
+                "site": self.sites[site_id],
+            }
+            return []
+
+        self.deadsites.pop(site_id, None)
+        if prepend_site:
+            for row in rows:
+                row.insert(0, site_id)
+        return rows
+
+    async def close(self) -> None:
+        await asyncio.gather(*(connection.close() for connection in self.connections.values()))
+
+
+def _connect_to_site(
+    site_id: SiteId, site: SiteConfiguration, pool_size: int
+) -> AsyncSiteConnection:
+    url = site["socket"]
+    assert isinstance(url, str)
+    tls_type, tls_params = site.get("tls", ("plain_text", TLSParams()))
+    return AsyncSiteConnection(
+        url,
+        site_name=site_id,
+        pool_size=pool_size,
+        allow_cache=site.get("cache", False),
+        tls=tls_type != "plain_text",
+        verify=tls_params.get("verify", True),
+        ca_file_path=tls_params.get("ca_file_path", None),
+        timeout=float(site["timeout"]) if "timeout" in site else None,
+    )
@@ -8,6 +8,7 @@
 #include <memory>
 
 #include "livestatus/Column.h"
+#include "livestatus/DoubleColumn.h"
 #include "livestatus/IntColumn.h"
 #include "livestatus/StringColumn.h"
 
@@ -18,6 +19,17 @@ TableEventConsoleRules::TableEventConsoleRules() {
 
     addColumn(ECRow::makeIntColumn(
         "rule_hits", "The times rule matched an incoming message", offsets));
+    addColumn(ECRow::makeIntColumn(
+        "rule_tries", "The times the rule has been tried on a message",
+        offsets));
+    addColumn(ECRow::makeIntColumn(
+        "rule_prefiltered",
+        "The times the rule has been skipped because a required literal was "
+        "missing in a message",
+        offsets));
+    addColumn(ECRow::makeDoubleColumn(
+        "rule_match_time",
+        "The time spent trying the rule on messages in seconds", offsets));
 }
 
 std::string TableEventConsoleRules::name() const { return "eventconsolerules"; }
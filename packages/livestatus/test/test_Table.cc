@@ -632,6 +632,9 @@ ColumnDefinitions event_console_rules_columns() {
     return {
         {"rule_hits", ColumnType::int_},
         {"rule_id", ColumnType::string},
+        {"rule_match_time", ColumnType::double_},
+        {"rule_prefiltered", ColumnType::int_},
+        {"rule_tries", ColumnType::int_},
     };
 }
 }  // namespace
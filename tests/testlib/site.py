@@ -1610,7 +1610,6 @@ class SiteFactory:
             # tmpfs should have been restored:
             assert os.path.exists(site.path("tmp/check_mk/counters"))
             assert os.path.exists(site.path("tmp/check_mk/piggyback"))
-            assert os.path.exists(site.path("tmp/check_mk/piggyback_sources"))
 
         # open the livestatus port
         site.open_livestatus_tcp(encrypted=False)
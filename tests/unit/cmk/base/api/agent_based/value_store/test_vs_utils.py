@@ -3,9 +3,10 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
-from ast import literal_eval
+import json
+import time
+from collections.abc import Mapping
 from pathlib import Path
-from unittest.mock import Mock
 
 import pytest
 
@@ -16,12 +17,11 @@ from cmk.checkengine.checking import CheckPluginName, ServiceID
 from cmk.base.api.agent_based.value_store._utils import (
     _DiskSyncedMapping,
     _DynamicDiskSyncedMapping,
-    _StaticDiskSyncedMapping,
     _ValueStore,
+    ValueStoreDatabase,
     ValueStoreManager,
 )
 
-from cmk.ccc import store
 
 _TEST_KEY = ("check", "item", "user-key")
 
@@ -78,73 +78,6 @@ class Test_DynamicDiskSyncedMapping:
         assert _TEST_KEY not in ddsm
 
 
-class Test_StaticDiskSyncedMapping:
-    def _mock_load(self, mocker):
-        stored_item_states = (
-            '{("check1", None, "stored-user-key-1"): 23,'
-            ' ("check2", "item", "stored-user-key-2"): 42}'
-        )
-
-        mocker.patch.object(
-            store,
-            "load_text_from_file",
-            side_effect=lambda *a, **kw: stored_item_states,
-        )
-
-    def _mock_store(self, mocker):
-        mocker.patch.object(
-            store,
-            "save_text_to_file",
-            autospec=True,
-        )
-
-    @staticmethod
-    def _get_sdsm(
-        tmp_path: Path,
-    ) -> _StaticDiskSyncedMapping[tuple[str, str | None, str], object]:
-        return _StaticDiskSyncedMapping(
-            path=tmp_path / "test-host",
-            log_debug=lambda msg: None,
-            serializer=repr,
-            deserializer=literal_eval,
-        )
-
-    def test_mapping_features(self, mocker: Mock, tmp_path: Path) -> None:
-        self._mock_load(mocker)
-        sdsm = self._get_sdsm(tmp_path)
-        assert sdsm.get(("check_no", None, "moo")) is None
-        with pytest.raises(KeyError):
-            _ = sdsm[("check_no", None, "moo")]
-        assert len(sdsm) == 2
-
-        assert sdsm.get(("check1", None, "stored-user-key-1")) == 23
-        assert sdsm[("check2", "item", "stored-user-key-2")] == 42
-        assert list(sdsm) == [
-            ("check1", None, "stored-user-key-1"),
-            ("check2", "item", "stored-user-key-2"),
-        ]
-        assert len(sdsm) == 2
-
-    def test_store(self, mocker: Mock, tmp_path: Path) -> None:
-        self._mock_load(mocker)
-        self._mock_store(mocker)
-
-        sdsm = self._get_sdsm(tmp_path)
-
-        sdsm.disksync(
-            removed={("check2", "item", "stored-user-key-2")},
-            updated=[(("check3", "el Barto", "Ay caramba"), "ASDF")],
-        )
-
-        expected_values = {
-            ("check1", None, "stored-user-key-1"): 23,
-            ("check3", "el Barto", "Ay caramba"): "ASDF",
-        }
-        written = store.save_text_to_file.call_args.args[1]  # type: ignore[attr-defined]
-        assert written == repr(expected_values)
-        assert list(sdsm.items()) == list(expected_values.items())
-
-
 class Test_DiskSyncedMapping:
     @staticmethod
     def _get_dsm() -> _DiskSyncedMapping:
@@ -213,6 +146,97 @@ class Test_DiskSyncedMapping:
         assert sorted(dsm) == [("dyn", "key", "1"), ("stat", "key", "2")]
 
 
+class TestValueStoreDatabase:
+    _HOST = HostName("heute")
+
+    @staticmethod
+    def _get_database(tmp_path: Path, max_delay: float = 60) -> ValueStoreDatabase[str, str]:
+        return ValueStoreDatabase[str, str](
+            tmp_path / "counters.sqlite",
+            legacy_dir=tmp_path / "counters",
+            log_debug=lambda msg: None,
+            serializer=json.dumps,
+            deserializer=json.loads,
+            max_delay=max_delay,
+        )
+
+    @staticmethod
+    def _write(
+        database: ValueStoreDatabase[str, str], values: Mapping[str, str], *, batched: bool
+    ) -> None:
+        database.update(
+            TestValueStoreDatabase._HOST, removed=(), updated=values.items(), batched=batched
+        )
+
+    def test_update_and_load(self, tmp_path: Path) -> None:
+        database = self._get_database(tmp_path)
+        assert database.load(self._HOST) == {}
+
+        self._write(database, {"a": "1", "b": "2"}, batched=False)
+        database.update(self._HOST, removed=["a"], updated=[("c", "3")], batched=False)
+
+        assert database.load(self._HOST) == {"b": "2", "c": "3"}
+        assert self._get_database(tmp_path).load(self._HOST) == {"b": "2", "c": "3"}
+
+    def test_batched_changes(self, tmp_path: Path) -> None:
+        database = self._get_database(tmp_path)
+        database.load(self._HOST)
+        self._write(database, {"a": "1"}, batched=True)
+
+        assert database.load(self._HOST) == {"a": "1"}
+        assert self._get_database(tmp_path).load(self._HOST) == {}
+
+        database.flush()
+        assert self._get_database(tmp_path).load(self._HOST) == {"a": "1"}
+
+    def test_batched_changes_are_written_when_idle(self, tmp_path: Path) -> None:
+        database = self._get_database(tmp_path, max_delay=0.05)
+        database.load(self._HOST)
+        self._write(database, {"a": "1"}, batched=True)
+
+        deadline = time.monotonic() + 10
+        while self._get_database(tmp_path).load(self._HOST) != {"a": "1"}:
+            assert time.monotonic() < deadline, "pending changes have not been written"
+            time.sleep(0.01)
+
+    def test_outdated_changes_are_discarded(self, tmp_path: Path) -> None:
+        database = self._get_database(tmp_path)
+        other_process = self._get_database(tmp_path)
+        self._write(database, {"a": "old"}, batched=False)
+        self._write(database, {"a": "pending"}, batched=True)
+
+        other_process.load(self._HOST)
+        self._write(other_process, {"a": "new"}, batched=False)
+        database.flush()
+
+        assert database.load(self._HOST) == {"a": "new"}
+        assert self._get_database(tmp_path).load(self._HOST) == {"a": "new"}
+
+    def test_legacy_files_are_migrated(self, tmp_path: Path) -> None:
+        (legacy_dir := tmp_path / "counters").mkdir()
+        (legacy_file := legacy_dir / str(self._HOST)).write_text('{"a": "1"}')
+        database = self._get_database(tmp_path)
+
+        assert database.load(self._HOST) == {"a": "1"}
+        assert database.migrate() == 1
+
+        assert not legacy_file.exists()
+        assert self._get_database(tmp_path).load(self._HOST) == {"a": "1"}
+
+    def test_remove_and_rename(self, tmp_path: Path) -> None:
+        database = self._get_database(tmp_path)
+        new_name = HostName("morgen")
+        self._write(database, {"a": "1"}, batched=True)
+
+        assert database.rename(self._HOST, new_name)
+        assert database.load(self._HOST) == {}
+        assert database.load(new_name) == {"a": "1"}
+
+        assert database.remove(new_name)
+        assert not database.remove(new_name)
+        assert database.load(new_name) == {}
+
+
 class Test_ValueStore:
     @staticmethod
     def _get_store() -> _ValueStore:
@@ -264,3 +288,19 @@ class TestValueStoreManager:
             assert vsm.active_service_interface["key"] == "outer"
 
         assert vsm.active_service_interface is None
+
+    @staticmethod
+    def test_save_and_load(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(ValueStoreManager, "DATABASE_PATH", tmp_path / "counters.sqlite")
+        service = ServiceID(CheckPluginName("unit_test"), None)
+
+        vsm = ValueStoreManager(HostName("test-host"))
+        with vsm.namespace(service):
+            assert vsm.active_service_interface is not None
+            vsm.active_service_interface["key"] = 42
+        vsm.save()
+
+        vsm = ValueStoreManager(HostName("test-host"))
+        with vsm.namespace(service):
+            assert vsm.active_service_interface is not None
+            assert vsm.active_service_interface["key"] == 42
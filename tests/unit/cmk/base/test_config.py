@@ -5,6 +5,7 @@
 
 # pylint: disable=protected-access
 
+import hashlib
 import itertools
 import re
 import shutil
@@ -2924,6 +2925,7 @@ def test_save_packed_config(monkeypatch: MonkeyPatch, config_path: VersionedConf
     config.save_packed_config(config_path, config_cache)
 
     assert precompiled_check_config.exists()
+    assert (Path(config_path) / "precomputed_host_rule_matches").exists()
 
 
 def test_load_packed_config(config_path: VersionedConfigPath) -> None:
@@ -2954,6 +2956,18 @@ class TestPackedConfigStore:
         assert precompiled_check_config.exists()
         assert store.read() == {"abc": 1}
 
+    def test_digest(self, store: config.PackedConfigStore) -> None:
+        store.write({"abc": 1})
+        digest = store.digest()
+        assert digest == hashlib.sha256(store.path.read_bytes()).digest()
+
+        store.write({"abc": 2})
+        assert store.digest() != digest
+
+        # Written by a version not storing the digest
+        store.path.with_suffix(".mk.sha256").unlink()
+        assert store.digest() == hashlib.sha256(store.path.read_bytes()).digest()
+
 
 def test__extract_check_plugins(monkeypatch: MonkeyPatch) -> None:
     duplicate_plugin = {
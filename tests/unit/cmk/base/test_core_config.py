@@ -23,6 +23,7 @@ from cmk.utils.labels import Labels, LabelSources
 from cmk.utils.tags import TagGroupID, TagID
 
 from cmk.checkengine.checking import CheckPluginName, ConfiguredService
+from cmk.checkengine.discovery import AutocheckEntry
 from cmk.checkengine.parameters import TimespecificParameters
 
 import cmk.base.nagios_utils
@@ -109,6 +110,68 @@ def test_do_create_config_nagios_collects_passwords(
     assert password_store.load(core_store) == passwords
 
 
+def _nagios_config_files() -> Mapping[str, bytes]:
+    """The files created per host, and the object configuration"""
+    config_dir = Path(LATEST_CONFIG).resolve()
+    return {
+        "objects": Path(cmk.utils.paths.nagios_objects_file).read_bytes(),
+        **{
+            # The host checks refer to their own paths
+            str(path.relative_to(config_dir)): path.read_bytes().replace(
+                str(config_dir).encode(), b"<config_dir>"
+            )
+            for path in [
+                *config_dir.glob("notify/*/*"),
+                # The compiled host checks contain the modification time of their source
+                *config_dir.glob("host_checks/*.py"),
+            ]
+        },
+    }
+
+
+def test_do_create_config_nagios_parallel(monkeypatch: pytest.MonkeyPatch) -> None:
+    ts = Scenario()
+    hostnames = [HostName(f"host{nr}") for nr in range(9)]
+    for hostname in hostnames:
+        ts.add_host(hostname)
+        ts.set_autochecks(hostname, [AutocheckEntry(CheckPluginName("uptime"), None, {}, {})])
+    ts.add_cluster(HostName("cluster"), nodes=hostnames[:2])
+    ts.set_option("ipaddresses", {hostname: "127.0.0.1" for hostname in hostnames})
+    ts.set_ruleset(
+        "host_check_commands",
+        [
+            {"id": "01", "condition": {"host_name": ["host1", "host4"]}, "value": "agent"},
+            {"id": "02", "condition": {"host_name": ["host6"]}, "value": ("service", "Uptime")},
+        ],
+    )
+    ts.set_option("define_hostgroups", {"group3": "Group 3"})
+    ts.set_ruleset(
+        "host_groups",
+        [
+            {"id": "03", "condition": {"host_name": ["host3"]}, "value": "group3"},
+            {"id": "04", "condition": {"host_name": ["host7"]}, "value": "group7"},
+        ],
+    )
+    config_cache = ts.apply(monkeypatch)
+    monkeypatch.setattr(config, "get_resource_macros", lambda *_: {})
+
+    files = {}
+    for workers in (1, 3):
+        monkeypatch.setattr(config, "nagios_config_workers", workers)
+        core_config.do_create_config(
+            create_core("nagios"),
+            config_cache,
+            config.ConfiguredIPLookup(config_cache, error_handler=ip_lookup.CollectFailedHosts()),
+            all_hosts=hostnames,
+            duplicates=(),
+        )
+        files[workers] = _nagios_config_files()
+
+    assert b"check-mk-host-custom-3" in files[1]["objects"]
+    assert {"notify/host_config/host8", "host_checks/host8.py"} <= set(files[1])
+    assert files[3] == files[1]
+
+
 def test_get_host_attributes(monkeypatch: MonkeyPatch) -> None:
     ts = Scenario()
     ts.add_host(HostName("test-host"), tags={TagGroupID("agent"): TagID("no-agent")})
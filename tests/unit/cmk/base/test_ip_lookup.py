@@ -4,6 +4,8 @@
 # conditions defined in the file COPYING, which is part of this source code package.
 
 import socket
+import threading
+import time
 from collections.abc import Mapping
 from pathlib import Path
 from typing import TypeAlias
@@ -237,6 +239,107 @@ def test_filecache_beats_failing_lookup(monkeypatch: MonkeyPatch) -> None:
     assert persisted_cache[(HostName("test_host"), socket.AF_INET)]
 
 
+def test_resolve_concurrently() -> None:
+    lock = threading.Lock()
+    running = max_running = 0
+
+    def resolver(host_name: HostName | HostAddress, family: socket.AddressFamily) -> HostAddress:
+        nonlocal running, max_running
+        with lock:
+            running += 1
+            max_running = max(running, max_running)
+        time.sleep(0.01)
+        with lock:
+            running -= 1
+        if host_name == "unknown":
+            raise OSError("Name or service not known")
+        return HostAddress(f"10.0.0.{host_name[-1]}")
+
+    cache_ids = [(HostName(f"host{n}"), socket.AF_INET) for n in range(8)]
+    result = ip_lookup.resolve_concurrently(
+        [*cache_ids, (HostName("unknown"), socket.AF_INET)], resolver=resolver, max_workers=3
+    )
+
+    assert {cache_id: result[cache_id] for cache_id in cache_ids} == {
+        (HostName(f"host{n}"), socket.AF_INET): HostAddress(f"10.0.0.{n}") for n in range(8)
+    }
+    assert isinstance(result[(HostName("unknown"), socket.AF_INET)], OSError)
+    assert max_running <= 3
+
+
+def test_resolve_concurrently_timeout() -> None:
+    hanging = threading.Event()
+
+    def resolver(host_name: HostName | HostAddress, family: socket.AddressFamily) -> HostAddress:
+        if host_name == "hanging":
+            hanging.wait(5)
+        return HostAddress("10.0.0.1")
+
+    result = ip_lookup.resolve_concurrently(
+        [(HostName("hanging"), socket.AF_INET), (HostName("fast"), socket.AF_INET)],
+        resolver=resolver,
+        timeout=0.1,
+    )
+    hanging.set()
+
+    assert isinstance(result[(HostName("hanging"), socket.AF_INET)], TimeoutError)
+    assert result[(HostName("fast"), socket.AF_INET)] == HostAddress("10.0.0.1")
+
+
+def test_cached_dns_lookups(monkeypatch: MonkeyPatch) -> None:
+    config_ipcache: _IPLookupCacheMapping = {}
+    caches = {"cached_dns_lookup": config_ipcache, "ip_lookup": {}}
+    monkeypatch.setattr(cache_manager, "obtain_cache", caches.__getitem__)
+    ip_lookup.IPLookupCache(
+        {
+            (HostName("cached"), socket.AF_INET): HostAddress("1.1.1.1"),
+            (HostName("failing"), socket.AF_INET): HostAddress("2.2.2.2"),
+        }
+    ).save_persisted()
+
+    writes = []
+    save_persisted = ip_lookup.IPLookupCache.save_persisted
+
+    def count_writes(self: ip_lookup.IPLookupCache) -> None:
+        writes.append(len(self))
+        save_persisted(self)
+
+    monkeypatch.setattr(ip_lookup.IPLookupCache, "save_persisted", count_writes)
+
+    def resolver(host_name: HostName | HostAddress, family: socket.AddressFamily) -> HostAddress:
+        if host_name.startswith("new"):
+            return HostAddress(f"10.0.0.{host_name[-1]}")
+        raise OSError("Name or service not known")
+
+    ip_lookup.cached_dns_lookups(
+        [
+            (HostName("cached"), socket.AF_INET),
+            (HostName("failing"), socket.AF_INET),
+            (HostName("unknown"), socket.AF_INET),
+            *((HostName(f"new{n}"), socket.AF_INET) for n in range(5)),
+        ],
+        force_file_cache_renewal=False,
+        resolver=resolver,
+    )
+
+    # All new addresses are written at once
+    assert writes == [7]
+    assert config_ipcache[(HostName("cached"), socket.AF_INET)] == HostAddress("1.1.1.1")
+    assert config_ipcache[(HostName("failing"), socket.AF_INET)] == HostAddress("2.2.2.2")
+    assert isinstance(config_ipcache[(HostName("unknown"), socket.AF_INET)], MKIPAddressLookupError)
+    assert config_ipcache[(HostName("new3"), socket.AF_INET)] == HostAddress("10.0.0.3")
+
+    persisted = ip_lookup.IPLookupCache({})
+    persisted.load_persisted()
+    assert persisted.get((HostName("new3"), socket.AF_INET)) == HostAddress("10.0.0.3")
+    assert persisted.get((HostName("unknown"), socket.AF_INET)) is None
+
+    # Answered from the config cache
+    assert ip_lookup.cached_dns_lookup(
+        HostName("new3"), family=socket.AF_INET, force_file_cache_renewal=True
+    ) == HostAddress("10.0.0.3")
+
+
 class TestIPLookupCacheSerialzer:
     def test_simple_cache(self) -> None:
         s = ip_lookup.IPLookupCacheSerializer()
@@ -315,6 +418,27 @@ class TestIPLookupCache:
         new_cache_instance.load_persisted()
         assert new_cache_instance[cache_id1] == HostAddress("0.0.0.0")
 
+    def test_batched_updates(self, tmp_path: Path) -> None:
+        cache_id1 = HostName("host1"), socket.AF_INET
+        cache_id2 = HostName("host2"), socket.AF_INET
+        cache_id3 = HostName("host3"), socket.AF_INET
+
+        ip_lookup_cache = ip_lookup.IPLookupCache({})
+        with ip_lookup_cache.batched_updates():
+            ip_lookup_cache[cache_id1] = HostAddress("127.0.0.1")
+            ip_lookup_cache[cache_id2] = HostAddress("127.0.0.2")
+            # Updated by another process in the meantime
+            ip_lookup.IPLookupCache({cache_id3: HostAddress("127.0.0.3")}).save_persisted()
+            assert ip_lookup_cache[cache_id1] == HostAddress("127.0.0.1")
+
+        new_cache_instance = ip_lookup.IPLookupCache({})
+        new_cache_instance.load_persisted()
+        assert new_cache_instance == {
+            cache_id1: HostAddress("127.0.0.1"),
+            cache_id2: HostAddress("127.0.0.2"),
+            cache_id3: HostAddress("127.0.0.3"),
+        }
+
     def test_load_legacy(self, tmp_path: Path) -> None:
         cache_id1 = HostName("host1"), socket.AF_INET
         cache_id2 = HostName("host2"), socket.AF_INET
@@ -4,7 +4,10 @@
 # conditions defined in the file COPYING, which is part of this source code package.
 
 import os
+import time
+import uuid
 from collections.abc import Mapping
+from pathlib import Path
 from typing import Final
 
 import pytest
@@ -129,3 +132,86 @@ def test_rbn_groups_contacts(user_groups: Mapping[ContactName, list[str]]) -> No
         "dong",
         "harry",
     }
+
+
+def _store_notification(bulk_dir: Path, mtime: float) -> None:
+    bulk_dir.mkdir(parents=True, exist_ok=True)
+    (path := bulk_dir / str(uuid.uuid4())).write_text("({}, {})\n")
+    os.utime(path, (mtime, mtime))
+
+
+def test_bulk_index_ripe_bulks(tmp_path: Path) -> None:
+    now = time.time()
+    by_age = tmp_path / "alice/mail/60,10"
+    by_count = tmp_path / "alice/mail/3600,2,host,h1"
+    not_ripe = tmp_path / "bob/mail/3600,10"
+    waiting = tmp_path / "bob/mail/timeperiod:night,10"
+    _store_notification(by_age, now - 70)
+    _store_notification(by_count, now - 10)
+    _store_notification(by_count, now - 5)
+    _store_notification(not_ripe, now - 10)
+    _store_notification(waiting, now - 10)
+
+    index = notify.BulkIndex(str(tmp_path))
+    index.rebuild()
+    assert len(index) == 4
+    assert index.timeperiods() == {"night"}
+    assert index.next_ripe_time() == 0.0
+
+    ripe = index.ripe_bulks(now, None)
+    assert sorted(bulk[0] for bulk in ripe) == [str(by_count), str(by_age)]
+
+    ripe = index.ripe_bulks(now, {"night": False})
+    assert sorted(bulk[0] for bulk in ripe) == [str(by_count), str(by_age), str(waiting)]
+    assert index.ripe_bulks(now, {"night": True}) == index.ripe_bulks(now, None)
+
+
+def test_bulk_index_add_and_refresh(tmp_path: Path) -> None:
+    now = time.time()
+    bulk_dir = tmp_path / "alice/mail/600,2"
+    _store_notification(bulk_dir, now - 10)
+
+    index = notify.BulkIndex(str(tmp_path))
+    index.rebuild()
+    assert index.next_ripe_time() == pytest.approx(now + 590, abs=1)
+
+    _store_notification(bulk_dir, now)
+    index.add(str(bulk_dir), now)
+    assert index.next_ripe_time() == 0.0
+
+    # Stored by another process
+    other_bulk_dir = tmp_path / "bob/mail/60,10"
+    _store_notification(other_bulk_dir, now - 30)
+    for path in bulk_dir.iterdir():
+        path.unlink()
+    bulk_dir.rmdir()
+
+    index.refresh()
+    assert len(index) == 1
+    assert index.next_ripe_time() == pytest.approx(now + 30, abs=1)
+
+
+def test_bulk_scheduler(tmp_path: Path, monkeypatch: MonkeyPatch) -> None:
+    queried = []
+
+    def timeperiod_active(timeperiod: str) -> bool:
+        queried.append(timeperiod)
+        return False
+
+    monkeypatch.setattr(notify, "timeperiod_active", timeperiod_active)
+    now = time.time()
+    _store_notification(tmp_path / "alice/mail/timeperiod:night,10", now)
+    _store_notification(tmp_path / "bob/mail/timeperiod:night,10,host,h1", now)
+    _store_notification(tmp_path / "bob/mail/3600,10", now)
+
+    index = notify.BulkIndex(str(tmp_path))
+    index.rebuild()
+    scheduler = notify.BulkScheduler(index, bulk_interval=10)
+
+    assert scheduler.timeout() == 0.0
+    assert len(scheduler.ripe_bulks()) == 2
+    assert queried == ["night"]
+    # Until the next cycle, the time periods are not queried again
+    assert 9 < scheduler.timeout() <= 10
+    assert not scheduler.ripe_bulks()
+    assert queried == ["night"]
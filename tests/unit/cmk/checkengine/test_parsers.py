@@ -8,9 +8,10 @@
 import copy
 import itertools
 import logging
+import pickle
 import time
 from collections import defaultdict
-from collections.abc import Sequence
+from collections.abc import Mapping, Sequence
 from pathlib import Path
 
 import pytest
@@ -29,7 +30,7 @@ from cmk.checkengine.parser import (
     SectionStore,
     SNMPParser,
 )
-from cmk.checkengine.parser._agent import ParserState
+from cmk.checkengine.parser._agent import ImmutableSection, NOOPParser, ParserState
 from cmk.checkengine.parser._markers import PiggybackMarker, SectionMarker
 
 StringTable = list[list[str]]
@@ -542,12 +543,17 @@ class TestAgentParser:
         monkeypatch.setattr(
             SectionStore,
             "load",
-            lambda self: {
+            lambda self, section_names=None: {
                 SectionName("persisted"): (42, 69, [["content"]]),
             },
         )
+        monkeypatch.setattr(
+            SectionStore,
+            "load_headers",
+            lambda self: {SectionName("persisted"): (42, 69)},
+        )
         # Patch IO:
-        monkeypatch.setattr(SectionStore, "store", lambda self, sections: None)
+        monkeypatch.setattr(SectionStore, "add", lambda self, sections: None)
 
         raw_data = AgentRawData(
             b"\n".join(
@@ -731,6 +737,92 @@ class TestAgentParser:
         }
         assert store.load() == {}
 
+    @staticmethod
+    def _parse_line_by_line(
+        parser: AgentParser, raw_data: AgentRawData
+    ) -> tuple[ImmutableSection, Mapping[PiggybackMarker, ImmutableSection]]:
+        state: ParserState = NOOPParser(
+            parser.hostname,
+            [],
+            {},
+            translation=parser.translation,
+            encoding_fallback=parser.encoding_fallback,
+            logger=logging.getLogger("test"),
+        )
+        for line in raw_data.split(b"\n"):
+            state = state(line.rstrip(b"\r"))
+        return state.sections, state.piggyback_sections
+
+    @pytest.mark.parametrize(
+        "raw_data",
+        [
+            b"",
+            b"<<<a>>>",
+            b"<<<a>>>\n1 2\n3 4\n",
+            b"junk\n<<<a>>>\r\n  1 2 \r\n\r\n \t \n3\r4\n<<<>>>\nignored\n",
+            b"<<<a:nostrip>>>\n  1 2  \n<<<b:sep(44)>>>\nx,y\n<<<a:nostrip>>>\n 3 \n",
+            b"<<<a>>>\n<<<not a marker\n<<<b>>> trailing\n  <<<c>>>\n<<<:cached(1,2)>>>\nx",
+            b"<<<a:encoding(utf-8)>>>\n\xc3\xa4\n<<<b>>>\n\xe4\n<<<c:sep(0)>>>\nx\x00y",
+            b"<<<a>>>\n1\n<<<<piggy>>>>\n<<<a>>>\n2\n<<<<>>>>\n3\n<<<a>>>\n4",
+            b"<<<<piggy>>>>\r\n<<<x:persist(2000)>>>\r\n 1 \r\n<<<<.>>>>\n<<<y>>>\n2\n<<<<>>>>",
+            b"<<<<testhost>>>>\n<<<a>>>\n1\n<<<<other>>>>\nno section\n<<<>>>\n<<<b>>>\n2",
+        ],
+    )
+    def test_split_like_line_by_line(
+        self, parser: AgentParser, raw_data: bytes, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(time, "time", lambda: 1000)
+        ahs = parser.parse(AgentRawData(raw_data), selection=NO_SELECTION)
+
+        monkeypatch.setattr(
+            parser, "_parse_host_section", lambda raw: self._parse_line_by_line(parser, raw)
+        )
+        expected = parser.parse(AgentRawData(raw_data), selection=NO_SELECTION)
+
+        assert ahs.sections == expected.sections
+        assert ahs.cache_info == expected.cache_info
+        assert ahs.piggybacked_raw_data == expected.piggybacked_raw_data
+
+    def test_sections_are_decoded_lazily(self, parser: AgentParser) -> None:
+        ahs = parser.parse(
+            AgentRawData(b"<<<a:sep(44)>>>\n1,2\n<<<b>>>\n3\n"), selection=NO_SELECTION
+        )
+        assert ahs.sections[SectionName("a")] == [["1", "2"]]
+        assert list(ahs.sections[SectionName("b")]) == [["3"]]
+        assert pickle.loads(pickle.dumps(ahs.sections[SectionName("a")])) == [["1", "2"]]
+        assert type(pickle.loads(pickle.dumps(ahs.sections[SectionName("a")]))) is list
+
+    @pytest.mark.slow
+    def test_benchmark_parse(self, parser: AgentParser, capsys: pytest.CaptureFixture[str]) -> None:
+        """Throughput of the splitting of a large agent output, with one section selected"""
+        raw_data = AgentRawData(
+            b"\n".join(
+                b"<<<section_%d>>>\n" % nr
+                + b"\n".join(b"line %d of section %d with some words" % (i, nr) for i in range(200))
+                for nr in range(1500)
+            )
+        )
+        selection = frozenset({SectionName("section_42")})
+
+        def measure() -> float:
+            start = time.perf_counter()
+            ahs = parser.parse(raw_data, selection=selection)
+            assert len(ahs.sections[SectionName("section_42")]) == 200
+            return time.perf_counter() - start
+
+        duration = measure()
+        with pytest.MonkeyPatch.context() as monkeypatch:
+            monkeypatch.setattr(
+                parser, "_parse_host_section", lambda raw: self._parse_line_by_line(parser, raw)
+            )
+            line_by_line = measure()
+
+        with capsys.disabled():
+            print(
+                f"\n{len(raw_data) / 1e6:.1f}MB agent output: {duration:.3f}s"
+                f" (line by line: {line_by_line:.3f}s)"
+            )
+
 
 class ParserStateAdapter(ParserState):
     def __init__(self, *, translation: TranslationOptions | None = None):
@@ -920,12 +1012,17 @@ class TestSNMPParser:
         monkeypatch.setattr(
             SectionStore,
             "load",
-            lambda self: {
+            lambda self, section_names=None: {
                 SectionName("persisted"): (42, 69, [["content"]]),
             },
         )
+        monkeypatch.setattr(
+            SectionStore,
+            "load_headers",
+            lambda self: {SectionName("persisted"): (42, 69)},
+        )
         # Patch IO:
-        monkeypatch.setattr(SectionStore, "store", lambda self, sections: None)
+        monkeypatch.setattr(SectionStore, "add", lambda self, sections: None)
 
         raw_data = sections
 
@@ -938,15 +1035,32 @@ class TestSNMPParser:
 
 
 class MockStore(SectionStore):
-    def __init__(self, path: str | Path, sections: object, *, logger: logging.Logger) -> None:
+    def __init__(
+        self, path: str | Path, sections: dict[SectionName, tuple], *, logger: logging.Logger
+    ) -> None:
         super().__init__(path, logger=logger)
         self._sections = sections
 
     def store(self, sections):
         self._sections = copy.copy(sections)
 
-    def load(self):
-        return copy.copy(self._sections)
+    def add(self, sections):
+        self._sections = {**self._sections, **sections}
+
+    def discard(self, section_names, predicate):
+        self._sections = {
+            name: entry
+            for name, entry in self._sections.items()
+            if name not in section_names or not predicate(*entry[:2])
+        }
+
+    def load_headers(self):
+        return {name: entry[:2] for name, entry in self._sections.items()}
+
+    def load(self, section_names=None):
+        if section_names is None:
+            return copy.copy(self._sections)
+        return {name: self._sections[name] for name in section_names if name in self._sections}
 
 
 class TestAgentPersistentSectionHandling:
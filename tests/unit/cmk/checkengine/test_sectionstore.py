@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import logging
+import pickle
+from collections.abc import Iterable
+from pathlib import Path
+
+import pytest
+
+from cmk.utils.sectionname import SectionName
+
+from cmk.checkengine.parser import NO_SELECTION, SectionStore
+
+
+@pytest.fixture(name="store")
+def _store(tmp_path: Path) -> SectionStore[list[str]]:
+    return SectionStore[list[str]](tmp_path / "host", logger=logging.getLogger("test"))
+
+
+def test_store_and_load(store: SectionStore[list[str]]) -> None:
+    store.store({SectionName("a"): (1, 2, ["a"]), SectionName("b"): (3, 4, ["b"])})
+
+    assert store.path.is_dir()
+    assert store.load() == {SectionName("a"): (1, 2, ["a"]), SectionName("b"): (3, 4, ["b"])}
+    assert store.load([SectionName("b"), SectionName("missing")]) == {
+        SectionName("b"): (3, 4, ["b"])
+    }
+    assert store.load_headers() == {SectionName("a"): (1, 2), SectionName("b"): (3, 4)}
+
+
+def test_store_replaces_all_sections(store: SectionStore[list[str]]) -> None:
+    store.store({SectionName("a"): (1, 2, ["a"]), SectionName("b"): (3, 4, ["b"])})
+    store.store({SectionName("b"): (5, 6, ["new"])})
+    assert store.load() == {SectionName("b"): (5, 6, ["new"])}
+
+    store.store({})
+    assert not store.path.exists()
+    assert store.load() == {}
+
+
+def test_add_keeps_other_sections(store: SectionStore[list[str]]) -> None:
+    store.store({SectionName("a"): (1, 2, ["a"])})
+    (store.path / "a").touch()  # must not be rewritten
+    mtime = (store.path / "a").stat().st_mtime_ns
+
+    store.add({SectionName("b"): (3, 4, ["b"])})
+
+    assert store.load() == {SectionName("a"): (1, 2, ["a"]), SectionName("b"): (3, 4, ["b"])}
+    assert (store.path / "a").stat().st_mtime_ns == mtime
+
+
+def test_discard_evaluates_predicate(store: SectionStore[list[str]]) -> None:
+    store.store({SectionName("a"): (1, 2, ["a"]), SectionName("b"): (3, 100, ["b"])})
+
+    store.discard([SectionName("a"), SectionName("b")], lambda _created_at, until: until < 50)
+
+    assert store.load() == {SectionName("b"): (3, 100, ["b"])}
+
+
+def test_empty_section_files_are_skipped(store: SectionStore[list[str]]) -> None:
+    store.store({SectionName("a"): (1, 2, ["a"])})
+    (store.path / "empty").touch()  # as left by locking a missing file
+
+    assert store.load() == {SectionName("a"): (1, 2, ["a"])}
+    assert store.load_headers() == {SectionName("a"): (1, 2)}
+
+
+def test_legacy_file_is_read_and_converted(store: SectionStore[list[str]]) -> None:
+    store.path.write_bytes(pickle.dumps({"a": (1, 2, ["a"]), "old": (1, 2)}))
+
+    assert store.load() == {SectionName("a"): (1, 2, ["a"])}
+    assert store.load_headers() == {SectionName("a"): (1, 2)}
+
+    store.add({SectionName("b"): (3, 4, ["b"])})
+
+    assert store.path.is_dir()
+    assert store.load() == {SectionName("a"): (1, 2, ["a"]), SectionName("b"): (3, 4, ["b"])}
+    assert not list(store.path.parent.glob(".*"))
+
+
+def test_update_loads_only_selected_sections(
+    store: SectionStore[list[str]], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    store.store(
+        {
+            SectionName("selected"): (1, 2, ["selected"]),
+            SectionName("deselected"): (1, 2, ["deselected"]),
+            SectionName("live"): (1, 2, ["persisted"]),
+        }
+    )
+    requested: list[SectionName] = []
+    load = store.load
+
+    def spy_load(section_names: Iterable[SectionName] | None = None) -> object:
+        assert section_names is not None
+        requested.extend(section_names)
+        return load(requested)
+
+    monkeypatch.setattr(store, "load", spy_load)
+    cache_info: dict[SectionName, tuple[int, int]] = {}
+
+    sections = store.update(
+        {SectionName("live"): ["live"]},
+        cache_info,
+        lambda _section_name: None,
+        lambda valid_until, now: valid_until < now,
+        now=1,
+        keep_outdated=False,
+        selection=frozenset({SectionName("selected"), SectionName("live")}),
+    )
+
+    assert sections == {SectionName("live"): ["live"], SectionName("selected"): ["selected"]}
+    assert cache_info == {SectionName("selected"): (1, 1)}
+    assert requested == [SectionName("selected")]
+
+
+def test_update_removes_outdated_sections(store: SectionStore[list[str]]) -> None:
+    store.store({SectionName("outdated"): (1, 2, ["old"]), SectionName("valid"): (1, 20, ["ok"])})
+
+    sections = store.update(
+        {SectionName("new"): ["new"]},
+        {},
+        lambda _section_name: (10, 30),
+        lambda valid_until, now: valid_until < now,
+        now=10,
+        keep_outdated=False,
+    )
+
+    assert sections == {SectionName("new"): ["new"], SectionName("valid"): ["ok"]}
+    assert store.load() == {
+        SectionName("new"): (10, 30, ["new"]),
+        SectionName("valid"): (1, 20, ["ok"]),
+    }
+
+
+def test_update_keeps_outdated_sections(store: SectionStore[list[str]]) -> None:
+    store.store({SectionName("outdated"): (1, 2, ["old"])})
+
+    sections = store.update(
+        {},
+        {},
+        lambda _section_name: None,
+        lambda valid_until, now: valid_until < now,
+        now=10,
+        keep_outdated=True,
+        selection=NO_SELECTION,
+    )
+
+    assert sections == {SectionName("outdated"): ["old"]}
+    assert store.load() == {SectionName("outdated"): (1, 2, ["old"])}
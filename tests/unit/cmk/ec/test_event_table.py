@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import logging
+import time
+
+import pytest
+
+from tests.unit.cmk.ec.helpers import new_event
+
+from cmk.utils.hostaddress import HostName
+
+import cmk.ec.export as ec
+from cmk.ec.config import Config, Count, ServiceLevel
+from cmk.ec.event_table import EventTable
+from cmk.ec.main import (
+    create_history,
+    EventServer,
+    EventStatus,
+    StatusTableEvents,
+    StatusTableHistory,
+)
+
+
+def _event(event_id: int, rule_id: str, host: str) -> ec.Event:
+    return ec.Event(id=event_id, rule_id=rule_id, host=HostName(host))
+
+
+def _ids(events: object) -> list[int]:
+    assert not isinstance(events, str)
+    return [event["id"] for event in events]  # type: ignore[attr-defined]
+
+
+def test_lookups() -> None:
+    table = EventTable(
+        [
+            _event(1, "r1", "heute"),
+            _event(2, "r2", "Heute"),
+            _event(3, "r1", "morgen"),
+            _event(4, "r1", "heute"),
+        ]
+    )
+
+    assert len(table) == 4
+    assert _ids(table) == [1, 2, 3, 4]
+    assert table.get(3) == _event(3, "r1", "morgen")
+    assert table.get(5) is None
+    assert table.oldest() == _event(1, "r1", "heute")
+    assert _ids(table.of_rule("r1")) == [1, 3, 4]
+    assert _ids(table.of_rule("unknown")) == []
+    assert _ids(table.of_host("HEUTE")) == [1, 2, 4]
+    assert _ids(table.of_hosts(["morgen", "heute"])) == [1, 2, 3, 4]
+    assert _ids(table.of_hosts(["unknown"])) == []
+    assert _ids(table.of_rule_and_host("r1", "heute")) == [1, 4]
+
+
+def test_remove() -> None:
+    event = _event(1, "r1", "heute")
+    table = EventTable([event, _event(2, "r1", "heute")])
+
+    assert not table.remove(_event(1, "r1", "heute"))  # An equal event is not the same event
+    assert table.remove(event)
+    assert not table.remove(event)
+    assert _ids(table) == [2]
+    assert _ids(table.of_rule_and_host("r1", "heute")) == [2]
+    assert table.oldest() == _event(2, "r1", "heute")
+
+    assert table.remove(table.get(2))  # type: ignore[arg-type]
+    assert table.oldest() is None
+    assert _ids(table.of_rule("r1")) == []
+
+
+def test_reindex_keeps_the_order() -> None:
+    event = _event(1, "r1", "heute")
+    table = EventTable([event, _event(2, "r1", "morgen")])
+
+    event["host"] = HostName("morgen")
+    table.reindex(event)
+
+    assert _ids(table.of_host("heute")) == []
+    assert _ids(table.of_host("morgen")) == [1, 2]
+    assert _ids(table.of_rule_and_host("r1", "morgen")) == [1, 2]
+
+
+def test_count_event_moves_event_to_new_host(event_status: EventStatus) -> None:
+    count = Count(
+        count=10,
+        period=86400,
+        algorithm="interval",
+        count_duration=None,
+        count_ack=False,
+        separate_host=False,
+        separate_application=False,
+        separate_match_groups=False,
+    )
+    first = new_event(ec.Event(host=HostName("heute"), core_host=None, host_in_downtime=False))
+    event_status.new_event(first)
+    second = new_event(ec.Event(host=HostName("morgen"), core_host=None, host_in_downtime=False))
+
+    assert event_status.count_event(None, second, count) is None  # type: ignore[arg-type]
+
+    assert first["count"] == 2
+    assert event_status.events_of_host("heute") == []
+    assert event_status.events_of_host("morgen") == [first]
+
+
+def _count_rule() -> ec.Rule:
+    return ec.Rule(
+        actions=[],
+        actions_in_downtime=True,
+        autodelete=False,
+        cancel_action_phases="always",
+        cancel_actions=[],
+        comment="",
+        description="",
+        disabled=False,
+        docu_url="",
+        id="link",
+        invert_matching=False,
+        match="Link (.*) down",
+        match_ok="Link (.*) up",
+        sl=ServiceLevel(precedence="message", value=0),
+        state=2,
+        count=Count(
+            count=1000,
+            period=86400,
+            algorithm="interval",
+            count_duration=None,
+            count_ack=False,
+            separate_host=True,
+            separate_application=False,
+            separate_match_groups=True,
+        ),
+    )
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("num_hosts", [1000, 100000])
+def test_load_process_potential_event(
+    event_server: EventServer,
+    event_status: EventStatus,
+    settings: ec.Settings,
+    config: Config,
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+    num_hosts: int,
+) -> None:
+    """Drive the event processing with a fixed message rate while many events are open"""
+    rule = _count_rule()
+    config_rule_packs: Config = config | {
+        "rule_packs": [ec.default_rule_pack([rule])],
+        "event_limit": {
+            "by_host": {"action": "stop_overflow", "limit": 1000},
+            "by_rule": {"action": "stop_overflow", "limit": 1000000},
+            "overall": {"action": "stop_overflow", "limit": 1000000},
+        },
+    }
+    event_server.reload_configuration(
+        config_rule_packs,
+        history=create_history(
+            settings,
+            config_rule_packs | {"archive_mode": "sqlite"},
+            logging.getLogger("cmk.mkeventd"),
+            StatusTableEvents.columns,
+            StatusTableHistory.columns,
+        ),
+    )
+    monkeypatch.setattr(event_server.host_config, "get_canonical_name", lambda host_name: None)
+
+    def message(host_number: int, text: str) -> ec.Event:
+        return ec.Event(
+            facility=1,
+            priority=3,
+            text=text,
+            host=HostName(f"switch{host_number:06}"),
+            ipaddress="127.0.0.1",
+            application="kernel",
+            pid=0,
+            time=time.time(),
+            core_host=None,
+            host_in_downtime=False,
+        )
+
+    for host_number in range(num_hosts):
+        event_server.process_potential_event(message(host_number, "Link eth0 down"))
+    assert len(event_status.events()) == num_hosts
+
+    rate = 2000  # messages per second
+    num_messages = 4000
+    start = time.perf_counter()
+    max_lag = 0.0
+    for nr in range(num_messages):
+        if (ahead := start + nr / rate - time.perf_counter()) > 0:
+            time.sleep(ahead)
+        max_lag = max(max_lag, time.perf_counter() - (start + nr / rate))
+        host_number = nr * 7919 % num_hosts
+        if nr % 4 == 3:
+            event_server.process_potential_event(message(host_number, "Link eth0 up"))
+        else:
+            event_server.process_potential_event(message(host_number, "Link eth0 down"))
+    duration = time.perf_counter() - start
+
+    assert len(event_status.events()) < num_hosts
+    with capsys.disabled():
+        print(
+            f"\n{num_hosts} open events: {num_messages} messages at {rate}/s"
+            f" processed in {duration:.3f}s (max. lag {max_lag * 1000:.1f}ms)"
+        )
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import logging
+import time
+from collections.abc import Iterator, Sequence
+
+import pytest
+
+import cmk.utils.paths
+
+import cmk.ec.export as ec
+from cmk.ec.config import Config, ServiceLevel
+from cmk.ec.helpers import ECLock
+from cmk.ec.history_file import FileHistory
+from cmk.ec.main import default_slave_status_master, EventServer, EventStatus, StatusTableEvents
+from cmk.ec.perfcounters import Perfcounters
+from cmk.ec.settings import create_settings
+
+
+def _rule(rule_id: str, **kwargs: object) -> ec.Rule:
+    rule = ec.Rule(
+        actions=[],
+        actions_in_downtime=True,
+        autodelete=False,
+        cancel_action_phases="always",
+        cancel_actions=[],
+        comment="",
+        description="",
+        disabled=False,
+        docu_url="",
+        id=rule_id,
+        invert_matching=False,
+        sl=ServiceLevel(precedence="message", value=0),
+        state=2,
+    )
+    rule.update(kwargs)  # type: ignore[typeddict-item]
+    return rule
+
+
+def _rule_packs() -> Sequence[ec.ECRulePack]:
+    return [
+        ec.ECRulePackSpec(
+            id="noise",
+            title="Noise",
+            disabled=False,
+            rules=[
+                _rule("skip_noise", match="noise", drop="skip_pack"),
+                _rule("never", match="noise"),
+            ],
+        ),
+        ec.default_rule_pack(
+            [
+                _rule("drop", match="ignore me", drop=True),
+                _rule("link", match="Link (.*) down", match_ok="Link (.*) up"),
+                _rule("kernel", match_application="kernel", match_priority=(0, 3), state=1),
+                _rule(
+                    "host", match_host="switch0[0-4]", match="temperature (\\d+)", set_text="\\1"
+                ),
+            ]
+        ),
+    ]
+
+
+def _messages(count: int) -> Iterator[bytes]:
+    texts = [
+        "Link eth{nr} down",
+        "noise {nr}",
+        "ignore me {nr}",
+        "temperature {nr}",
+        "Link eth{nr} up",
+        "something else {nr}",
+    ]
+    for nr in range(count):
+        yield (
+            f"<{(nr % 24) * 8 + nr % 8}>Oct 17 12:00:00 switch{nr % 10:02}"
+            f" {'kernel' if nr % 3 else 'sshd'}[{nr}]: {texts[nr % len(texts)].format(nr=nr % 7)}"
+        ).encode()
+
+
+def _event_server(
+    match_workers: int,
+    config: Config,
+    perfcounters: Perfcounters,
+    history: FileHistory,
+    monkeypatch: pytest.MonkeyPatch,
+) -> EventServer:
+    settings = create_settings(
+        "1.2.3i45",
+        cmk.utils.paths.omd_root,
+        ["mkeventd", "--match-workers", str(match_workers)],
+    )
+    event_server = EventServer(
+        logging.getLogger("cmk.mkeventd.EventServer"),
+        settings,
+        config,
+        default_slave_status_master(),
+        perfcounters,
+        ECLock(logging.getLogger("cmk.mkeventd.configuration")),
+        history,
+        EventStatus(
+            settings, config, perfcounters, history, logging.getLogger("cmk.mkeventd.EventStatus")
+        ),
+        StatusTableEvents.columns,
+        False,
+    )
+    config_rule_packs: Config = config | {"rule_packs": _rule_packs()}
+    event_server.reload_configuration(config_rule_packs, history)
+    monkeypatch.setattr(event_server.host_config, "get_canonical_name", lambda host_name: None)
+    return event_server
+
+
+def _open_events(event_server: EventServer) -> list[ec.Event]:
+    return event_server._event_status.events()  # pylint: disable=protected-access
+
+
+def test_workers_match_like_event_thread(
+    config: Config,
+    perfcounters: Perfcounters,
+    history: FileHistory,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    messages = list(_messages(500))
+    in_process = _event_server(0, config, perfcounters, history, monkeypatch)
+    in_workers = _event_server(2, config, perfcounters, history, monkeypatch)
+    try:
+        for chunk in range(0, len(messages), 37):
+            in_process.process_syslog_messages(messages[chunk : chunk + 37], ("10.0.0.1", 514))
+            in_workers.process_syslog_messages(messages[chunk : chunk + 37], ("10.0.0.1", 514))
+        assert not _open_events(in_workers)  # nothing processed before the batches are done
+
+        in_workers.process_matched_batches(wait=True)
+    finally:
+        in_workers.process_matched_batches(wait=True)
+        assert in_workers._match_pool is not None  # pylint: disable=protected-access
+        in_workers._match_pool.close()  # pylint: disable=protected-access
+
+    assert _open_events(in_process)
+    assert _open_events(in_workers) == _open_events(in_process)
+    assert dict(
+        in_workers._event_status.get_rule_stats()
+    ) == dict(  # pylint: disable=protected-access
+        in_process._event_status.get_rule_stats()  # pylint: disable=protected-access
+    )
+
+
+def test_reload_rematches_outdated_batches(
+    config: Config,
+    perfcounters: Perfcounters,
+    history: FileHistory,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    event_server = _event_server(1, config, perfcounters, history, monkeypatch)
+    try:
+        event_server.process_syslog_messages(
+            [b"<11>Oct 17 12:00:00 switch01 app: Link eth0 down"], None
+        )
+        # The batch has been matched with the "link" rule, which is gone after the reload
+        event_server.reload_configuration(
+            config | {"rule_packs": [ec.default_rule_pack([_rule("any", match="eth0")])]}, history
+        )
+        monkeypatch.setattr(event_server.host_config, "get_canonical_name", lambda host_name: None)
+        event_server.process_matched_batches(wait=True)
+    finally:
+        assert event_server._match_pool is not None  # pylint: disable=protected-access
+        event_server._match_pool.close()  # pylint: disable=protected-access
+
+    assert [event["rule_id"] for event in _open_events(event_server)] == ["any"]
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("match_workers", [0, 2])
+def test_benchmark_matching(
+    config: Config,
+    perfcounters: Perfcounters,
+    history: FileHistory,
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+    match_workers: int,
+) -> None:
+    """Throughput of the event thread with many regex rules, which all have to be tried"""
+    rules = [
+        _rule(f"rule{nr}", match=f"^(error|failure) {nr} in (.*) at (\\d+)$") for nr in range(200)
+    ]
+    messages = [
+        f"<{nr % 192}>Oct 17 12:00:00 switch{nr % 5000:04} app: message {nr}".encode()
+        for nr in range(2000)
+    ]
+    event_server = _event_server(match_workers, config, perfcounters, history, monkeypatch)
+    event_server.reload_configuration(
+        config | {"rule_packs": [ec.default_rule_pack(rules)]}, history
+    )
+
+    start = time.perf_counter()
+    try:
+        for chunk in range(0, len(messages), 100):
+            event_server.process_syslog_messages(messages[chunk : chunk + 100], None)
+        event_server.process_matched_batches(wait=True)
+    finally:
+        if event_server._match_pool is not None:  # pylint: disable=protected-access
+            event_server._match_pool.close()  # pylint: disable=protected-access
+    duration = time.perf_counter() - start
+
+    with capsys.disabled():
+        print(
+            f"\n{match_workers} match workers: {len(messages)} messages, {len(rules)} rules"
+            f" in {duration:.3f}s ({len(messages) / duration:.0f} messages/s)"
+        )
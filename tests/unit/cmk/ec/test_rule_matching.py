@@ -11,9 +11,16 @@ import pytest
 
 from livestatus import SiteId
 
+from cmk.utils.hostaddress import HostName
+
 import cmk.ec.export as ec
 from cmk.ec.config import MatchGroups, TextMatchResult
-from cmk.ec.rule_matcher import compile_matching_value, MatchPriority
+from cmk.ec.rule_matcher import (
+    _regex_literals,
+    compile_matching_value,
+    MatchPriority,
+    RulePrefilter,
+)
 
 
 @pytest.mark.parametrize(
@@ -465,3 +472,91 @@ def test_compile_matching_value_different_key(key: str) -> None:
     assert isinstance(compiled_pattern, re.Pattern)
     # Expect the original pattern since the key is not in {"match", "match_ok"}
     assert compiled_pattern.pattern == original_value
+
+
+@pytest.mark.parametrize(
+    "pattern, literals",
+    [
+        ("Link (.*) down", ["link ", " down"]),
+        ("^ERROR: disk (sda|sdb) failed$", ["error: disk sd", " failed"]),
+        ("(?:bad|worse) thing", [" thing"]),
+        ("ab+c", ["a", "c"]),
+        ("a|b", []),
+        ("[abc]+", []),
+        ("Temp\\.? (\\d+) °C", ["temp", " "]),
+    ],
+)
+def test_regex_literals(pattern: str, literals: list[str]) -> None:
+    assert list(_regex_literals(re.compile(pattern, re.IGNORECASE))) == literals
+
+
+def _prefilter_rule(rule_id: str, **conditions: str) -> ec.Rule:
+    rule = ec.Rule(id=rule_id, pack="pack")
+    rule.update(conditions)  # type: ignore[typeddict-item]
+    ec.compile_rule(rule)
+    return rule
+
+
+_PREFILTER_RULES = [
+    _prefilter_rule("plain", match="disk failure"),
+    _prefilter_rule("regex", match="Link (eth\\d+) down", match_ok="Link (eth\\d+) up"),
+    _prefilter_rule("host", match_host="switch01", match="port"),
+    _prefilter_rule("host_regex", match_host="^core-.*-dc1$"),
+    _prefilter_rule("application", match_application="kernel", cancel_application="systemd"),
+    _prefilter_rule("alternatives", match="(error|failure)"),
+    _prefilter_rule("inverted", match="never", invert_matching=True),  # type: ignore[arg-type]
+    _prefilter_rule("no_conditions"),
+]
+
+
+@pytest.mark.parametrize(
+    "event, rule_ids",
+    [
+        (
+            ec.Event(host=HostName("server"), application="sshd", text="nothing to see"),
+            ["alternatives", "inverted", "no_conditions"],
+        ),
+        (
+            ec.Event(host=HostName("SWITCH01"), application="kernel", text="LINK eth0 UP on port"),
+            ["regex", "host", "application", "alternatives", "inverted", "no_conditions"],
+        ),
+        (
+            ec.Event(host=HostName("core-01-dc1"), application="systemd", text="Disk failure"),
+            ["plain", "host_regex", "application", "alternatives", "inverted", "no_conditions"],
+        ),
+    ],
+)
+def test_prefilter(event: ec.Event, rule_ids: list[str]) -> None:
+    skipped: list[str] = []
+    prefilter = RulePrefilter(_PREFILTER_RULES)
+    assert [
+        rule["id"]
+        for rule in prefilter.filter(_PREFILTER_RULES, event, lambda r: skipped.append(r["id"]))
+    ] == rule_ids
+    assert len(skipped) + len(rule_ids) == len(_PREFILTER_RULES)
+
+
+@pytest.mark.parametrize(
+    "pattern",
+    ["link", "Link (.*) down", "^sensor: k", "(?i)STATUS", "fast (?:path)", "i[sS]", "ſ", "ok$"],
+)
+@pytest.mark.parametrize(
+    "text",
+    ["LINK eth0 DOWN", "lİnk x down", "sensor: K", "Status", "fast path", "İS", "ıs", "ſ", "OK"],
+)
+def test_prefilter_never_skips_a_matching_rule(pattern: str, text: str) -> None:
+    rule = _prefilter_rule("rule", match=pattern)
+    event = ec.Event(
+        host=HostName("host"),
+        application="app",
+        text=text,
+        facility=1,
+        priority=2,
+        ipaddress="",
+        sl=0,
+    )
+    matches = ec.RuleMatcher(None, SiteId("test_site"), lambda name: True).event_rule_matches(
+        rule, event
+    )
+    if isinstance(matches, ec.MatchSuccess):
+        assert list(RulePrefilter([rule]).filter([rule], event, lambda r: None)) == [rule]
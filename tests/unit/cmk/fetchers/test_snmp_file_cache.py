@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+# pylint: disable=protected-access
+
+import random
+import time
+from typing import Any
+
+import pytest
+
+from cmk.utils.sectionname import SectionName
+
+from cmk.snmplib import SNMPRawData
+
+from cmk.fetchers.filecache import SNMPFileCache
+
+
+def _legacy_cache_file(raw_data: SNMPRawData) -> bytes:
+    """The format written by older versions"""
+    return (repr({str(k): v for k, v in raw_data.items()}) + "\n").encode("utf-8")
+
+
+def _raw_data() -> dict[SectionName, Any]:
+    # Not all of the values are valid SNMP data, but the format should not care
+    return {
+        SectionName("if64"): [
+            [
+                ["1", "eth0", "6", "1000000000", [0, 12, 41, 255, 1, 2]],
+                ["2", "loä", "24", "", []],
+            ],
+            [["1.3.6.1.2.1.2.2.1.1.1", [1, 3, 6, 1]]],
+        ],
+        SectionName("snmp_info"): [[["Linux", "sysContact", "host", "room"]]],
+        SectionName("empty"): [],
+        SectionName("nested"): [[[["a", "b"], ["c"]]], [[None, 42, -1, b"\x00raw"]]],
+    }
+
+
+def test_roundtrip() -> None:
+    raw_data = _raw_data()
+    assert SNMPFileCache._from_cache_file(SNMPFileCache._to_cache_file(raw_data)) == raw_data
+
+
+def test_read_legacy_format() -> None:
+    raw_data = _raw_data()
+    assert SNMPFileCache._from_cache_file(_legacy_cache_file(raw_data)) == raw_data
+
+
+def test_sections_are_decoded_lazily() -> None:
+    cache_file = bytearray(SNMPFileCache._to_cache_file(_raw_data()))
+    # Corrupt the tag of the first value of the first section
+    cache_file[cache_file.index(b"l\x02\x00\x00\x00")] = ord("?")
+
+    sections = SNMPFileCache._from_cache_file(bytes(cache_file))
+
+    assert list(sections) == list(_raw_data())
+    assert SectionName("if64") in sections
+    assert sections[SectionName("snmp_info")] == [[["Linux", "sysContact", "host", "room"]]]
+    with pytest.raises(ValueError):
+        _ = sections[SectionName("if64")]
+
+
+def test_unsupported_version() -> None:
+    cache_file = bytearray(SNMPFileCache._to_cache_file(_raw_data()))
+    cache_file[8] = 42
+    with pytest.raises(ValueError):
+        SNMPFileCache._from_cache_file(bytes(cache_file))
+
+
+def test_unsupported_value() -> None:
+    with pytest.raises(TypeError):
+        SNMPFileCache._to_cache_file({SectionName("float"): [[[1.5]]]})  # type: ignore[list-item]
+
+
+@pytest.mark.slow
+def test_benchmark_against_legacy_format(capsys: pytest.CaptureFixture[str]) -> None:
+    rand = random.Random(4711)
+    raw_data: dict[SectionName, Any] = {
+        SectionName("if64"): [
+            [
+                [
+                    str(i),
+                    f"Ethernet{i}",
+                    "6",
+                    str(rand.randrange(10**9)),
+                    str(rand.randrange(10**12)),
+                    [0, 12, 41, rand.randrange(256), 1, 2],
+                ]
+                for i in range(48000)
+            ]
+        ],
+        SectionName("snmp_info"): [[["Linux", "sysContact", "host", "room"]]],
+    }
+    legacy = _legacy_cache_file(raw_data)
+    binary = SNMPFileCache._to_cache_file(raw_data)
+
+    start = time.perf_counter()
+    assert SNMPFileCache._from_cache_file(legacy) == raw_data
+    legacy_duration = time.perf_counter() - start
+
+    start = time.perf_counter()
+    assert SNMPFileCache._from_cache_file(binary) == raw_data
+    binary_duration = time.perf_counter() - start
+
+    start = time.perf_counter()
+    _ = SNMPFileCache._from_cache_file(binary)[SectionName("snmp_info")]
+    single_section_duration = time.perf_counter() - start
+
+    assert binary_duration < legacy_duration
+    with capsys.disabled():
+        print(
+            f"\nrepr/literal_eval: {legacy_duration:.3f}s ({len(legacy)} bytes),"
+            f" binary: {binary_duration:.3f}s ({len(binary)} bytes),"
+            f" single section: {single_section_duration:.6f}s"
+        )
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import time
+from pathlib import Path
+
+import pytest
+import time_machine
+
+from cmk.utils.hostaddress import HostAddress, HostName
+
+from cmk.fetchers._snmpcache import SingleOIDCache
+
+OID_SYS_DESCR = ".1.3.6.1.2.1.1.1.0"
+OID_SYS_OBJ = ".1.3.6.1.2.1.1.2.0"
+
+
+def _cache(cache_dir: Path, ttl: float = 60) -> SingleOIDCache:
+    return SingleOIDCache(HostName("heute"), HostAddress("1.2.3.4"), cache_dir=cache_dir, ttl=ttl)
+
+
+def test_hits_and_misses(tmp_path: Path) -> None:
+    cache = _cache(tmp_path)
+    with pytest.raises(KeyError):
+        _ = cache[OID_SYS_DESCR]
+
+    cache[OID_SYS_DESCR] = "sys description"
+    cache[OID_SYS_OBJ] = None
+
+    assert cache[OID_SYS_DESCR] == "sys description"
+    assert cache[OID_SYS_OBJ] is None
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_shared_between_instances(tmp_path: Path) -> None:
+    cache = _cache(tmp_path)
+    cache[OID_SYS_DESCR] = "sys description"
+    cache[OID_SYS_OBJ] = None
+    cache.save()
+
+    other = _cache(tmp_path)
+    other.load()
+    assert dict(other) == {OID_SYS_DESCR: "sys description"}
+
+
+def test_missing_values_are_not_saved(tmp_path: Path) -> None:
+    cache = _cache(tmp_path)
+    cache[OID_SYS_OBJ] = None
+    assert cache[OID_SYS_OBJ] is None
+    cache.save()
+    assert not cache.path.exists()
+
+    # Missing values written by an earlier version are ignored as well
+    cache.path.write_text(f'{{"{OID_SYS_OBJ}":[{time.time()},null]}}')
+    other = _cache(tmp_path)
+    other.load()
+    assert not other
+
+
+def test_values_expire(tmp_path: Path) -> None:
+    with time_machine.travel(1000, tick=False):
+        cache = _cache(tmp_path, ttl=60)
+        cache[OID_SYS_DESCR] = "sys description"
+        cache.save()
+
+    with time_machine.travel(1060, tick=False):
+        assert cache[OID_SYS_DESCR] == "sys description"
+        other = _cache(tmp_path, ttl=60)
+        other.load()
+        assert OID_SYS_DESCR in other
+
+    with time_machine.travel(1061, tick=False):
+        with pytest.raises(KeyError):
+            _ = cache[OID_SYS_DESCR]
+        other = _cache(tmp_path, ttl=60)
+        other.load()
+        assert not other
+
+
+def test_save_merges_concurrent_updates(tmp_path: Path) -> None:
+    first = _cache(tmp_path)
+    second = _cache(tmp_path)
+    first[OID_SYS_DESCR] = "sys description"
+    second[OID_SYS_OBJ] = "sys object"
+    first.save()
+    second.save()
+
+    merged = _cache(tmp_path)
+    merged.load()
+    assert dict(merged) == {OID_SYS_DESCR: "sys description", OID_SYS_OBJ: "sys object"}
+
+
+def test_volatile_values_are_not_saved(tmp_path: Path) -> None:
+    cache = _cache(tmp_path)
+    cache.set_volatile(OID_SYS_DESCR, "")
+    assert cache[OID_SYS_DESCR] == ""
+    cache.save()
+    assert not cache.path.exists()
+
+
+def test_no_ttl_does_not_touch_the_disk(tmp_path: Path) -> None:
+    cache = _cache(tmp_path, ttl=0)
+    cache[OID_SYS_DESCR] = "sys description"
+    assert cache[OID_SYS_DESCR] == "sys description"
+    cache.save()
+    assert not cache.path.exists()
+
+
+def test_ignore_legacy_cache_file(tmp_path: Path) -> None:
+    cache = _cache(tmp_path)
+    cache.path.write_text(repr({OID_SYS_DESCR: "sys description", OID_SYS_OBJ: None}))
+    cache.load()
+    assert not cache
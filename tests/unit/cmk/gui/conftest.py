@@ -368,6 +368,9 @@ def _reset_cache_for_folders_and_hosts_setup() -> None:
     if hasattr(g, "wato_redis_client"):
         del g.wato_redis_client
 
+    if hasattr(g, "wato_folder_index"):
+        del g.wato_folder_index
+
 
 @pytest.fixture()
 def auth_request(with_user: tuple[UserId, str]) -> typing.Generator[http.Request, None, None]:
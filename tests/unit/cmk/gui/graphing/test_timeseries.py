@@ -3,6 +3,10 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+import functools
+import random
+import time
+from collections.abc import Callable, Mapping, Sequence
 from typing import Literal
 
 import pytest
@@ -29,3 +33,132 @@ def test__time_series_math_exc_symbol(args: tuple[Literal["%"], list[TimeSeries]
 def test__time_series_math_stable_singles(operator: Operators) -> None:
     test_ts = TimeSeries([0, 180, 60, 6, 5, 10, None, -2, -3.14])
     assert time_series_math(operator, [test_ts]) == test_ts
+
+
+def _evaluate_point_by_point(operator: Operators, operands: Sequence[TimeSeries]) -> TimeSeries:
+    """The evaluation as it was done before the time series were backed by arrays"""
+
+    def clean(tsp: Sequence[float | None]) -> list[float]:
+        return [x for x in tsp if x is not None]
+
+    def fraction(tsp: Sequence[float | None]) -> float | None:
+        if None in tsp or tsp[1] == 0:
+            return None
+        assert tsp[0] is not None and tsp[1] is not None
+        return tsp[0] / tsp[1]
+
+    def difference(tsp: Sequence[float | None]) -> float | None:
+        if None in tsp:
+            return None
+        assert tsp[0] is not None and tsp[1] is not None
+        return tsp[0] - tsp[1]
+
+    def product(tsp: Sequence[float | None]) -> float | None:
+        if None in tsp:
+            return None
+        return functools.reduce(lambda x, y: x * y, clean(tsp), 1.0)
+
+    op_funcs: Mapping[Operators, Callable[[Sequence[float | None]], float | None]] = {
+        "+": lambda tsp: sum(clean(tsp)),
+        "*": product,
+        "-": difference,
+        "/": fraction,
+        "MAX": lambda tsp: max(clean(tsp)),
+        "MIN": lambda tsp: min(clean(tsp)),
+        "AVERAGE": lambda tsp: sum(clean(tsp)) / len(clean(tsp)),
+        "MERGE": lambda tsp: clean(tsp)[0],
+    }
+    return TimeSeries(
+        [
+            op_funcs[operator](tsp) if tsp.count(None) < len(tsp) else None
+            for tsp in (list(tsp) for tsp in zip(*operands))
+        ],
+        operands[0].twindow,
+    )
+
+
+def _random_time_series(num_points: int, seed: int) -> TimeSeries:
+    rng = random.Random(seed)
+    return TimeSeries(
+        [
+            rng.choice([None, 0.0, rng.uniform(-100, 100), float(rng.randint(-3, 3))])
+            for _ in range(num_points)
+        ],
+        (0, 60 * num_points, 60),
+    )
+
+
+@pytest.mark.parametrize("operator", ["+", "*", "-", "/", "MAX", "MIN", "AVERAGE", "MERGE"])
+def test__time_series_math_like_point_by_point(operator: Operators) -> None:
+    operands = [_random_time_series(1000, seed) for seed in range(2 if operator in "-/" else 4)]
+    # Operands of different lengths are cut to the shortest one
+    operands[1] = TimeSeries(operands[1].array[:-3], operands[1].twindow)
+
+    result = time_series_math(operator, operands)
+
+    assert result is not None
+    assert len(result) == 997
+    assert result.values == pytest.approx(
+        _evaluate_point_by_point(operator, operands).values, rel=1e-12
+    )
+
+
+# A year of one minute data, as shown on a dashboard
+_YEAR_OF_MINUTES = 365 * 24 * 60
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize(
+    "title, operator, num_operands",
+    [
+        pytest.param("CPU utilization (user + system + wait)", "+", 3, id="stacked sum"),
+        pytest.param("Used memory percentage (used / total)", "/", 2, id="fraction"),
+        pytest.param("Disk throughput (read - write)", "-", 2, id="difference"),
+        pytest.param("Average latency over paths", "AVERAGE", 4, id="average"),
+        pytest.param("Maximum of interface errors", "MAX", 8, id="maximum"),
+        pytest.param("Merged translated metrics", "MERGE", 3, id="merge"),
+    ],
+)
+def test_benchmark_time_series_math(
+    title: str, operator: Operators, num_operands: int, capsys: pytest.CaptureFixture[str]
+) -> None:
+    operands = [_random_time_series(_YEAR_OF_MINUTES, seed) for seed in range(num_operands)]
+
+    start = time.perf_counter()
+    expected = _evaluate_point_by_point(operator, operands)
+    point_by_point_duration = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = time_series_math(operator, operands)
+    vectorized_duration = time.perf_counter() - start
+
+    assert result is not None
+    assert result.values == pytest.approx(expected.values, rel=1e-12)
+    with capsys.disabled():
+        print(
+            f"\n{title}, {num_operands} x {_YEAR_OF_MINUTES} points:"
+            f" point by point {point_by_point_duration:.3f}s, arrays {vectorized_duration:.3f}s"
+        )
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("cf", ["max", "average"])
+def test_benchmark_downsample(cf: str, capsys: pytest.CaptureFixture[str]) -> None:
+    time_series = _random_time_series(_YEAR_OF_MINUTES, 0)
+    # Align to the five minute steps of the next RRA
+    twindow = (0, 60 * _YEAR_OF_MINUTES, 300)
+
+    start = time.perf_counter()
+    expected = time_series._downsample_stepwise(twindow, cf)
+    stepwise_duration = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = time_series.downsample(twindow, cf)
+    vectorized_duration = time.perf_counter() - start
+
+    assert result == pytest.approx(expected, rel=1e-12)
+    with capsys.disabled():
+        print(
+            f"\nDownsampling {_YEAR_OF_MINUTES} points to 5 minutes ({cf}):"
+            f" value by value {stepwise_duration:.3f}s, arrays {vectorized_duration:.3f}s"
+        )
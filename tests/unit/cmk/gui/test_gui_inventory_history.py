@@ -9,7 +9,7 @@ import pytest
 
 import cmk.utils
 from cmk.utils.hostaddress import HostName
-from cmk.utils.structured_data import ImmutableTree
+from cmk.utils.structured_data import ImmutableTree, TreeArchive
 
 from cmk.gui.inventory._history import get_history, load_delta_tree, load_latest_delta_tree
 
@@ -114,6 +114,35 @@ def test_get_history(request_context: None) -> None:
         assert delta_cache_filename == expected_delta_cache_filename
 
 
+def test_get_history_from_tree_archive(request_context: None) -> None:
+    hostname = HostName("inv-host")
+
+    # history
+    tree_archive = TreeArchive(Path(cmk.utils.paths.inventory_archive_dir, hostname))
+    for timestamp, raw_tree in enumerate(
+        [{"inv": "attr-0"}, {"inv": "attr-1"}, {"inv-2": "attr"}, {"inv": "attr-3"}]
+    ):
+        tree_archive.append(timestamp, ImmutableTree.deserialize(raw_tree))
+    # current tree
+    cmk.ccc.store.save_object_to_file(
+        Path(cmk.utils.paths.inventory_output_dir, hostname),
+        ImmutableTree.deserialize({"inv": "attr"}).serialize(),
+    )
+
+    history, corrupted_history_files = get_history(hostname)
+
+    assert [(e.new, e.changed, e.removed) for e in history] == [
+        (1, 0, 0),
+        (0, 1, 0),
+        (1, 0, 1),
+        (1, 0, 1),
+        (0, 1, 0),
+    ]
+    assert [e.timestamp for e in history][:4] == [0, 1, 2, 3]
+    assert not corrupted_history_files
+    assert load_delta_tree(hostname, 2)[0].get_stats() == history[2].delta_tree.get_stats()
+
+
 @pytest.mark.usefixtures("create_inventory_history")
 @pytest.mark.parametrize(
     "search_timestamp, expected_raw_delta_tree",
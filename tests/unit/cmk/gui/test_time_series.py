@@ -79,6 +79,25 @@ def test_time_series_downsampling(
     assert ts.downsample(twindow, cf) == downsampled
 
 
+@pytest.mark.parametrize("cf", ["max", "min", "average"])
+@pytest.mark.parametrize(
+    "twindow",
+    [
+        pytest.param((0, 3000, 300), id="aligned"),
+        pytest.param((60, 3120, 180), id="aligned with offset"),
+        pytest.param((30, 3030, 300), id="misaligned"),
+        pytest.param((0, 3000, 90), id="smaller step"),
+        pytest.param((-600, 6000, 600), id="larger window"),
+    ],
+)
+def test_time_series_downsampling_like_stepwise(twindow: TimeWindow, cf: str) -> None:
+    ts = TimeSeries(
+        [None if nr % 7 in (3, 4) else (nr * 37) % 11 - 5.5 for nr in range(50)],
+        time_window=(0, 3000, 60),
+    )
+    assert ts.downsample(twindow, cf) == pytest.approx(ts._downsample_stepwise(twindow, cf))
+
+
 class TestTimeseries:
     def test_conversion(self) -> None:
         assert TimeSeries(
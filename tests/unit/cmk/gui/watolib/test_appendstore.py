@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+from pathlib import Path
+
+import pytest
+
+from cmk.gui.watolib import appendstore
+from cmk.gui.watolib.appendstore import ABCAppendStore
+
+_Entry = dict[str, object]
+
+
+class _Store(ABCAppendStore[_Entry]):
+    @staticmethod
+    def _serialize(entry: _Entry) -> object:
+        return entry
+
+    @staticmethod
+    def _deserialize(raw: object) -> _Entry:
+        assert isinstance(raw, dict)
+        return raw
+
+    @staticmethod
+    def _timestamp(entry: _Entry) -> float:
+        assert isinstance(entry["time"], int)
+        return entry["time"]
+
+    @staticmethod
+    def _is_pending(entry: _Entry) -> bool:
+        return bool(entry["pending"])
+
+
+def _entry(time: int) -> _Entry:
+    return {"time": time, "pending": time % 3 == 0}
+
+
+@pytest.fixture(autouse=True)
+def small_segments(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(appendstore, "_ENTRIES_PER_SEGMENT", 4)
+
+
+@pytest.fixture(name="store")
+def fixture_store(tmp_path: Path) -> _Store:
+    store = _Store(tmp_path / "store.mk")
+    for time in range(10):
+        store.append(_entry(time))
+    return store
+
+
+def test_empty_store(tmp_path: Path) -> None:
+    store = _Store(tmp_path / "store.mk")
+    assert store.read() == []
+    assert store.read_time_range(0, 10) == []
+    assert store.read_last(3) == []
+    assert store.num_pending() == 0
+
+
+def test_read(store: _Store) -> None:
+    assert store.read() == [_entry(time) for time in range(10)]
+
+
+def test_read_time_range(store: _Store) -> None:
+    # Only the segments overlapping the time range are read
+    assert store.read_time_range(since=5) == [_entry(time) for time in range(4, 10)]
+    assert store.read_time_range(until=2) == [_entry(time) for time in range(4)]
+    assert store.read_time_range(4, 7) == [_entry(time) for time in range(4, 8)]
+    assert store.read_time_range(since=10) == []
+
+
+def test_read_time_range_unordered(tmp_path: Path) -> None:
+    store = _Store(tmp_path / "store.mk")
+    for time in (1, 2, 3, 4, 10, 11, 0, 12):
+        store.append(_entry(time))
+    assert [e["time"] for e in store.read_time_range(until=0)] == [10, 11, 0, 12]
+
+
+def test_read_last(store: _Store) -> None:
+    assert store.read_last(0) == []
+    assert store.read_last(3) == [_entry(time) for time in range(7, 10)]
+    assert store.read_last(5) == [_entry(time) for time in range(5, 10)]
+    assert store.read_last(20) == [_entry(time) for time in range(10)]
+
+
+def test_num_pending(store: _Store) -> None:
+    assert store.num_pending() == 4
+
+
+def test_mutable_view(store: _Store) -> None:
+    with store.mutable_view() as entries:
+        for entry in entries:
+            entry["pending"] = False
+        entries.append(_entry(12))
+
+    assert store.num_pending() == 1
+    assert [e["time"] for e in store.read_time_range(since=9)] == [8, 9, 12]
+    store.append(_entry(15))
+    assert store.read_last(2) == [_entry(12), _entry(15)]
+    assert store.num_pending() == 2
+
+
+def test_index_rebuilt_after_external_change(store: _Store, tmp_path: Path) -> None:
+    path = tmp_path / "store.mk"
+    path.write_bytes(path.read_bytes() + repr(_entry(21)).encode("utf-8") + b"\0")
+    assert store.read_last(1) == [_entry(21)]
+    assert store.num_pending() == 5
+
+    path.write_bytes(repr(_entry(30)).encode("utf-8") + b"\0\0")
+    store.append(_entry(33))
+    assert store.read() == [_entry(30), _entry(33)]
+    assert store.read_time_range(since=31) == [_entry(30), _entry(33)]
+    assert store.num_pending() == 2
+
+
+def test_index_rebuilt_without_index(store: _Store, tmp_path: Path) -> None:
+    (tmp_path / ".store.mk.idx").unlink()
+    assert store.num_pending() == 4
+    store.append(_entry(12))
+    assert store.read_last(2) == [_entry(9), _entry(12)]
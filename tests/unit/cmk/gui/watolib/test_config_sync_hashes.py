@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import hashlib
+import os
+import time
+from pathlib import Path
+
+from cmk.gui.watolib.config_sync_hashes import ConfigSyncHashIndex, HashingStats
+
+
+def _settled_file(path: Path, content: bytes) -> str:
+    path.write_bytes(content)
+    past = time.time() - 60
+    os.utime(path, (past, past))
+    return str(path)
+
+
+def _stats(*file_paths: str) -> dict[str, os.stat_result]:
+    return {file_path: os.stat(file_path) for file_path in file_paths}
+
+
+def test_hashes(tmp_path: Path) -> None:
+    file_paths = [_settled_file(tmp_path / f"f{nr}", b"x" * nr) for nr in range(5)]
+
+    index = ConfigSyncHashIndex(None, workers=2)
+
+    assert index.hashes(_stats(*file_paths)) == {
+        file_path: hashlib.sha256(b"x" * nr).hexdigest() for nr, file_path in enumerate(file_paths)
+    }
+    assert index.stats().files == 5
+    assert index.stats().hashed == 5
+
+
+def test_hashes_are_remembered(tmp_path: Path) -> None:
+    index_path = tmp_path / "index.pickle"
+    unchanged = _settled_file(tmp_path / "unchanged", b"unchanged")
+    modified = _settled_file(tmp_path / "modified", b"modified")
+
+    first = ConfigSyncHashIndex(index_path)
+    first.hashes(_stats(unchanged, modified))
+    first.save()
+
+    _settled_file(tmp_path / "modified", b"modified again")
+    second = ConfigSyncHashIndex(index_path)
+    assert second.hashes(_stats(unchanged, modified)) == {
+        unchanged: hashlib.sha256(b"unchanged").hexdigest(),
+        modified: hashlib.sha256(b"modified again").hexdigest(),
+    }
+    assert second.stats()[:2] == (2, 1)
+
+
+def test_recently_modified_files_are_not_remembered(tmp_path: Path) -> None:
+    index_path = tmp_path / "index.pickle"
+    (file_path := tmp_path / "recent").write_bytes(b"recent")
+
+    first = ConfigSyncHashIndex(index_path)
+    first.hashes(_stats(str(file_path)))
+    first.save()
+
+    second = ConfigSyncHashIndex(index_path)
+    second.hashes(_stats(str(file_path)))
+    assert second.stats().hashed == 1
+
+
+def test_save_drops_files_not_seen(tmp_path: Path) -> None:
+    index_path = tmp_path / "index.pickle"
+    kept = _settled_file(tmp_path / "kept", b"kept")
+    removed = _settled_file(tmp_path / "removed", b"removed")
+
+    first = ConfigSyncHashIndex(index_path)
+    first.hashes(_stats(kept, removed))
+    first.save()
+
+    second = ConfigSyncHashIndex(index_path)
+    second.hashes(_stats(kept))
+    second.save()
+
+    third = ConfigSyncHashIndex(index_path)
+    third.hashes(_stats(kept, removed))
+    assert third.stats()[:2] == (2, 1)
+
+
+def test_broken_index_file(tmp_path: Path) -> None:
+    (index_path := tmp_path / "index.pickle").write_bytes(b"no pickle")
+    file_path = _settled_file(tmp_path / "file", b"content")
+
+    index = ConfigSyncHashIndex(index_path)
+    assert index.hashes(_stats(file_path)) == {file_path: hashlib.sha256(b"content").hexdigest()}
+    assert index.stats() == HashingStats(1, 1, index.stats().seconds)
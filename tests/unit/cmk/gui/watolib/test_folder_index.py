@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+from pathlib import Path
+
+from cmk.gui.watolib.folder_index import FolderIndex, FolderIndexEntry
+
+_ENTRIES = [
+    FolderIndexEntry("/", "Main", "", 1, ["all"]),
+    FolderIndexEntry("a/", "A", "A", 2, ["g1", "g2"]),
+    FolderIndexEntry("a/b/", "B", "A/B", 3, []),
+    FolderIndexEntry("a.c/", "A.C", "A.C", 4, ["g3"]),
+    FolderIndexEntry("ab/", "AB", "AB", 5, []),
+]
+
+
+def test_empty_index(tmp_path: Path) -> None:
+    index = FolderIndex(tmp_path / "index.sqlite")
+    assert index.last_update() is None
+    assert index.folder_paths() == ()
+    assert index.folder("/") is None
+    assert index.folders_below("/") == []
+
+
+def test_replace_all(tmp_path: Path) -> None:
+    index = FolderIndex(tmp_path / "index.sqlite")
+    index.replace_all([FolderIndexEntry("old/", "Old", "Old", 1, [])], "1.00000")
+    index.replace_all(_ENTRIES, "2.00000")
+
+    assert index.last_update() == "2.00000"
+    assert sorted(index.folder_paths()) == sorted(e.path for e in _ENTRIES)
+    assert index.folder("a/") == FolderIndexEntry("a/", "A", "A", 2, ["g1", "g2"])
+    assert index.folder("old/") is None
+    assert sorted(index.folders()) == sorted(_ENTRIES)
+
+
+def test_folders_below(tmp_path: Path) -> None:
+    index = FolderIndex(tmp_path / "index.sqlite")
+    index.replace_all(_ENTRIES, "1.00000")
+
+    assert sorted(e.path for e in index.folders_below("/")) == sorted(e.path for e in _ENTRIES)
+    assert sorted(e.path for e in index.folders_below("a/")) == ["a/", "a/b/"]
+    assert [e.path for e in index.folders_below("a/b/")] == ["a/b/"]
+    assert index.folders_below("x/") == []
+
+
+def test_save_and_set_last_update(tmp_path: Path) -> None:
+    index = FolderIndex(tmp_path / "index.sqlite")
+    index.replace_all(_ENTRIES, "1.00000")
+
+    index.save(FolderIndexEntry("a/", "Renamed", "Renamed", 7, ["g4"]), "2.00000")
+    index.save(FolderIndexEntry("a/d/", "D", "Renamed/D", 0, []), "3.00000")
+
+    assert index.folder("a/") == FolderIndexEntry("a/", "Renamed", "Renamed", 7, ["g4"])
+    assert sorted(e.path for e in index.folders_below("a/")) == ["a/", "a/b/", "a/d/"]
+    assert index.last_update() == "3.00000"
+
+    index.set_last_update("4.00000")
+    assert index.last_update() == "4.00000"
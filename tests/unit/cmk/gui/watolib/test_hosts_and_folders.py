@@ -1012,6 +1012,41 @@ def test_load_redis_folders_on_demand(monkeypatch: MonkeyPatch) -> None:
         assert isinstance(g.wato_folders._raw_dict[""], hosts_and_folders.Folder)
 
 
+def test_folder_metadata_from_folder_index(monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setattr(hosts_and_folders, "may_use_redis", lambda: False)
+    tree = folder_tree()
+    foo = tree.root_folder().create_subfolder("foo", "Foo", {})
+    foo.create_subfolder("bar", "Bar", {})
+    tree.root_folder().create_subfolder("baz", "Baz", {})
+    foo.create_hosts(
+        [
+            (HostName("host1"), HostAttributes(), []),
+            (HostName("host2"), HostAttributes(), []),
+        ]
+    )
+    tree.invalidate_caches()
+    g.pop("wato_folder_index")
+
+    metadata_cache = hosts_and_folders.get_folder_metadata_cache(tree)
+    assert isinstance(metadata_cache, hosts_and_folders._SQLiteHelper)
+    assert sorted(metadata_cache.folder_paths) == ["/", "baz/", "foo/", "foo/bar/"]
+    assert sorted(metadata_cache.recursive_subfolders_for_path("foo/")) == ["foo/", "foo/bar/"]
+    assert tree.root_folder().num_hosts_recursively() == 2
+    assert tree.folder("baz").num_hosts_recursively() == 0
+    assert tree.folder("foo/bar").choices_for_moving_folder() == [("baz", "Baz"), ("", "Main")]
+    assert tree.folder("foo/bar").choices_for_moving_host() == [
+        ("baz", "Baz"),
+        ("foo", "Foo"),
+        ("", "Main"),
+    ]
+    folder_metadata = metadata_cache.folder_metadata("foo/bar")
+    assert folder_metadata is not None
+    assert folder_metadata.title_path_without_root == "Foo/Bar"
+
+    # The index is up to date, so the next request does not load all folders
+    assert hosts_and_folders._SQLiteHelper(tree).loaded_wato_folders is None
+
+
 def test_folder_exists() -> None:
     tree = folder_tree()
     tree.root_folder().create_subfolder("foo", "foo", {}).create_subfolder("bar", "bar", {})
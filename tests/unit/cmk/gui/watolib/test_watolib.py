@@ -134,6 +134,7 @@ def test_registered_configvars() -> None:
         "mkeventd_pprint_rules",
         "mkeventd_service_levels",
         "multisite_draw_ruleicon",
+        "nagios_config_workers",
         "notification_backlog",
         "notification_bulk_interval",
         "notification_fallback_email",
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import contextlib
+import logging
+from collections.abc import Callable, Iterator
+from pathlib import Path
+
+import pytest
+
+from livestatus import SiteId
+
+from cmk.utils.hostaddress import HostName
+
+from cmk import piggyback
+from cmk.piggyback import _storage
+from cmk.piggyback_hub.config import load_config, PiggybackHubConfig
+from cmk.piggyback_hub.hub import decode_message, encode_message, PiggybackHub, SourceUpdate
+from cmk.piggyback_hub.transport import LoopbackNetwork
+
+_SOURCE = HostName("vcenter")
+_VM_B = HostName("vm-b")
+_VM_A = HostName("vm-a")
+
+_SITE_A = SiteId("site_a")
+_SITE_B = SiteId("site_b")
+
+_Site = Callable[[SiteId], contextlib.AbstractContextManager[None]]
+
+
+@pytest.fixture(name="site")
+def _site(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> _Site:
+    """Switch the piggyback storage between the directories of two sites"""
+
+    @contextlib.contextmanager
+    def site(site_id: SiteId) -> Iterator[None]:
+        with monkeypatch.context() as m:
+            tmp_dir = tmp_path / site_id / "tmp/check_mk"
+            m.setattr(_storage, "piggyback_dir", tmp_dir / "piggyback")
+            m.setattr(_storage, "piggyback_catalog_file", tmp_dir / "piggyback_catalog.sqlite")
+            yield
+
+    return site
+
+
+def _hubs() -> tuple[PiggybackHub, PiggybackHub]:
+    network = LoopbackNetwork()
+    targets = {_VM_A: _SITE_A, _VM_B: _SITE_B}
+    return (
+        PiggybackHub(
+            PiggybackHubConfig(_SITE_A, targets=targets),
+            network.transport(_SITE_A),
+            logging.getLogger("test"),
+        ),
+        PiggybackHub(
+            PiggybackHubConfig(_SITE_B, targets=targets),
+            network.transport(_SITE_B),
+            logging.getLogger("test"),
+        ),
+    )
+
+
+def test_encode_decode_message() -> None:
+    updates = {
+        _SOURCE: SourceUpdate(1000, {_VM_A: (900, b"a\n"), _VM_B: (1000, b"")}),
+        HostName("gone"): SourceUpdate(None),
+    }
+    assert decode_message(encode_message(_SITE_A, updates)) == (_SITE_A, updates)
+
+
+def test_decode_invalid_message() -> None:
+    with pytest.raises(ValueError):
+        decode_message(b"CMKH\x05\x00site_a\x78\x9cgarbage")
+
+
+def test_load_config(tmp_path: Path) -> None:
+    assert load_config(tmp_path / "missing.json", _SITE_A) == PiggybackHubConfig(_SITE_A)
+
+    (config_path := tmp_path / "piggyback_hub.json").write_text(
+        '{"port": 6559, "peers": {"site_b": ["b.example.com", 6559]}, "targets": {"vm-b": "site_b"}}'
+    )
+    assert load_config(config_path, _SITE_A) == PiggybackHubConfig(
+        _SITE_A,
+        port=6559,
+        peers={_SITE_B: ("b.example.com", 6559)},
+        targets={_VM_B: _SITE_B},
+    )
+
+
+def test_distribute_payloads(site: _Site) -> None:
+    hub_a, hub_b = _hubs()
+
+    with site(_SITE_A):
+        piggyback.store_piggyback_raw_data(_SOURCE, {_VM_A: [b"a"], _VM_B: [b"b"]}, 1000)
+        assert hub_a.send_updates() == 1
+        # Nothing changed
+        assert hub_a.send_updates() == 0
+
+    with site(_SITE_B):
+        assert hub_b.receive_updates(timeout=0) == 1
+        (raw_data_info,) = piggyback.get_piggyback_raw_data(_VM_B)
+        assert raw_data_info.raw_data == b"b\n"
+        assert raw_data_info.info.source == _SOURCE
+        assert raw_data_info.info.last_update == 1000
+        assert raw_data_info.info.last_contact == 1000
+        # Only the payloads of the hosts monitored on site B are sent
+        assert not piggyback.get_piggyback_raw_data(_VM_A)
+
+
+def test_distribute_last_contact(site: _Site) -> None:
+    hub_a, hub_b = _hubs()
+
+    with site(_SITE_A):
+        piggyback.store_piggyback_raw_data(_SOURCE, {_VM_A: [b"a"], _VM_B: [b"b"]}, 1000)
+        hub_a.send_updates()
+        # The source still sends data, but no longer for vm-b
+        piggyback.store_piggyback_raw_data(_SOURCE, {_VM_A: [b"a"]}, 1060)
+        assert hub_a.send_updates() == 0
+
+    with site(_SITE_B):
+        hub_b.receive_updates(timeout=0)
+        (raw_data_info,) = piggyback.get_piggyback_raw_data(_VM_B)
+        assert raw_data_info.info.last_update == 1000
+        assert raw_data_info.info.last_contact == 1060
+
+    with site(_SITE_A):
+        # The source sends no piggyback data at all
+        piggyback.store_piggyback_raw_data(_SOURCE, {}, 1120)
+        hub_a.send_updates()
+
+    with site(_SITE_B):
+        hub_b.receive_updates(timeout=0)
+        (raw_data_info,) = piggyback.get_piggyback_raw_data(_VM_B)
+        assert raw_data_info.info.last_update == 1000
+        assert raw_data_info.info.last_contact is None
+
+
+def test_resend_after_failed_send(site: _Site) -> None:
+    network = LoopbackNetwork()
+    hub_a = PiggybackHub(
+        PiggybackHubConfig(_SITE_A, targets={_VM_B: _SITE_B}),
+        network.transport(_SITE_A),
+        logging.getLogger("test"),
+    )
+
+    with site(_SITE_A):
+        piggyback.store_piggyback_raw_data(_SOURCE, {_VM_B: [b"b"]}, 1000)
+        # The hub of site B is not connected yet
+        assert hub_a.send_updates() == 0
+
+        hub_b = PiggybackHub(
+            PiggybackHubConfig(_SITE_B, targets={_VM_B: _SITE_B}),
+            network.transport(_SITE_B),
+            logging.getLogger("test"),
+        )
+        assert hub_a.send_updates() == 1
+
+    with site(_SITE_B):
+        assert hub_b.receive_updates(timeout=0) == 1
+        (raw_data_info,) = piggyback.get_piggyback_raw_data(_VM_B)
+        assert raw_data_info.raw_data == b"b\n"
@@ -20,8 +20,8 @@ from cmk.utils.sectionname import SectionName
 
 from cmk.snmplib import OID, SNMPBackend, SNMPBackendEnum, SNMPHostConfig, SNMPVersion
 
-import cmk.fetchers._snmpcache as snmp_cache
 import cmk.fetchers._snmpscan as snmp_scan
+from cmk.fetchers._snmpcache import SingleOIDCache
 
 import cmk.base.api.agent_based.register as agent_based_register
 
@@ -184,53 +184,54 @@ def backend() -> Iterator[SNMPBackend]:
 
 
 @pytest.fixture
-def cache_oids(backend, tmp_path):
+def oid_cache(backend: SNMPBackend, tmp_path: Path) -> SingleOIDCache:
     # Cache OIDs to avoid actual SNMP I/O.
-    snmp_cache.initialize_single_oid_cache(
-        backend.config.hostname, backend.config.ipaddress, cache_dir=tmp_path
+    cache = SingleOIDCache(
+        backend.config.hostname, backend.config.ipaddress, cache_dir=tmp_path, ttl=300
     )
-    snmp_cache.single_oid_cache()[snmp_scan.OID_SYS_DESCR] = "sys description"
-    snmp_cache.single_oid_cache()[snmp_scan.OID_SYS_OBJ] = "sys object"
-    yield
-    snmp_cache._clear_other_hosts_oid_cache(backend.hostname)
+    cache[snmp_scan.OID_SYS_DESCR] = "sys description"
+    cache[snmp_scan.OID_SYS_OBJ] = "sys object"
+    cache.save()
+    return cache
 
 
-@pytest.mark.usefixtures("cache_oids")
 @pytest.mark.parametrize("oid", [snmp_scan.OID_SYS_DESCR, snmp_scan.OID_SYS_OBJ])
-def test_snmp_scan_prefetch_description_object__oid_missing(oid: OID, backend: SNMPBackend) -> None:
-    snmp_cache.single_oid_cache()[oid] = None
+def test_snmp_scan_prefetch_description_object__oid_missing(
+    oid: OID, oid_cache: SingleOIDCache, backend: SNMPBackend
+) -> None:
+    oid_cache[oid] = None
 
     with pytest.raises(MKSNMPError, match=r"Cannot fetch [\w ]+ OID %s" % oid):
-        snmp_scan._prefetch_description_object(backend=backend)
+        snmp_scan._prefetch_description_object(oid_cache, backend=backend)
 
 
-@pytest.mark.usefixtures("cache_oids")
-def test_snmp_scan_prefetch_description_object__success(backend: SNMPBackend) -> None:
-    sys_desc = snmp_cache.single_oid_cache()[snmp_scan.OID_SYS_DESCR]
-    sys_obj = snmp_cache.single_oid_cache()[snmp_scan.OID_SYS_OBJ]
+def test_snmp_scan_prefetch_description_object__success(
+    oid_cache: SingleOIDCache, backend: SNMPBackend
+) -> None:
+    sys_desc = oid_cache[snmp_scan.OID_SYS_DESCR]
+    sys_obj = oid_cache[snmp_scan.OID_SYS_OBJ]
     assert sys_desc
     assert sys_obj
 
-    snmp_scan._prefetch_description_object(backend=backend)
+    snmp_scan._prefetch_description_object(oid_cache, backend=backend)
 
     # Success is no-op
-    assert snmp_cache.single_oid_cache()[snmp_scan.OID_SYS_DESCR] == sys_desc
-    assert snmp_cache.single_oid_cache()[snmp_scan.OID_SYS_OBJ] == sys_obj
+    assert oid_cache[snmp_scan.OID_SYS_DESCR] == sys_desc
+    assert oid_cache[snmp_scan.OID_SYS_OBJ] == sys_obj
 
 
-@pytest.mark.usefixtures("cache_oids")
-def test_snmp_scan_fake_description_object__success(backend: SNMPBackend) -> None:
-    snmp_scan._fake_description_object(logging.getLogger("test"))
+def test_snmp_scan_fake_description_object__success(oid_cache: SingleOIDCache) -> None:
+    snmp_scan._fake_description_object(oid_cache, logging.getLogger("test"))
 
-    assert snmp_cache.single_oid_cache()[snmp_scan.OID_SYS_DESCR] == ""
-    assert snmp_cache.single_oid_cache()[snmp_scan.OID_SYS_OBJ] == ""
+    assert oid_cache[snmp_scan.OID_SYS_DESCR] == ""
+    assert oid_cache[snmp_scan.OID_SYS_OBJ] == ""
 
 
-@pytest.mark.usefixtures("cache_oids")
-def test_snmp_scan_find_plugins__success(backend: SNMPBackend) -> None:
+def test_snmp_scan_find_plugins__success(oid_cache: SingleOIDCache, backend: SNMPBackend) -> None:
     sections = [(s.name, s.detect_spec) for s in agent_based_register.iter_all_snmp_sections()]
     found = snmp_scan._find_sections(
         sections,
+        oid_cache,
         on_error=OnError.RAISE,
         backend=backend,
     )
@@ -240,10 +241,8 @@ def test_snmp_scan_find_plugins__success(backend: SNMPBackend) -> None:
     assert len(sections) > len(found)
 
 
-@pytest.mark.usefixtures("cache_oids")
+@pytest.mark.usefixtures("oid_cache")
 def test_gather_available_raw_section_names_defaults(backend: SNMPBackend, tmp_path: Path) -> None:
-    assert snmp_cache.single_oid_cache()[snmp_scan.OID_SYS_DESCR]
-    assert snmp_cache.single_oid_cache()[snmp_scan.OID_SYS_OBJ]
 
     assert snmp_scan.gather_available_raw_section_names(
         [(s.name, s.detect_spec) for s in agent_based_register.iter_all_snmp_sections()],
@@ -12,6 +12,7 @@ import cmk.utils.paths
 from cmk.utils.hostaddress import HostAddress
 
 from cmk import piggyback
+from cmk.piggyback import _storage
 
 _TEST_HOST_NAME = HostAddress("test-host")
 
@@ -123,33 +124,93 @@ def test_get_source_and_piggyback_hosts() -> None:
     piggybacked = piggyback.get_piggybacked_host_with_sources()
 
     pprint.pprint(piggybacked)  # pytest won't show it :-(
-    assert piggybacked == {
+    assert {
+        host: [(i.source, i.last_update, i.last_contact) for i in infos]
+        for host, infos in piggybacked.items()
+    } == {
         HostAddress("test-host"): [
-            piggyback.PiggybackFileInfo(
-                source=HostAddress("source1"),
-                file_path=cmk.utils.paths.piggyback_dir / "test-host" / "source1",
-                last_update=int(_REF_TIME - 10),
-                last_contact=int(_REF_TIME),
-            ),
-            piggyback.PiggybackFileInfo(
-                source=HostAddress("source2"),
-                file_path=cmk.utils.paths.piggyback_dir / "test-host" / "source2",
-                last_update=int(_REF_TIME),
-                last_contact=int(_REF_TIME),
-            ),
+            (HostAddress("source1"), int(_REF_TIME - 10), int(_REF_TIME)),
+            (HostAddress("source2"), int(_REF_TIME), int(_REF_TIME)),
         ],
         HostAddress("test-host2"): [
-            piggyback.PiggybackFileInfo(
-                source=HostAddress("source1"),
-                file_path=cmk.utils.paths.piggyback_dir / "test-host2" / "source1",
-                last_update=int(_REF_TIME),
-                last_contact=int(_REF_TIME),
-            ),
-            piggyback.PiggybackFileInfo(
-                source=HostAddress("source2"),
-                file_path=cmk.utils.paths.piggyback_dir / "test-host2" / "source2",
-                last_update=int(_REF_TIME),
-                last_contact=int(_REF_TIME),
-            ),
+            (HostAddress("source1"), int(_REF_TIME), int(_REF_TIME)),
+            (HostAddress("source2"), int(_REF_TIME), int(_REF_TIME)),
         ],
     }
+    assert all(
+        info.file_path.parent == cmk.utils.paths.piggyback_dir / info.source
+        for infos in piggybacked.values()
+        for info in infos
+    )
+
+
+def test_store_piggyback_raw_data_removes_superseded_files() -> None:
+    source = HostAddress("source1")
+    piggyback.store_piggyback_raw_data(source, {_TEST_HOST_NAME: _PAYLOAD}, _REF_TIME)
+    piggyback.store_piggyback_raw_data(source, {HostAddress("other"): _PAYLOAD}, _REF_TIME + 10)
+    # the payload for _TEST_HOST_NAME is still in use
+    assert len(list((cmk.utils.paths.piggyback_dir / source).iterdir())) == 2
+
+    piggyback.store_piggyback_raw_data(
+        source, {_TEST_HOST_NAME: (b"new",), HostAddress("other"): _PAYLOAD}, _REF_TIME + 20
+    )
+
+    assert len(list((cmk.utils.paths.piggyback_dir / source).iterdir())) == 1
+    assert _get_only_raw_data_element(_TEST_HOST_NAME).raw_data == b"new\n"
+    assert _get_only_raw_data_element(HostAddress("other")).raw_data == b"pay\nload\n"
+
+
+def test_get_piggyback_raw_data_of_removed_file() -> None:
+    source = HostAddress("source1")
+    piggyback.store_piggyback_raw_data(source, {_TEST_HOST_NAME: _PAYLOAD}, _REF_TIME)
+    with _storage._catalog() as catalog:
+        stale_row = catalog.execute(_storage._SELECT_PAYLOADS, (str(_TEST_HOST_NAME),)).fetchone()
+    # Supersedes the payload looked up above and removes its file
+    piggyback.store_piggyback_raw_data(source, {_TEST_HOST_NAME: (b"new",)}, _REF_TIME + 10)
+
+    raw_data_info = _storage._read_payload(_TEST_HOST_NAME, stale_row)
+
+    assert raw_data_info is not None
+    assert raw_data_info.raw_data == b"new\n"
+    assert raw_data_info.info.last_update == _REF_TIME + 10
+
+
+def test_cleanup_piggyback_files() -> None:
+    piggyback.store_piggyback_raw_data(
+        HostAddress("source1"), {_TEST_HOST_NAME: _PAYLOAD}, _REF_TIME
+    )
+    piggyback.store_piggyback_raw_data(
+        HostAddress("source2"), {_TEST_HOST_NAME: _PAYLOAD}, _REF_TIME + 10
+    )
+
+    piggyback.cleanup_piggyback_files(_REF_TIME + 5)
+
+    info = _get_only_raw_data_element(_TEST_HOST_NAME).info
+    assert info.source == HostAddress("source2")
+    # The payload file of source1 is not referenced anymore, but it is brand new, so it has
+    # to stay in case it is in the middle of being written.
+    assert (cmk.utils.paths.piggyback_dir / "source1").exists()
+
+    piggyback.cleanup_piggyback_files(_REF_TIME + 20)
+
+    assert not piggyback.get_piggyback_raw_data(_TEST_HOST_NAME)
+
+
+def test_move_for_host_rename() -> None:
+    piggyback.store_piggyback_raw_data(
+        HostAddress("source1"), {HostAddress("old"): _PAYLOAD}, _REF_TIME
+    )
+    piggyback.store_piggyback_raw_data(
+        HostAddress("old"), {_TEST_HOST_NAME: (b"from old",)}, _REF_TIME
+    )
+
+    assert piggyback.move_for_host_rename("old", "new") == ("piggyback-load", "piggyback-pig")
+
+    assert not piggyback.get_piggyback_raw_data(HostAddress("old"))
+    assert _get_only_raw_data_element(HostAddress("new")).raw_data == b"pay\nload\n"
+    stored = _get_only_raw_data_element(_TEST_HOST_NAME)
+    assert stored.info.source == HostAddress("new")
+    assert stored.info.last_contact == _REF_TIME
+    assert stored.raw_data == b"from old\n"
+
+    assert not piggyback.move_for_host_rename("old", "new")
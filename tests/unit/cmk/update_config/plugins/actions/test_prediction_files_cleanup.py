@@ -33,11 +33,23 @@ def test_ok_files_are_kept(tmp_path: Path) -> None:
             step=2,
         ).model_dump_json(),
     )
+    binary_info_file = tmp_path / "my_binary_prediction.info"
+    binary_data_file = tmp_path / "my_binary_prediction"
+    binary_info_file.write_text(info_file.read_text())
+    binary_data_file.write_bytes(
+        PredictionData(
+            points=[DataStat(average=1.0, max_=2.0, min_=3.0, stdev=None), None],
+            start=1,
+            step=2,
+        ).serialize(),
+    )
 
     RemoveUnreadablePredictions.cleanup_unreadable_files(tmp_path)
 
     assert info_file.exists()
     assert data_file.exists()
+    assert binary_info_file.exists()
+    assert binary_data_file.exists()
 
 
 def test_corrupt_files_are_removed(tmp_path: Path) -> None:
@@ -3,6 +3,8 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+import pytest
+
 from livestatus import LocalConnection
 
 from cmk.utils.hostaddress import HostName
@@ -64,8 +66,9 @@ class TestPredictionQuerier:
         )
         assert list(querier.query_available_predictions(metric)) == [expected_prediction_info]
 
+    @pytest.mark.parametrize("binary", [True, False])
     def test_query_prediction_data(
-        self, patch_omd_site: None, mock_livestatus: MockLiveStatusConnection
+        self, patch_omd_site: None, mock_livestatus: MockLiveStatusConnection, binary: bool
     ) -> None:
         metric = "metric"
         querier = self._prediction_querier()
@@ -94,7 +97,11 @@ class TestPredictionQuerier:
                 {
                     "host_name": str(querier.host_name),
                     "description": str(querier.service_name),
-                    f"prediction_file:file:{metric}/day-1234-lower": expected_prediction_data.model_dump_json().encode(),
+                    f"prediction_file:file:{metric}/day-1234-lower": (
+                        expected_prediction_data.serialize()
+                        if binary
+                        else expected_prediction_data.model_dump_json().encode()
+                    ),
                 }
             ],
             site=SiteName("local"),
@@ -6,6 +6,10 @@
 # pylint: disable=protected-access
 
 import json
+import math
+import random
+import time
+from collections.abc import Sequence
 
 import pytest
 
@@ -210,3 +214,125 @@ def test_calculate_data_for_prediction(
     assert len(expected_reference.points) == len(data_for_pred.points)
     for cal, ref in zip(data_for_pred.points, expected_reference.points):
         assert cal == pytest.approx(ref, rel=1e-12, abs=1e-12)
+
+
+def _reference_data_stats(
+    youngest_range: range,
+    raw_slices: Sequence[tuple[range, Sequence[float | None], int]],
+) -> list[_prediction.DataStat | None]:
+    """The former pure Python implementation"""
+
+    def resample(
+        current_range: range, values: Sequence[float | None], new_range: range
+    ) -> Sequence[float | None]:
+        if current_range == new_range:
+            return values
+        idx_max = len(values) - 1
+        return [
+            values[max(0, min(int((t - current_range.start) / current_range.step), idx_max))]
+            for t in new_range
+        ]
+
+    def data_stat(values: Sequence[float]) -> _prediction.DataStat:
+        average = sum(values) / float(len(values))
+        samples = len(values)
+        return _prediction.DataStat(
+            average=average,
+            min_=min(values),
+            max_=max(values),
+            stdev=(
+                None
+                if samples == 1
+                else math.sqrt(
+                    abs(sum(p**2 for p in values) - average**2 * samples) / float(samples - 1)
+                )
+            ),
+        )
+
+    slices = [
+        resample(
+            current_range,
+            values,
+            range(youngest_range.start - shift, youngest_range.stop - shift, youngest_range.step),
+        )
+        for current_range, values, shift in raw_slices
+    ]
+    return [
+        data_stat(point_line) if (point_line := [x for x in column if x is not None]) else None
+        for column in zip(*slices)
+    ]
+
+
+def _random_slices(
+    rng: random.Random, num_slices: int
+) -> list[tuple[range, Sequence[float | None], int]]:
+    youngest = range(1700000000, 1700086400, 60)
+    raw_slices: list[tuple[range, Sequence[float | None], int]] = []
+    for nr in range(num_slices):
+        step = rng.choice([60, 60, 300, 1800])
+        shift = nr * 86400
+        window = range(
+            youngest.start - shift, youngest.stop - shift + rng.randrange(2) * step, step
+        )
+        values = [
+            None if rng.random() < 0.1 else rng.choice([rng.uniform(-1e6, 1e6), rng.random()])
+            for _ in window
+        ]
+        raw_slices.append((youngest if nr == 0 else window, values, shift))
+    return raw_slices
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_calculate_data_for_prediction_is_identical_to_pure_python(seed: int) -> None:
+    rng = random.Random(seed)
+    raw_slices = _random_slices(rng, rng.randrange(1, 14))
+
+    prediction = _prediction._calculate_data_for_prediction(raw_slices[0][0], raw_slices)
+
+    reference = _reference_data_stats(raw_slices[0][0], raw_slices)
+    assert [p and p[:3] for p in prediction.points] == [r and r[:3] for r in reference]
+    # The squares are x * x rather than the (not always correctly rounded) pow(x, 2.0)
+    assert [p and p.stdev for p in prediction.points] == [
+        r and pytest.approx(r.stdev, rel=1e-12) for r in reference
+    ]
+
+
+def test_prediction_data_binary_roundtrip() -> None:
+    prediction = _prediction.PredictionData(
+        points=[
+            _prediction.DataStat(1.5, -1.0, 3.0, 0.25),
+            None,
+            _prediction.DataStat(2.0, 2.0, 2.0, None),
+        ],
+        start=1700000000,
+        step=60,
+    )
+    raw = prediction.serialize()
+
+    assert len(raw) == 24 + 3 * 4 * 8
+    assert _prediction.PredictionData.deserialize(raw) == prediction
+    # Files written by older versions are still readable
+    assert (
+        _prediction.PredictionData.deserialize(prediction.model_dump_json().encode()) == prediction
+    )
+    with pytest.raises(ValueError):
+        _prediction.PredictionData.deserialize(raw[:-8])
+
+
+@pytest.mark.slow
+def test_benchmark_calculate_data_for_prediction(capsys: pytest.CaptureFixture[str]) -> None:
+    raw_slices = _random_slices(random.Random(0), 13)
+
+    start = time.perf_counter()
+    _reference_data_stats(raw_slices[0][0], raw_slices)
+    pure_python = time.perf_counter() - start
+
+    start = time.perf_counter()
+    _prediction._calculate_data_for_prediction(raw_slices[0][0], raw_slices)
+    vectorized = time.perf_counter() - start
+
+    with capsys.disabled():
+        print(
+            f"\n13 slices of {len(raw_slices[0][0])} points:"
+            f" pure Python {pure_python * 1000:.1f}ms, NumPy {vectorized * 1000:.1f}ms"
+        )
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+# pylint: disable=protected-access
+
+import random
+import time
+from collections.abc import Mapping, Sequence
+from typing import NamedTuple
+
+import pytest
+
+from cmk.utils.hostaddress import HostName
+from cmk.utils.labels import Labels
+from cmk.utils.rulesets.host_index import HostBitmapIndex
+from cmk.utils.rulesets.ruleset_matcher import (
+    LabelManager,
+    matches_host_name,
+    matches_host_tags,
+    matches_labels,
+    RuleConditionsSpec,
+    RulesetMatcher,
+    TagCondition,
+)
+from cmk.utils.tags import TagGroupID, TagID
+
+
+def _index() -> HostBitmapIndex:
+    return HostBitmapIndex(
+        [HostName("h0"), HostName("h1"), HostName("h2"), HostName("h1")],
+        {
+            HostName("h0"): [(TagGroupID("crit"), TagID("prod"))],
+            HostName("h1"): [(TagGroupID("crit"), TagID("test"))],
+            HostName("h2"): [(TagGroupID("crit"), TagID("prod"))],
+        },
+        {HostName("h0"): "/a/", HostName("h1"): "/a/b/", HostName("h2"): "/c/"},
+    )
+
+
+def test_host_index_bitmap_roundtrip() -> None:
+    index = _index()
+    assert index.all_hosts == 0b111
+    assert index.bitmap([HostName("h2"), HostName("h0"), HostName("unknown")]) == 0b101
+    assert index.hosts(0b101) == {HostName("h0"), HostName("h2")}
+    assert index.hosts(0) == set()
+
+
+def test_host_index_tags_and_folders() -> None:
+    index = _index()
+    assert index.tag(TagGroupID("crit"), TagID("prod")) == 0b101
+    assert index.tag(TagGroupID("crit"), TagID("unknown")) == 0
+    assert index.folder("/") == 0b111
+    assert index.folder("/a/") == 0b011
+    assert index.folder("/a/b/") == 0b010
+
+
+def test_host_index_lazy_evaluation() -> None:
+    index = _index()
+    asked: list[HostName] = []
+
+    def labels_of_host(host_name: HostName) -> Labels:
+        asked.append(host_name)
+        return {"os": "linux"} if host_name != HostName("h1") else {}
+
+    assert index.label("os", "linux", 0b011, labels_of_host) == 0b001
+    assert sorted(asked) == [HostName("h0"), HostName("h1")]
+    assert index.label("os", "linux", 0b111, labels_of_host) == 0b101
+    assert sorted(asked) == [HostName("h0"), HostName("h1"), HostName("h2")]
+
+    assert index.host_name_regex("h[12]", 0b111) == 0b110
+
+
+class _Setup(NamedTuple):
+    matcher: RulesetMatcher
+    conditions: Sequence[RuleConditionsSpec]
+    host_tags: Mapping[HostName, set[tuple[TagGroupID, TagID]]]
+    host_paths: Mapping[HostName, str]
+    host_labels: Mapping[HostName, Labels]
+
+
+def _random_setup(num_hosts: int, num_rules: int) -> _Setup:
+    rand = random.Random(4711)
+    hosts = [HostName(f"host{i:05}") for i in range(num_hosts)]
+    tag_groups = {
+        TagGroupID(f"grp{g}"): [TagID(f"grp{g}_tag{t}") for t in range(4)] for g in range(6)
+    }
+    host_tags: dict[HostName, Mapping[TagGroupID, TagID]] = {
+        host_name: {group_id: rand.choice(tag_ids) for group_id, tag_ids in tag_groups.items()}
+        for host_name in hosts
+    }
+    folders = ["/", "/a/", "/a/b/", "/c/", "/c/d/"]
+    host_paths = {host_name: rand.choice(folders) for host_name in hosts}
+    host_labels: dict[HostName, Labels] = {
+        host_name: {f"key{k}": f"value{rand.randrange(3)}" for k in range(3)} for host_name in hosts
+    }
+
+    conditions: list[RuleConditionsSpec] = []
+    for _ in range(num_rules):
+        condition: RuleConditionsSpec = {"host_folder": rand.choice(folders)}
+        kind = rand.random()
+        if kind < 0.15:
+            # No conditions besides the folder
+            conditions.append(condition)
+            continue
+        if kind < 0.3:
+            # Explicit host list only
+            condition["host_name"] = rand.sample(hosts, rand.randrange(1, 6))
+            conditions.append(condition)
+            continue
+
+        group_id, tag_ids = rand.choice(list(tag_groups.items()))
+        tag_conditions: list[TagCondition] = [
+            rand.choice(tag_ids),
+            {"$ne": rand.choice(tag_ids)},
+            {"$or": rand.sample(tag_ids, 2)},
+            {"$nor": rand.sample(tag_ids, 2)},
+        ]
+        condition["host_tags"] = {group_id: rand.choice(tag_conditions)}
+        if rand.random() < 0.3:
+            condition["host_label_groups"] = [
+                (
+                    rand.choice(["and", "or", "not"]),
+                    [
+                        (
+                            rand.choice(["and", "not"]),
+                            f"key{rand.randrange(3)}:value{rand.randrange(3)}",
+                        ),
+                        (
+                            rand.choice(["and", "or", "not"]),
+                            f"key{rand.randrange(3)}:value{rand.randrange(3)}",
+                        ),
+                    ],
+                )
+            ]
+        if rand.random() < 0.2:
+            entries: list = (
+                [{"$regex": f"host0{rand.randrange(10)}"}, rand.choice(hosts)]
+                if rand.random() < 0.5
+                else rand.sample(hosts, 3)
+            )
+            condition["host_name"] = {"$nor": entries} if rand.random() < 0.5 else entries
+        conditions.append(condition)
+
+    matcher = RulesetMatcher(
+        host_tags=host_tags,
+        host_paths=host_paths,
+        label_manager=LabelManager(
+            explicit_host_labels=host_labels,
+            host_label_rules=(),
+            service_label_rules=(),
+            discovered_labels_of_service=lambda *args, **kw: {},
+        ),
+        all_configured_hosts=hosts,
+        clusters_of={},
+        nodes_of={},
+    )
+    # Do not touch the disk while computing the labels of the hosts
+    matcher.ruleset_optimizer.labels_of_host = host_labels.__getitem__  # type: ignore[method-assign,assignment]
+    return _Setup(
+        matcher,
+        conditions,
+        {host_name: set(tags.items()) for host_name, tags in host_tags.items()},
+        host_paths,
+        host_labels,
+    )
+
+
+def _match_host_by_host(setup: _Setup, condition: RuleConditionsSpec) -> set[HostName]:
+    """The straight forward implementation the bitmap index has to agree with"""
+    if condition.get("host_name") == []:
+        return set()
+    return {
+        host_name
+        for host_name in setup.host_paths
+        if setup.host_paths[host_name].startswith(condition.get("host_folder", "/"))
+        and matches_host_tags(setup.host_tags[host_name], condition.get("host_tags", {}))
+        and matches_labels(setup.host_labels[host_name], condition.get("host_label_groups", []))
+        and matches_host_name(condition.get("host_name"), host_name)
+    }
+
+
+class _BaselineMatcher:
+    """How RulesetOptimizer._all_matching_hosts matched before the bitmap index
+
+    The hosts of the folders are looked up once per folder, rules with tag conditions only
+    check the tags of these hosts, explicit host lists are intersected with them and all other
+    rules are matched host by host.
+    """
+
+    def __init__(self, setup: _Setup) -> None:
+        self._setup = setup
+        self._hosts_within_folder: dict[str, set[HostName]] = {}
+
+    def _get_hosts_within_folder(self, folder_path: str) -> set[HostName]:
+        try:
+            return self._hosts_within_folder[folder_path]
+        except KeyError:
+            pass
+        hosts = self._hosts_within_folder[folder_path] = {
+            host_name
+            for host_name, host_path in self._setup.host_paths.items()
+            if host_path.startswith(folder_path)
+        }
+        return hosts
+
+    def all_matching_hosts(self, condition: RuleConditionsSpec) -> set[HostName]:
+        hostlist = condition.get("host_name")
+        tag_conditions = condition.get("host_tags", {})
+        label_groups = condition.get("host_label_groups", [])
+        valid_hosts = self._get_hosts_within_folder(condition.get("host_folder", "/"))
+
+        if (
+            tag_conditions
+            and hostlist is None
+            and not label_groups
+            and not any(
+                isinstance(c, dict) and ("$or" in c or "$nor" in c) for c in tag_conditions.values()
+            )
+        ):
+            return {
+                host_name
+                for host_name in valid_hosts
+                if matches_host_tags(self._setup.host_tags[host_name], tag_conditions)
+            }
+
+        only_specific_hosts = isinstance(hostlist, list) and all(
+            not isinstance(x, dict) for x in hostlist
+        )
+        if hostlist == []:
+            return set()
+        if not tag_conditions and not label_groups and not hostlist:
+            return valid_hosts
+        if not tag_conditions and not label_groups and only_specific_hosts:
+            return valid_hosts.intersection(hostlist)  # type: ignore[arg-type]
+
+        hosts_to_check = (
+            valid_hosts.intersection(hostlist)  # type: ignore[arg-type]
+            if only_specific_hosts
+            else valid_hosts
+        )
+        return {
+            host_name
+            for host_name in hosts_to_check
+            if (
+                not tag_conditions
+                or matches_host_tags(self._setup.host_tags[host_name], tag_conditions)
+            )
+            and (
+                not label_groups or matches_labels(self._setup.host_labels[host_name], label_groups)
+            )
+            and matches_host_name(hostlist, host_name)
+        }
+
+
+def test_all_matching_hosts_agrees_with_host_by_host_matching() -> None:
+    setup = _random_setup(num_hosts=300, num_rules=200)
+    baseline = _BaselineMatcher(setup)
+    for condition in setup.conditions:
+        matching = setup.matcher.ruleset_optimizer._all_matching_hosts(
+            condition, with_foreign_hosts=False
+        )
+        assert matching == _match_host_by_host(setup, condition), condition
+        assert matching == baseline.all_matching_hosts(condition), condition
+
+
+def test_from_positions_sparse_and_dense() -> None:
+    hosts = [HostName(f"h{i}") for i in range(1000)]
+    index = HostBitmapIndex(hosts, {}, {})
+    assert index._from_positions([3, 999]) == (1 << 3) | (1 << 999)
+    assert index._from_positions(range(0, 1000, 2)) == sum(1 << i for i in range(0, 1000, 2))
+    assert index._from_positions([]) == 0
+
+
+@pytest.mark.slow
+def test_benchmark_all_matching_hosts(capsys: pytest.CaptureFixture[str]) -> None:
+    setup = _random_setup(num_hosts=10000, num_rules=300)
+
+    start = time.perf_counter()
+    baseline_matcher = _BaselineMatcher(setup)
+    baseline = [baseline_matcher.all_matching_hosts(condition) for condition in setup.conditions]
+    baseline_duration = time.perf_counter() - start
+
+    start = time.perf_counter()
+    bitmap = [
+        setup.matcher.ruleset_optimizer._all_matching_hosts(condition, with_foreign_hosts=False)
+        for condition in setup.conditions
+    ]
+    bitmap_duration = time.perf_counter() - start
+
+    assert bitmap == baseline
+    with capsys.disabled():
+        print(f"\nbaseline: {baseline_duration:.3f}s, bitmap index: {bitmap_duration:.3f}s")
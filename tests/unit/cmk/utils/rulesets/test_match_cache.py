@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+from collections.abc import Sequence
+from pathlib import Path
+
+from cmk.utils.hostaddress import HostName
+from cmk.utils.rulesets.match_cache import PrecomputedHostRuleMatchesStore
+from cmk.utils.rulesets.ruleset_matcher import (
+    LabelManager,
+    RulesetMatcher,
+    ruleset_fingerprint,
+    RuleSpec,
+)
+
+_DIGEST = b"x" * 32
+
+ruleset: Sequence[RuleSpec[str]] = [
+    {"id": "1", "value": "one", "condition": {"host_name": ["host1"]}},
+    {"id": "2", "value": "two", "condition": {}, "options": {"disabled": True}},
+    {"id": "3", "value": "three", "condition": {"host_name": ["host1", "host2"]}},
+]
+
+
+def _matcher() -> RulesetMatcher:
+    return RulesetMatcher(
+        host_tags={HostName("host1"): {}, HostName("host2"): {}, HostName("host3"): {}},
+        host_paths={},
+        label_manager=LabelManager(
+            explicit_host_labels={},
+            host_label_rules=(),
+            service_label_rules=(),
+            discovered_labels_of_service=lambda *args, **kw: {},
+        ),
+        all_configured_hosts=[HostName("host1"), HostName("host2"), HostName("host3")],
+        clusters_of={},
+        nodes_of={},
+    )
+
+
+def test_ruleset_fingerprint() -> None:
+    assert ruleset_fingerprint(ruleset) == ruleset_fingerprint(list(ruleset))
+    assert ruleset_fingerprint(ruleset) != ruleset_fingerprint(ruleset[:2])
+    # The values are not relevant for the matching
+    other_values: list[RuleSpec[str]] = [{**rule, "value": "other"} for rule in ruleset]
+    assert ruleset_fingerprint(ruleset) == ruleset_fingerprint(other_values)
+
+
+def test_host_rule_indices() -> None:
+    assert _matcher().ruleset_optimizer.host_rule_indices(ruleset) == {
+        HostName("host1"): [0, 2],
+        HostName("host2"): [2],
+    }
+
+
+def test_write_and_load(tmp_path: Path) -> None:
+    store = PrecomputedHostRuleMatchesStore(tmp_path / "matches")
+    store.write(
+        _DIGEST,
+        [HostName("host1"), HostName("host2")],
+        {"fingerprint": {HostName("host1"): [0, 2], HostName("unknown"): [1]}},
+    )
+
+    assert store.load(b"y" * 32) is None
+
+    cache = store.load(_DIGEST)
+    assert cache is not None
+    assert cache.rule_indices(HostName("host1"), "fingerprint") == (0, 2)
+    assert not cache.rule_indices(HostName("host2"), "fingerprint")
+    assert cache.rule_indices(HostName("host2"), "other fingerprint") is None
+    assert cache.rule_indices(HostName("unknown"), "fingerprint") is None
+
+
+def test_write_is_independent_of_the_order(tmp_path: Path) -> None:
+    hosts = [HostName("host1"), HostName("host2"), HostName("host3")]
+    matches = {
+        "fingerprint1": {HostName("host1"): [0, 2]},
+        "fingerprint2": {HostName("host3"): [1], HostName("host2"): [0]},
+    }
+    PrecomputedHostRuleMatchesStore(tmp_path / "matches1").write(_DIGEST, hosts, matches)
+    PrecomputedHostRuleMatchesStore(tmp_path / "matches2").write(
+        _DIGEST,
+        reversed(hosts),
+        {fingerprint: matches[fingerprint] for fingerprint in reversed(matches)},
+    )
+
+    assert (tmp_path / "matches1").read_bytes() == (tmp_path / "matches2").read_bytes()
+
+
+def test_load_missing_file(tmp_path: Path) -> None:
+    assert PrecomputedHostRuleMatchesStore(tmp_path / "matches").load(_DIGEST) is None
+
+
+def test_get_host_values_uses_precomputed_matches(tmp_path: Path) -> None:
+    store = PrecomputedHostRuleMatchesStore(tmp_path / "matches")
+    # Deliberately different from what the matching would compute
+    store.write(
+        _DIGEST,
+        [HostName("host1"), HostName("host2")],
+        {ruleset_fingerprint(ruleset): {HostName("host1"): [2]}},
+    )
+    matcher = _matcher()
+    matcher.ruleset_optimizer.set_precomputed_host_matches(store.load(_DIGEST))
+
+    assert matcher.get_host_values(HostName("host1"), ruleset) == ["three"]
+    assert not matcher.get_host_values(HostName("host2"), ruleset)
+    # Not precomputed: fall back to the regular matching
+    assert not matcher.get_host_values(HostName("host3"), ruleset)
+    assert matcher.get_host_values(HostName("host1"), ruleset[:1]) == ["one"]
+
+    matcher.clear_caches()
+    assert matcher.get_host_values(HostName("host1"), ruleset) == ["one", "three"]
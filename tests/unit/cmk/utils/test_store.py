@@ -91,6 +91,79 @@ def test_object_store_default(io: type[FileIo], exists: bool, tmp_path: Path) ->
     assert a.read_obj(default="zz") == "zz"
 
 
+def _cached_store(path: Path, cache: store.ObjectCache) -> ObjectStore:
+    return ObjectStore(path, serializer=store.DimSerializer(), cache=cache)
+
+
+def test_object_cache(tmp_path: Path) -> None:
+    cache = store.ObjectCache(max_bytes=1024 * 1024, settle_time=0)
+    test_file = tmp_path / "cached"
+    _cached_store(test_file, cache).write_obj({"a": [1, 2]})
+
+    first = _cached_store(test_file, cache).read_obj(default={})
+    first["a"].append(3)  # Every load returns its own object
+    assert _cached_store(test_file, cache).read_obj(default={}) == {"a": [1, 2]}
+    assert cache.stats()[:2] == (1, 1)  # hits, misses
+
+    # Same size and modified in place: Only the modification time tells the difference
+    test_file.write_text("{'a': [3, 4]}\n")
+    stat = test_file.stat()
+    os.utime(test_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert _cached_store(test_file, cache).read_obj(default={}) == {"a": [3, 4]}
+
+    _cached_store(test_file, cache).write_obj({"b": 1})
+    assert _cached_store(test_file, cache).read_obj(default={}) == {"b": 1}
+
+
+def test_object_cache_missing_and_empty_files_are_not_cached(tmp_path: Path) -> None:
+    cache = store.ObjectCache(max_bytes=1024, settle_time=0)
+    test_file = tmp_path / "cached"
+    assert _cached_store(test_file, cache).read_obj(default=1) == 1
+    test_file.touch()
+    assert _cached_store(test_file, cache).read_obj(default=2) == 2
+    assert cache.stats().entries == 0
+
+
+def test_object_cache_skips_recently_modified_files(tmp_path: Path) -> None:
+    cache = store.ObjectCache(max_bytes=1024, settle_time=60)
+    test_file = tmp_path / "cached"
+    _cached_store(test_file, cache).write_obj([1])
+    assert _cached_store(test_file, cache).read_obj(default=[]) == [1]
+    assert cache.stats().entries == 0
+
+
+def test_object_cache_evicts_least_recently_used(tmp_path: Path) -> None:
+    cache = store.ObjectCache(max_bytes=250, settle_time=0)
+    for name in ("a", "b", "c"):
+        _cached_store(tmp_path / name, cache).write_obj("x" * 80)
+        _cached_store(tmp_path / name, cache).read_obj(default="")
+    assert cache.stats().entries == 2
+    assert cache.stats().evictions == 1
+    assert cache.stats().bytes <= 250
+
+    _cached_store(tmp_path / "b", cache).read_obj(default="")
+    _cached_store(tmp_path / "c", cache).read_obj(default="")
+    assert cache.stats().hits == 2
+
+    _cached_store(tmp_path / "a", cache).read_obj(default="")
+    # "a" has been evicted and pushes out "b" now, which is least recently used
+    _cached_store(tmp_path / "c", cache).read_obj(default="")
+    assert cache.stats().hits == 3
+    _cached_store(tmp_path / "b", cache).read_obj(default="")
+    assert cache.stats().hits == 3
+
+
+def test_object_cache_refuses_world_writable_file(tmp_path: Path) -> None:
+    cache = store.ObjectCache(max_bytes=1024, settle_time=0)
+    test_file = tmp_path / "cached"
+    _cached_store(test_file, cache).write_obj([1])
+    assert _cached_store(test_file, cache).read_obj(default=[]) == [1]
+
+    test_file.chmod(0o666)
+    with pytest.raises(MKGeneralException, match="world writable"):
+        _cached_store(test_file, cache).read_obj(default=[])
+
+
 @pytest.mark.parametrize("path_type", [str, Path])
 def test_mkdir(tmp_path: Path, path_type: type[str] | type[Path]) -> None:
     test_dir = tmp_path / "abc"
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# Copyright (C) 2024 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+# pylint: disable=redefined-outer-name
+
+import asyncio
+import json
+import threading
+import time
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+import livestatus
+
+from cmk.livestatus_client.aio import AsyncMultiSiteConnection, AsyncSiteConnection
+
+
+# Override top level fixture to make livestatus connects possible here
+@pytest.fixture(autouse=True, scope="module")
+def prevent_livestatus_connect() -> None:
+    pass
+
+
+class StandInLivestatus:
+    """A Livestatus socket answering "GET hosts" with a delay, served by a background thread"""
+
+    def __init__(self, path: Path, hosts: int = 3, latency: float = 0.0) -> None:
+        self.path = path
+        self.rows = [[f"host{nr}", nr % 3] for nr in range(hosts)]
+        self.latency = latency
+        self.connections = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._writers: list[asyncio.StreamWriter] = []
+        self._loop = asyncio.new_event_loop()
+        self._stopped = asyncio.Event()
+        self._started = threading.Event()
+        self._thread = threading.Thread(target=self._loop.run_until_complete, args=(self._serve(),))
+        self._thread.start()
+        self._started.wait()
+
+    async def _serve(self) -> None:
+        server = await asyncio.start_unix_server(self._handle, str(self.path))
+        self._started.set()
+        async with server:
+            await self._stopped.wait()
+            server.close()
+            for writer in self._writers:
+                writer.close()
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        self._writers.append(writer)
+        try:
+            while query := await reader.readuntil(b"\n\n"):
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+                await asyncio.sleep(self.latency)
+                self.in_flight -= 1
+                writer.write(self._response(query.decode("utf-8")))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def _response(self, query: str) -> bytes:
+        if not query.startswith("GET hosts\n"):
+            code, payload = 404, b"Invalid GET request, no such table"
+        elif "OutputFormat: json" in query:
+            code, payload = 200, json.dumps(self.rows).encode()
+        else:
+            code, payload = 200, repr(self.rows).encode()
+        return b"%3d %11d\n" % (code, len(payload)) + payload
+
+    def drop_connections(self) -> None:
+        """Close the idle connections, like the core does after its keepalive timeout"""
+
+        def close() -> None:
+            for writer in self._writers:
+                writer.close()
+
+        self._loop.call_soon_threadsafe(close)
+        time.sleep(0.1)
+
+    def stop(self) -> None:
+        self._loop.call_soon_threadsafe(self._stopped.set)
+        self._thread.join()
+        self._loop.close()
+
+
+@pytest.fixture
+def site(tmp_path: Path) -> Iterator[StandInLivestatus]:
+    site = StandInLivestatus(tmp_path / "live")
+    yield site
+    site.stop()
+
+
+def test_query_like_blocking_connection(site: StandInLivestatus) -> None:
+    queries = [
+        livestatus.Query("GET hosts\nColumns: name state"),
+        livestatus.Query(livestatus.QuerySpecification("hosts", ["name", "state"])),
+    ]
+
+    async def query_all() -> list[livestatus.LivestatusResponse]:
+        connection = AsyncSiteConnection(f"unix:{site.path}")
+        try:
+            return [await connection.query(query) for query in queries]
+        finally:
+            await connection.close()
+
+    blocking = livestatus.SingleSiteConnection(f"unix:{site.path}")
+    assert asyncio.run(query_all()) == [blocking.query(query) for query in queries]
+
+
+def test_pool_is_bounded_and_reused(site: StandInLivestatus) -> None:
+    site.latency = 0.05
+
+    async def query_concurrently() -> list[livestatus.LivestatusResponse]:
+        connection = AsyncSiteConnection(f"unix:{site.path}", pool_size=3)
+        try:
+            return await asyncio.gather(*(connection.query("GET hosts") for _ in range(20)))
+        finally:
+            await connection.close()
+
+    assert asyncio.run(query_concurrently()) == [site.rows] * 20
+    assert site.connections == 3
+    assert site.max_in_flight == 3
+
+
+def test_reconnect_after_idle_connection_closed(site: StandInLivestatus) -> None:
+    async def query_twice() -> tuple[livestatus.LivestatusResponse, livestatus.LivestatusResponse]:
+        connection = AsyncSiteConnection(f"unix:{site.path}")
+        try:
+            first = await connection.query("GET hosts")
+            site.drop_connections()
+            return first, await connection.query("GET hosts")
+        finally:
+            await connection.close()
+
+    assert asyncio.run(query_twice()) == (site.rows, site.rows)
+    assert site.connections == 2
+
+
+def test_query_deadline(site: StandInLivestatus) -> None:
+    async def slow_then_fast() -> livestatus.LivestatusResponse:
+        connection = AsyncSiteConnection(f"unix:{site.path}", pool_size=1)
+        try:
+            site.latency = 0.5
+            with pytest.raises(livestatus.MKLivestatusSocketError, match="within 0.1s"):
+                await connection.query("GET hosts", timeout=0.1)
+            site.latency = 0.0
+            # The late response of the first query must not be taken for this one
+            return await connection.query("GET hosts\nColumns: name")
+        finally:
+            await connection.close()
+
+    assert asyncio.run(slow_then_fast()) == site.rows
+
+
+def test_multisite_query(tmp_path: Path) -> None:
+    slow = StandInLivestatus(tmp_path / "slow", hosts=2, latency=0.3)
+    fast = StandInLivestatus(tmp_path / "fast", hosts=1)
+    sites = livestatus.SiteConfigurations(
+        {
+            livestatus.SiteId("slow"): livestatus.SiteConfiguration(socket=f"unix:{slow.path}"),
+            livestatus.SiteId("fast"): livestatus.SiteConfiguration(socket=f"unix:{fast.path}"),
+            livestatus.SiteId("gone"): livestatus.SiteConfiguration(
+                socket=f"unix:{tmp_path / 'gone'}"
+            ),
+        }
+    )
+
+    async def query() -> tuple[livestatus.LivestatusResponse, list[livestatus.LivestatusRow]]:
+        async with AsyncMultiSiteConnection(sites) as live:
+            assert await live.query("GET services") == []
+            return (
+                await live.query("GET hosts\nColumns: name state", prepend_site=True),
+                [row async for row in live.query_iter("GET hosts", prepend_site=True)],
+            )
+
+    try:
+        rows, streamed_rows = asyncio.run(query())
+    finally:
+        slow.stop()
+        fast.stop()
+
+    assert rows == [["slow", "host0", 0], ["slow", "host1", 1], ["fast", "host0", 0]]
+    assert streamed_rows == [["fast", "host0", 0], ["slow", "host0", 0], ["slow", "host1", 1]]
+
+
+def test_multisite_dead_sites(tmp_path: Path) -> None:
+    sites = livestatus.SiteConfigurations(
+        {livestatus.SiteId("gone"): livestatus.SiteConfiguration(socket=f"unix:{tmp_path}/gone")}
+    )
+
+    async def query() -> AsyncMultiSiteConnection:
+        async with AsyncMultiSiteConnection(sites) as live:
+            assert await live.query("GET hosts") == []
+            return live
+
+    live = asyncio.run(query())
+    assert list(live.dead_sites()) == ["gone"]
+    assert isinstance(live.dead_sites()["gone"]["exception"], livestatus.MKLivestatusSocketError)
+
+
+@pytest.mark.slow
+def test_benchmark_many_small_queries(
+    site: StandInLivestatus, capsys: pytest.CaptureFixture[str]
+) -> None:
+    """Independent queries of a REST API request, against a site with some latency"""
+    site.latency = 0.005
+    queries = [f"GET hosts\nColumns: name state\nFilter: name = host{nr % 3}" for nr in range(200)]
+
+    start = time.perf_counter()
+    blocking = livestatus.SingleSiteConnection(f"unix:{site.path}")
+    blocking_results = [blocking.query(query) for query in queries]
+    blocking_duration = time.perf_counter() - start
+
+    async def query_concurrently() -> list[livestatus.LivestatusResponse]:
+        connection = AsyncSiteConnection(f"unix:{site.path}", pool_size=8)
+        try:
+            return await asyncio.gather(*(connection.query(query) for query in queries))
+        finally:
+            await connection.close()
+
+    start = time.perf_counter()
+    async_results = asyncio.run(query_concurrently())
+    async_duration = time.perf_counter() - start
+
+    assert async_results == blocking_results
+    with capsys.disabled():
+        print(
+            f"\n{len(queries)} queries with {site.latency * 1000:.0f}ms latency:"
+            f" blocking {blocking_duration:.3f}s, asyncio (8 connections) {async_duration:.3f}s"
+        )
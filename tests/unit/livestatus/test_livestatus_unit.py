@@ -7,10 +7,13 @@
 
 # pylint: disable=redefined-outer-name
 
+import contextlib
 import errno
 import socket
 import ssl
-from collections.abc import Sequence
+import threading
+import time
+from collections.abc import Iterator, Sequence
 from contextlib import closing
 from pathlib import Path
 
@@ -341,3 +344,105 @@ def test_livestatus_lql(
     result: str,
 ) -> None:
     assert livestatus.livestatus_lql(*args) == result
+
+
+class _FakeSite:
+    """A Livestatus socket answering every query after a delay, keeping the connection open"""
+
+    def __init__(self, path: Path, code: int, payload: bytes, delay: float = 0.0) -> None:
+        self.path = path
+        self.code = code
+        self.payload = payload
+        self.delay = delay
+        self.queries: list[bytes] = []
+        self._server = socket.socket(socket.AF_UNIX)
+        self._server.bind(str(path))
+        self._server.listen(5)
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self) -> None:
+        while True:
+            try:
+                conn, _addr = self._server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn: socket.socket) -> None:
+        with conn, contextlib.suppress(OSError):  # The client may hang up at any time
+            data = b""
+            while packet := conn.recv(4096):
+                data += packet
+                while b"\n\n" in data:
+                    query, data = data.split(b"\n\n", 1)
+                    self.queries.append(query)
+                    time.sleep(self.delay)
+                    conn.sendall(b"%3d %11d\n" % (self.code, len(self.payload)) + self.payload)
+
+    def close(self) -> None:
+        self._server.close()
+
+
+@pytest.fixture
+def fake_sites(tmp_path: Path) -> Iterator[dict[livestatus.SiteId, _FakeSite]]:
+    sites = {
+        livestatus.SiteId("slow"): _FakeSite(tmp_path / "slow", 200, b"[[1], [2]]", delay=0.5),
+        livestatus.SiteId("fast"): _FakeSite(tmp_path / "fast", 200, b"[[3]]"),
+        livestatus.SiteId("error"): _FakeSite(tmp_path / "error", 400, b"Invalid query"),
+    }
+    yield sites
+    for site in sites.values():
+        site.close()
+
+
+def _multisite_connection(
+    fake_sites: dict[livestatus.SiteId, _FakeSite],
+) -> livestatus.MultiSiteConnection:
+    live = livestatus.MultiSiteConnection(
+        livestatus.SiteConfigurations(
+            {
+                site_id: livestatus.SiteConfiguration(socket=f"unix:{site.path}")
+                for site_id, site in fake_sites.items()
+            }
+        )
+    )
+    live.set_prepend_site(True)
+    return live
+
+
+def test_query_parallel_keeps_site_order(fake_sites: dict[livestatus.SiteId, _FakeSite]) -> None:
+    live = _multisite_connection(fake_sites)
+
+    assert live.query("GET hosts\nColumns: name") == [["slow", 1], ["slow", 2], ["fast", 3]]
+    assert live.alive_sites() == ["slow", "fast"]
+    assert set(live.dead_sites()) == {"error"}
+    assert isinstance(live.dead_sites()["error"]["exception"], livestatus.MKLivestatusSocketError)
+    assert fake_sites[livestatus.SiteId("fast")].queries[0].startswith(b"GET hosts\nColumns: name")
+
+
+def test_query_iter_yields_fastest_site_first(
+    fake_sites: dict[livestatus.SiteId, _FakeSite],
+) -> None:
+    live = _multisite_connection(fake_sites)
+    live.set_only_sites([livestatus.SiteId("slow"), livestatus.SiteId("fast")])
+
+    start = time.time()
+    rows = live.query_iter("GET hosts\nColumns: name")
+    assert next(rows) == ["fast", 3]
+    assert time.time() - start < 0.5
+    assert list(rows) == [["slow", 1], ["slow", 2]]
+    assert not live.dead_sites()
+
+
+def test_query_iter_stopped_early(fake_sites: dict[livestatus.SiteId, _FakeSite]) -> None:
+    live = _multisite_connection(fake_sites)
+    live.set_only_sites([livestatus.SiteId("slow"), livestatus.SiteId("fast")])
+
+    rows = live.query_iter("GET hosts\nColumns: name")
+    assert next(rows) == ["fast", 3]
+    rows.close()
+    # The unanswered query must not be taken for the response to the next one
+    assert live.get_connection(livestatus.SiteId("slow")).socket is None
+    assert live.alive_sites() == ["slow", "fast", "error"]
+
+    assert live.query("GET hosts\nColumns: name") == [["slow", 1], ["slow", 2], ["fast", 3]]
@@ -69,7 +69,9 @@ def test_tmpfs_save_then_restore(tmp_path: Path) -> None:
     # Create something to restore
     restored_tmp_files = [
         Path(site_tmp_dir) / "check_mk/piggyback/backed/pig",
-        Path(site_tmp_dir) / "check_mk/piggyback_sources/pig",
+        Path(site_tmp_dir) / "check_mk/piggyback_catalog.sqlite",
+        Path(site_tmp_dir) / "check_mk/piggyback_catalog.sqlite-wal",
+        Path(site_tmp_dir) / "check_mk/counters.sqlite",
     ]
     for file in restored_tmp_files:
         file.parent.mkdir(parents=True, exist_ok=True)